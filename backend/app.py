@@ -1,10 +1,11 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Request, Response, BackgroundTasks, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, model_validator, field_validator
 from dotenv import load_dotenv
 from html.parser import HTMLParser
-from typing import Optional, Dict, Any, Union
+from typing import Optional, Dict, Any, Union, Callable, AsyncIterator
 import os
 import uuid
 import json
@@ -25,14 +26,21 @@ sys.path.insert(0, str(root_dir))
 
 from providers.openai_provider import OpenAIProvider
 from providers.gemini_provider import GeminiProvider
-from database import get_credits, deduct_credits, create_validation_record, update_validation_tracking, add_pass, get_active_pass, try_increment_daily_usage, get_daily_usage_for_current_window
+from database import get_credits, deduct_credits, create_validation_record, update_validation_tracking, add_pass, get_active_pass, try_increment_daily_usage, get_daily_usage_for_current_window, get_pool_metrics, reserve_quota, settle_reservation, refund_reservation, release_stale_reservations, prune_entitlement_changes
 from gating import get_user_type, should_gate_results_sync, log_gating_event, GATED_RESULTS_ENABLED
-from citation_logger import log_citations_to_dashboard, ensure_citation_log_ready, check_disk_space
+from citation_logger import CitationLogWriter, ensure_citation_log_ready, check_disk_space
+from events import emit_event, bind_job, event_log_writer
+from timing import JobTimer, STAGE_LATENCY, bind_timer, timed
+from metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY as METRICS, HTTP_REQUESTS, HTTP_REQUEST_SECONDS,
+    JOBS_CREATED, JOBS_FINISHED, JOBS_IN_FLIGHT, JOB_STORE_SIZE, LLM_CALLS,
+    CITATION_LOG_BACKLOG, CITATION_LOG_BLOCKS
+)
 from dashboard.log_parser import CitationLogParser
 from pricing_config import PRODUCT_CONFIG, get_next_utc_midnight
 
 # Import analytics for funnel data
-from dashboard.analytics import parse_upgrade_events
+from dashboard.analytics import get_upgrade_funnel
 
 # Import styles module for multi-style support
 from styles import SUPPORTED_STYLES, DEFAULT_STYLE, is_valid_style
@@ -40,6 +48,9 @@ from styles import SUPPORTED_STYLES, DEFAULT_STYLE, is_valid_style
 # Import parsing and inline validation modules
 from parsing import convert_docx_to_html, split_document, scan_inline_citations
 from inline_validator import validate_inline_citations
+from job_store import JobStore, create_job_store, DEFAULT_JOB_STALE_SECONDS, DEFAULT_JOB_TTL_SECONDS
+from prompt_manager import PromptManager
+from result_cache import CitationResultCache, validate_with_cache
 
 # Load environment variables
 load_dotenv()
@@ -70,6 +81,14 @@ BASE_URL = os.getenv('BASE_URL', 'https://citationformatchecker.com').rstrip('/'
 CITATION_LOGGING_ENABLED = os.getenv('CITATION_LOGGING_ENABLED', '').lower() == 'true'
 logger.info(f"Citation logging enabled: {CITATION_LOGGING_ENABLED}")
 
+# Per-citation result cache feature toggle for safe deployment
+CITATION_CACHE_ENABLED = os.getenv('CITATION_CACHE_ENABLED', '').lower() == 'true'
+logger.info(f"Citation result cache enabled: {CITATION_CACHE_ENABLED}")
+
+# Streamed validation (per-citation partial results while the LLM responds) toggle for safe deployment
+STREAMING_VALIDATION_ENABLED = os.getenv('STREAMING_VALIDATION_ENABLED', '').lower() == 'true'
+logger.info(f"Streamed validation enabled: {STREAMING_VALIDATION_ENABLED}")
+
 # Initialize providers (mock for E2E tests, real for production)
 if os.getenv('MOCK_LLM', '').lower() == 'true':
     from providers.mock_provider import MockProvider
@@ -86,6 +105,12 @@ else:
         logger.warning(f"Failed to initialize GeminiProvider: {str(e)}")
         gemini_provider = None
 
+# Shared prompt manager for local citation splitting (reference entries for inline matching)
+prompt_manager = PromptManager()
+
+# Per-citation result cache (only misses are sent to the LLM)
+result_cache = CitationResultCache() if CITATION_CACHE_ENABLED else None
+
 
 def get_provider_for_request(request: Request) -> tuple[Any, str, bool]:
     """
@@ -120,7 +145,8 @@ async def validate_with_provider_fallback(
     job_id: str,
     citations: str,
     style: str,
-    initial_fallback: bool = False
+    initial_fallback: bool = False,
+    on_results: Optional[Callable[[list], None]] = None
 ) -> Dict[str, Any]:
     """
     Validate citations with automatic fallback from Gemini to OpenAI.
@@ -132,6 +158,9 @@ async def validate_with_provider_fallback(
         citations: Citations text to validate
         style: Citation style
         initial_fallback: Whether initial selection was a fallback
+        on_results: Optional callback receiving results as they become available
+            (one at a time from stream_with_provider_fallback when
+            STREAMING_VALIDATION_ENABLED)
 
     Returns:
         Validation results dictionary
@@ -139,49 +168,246 @@ async def validate_with_provider_fallback(
     Raises:
         Exception: If both providers fail
     """
+    if STREAMING_VALIDATION_ENABLED and on_results is not None:
+        # Report each citation as the provider parses it, not once per chunk
+        results = []
+        async for result in stream_with_provider_fallback(
+            provider, internal_model_id, job_id, citations, style, initial_fallback
+        ):
+            results.append(result)
+            on_results([result])
+        return {"results": sorted(results, key=lambda result: result.get("citation_number", 0))}
+
     logger.info(f"Calling {internal_model_id} provider for validation")
     api_start = time.time()
     try:
         validation_results = await provider.validate_citations(
             citations=citations,
-            style=style
+            style=style,
+            on_results=on_results
         )
         api_duration = time.time() - api_start
         # Log duration with job_id for direct matching in dashboard log parser
         logger.info(f"Job {job_id}: LLM API completed in {api_duration:.3f}s")
         # Log successful provider selection
         logger.info(f"PROVIDER_SELECTION: job_id={job_id} style={style} model={internal_model_id} status=success fallback={initial_fallback}")
+        emit_event("llm_call", job_id, provider=internal_model_id, style=style,
+                   fallback=initial_fallback, duration_seconds=round(api_duration, 3))
+        LLM_CALLS.inc(provider=internal_model_id, outcome="success", fallback=initial_fallback)
         return validation_results
     except Exception as provider_error:
+        LLM_CALLS.inc(provider=internal_model_id, outcome="error", fallback=initial_fallback)
         # If Gemini (model_b or model_c) fails, fallback to OpenAI
         if internal_model_id in ('model_b', 'model_c') and provider is gemini_provider:
             logger.warning(f"Gemini provider failed for job {job_id}, falling back to OpenAI: {str(provider_error)}")
             provider = openai_provider
             internal_model_id = 'model_a'  # Update to fallback provider
-            jobs[job_id]["provider"] = internal_model_id  # Update job with actual provider
+            await jobs.aupdate(job_id, provider=internal_model_id)  # Update job with actual provider
 
             api_start = time.time()  # Reset timer for fallback
-            validation_results = await provider.validate_citations(
-                citations=citations,
-                style=style
-            )
+            try:
+                validation_results = await provider.validate_citations(
+                    citations=citations,
+                    style=style,
+                    on_results=on_results
+                )
+            except Exception:
+                LLM_CALLS.inc(provider=internal_model_id, outcome="error", fallback=True)
+                raise
             api_duration = time.time() - api_start
             # Log duration with job_id for direct matching in dashboard log parser
             logger.info(f"Job {job_id}: LLM API completed in {api_duration:.3f}s")
             # Log fallback event
             logger.info(f"PROVIDER_SELECTION: job_id={job_id} style={style} model={internal_model_id} status=success fallback=true")
+            emit_event("llm_call", job_id, provider=internal_model_id, style=style,
+                       fallback=True, duration_seconds=round(api_duration, 3))
+            LLM_CALLS.inc(provider=internal_model_id, outcome="success", fallback=True)
             return validation_results
         else:
             # Re-raise the error if it's not a Gemini provider or fallback already occurred
             raise provider_error
 
+
+async def stream_with_provider_fallback(
+    provider: Any,
+    internal_model_id: str,
+    job_id: str,
+    citations: str,
+    style: str,
+    initial_fallback: bool = False
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Streaming counterpart of validate_with_provider_fallback.
+
+    Yields each citation result as soon as the provider has parsed it (see
+    CitationValidator.stream_citations), with the same fallback from Gemini to
+    OpenAI. If Gemini fails part way through, the citations it already yielded
+    are not yielded again by the fallback.
+
+    Args:
+        provider: Initial LLM provider to use
+        internal_model_id: Internal model ID ('model_a', 'model_b', or 'model_c')
+        job_id: Job ID for logging
+        citations: Citations text to validate
+        style: Citation style
+        initial_fallback: Whether initial selection was a fallback
+
+    Yields:
+        Validation results, one per citation, in completion order
+
+    Raises:
+        Exception: If both providers fail
+    """
+    logger.info(f"Streaming {internal_model_id} provider for validation")
+    api_start = time.time()
+    yielded = set()
+    results = provider.stream_citations(citations, style)
+    try:
+        async for result in results:
+            yielded.add(result.get("citation_number"))
+            yield result
+        api_duration = time.time() - api_start
+        # Log duration with job_id for direct matching in dashboard log parser
+        logger.info(f"Job {job_id}: LLM API completed in {api_duration:.3f}s")
+        logger.info(f"PROVIDER_SELECTION: job_id={job_id} style={style} model={internal_model_id} status=success fallback={initial_fallback}")
+        emit_event("llm_call", job_id, provider=internal_model_id, style=style,
+                   fallback=initial_fallback, duration_seconds=round(api_duration, 3))
+        LLM_CALLS.inc(provider=internal_model_id, outcome="success", fallback=initial_fallback)
+        return
+    except Exception as provider_error:
+        LLM_CALLS.inc(provider=internal_model_id, outcome="error", fallback=initial_fallback)
+        # Only Gemini (model_b or model_c) falls back to OpenAI
+        if internal_model_id not in ('model_b', 'model_c') or provider is not gemini_provider:
+            raise
+        logger.warning(f"Gemini provider failed for job {job_id} after {len(yielded)} streamed result(s), "
+                       f"falling back to OpenAI: {str(provider_error)}")
+    finally:
+        # Ends the LLM calls if the caller stopped reading early
+        await results.aclose()
+
+    provider = openai_provider
+    internal_model_id = 'model_a'  # Update to fallback provider
+    await jobs.aupdate(job_id, provider=internal_model_id)  # Update job with actual provider
+
+    api_start = time.time()  # Reset timer for fallback
+    results = provider.stream_citations(citations, style)
+    try:
+        async for result in results:
+            if result.get("citation_number") not in yielded:
+                yield result
+    except Exception:
+        LLM_CALLS.inc(provider=internal_model_id, outcome="error", fallback=True)
+        raise
+    finally:
+        await results.aclose()
+    api_duration = time.time() - api_start
+    # Log duration with job_id for direct matching in dashboard log parser
+    logger.info(f"Job {job_id}: LLM API completed in {api_duration:.3f}s")
+    # Log fallback event
+    logger.info(f"PROVIDER_SELECTION: job_id={job_id} style={style} model={internal_model_id} status=success fallback=true")
+    emit_event("llm_call", job_id, provider=internal_model_id, style=style,
+               fallback=True, duration_seconds=round(api_duration, 3))
+    LLM_CALLS.inc(provider=internal_model_id, outcome="success", fallback=True)
+
+
+async def validate_with_result_cache(
+    provider: Any,
+    internal_model_id: str,
+    job_id: str,
+    citations: str,
+    style: str,
+    initial_fallback: bool = False,
+    on_results: Optional[Callable[[list], None]] = None
+) -> Dict[str, Any]:
+    """
+    Validate citations, serving previously seen citations from the result cache.
+
+    Same arguments and return value as validate_with_provider_fallback, which is
+    called directly when the cache is disabled and for cache misses otherwise.
+    """
+    async def validate_misses(citations_text: str, on_results: Optional[Callable[[list], None]] = None) -> Dict[str, Any]:
+        return await validate_with_provider_fallback(
+            provider=provider,
+            internal_model_id=internal_model_id,
+            job_id=job_id,
+            citations=citations_text,
+            style=style,
+            initial_fallback=initial_fallback,
+            on_results=on_results
+        )
+
+    if result_cache is None:
+        return await validate_misses(citations, on_results=on_results)
+
+    logger.debug(f"Job {job_id}: Checking result cache")
+    return await validate_with_cache(result_cache, citations, style, validate_misses, on_results=on_results)
+
+
+# Minimum time between partial result writes for one job (the stream's poll interval)
+PARTIAL_RESULTS_WRITE_INTERVAL = 0.25
+
+
+class PartialResultRecorder:
+    """
+    on_results callback that stores results on the job as they arrive.
+
+    /api/jobs/{job_id}/stream (possibly served by another worker) emits them
+    before the job completes. Only new results are written
+    (jobs.add_partial_results), on a worker thread; results arriving while a
+    write is in flight or within PARTIAL_RESULTS_WRITE_INTERVAL of the last one
+    go out together in the next write. A re-delivered citation_number (e.g.
+    after provider fallback) replaces the earlier result.
+
+    Await flush() before writing the job's final status.
+    """
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self._pending: Dict[int, dict] = {}
+        self._writer: Optional[asyncio.Task] = None
+        self._last_write = 0.0
+
+    def __call__(self, results: list) -> None:
+        for result in results:
+            self._pending[result.get("citation_number", 0)] = result
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.get_running_loop().create_task(self._write_pending())
+
+    async def _write_pending(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            delay = self._last_write + PARTIAL_RESULTS_WRITE_INTERVAL - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            batch = list(self._pending.values())
+            self._pending = {}
+            self._last_write = loop.time()
+            try:
+                await jobs.aadd_partial_results(self.job_id, batch)
+            except Exception as e:
+                # Partial results are a preview; the completed job carries them all
+                logger.warning(f"Job {self.job_id}: Failed to store {len(batch)} partial result(s): {e}")
+
+    async def flush(self) -> None:
+        """Wait until every result received so far is stored."""
+        if self._writer is not None:
+            await self._writer
+
 # Initialize Polar client
 polar = Polar(
     access_token=os.getenv('POLAR_ACCESS_TOKEN')
 )
 
-# Global in-memory job storage
-jobs: Dict[str, Dict[str, Any]] = {}
+# Async job storage (SQLite by default so jobs survive restarts and are shared across workers)
+jobs: JobStore = create_job_store()
+JOB_STORE_SIZE.set_function(lambda: len(jobs))
+
+# Citation log appends happen on a background thread, off the job's path
+citation_log_writer = CitationLogWriter()
+CITATION_LOG_BACKLOG.set_function(lambda: citation_log_writer.backlog)
+CITATION_LOG_BLOCKS.set_function(lambda: {
+    (outcome,): count for outcome, count in citation_log_writer.counts().items() if outcome != "batches"
+})
 
 
 class HTMLToTextConverter(HTMLParser):
@@ -204,6 +430,9 @@ class HTMLToTextConverter(HTMLParser):
         elif tag == 'u':
             self.in_underline = True
             self.text.append('_')  # Markdown underline as italic
+        elif tag == 'br':
+            # Line break inside a paragraph, e.g. a <br>-separated list
+            self.text.append('\n')
         elif tag == 'p':
             # Add newline at start of paragraph
             # Don't skip if last char is \n - we want blank lines between <p> tags
@@ -256,55 +485,22 @@ def check_user_access(token: str, citation_count: int) -> dict:
         # User has active pass - check daily limit
         daily_usage = try_increment_daily_usage(token, citation_count)
 
-        # Calculate days remaining from hours
-        days_remaining = active_pass['hours_remaining'] // 24
-
         if daily_usage['success']:
             # Pass user within daily limit
-            user_status = UserStatus(
-                type='pass',
-                days_remaining=days_remaining,
-                daily_used=daily_usage['used_after'],
-                daily_limit=PASS_DAILY_LIMIT,
-                reset_time=daily_usage['reset_timestamp'],
-
-                balance=None,  # Not applicable for pass users
-                validations_used=None,  # Not applicable for pass users
-                limit=None,  # Not applicable for pass users
-
-                hours_remaining=active_pass['hours_remaining'],  # Needed for frontend display
-                pass_product_name=active_pass.get('pass_product_name', 'Pass')  # Use name from database.py
-            )
-
             return {
                 'has_access': True,
                 'access_type': 'pass',
-                'user_status': user_status,
+                'user_status': pass_user_status(active_pass, daily_usage['used_after'], daily_usage['reset_timestamp']),
                 'error_message': None
             }
         else:
             # Pass user exceeded daily limit
-            user_status = UserStatus(
-                type='pass',
-                days_remaining=days_remaining,
-                daily_used=daily_usage['used_before'] + citation_count,  # Would exceed
-                daily_limit=PASS_DAILY_LIMIT,
-                reset_time=daily_usage['reset_timestamp'],
-                balance=None,
-                validations_used=None,
-                limit=None,
-
-                hours_remaining=active_pass['hours_remaining'],
-                pass_product_name=active_pass.get('pass_product_name', 'Pass')  # Use name from database.py
+            return pass_limit_access(
+                active_pass,
+                daily_usage['used_before'] + citation_count,  # Would exceed
+                daily_usage['reset_timestamp']
             )
 
-            return {
-                'has_access': False,
-                'access_type': 'pass',
-                'user_status': user_status,
-                'error_message': f"Daily limit ({PASS_DAILY_LIMIT}) reached. Your limit will reset at midnight UTC."
-            }
-
     # No active pass - check credits
     user_credits = get_credits(token)
 
@@ -312,21 +508,10 @@ def check_user_access(token: str, citation_count: int) -> dict:
         # User has sufficient credits
         success = deduct_credits(token, citation_count)
         if success:
-            user_status = UserStatus(
-                type='credits',
-                days_remaining=None,
-                daily_used=None,
-                daily_limit=None,
-                reset_time=None,
-                balance=user_credits - citation_count,
-                validations_used=None,
-                limit=None
-            )
-
             return {
                 'has_access': True,
                 'access_type': 'credits',
-                'user_status': user_status,
+                'user_status': credits_user_status(user_credits - citation_count),
                 'error_message': None
             }
         else:
@@ -338,25 +523,157 @@ def check_user_access(token: str, citation_count: int) -> dict:
             }
 
     # User doesn't have enough credits
-    user_status = UserStatus(
+    return insufficient_credits_access(user_credits, citation_count)
+
+
+def pass_user_status(active_pass: dict, daily_used: int, reset_time: int) -> 'UserStatus':
+    """UserStatus of a pass user; active_pass as returned by get_active_pass()."""
+    return UserStatus(
+        type='pass',
+        days_remaining=active_pass['hours_remaining'] // 24,
+        daily_used=daily_used,
+        daily_limit=PASS_DAILY_LIMIT,
+        reset_time=reset_time,
+
+        balance=None,  # Not applicable for pass users
+        validations_used=None,  # Not applicable for pass users
+        limit=None,  # Not applicable for pass users
+
+        hours_remaining=active_pass['hours_remaining'],  # Needed for frontend display
+        pass_product_name=active_pass.get('pass_product_name', 'Pass')  # Use name from database.py
+    )
+
+
+def pass_limit_access(active_pass: dict, daily_used: int, reset_time: int) -> dict:
+    """check_user_access() result for a pass user over the daily limit."""
+    return {
+        'has_access': False,
+        'access_type': 'pass',
+        'user_status': pass_user_status(active_pass, daily_used, reset_time),
+        'error_message': f"Daily limit ({PASS_DAILY_LIMIT}) reached. Your limit will reset at midnight UTC."
+    }
+
+
+def credits_user_status(balance: int) -> 'UserStatus':
+    """UserStatus of a credits user with the given balance."""
+    return UserStatus(
         type='credits',
         days_remaining=None,
         daily_used=None,
         daily_limit=None,
         reset_time=None,
-        balance=user_credits,
+        balance=balance,
         validations_used=None,
         limit=None
     )
 
+
+def insufficient_credits_access(user_credits: int, citation_count: int) -> dict:
+    """check_user_access() result for a credits user who can't pay for citation_count."""
     return {
         'has_access': False,
         'access_type': 'credits',
-        'user_status': user_status,
+        'user_status': credits_user_status(user_credits),
         'error_message': f"Insufficient credits: need {citation_count}, have {user_credits}"
     }
 
 
+def plan_affordable_citations(
+    job_id: str,
+    token: Optional[str],
+    free_used: int,
+    citations_text: str
+) -> tuple[str, int, int, Optional[dict]]:
+    """
+    Work out before the LLM call how many citations the user will be shown.
+
+    Free users partway through their quota and credit users with a short
+    balance only get the first `affordable` results, so only those are sent
+    to the LLM; the rest are just counted with the local split. Paid users'
+    quota is reserved for the job here (reserve_quota): credits for as many
+    citations as the balance covers, or the whole list against a pass's
+    daily limit - all or nothing, so a pass user over the limit gets no LLM
+    call. The job settles the reservation when it finishes.
+
+    Args:
+        job_id: Job the quota is reserved for
+        token: Paid user token, or None for free users
+        free_used: Free citations used so far
+        citations_text: Reference text to validate
+
+    Returns:
+        tuple: (text to validate, citations in it, total citations,
+                reservation from reserve_quota or None for free users)
+    """
+    entries = prompt_manager.split_citations(citations_text)
+    total = len(entries)
+
+    reservation = None
+    if token:
+        reservation = reserve_quota(job_id, token, total)
+        affordable = reservation['reserved']
+    else:
+        affordable = max(0, FREE_LIMIT - free_used)
+
+    if affordable >= total:
+        return citations_text, total, total, reservation
+    # Blank-line separated, so the LLM numbers them like the local split
+    return "\n\n".join(entries[:affordable]), affordable, total, reservation
+
+
+def settle_reserved_access(job_id: str, token: str, reservation: dict, citation_count: int) -> dict:
+    """
+    check_user_access() for a job whose quota was reserved by plan_affordable_citations().
+
+    Settles the reservation when it covers the whole list. The LLM can return
+    more results than the local split counted; those extra citations are paid
+    for like an unreserved job (check_user_access) before the hold is settled,
+    and a user who can't pay for them is treated like one whose reservation
+    was short. A pass user over the daily limit or a credit user whose
+    reservation is short gets has_access False; the caller settles what it
+    shows of a partial result.
+    """
+    reserved = reservation['reserved']
+    extra = citation_count - reserved
+
+    if reservation['success'] and extra > 0:
+        extra_access = check_user_access(token, extra)
+        if not extra_access['has_access']:
+            if extra_access['access_type'] == 'credits':
+                return insufficient_credits_access(reservation['balance'] + reserved, citation_count)
+            return extra_access
+        settle_reservation(job_id, reserved)
+        return extra_access
+
+    if reservation['kind'] == 'pass':
+        # The pass may have expired during the job; it was active when reserved
+        active_pass = get_active_pass(token) or {'hours_remaining': 0}
+        if not reservation['success']:
+            return pass_limit_access(
+                active_pass,
+                reservation['used_before'] + citation_count,  # Would exceed
+                reservation['reset_timestamp']
+            )
+        settle_reservation(job_id, citation_count)
+        return {
+            'has_access': True,
+            'access_type': 'pass',
+            'user_status': pass_user_status(active_pass, reservation['used_before'] + citation_count,
+                                            reservation['reset_timestamp']),
+            'error_message': None
+        }
+
+    if reservation['success']:
+        settle_reservation(job_id, citation_count)
+        return {
+            'has_access': True,
+            'access_type': 'credits',
+            'user_status': credits_user_status(reservation['balance'] + reserved - citation_count),
+            'error_message': None
+        }
+    return insufficient_credits_access(reservation['balance'] + reserved, citation_count)
+
+
 def extract_user_id(request: Request) -> tuple[Optional[str], Optional[str], str]:
     """
     Extract user identification from request headers.
@@ -399,12 +716,8 @@ def extract_user_id(request: Request) -> tuple[Optional[str], Optional[str], str
     return None, None, 'anonymous'
 
 
-# Global keep-alive connection to ensure WAL file persists
-keep_alive_conn = None
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global keep_alive_conn
     """Handle application lifespan events."""
     logger.info("Citation Validator API starting up")
 
@@ -452,16 +765,12 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.warning(f"Error checking citation log directory: {e} - citation logging disabled")
     
-        # Initialize database (ensure tables exist and WAL mode is set)        try:
-            from database import init_db, get_db_path
-            import sqlite3
+        # Initialize database (ensure tables exist and WAL mode is set).
+        # Pooled connections stay open, which keeps the WAL file alive.
+        try:
+            from database import init_db
             init_db()
-            # Open a keep-alive connection to prevent WAL checkpointing/deletion
-            # This is critical for high-concurrency tests using transient connections
-            keep_alive_conn = sqlite3.connect(get_db_path())
-            # Force WAL mode on this connection too
-            keep_alive_conn.execute("PRAGMA journal_mode=WAL")
-            logger.info("Database initialized successfully and keep-alive connection established")
+            logger.info("Database initialized successfully")
         except Exception as e:
             logger.critical(f"Failed to initialize database: {e}")
     
@@ -472,9 +781,13 @@ async def lifespan(app: FastAPI):
         
         yield
         
-        # Clean up keep-alive connection
-        if keep_alive_conn:
-            keep_alive_conn.close()
+        # Write out buffered citation log blocks and events
+        await asyncio.to_thread(citation_log_writer.stop)
+        await asyncio.to_thread(event_log_writer.stop)
+
+        # Close pooled database connections
+        from database import close_all_connections
+        close_all_connections()
         logger.info("Citation Validator API shutting down")
 
 # Create FastAPI app
@@ -511,6 +824,22 @@ async def log_requests(request, call_next):
     return response
 
 
+@app.middleware("http")
+async def record_request_metrics(request, call_next):
+    """Count requests and their latency by route template (not raw path, to bound cardinality)."""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", "unmatched")
+        HTTP_REQUESTS.inc(method=request.method, route=route_path, status=status)
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, method=request.method, route=route_path)
+
+
 class ValidationRequest(BaseModel):
     """Request model for citation validation."""
     citations: str
@@ -680,6 +1009,9 @@ def log_upgrade_event(event_name: str, token: str, experiment_variant: str = Non
     # Construct the unified log line
     log_line = f"UPGRADE_WORKFLOW: {' '.join(parts)}"
     logger.info(log_line)
+    if job_id:
+        emit_event("upgrade", job_id, event=event_name, token=token[:8] if token else None,
+                   experiment_variant=experiment_variant, product_id=product_id, amount_cents=amount_cents)
 
     # Legacy JSON logging for backward compatibility / debugging
     payload = {
@@ -756,6 +1088,46 @@ async def health_check_api():
     return {"status": "ok"}
 
 
+@app.get("/api/health/db")
+async def database_health():
+    """
+    Database connection pool metrics.
+
+    Returns:
+        dict: Status and pool counters (connections opened/open, reconnects,
+        checkouts, transactions, rollbacks)
+    """
+    return {"status": "ok", "pool": get_pool_metrics()}
+
+
+@app.get("/api/metrics")
+async def latency_metrics():
+    """
+    Validation job latency by stage (queue_wait, html_to_text, split_document,
+    llm, llm_retry, access_check, gating, db_write, total, ...).
+
+    Histograms cover the jobs this worker process has run.
+
+    Returns:
+        dict: Histograms per stage, per provider and per style, each with
+        count, sum, p50/p95/p99 estimates and cumulative bucket counts (seconds)
+    """
+    return STAGE_LATENCY.snapshot()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """
+    All process metrics in the Prometheus text exposition format.
+
+    Request throughput and error rate, jobs created/finished/in flight, job
+    store size, stage latency, LLM calls and fallbacks, token usage, gating
+    decisions, SQLite busy errors and connection pool counters of this
+    worker process.
+    """
+    return PlainTextResponse(METRICS.exposition(), media_type=METRICS_CONTENT_TYPE)
+
+
 @app.get("/api/styles")
 async def get_available_styles():
     """
@@ -954,16 +1326,21 @@ async def process_validation_job(job_id: str, citations: str, style: str):
     Background task to process validation.
     No HTTP timeout applies here.
     """
+    reservation = None
     try:
-        # Update status
-        jobs[job_id]["status"] = "processing"
+        # Claim the job - another worker sharing the job store may already own it
+        if not await jobs.atransition(job_id, ("pending",), "processing"):
+            logger.warning(f"Job {job_id}: Not pending (missing or already claimed), skipping")
+            return
+        job = await jobs.aget(job_id)
         logger.info(f"Job {job_id}: Starting validation")
+        bind_job(job_id)
 
         # Check credits BEFORE starting job (fail fast)
-        token = jobs[job_id]["token"]
-        free_used = jobs[job_id]["free_used"]
-        paid_user_id = jobs[job_id].get("paid_user_id")
-        free_user_id = jobs[job_id].get("free_user_id")
+        token = job["token"]
+        free_used = job["free_used"]
+        paid_user_id = job.get("paid_user_id")
+        free_user_id = job.get("free_user_id")
 
         # Determine user type for gating decisions
         user_type = 'paid' if token else 'free'
@@ -973,33 +1350,31 @@ async def process_validation_job(job_id: str, citations: str, style: str):
         # Note: Record was already created in validate_citations_async
         update_validation_tracking(job_id, status='processing')
 
-        # Note: We don't check access here anymore - it's checked after validation
-        # This allows pass users to start validation jobs
-        if token:
-            pass  # Access is checked after validation
-        else:
-            # Free tier - check limit
-            if free_used >= FREE_LIMIT:
-                # Return partial results with all citations locked (user can see upgrade prompt)
-                logger.info(f"Job {job_id}: Free tier limit reached - returning empty partial results")
+        # Free tier - check limit (paid users' quota is reserved just before validation)
+        if not token and free_used >= FREE_LIMIT:
+            # Return partial results with all citations locked (user can see upgrade prompt)
+            logger.info(f"Job {job_id}: Free tier limit reached - returning empty partial results")
+            emit_event("results_locked", job_id, partial_type="empty")
 
-                # Split raw citations for counting and logging (no LLM call needed)
-                raw_citations = [c.strip() for c in citations.split('\n\n') if c.strip()]
-                citation_count = len(raw_citations)
-                logger.debug(f"Job {job_id}: Citation count from raw input: {citation_count}")
+            # Split raw citations for counting and logging (no LLM call needed)
+            raw_citations = [c.strip() for c in citations.split('\n\n') if c.strip()]
+            citation_count = len(raw_citations)
+            logger.debug(f"Job {job_id}: Citation count from raw input: {citation_count}")
 
-                # Log citations for dashboard (even for over-limit users)
-                if raw_citations and CITATION_LOGGING_ENABLED:
-                    log_citations_to_dashboard(job_id, raw_citations)
+            # Log citations for dashboard (even for over-limit users)
+            if raw_citations and CITATION_LOGGING_ENABLED:
+                citation_log_writer.submit(job_id, raw_citations)
 
-                # Log GATING_DECISION for dashboard parser to detect gated state
-                logger.info(f"GATING_DECISION: job_id={job_id} user_type=free results_gated=True reason='Free tier limit exceeded'")
+            # Log GATING_DECISION for dashboard parser to detect gated state
+            log_gating_event(job_id, 'free', True, 'Free tier limit exceeded')
 
-                # Note: pricing_table_shown tracking is now handled by frontend based on variant
-                # (inline variants track on mount, button variants track on click)
+            # Note: pricing_table_shown tracking is now handled by frontend based on variant
+            # (inline variants track on mount, button variants track on click)
 
-                jobs[job_id]["status"] = "completed"
-                jobs[job_id]["results"] = ValidationResponse(
+            await jobs.aupdate(
+                job_id,
+                status="completed",
+                results=ValidationResponse(
                     results=[],  # Empty array - all locked
                     partial=True,
                     citations_checked=0,
@@ -1008,14 +1383,16 @@ async def process_validation_job(job_id: str, citations: str, style: str):
                     free_used_total=FREE_LIMIT,
                     limit_type="free_limit",
                     job_id=job_id  # Include job_id for upgrade tracking
-                ).model_dump()
-                jobs[job_id]["results_gated"] = True  # This is a gated response
-                logger.info(f"Job {job_id}: Completed - free tier limit reached, returning locked partial results with {citation_count} remaining")
-                return
+                ).model_dump(),
+                results_gated=True  # This is a gated response
+            )
+            logger.info(f"Job {job_id}: Completed - free tier limit reached, returning locked partial results with {citation_count} remaining")
+            emit_event("job_completed", job_id)
+            return
 
         # Get provider based on stored model preference with fallback logic
         # Default is Gemini 3 Flash (model_c), OpenAI (model_a) is fallback
-        model_preference = jobs[job_id].get("model_preference", "model_c")
+        model_preference = job.get("model_preference", "model_c")
 
         if model_preference == 'model_a':
             # Explicit OpenAI request
@@ -1034,21 +1411,40 @@ async def process_validation_job(job_id: str, citations: str, style: str):
             internal_model_id = 'model_a'
             fallback_occurred = True
 
-        # Store provider in job for dashboard tracking
-        jobs[job_id]["provider"] = internal_model_id
+        # Only validate what the user can afford; the rest is counted locally
+        citations_to_validate, validated_count, total_count, reservation = plan_affordable_citations(
+            job_id, token, free_used, citations
+        )
+        if validated_count < total_count:
+            logger.info(f"Job {job_id}: Quota covers {validated_count} of {total_count} citations - validating only those")
+
+        # Store provider and expected citation count in job for dashboard tracking and streaming
+        await jobs.aupdate(
+            job_id,
+            provider=internal_model_id,
+            citation_total=total_count,
+            citation_reserved=reservation['reserved'] if reservation else None
+        )
 
         # Call provider with fallback mechanism using helper function
-        validation_results = await validate_with_provider_fallback(
-            provider=provider,
-            internal_model_id=internal_model_id,
-            job_id=job_id,
-            citations=citations,
-            style=style,
-            initial_fallback=fallback_occurred
-        )
+        if validated_count:
+            partial_results = PartialResultRecorder(job_id)
+            validation_results = await validate_with_result_cache(
+                provider=provider,
+                internal_model_id=internal_model_id,
+                job_id=job_id,
+                citations=citations_to_validate,
+                style=style,
+                initial_fallback=fallback_occurred,
+                on_results=partial_results
+            )
+            await partial_results.flush()
+        else:
+            validation_results = {"results": []}
 
         results = validation_results["results"]
-        citation_count = len(results)
+        # Citations beyond the quota were never validated but still count
+        citation_count = len(results) if validated_count == total_count else total_count
         logger.info(f"Job {job_id}: Found {citation_count} citation result(s)")
         
         # Calculate valid/invalid counts
@@ -1058,14 +1454,15 @@ async def process_validation_job(job_id: str, citations: str, style: str):
         
         # Log validation summary for dashboard parser
         logger.info(f"Validation summary: {valid_count} valid, {invalid_count} invalid")
+        emit_event("validation_summary", job_id, citation_count=citation_count, valid=valid_count, invalid=invalid_count)
         
-        jobs[job_id]["citation_count"] = citation_count
+        await jobs.aupdate(job_id, citation_count=citation_count)
         update_validation_tracking(job_id, status='completed')
 
         # Log citations to dashboard (extract original citations from results)
         original_citations = [result.get('original', '') for result in results if result.get('original')]
         if original_citations and CITATION_LOGGING_ENABLED:
-            log_citations_to_dashboard(job_id, original_citations)
+            citation_log_writer.submit(job_id, original_citations)
 
         # Handle credit/free tier logic (same as existing /api/validate)
         if not token:
@@ -1093,9 +1490,10 @@ async def process_validation_job(job_id: str, citations: str, style: str):
                 gating_reason = "Free tier over limit"
                 # Log partial results for dashboard parser to detect 'locked' state
                 logger.info(f"Job {job_id}: Completed - free tier limit reached, returning locked partial results with {citation_count - affordable} remaining")
+                emit_event("results_locked", job_id, partial_type="locked")
         else:
-            # Paid tier - use check_user_access function (which handles passes correctly)
-            access_check = check_user_access(token, citation_count)
+            # Paid tier - settle the quota reserved before validation (passes or credits)
+            access_check = settle_reserved_access(job_id, token, reservation, citation_count)
 
             if not access_check['has_access']:
                 # User denied access - handle differently based on access type
@@ -1103,18 +1501,18 @@ async def process_validation_job(job_id: str, citations: str, style: str):
 
                 if access_check['access_type'] == 'credits':
                     # Credits user with insufficient balance - return partial results instead of error
-                    user_credits = access_check['user_status'].balance
+                    reserved = reservation['reserved']
                     
                     # Note: pricing_table_shown tracking is now handled by frontend based on variant
                     # (inline variants track on mount, button variants track on click)
                     
-                    # Determine how many we can process
-                    affordable = user_credits
+                    # Determine how many we can process (no more than were validated)
+                    affordable = min(reserved, len(results))
                     remaining = citation_count - affordable
                     
-                    # Deduct what credits they have (if any)
-                    if affordable > 0:
-                        deduct_credits(token, affordable)
+                    # Charge the reserved credits shown, give back the rest
+                    settle_reservation(job_id, affordable)
+                    credits_remaining = reservation['balance'] + reserved - affordable
                     
                     # Build partial results response
                     response_data = {
@@ -1122,23 +1520,22 @@ async def process_validation_job(job_id: str, citations: str, style: str):
                         "partial": True,
                         "citations_checked": affordable,
                         "citations_remaining": remaining,
-                        "credits_remaining": 0,
-                        "user_status": access_check['user_status'],
+                        "credits_remaining": credits_remaining,
+                        "user_status": credits_user_status(credits_remaining),
                         "limit_type": "credits_exhausted"
                     }
                     
                     # Build and store gated response
                     gated_response = build_gated_response(response_data, user_type, job_id, "Credits exhausted")
-                    jobs[job_id]["results"] = gated_response.model_dump()
-                    jobs[job_id]["status"] = "completed"
-                    jobs[job_id]["results_gated"] = True
-                    logger.info(f"Job {job_id}: Credits exhausted ({user_credits}/{citation_count}) - returning partial results with {remaining} locked")
+                    await jobs.aupdate(job_id, status="completed", results=gated_response.model_dump(), results_gated=True)
+                    logger.info(f"Job {job_id}: Credits exhausted ({reserved}/{citation_count}) - returning partial results with {remaining} locked")
+                    emit_event("job_completed", job_id)
                     return
                 else:
                     # Pass user daily limit exceeded - return error
-                    jobs[job_id]["status"] = "failed"
-                    jobs[job_id]["error"] = access_check['error_message']
+                    await jobs.aupdate(job_id, status="failed", error=access_check['error_message'])
                     update_validation_tracking(job_id, status='failed', error_message=access_check['error_message'])
+                    emit_event("job_failed", job_id, error_message=access_check['error_message'])
                     return
 
             # User has access - build response based on access type
@@ -1150,7 +1547,7 @@ async def process_validation_job(job_id: str, citations: str, style: str):
                 }
                 gating_reason = "Pass user within daily limit"
             else:
-                # Credit user - credits already deducted by check_user_access
+                # Credit user - credits charged by settle_reserved_access
                 response_data = {
                     "results": results,
                     "credits_remaining": access_check['user_status'].balance,
@@ -1163,21 +1560,49 @@ async def process_validation_job(job_id: str, citations: str, style: str):
 
         # Apply gating logic and store results
         gated_response = build_gated_response(response_data, user_type, job_id, gating_reason)
-        jobs[job_id]["results"] = gated_response.model_dump()
-        jobs[job_id]["status"] = "completed"
-        jobs[job_id]["results_gated"] = gated_response.results_gated
+        await jobs.aupdate(
+            job_id,
+            status="completed",
+            results=gated_response.model_dump(),
+            results_gated=gated_response.results_gated
+        )
         logger.info(f"Job {job_id}: Completed successfully with gating={gated_response.results_gated}")
+        emit_event("job_completed", job_id)
 
     except Exception as e:
         logger.error(f"Job {job_id}: Failed with error: {str(e)}", exc_info=True)
-        jobs[job_id]["status"] = "failed"
-        jobs[job_id]["error"] = str(e)
+        emit_event("job_failed", job_id, error_message=str(e))
+        await jobs.aupdate(job_id, status="failed", error=str(e))
 
         # Update validation tracking
         update_validation_tracking(job_id, status='failed', error_message=str(e))
 
+    finally:
+        # Give back quota the job still holds (it failed before settling)
+        if reservation is not None:
+            refund_reservation(job_id)
+
+
+async def record_job_timings(job_id: str, style: str, timer: JobTimer) -> None:
+    """
+    Store a finished job's latency spans with the job, in the per-stage
+    histograms served by /api/metrics and in the dashboard's event log.
+    """
+    spans = timer.finish()
+    provider = (await jobs.aget(job_id) or {}).get("provider")
+    STAGE_LATENCY.observe(spans, provider, style)
+    await jobs.aupdate(job_id, timings=spans)
+    emit_event("job_timings", job_id, provider=provider, style=style, spans=spans)
+    logger.info(f"Job {job_id}: Latency breakdown {spans}")
+
 
-async def process_validation_job_with_inline(job_id: str, html_content: str, citations_text: str, style: str):
+async def process_validation_job_with_inline(
+    job_id: str,
+    html_content: str,
+    citations_text: str,
+    style: str,
+    timer: Optional[JobTimer] = None
+):
     """
     Background task to process validation with inline citation support.
 
@@ -1192,38 +1617,54 @@ async def process_validation_job_with_inline(job_id: str, html_content: str, cit
         html_content: Full HTML content (from DOCX or paste)
         citations_text: Plain text version for ref-list validation
         style: Citation style (apa7, mla9, chicago17)
+        timer: Latency spans started by the request (a new timer if not given)
     """
+    timer = timer or JobTimer()
+    claimed = False
+    reservation = None
     try:
-        # Update status
-        jobs[job_id]["status"] = "processing"
+        # Claim the job - another worker sharing the job store may already own it
+        if not await jobs.atransition(job_id, ("pending",), "processing"):
+            logger.warning(f"Job {job_id}: Not pending (missing or already claimed), skipping")
+            return
+        claimed = True
+        JOBS_IN_FLIGHT.inc()
+        timer.dequeue()
+        job = await jobs.aget(job_id)
         logger.info(f"Job {job_id}: Starting validation with inline support")
+        bind_job(job_id)
+        bind_timer(timer)
 
         # Check credits BEFORE starting job (fail fast)
-        token = jobs[job_id]["token"]
-        free_used = jobs[job_id]["free_used"]
-        paid_user_id = jobs[job_id].get("paid_user_id")
-        free_user_id = jobs[job_id].get("free_user_id")
+        token = job["token"]
+        free_used = job["free_used"]
+        paid_user_id = job.get("paid_user_id")
+        free_user_id = job.get("free_user_id")
 
         # Determine user type for gating decisions
         user_type = 'paid' if token else 'free'
         logger.debug(f"Job {job_id}: User type determined as {user_type}")
 
         # Update validation tracking record status
-        update_validation_tracking(job_id, status='processing')
+        with timer.span("db_write"):
+            update_validation_tracking(job_id, status='processing')
 
         # Split document into body and reference sections
-        body_html, refs_html, has_header = split_document(html_content)
+        with timer.span("split_document"):
+            body_html, refs_html, has_header = split_document(html_content)
 
         # Use refs section for validation if header was found, otherwise use full text
         if has_header and refs_html:
-            refs_text = html_to_text_with_formatting(refs_html)
+            with timer.span("html_to_text"):
+                refs_text = html_to_text_with_formatting(refs_html)
         else:
             refs_text = citations_text  # Fall back to full text for paste-only flow
 
         # Determine validation type
         if has_header and body_html:
             validation_type = "full_doc"
-            inline_citations = scan_inline_citations(body_html, style)
+            with timer.span("scan_inline"):
+                inline_citations = scan_inline_citations(body_html, style)
             logger.info(f"Job {job_id}: VALIDATION_TYPE={validation_type}, {len(inline_citations)} inline citations found")
         else:
             validation_type = "ref_only"
@@ -1232,31 +1673,30 @@ async def process_validation_job_with_inline(job_id: str, html_content: str, cit
 
         # Log validation type
         logger.info(f"VALIDATION_TYPE: job_id={job_id} type={validation_type}")
-
-        # Note: We don't check access here anymore - it's checked after validation
-        # This allows pass users to start validation jobs
-        if token:
-            pass  # Access is checked after validation
-        else:
-            # Free tier - check limit
-            if free_used >= FREE_LIMIT:
-                # Return partial results with all citations locked (user can see upgrade prompt)
-                logger.info(f"Job {job_id}: Free tier limit reached - returning empty partial results")
-
-                # Split raw citations for counting and logging (no LLM call needed)
-                raw_citations = [c.strip() for c in citations_text.split('\n\n') if c.strip()]
-                citation_count = len(raw_citations)
-                logger.debug(f"Job {job_id}: Citation count from raw input: {citation_count}")
-
-                # Log citations for dashboard (even for over-limit users)
-                if raw_citations and CITATION_LOGGING_ENABLED:
-                    log_citations_to_dashboard(job_id, raw_citations)
-
-                # Log GATING_DECISION for dashboard parser to detect gated state
-                logger.info(f"GATING_DECISION: job_id={job_id} user_type=free results_gated=True reason='Free tier limit exceeded'")
-
-                jobs[job_id]["status"] = "completed"
-                jobs[job_id]["results"] = ValidationResponse(
+        emit_event("validation_type", job_id, validation_type=validation_type)
+
+        # Free tier - check limit (paid users' quota is reserved just before validation)
+        if not token and free_used >= FREE_LIMIT:
+            # Return partial results with all citations locked (user can see upgrade prompt)
+            logger.info(f"Job {job_id}: Free tier limit reached - returning empty partial results")
+            emit_event("results_locked", job_id, partial_type="empty")
+
+            # Split raw citations for counting and logging (no LLM call needed)
+            raw_citations = [c.strip() for c in citations_text.split('\n\n') if c.strip()]
+            citation_count = len(raw_citations)
+            logger.debug(f"Job {job_id}: Citation count from raw input: {citation_count}")
+
+            # Log citations for dashboard (even for over-limit users)
+            if raw_citations and CITATION_LOGGING_ENABLED:
+                citation_log_writer.submit(job_id, raw_citations)
+
+            # Log GATING_DECISION for dashboard parser to detect gated state
+            log_gating_event(job_id, 'free', True, 'Free tier limit exceeded')
+
+            await jobs.aupdate(
+                job_id,
+                status="completed",
+                results=ValidationResponse(
                     results=[],  # Empty array - all locked
                     partial=True,
                     citations_checked=0,
@@ -1265,13 +1705,15 @@ async def process_validation_job_with_inline(job_id: str, html_content: str, cit
                     free_used_total=FREE_LIMIT,
                     limit_type="free_limit",
                     job_id=job_id
-                ).model_dump()
-                jobs[job_id]["results_gated"] = True
-                logger.info(f"Job {job_id}: Completed - free tier limit reached, returning locked partial results with {citation_count} remaining")
-                return
+                ).model_dump(),
+                results_gated=True
+            )
+            logger.info(f"Job {job_id}: Completed - free tier limit reached, returning locked partial results with {citation_count} remaining")
+            emit_event("job_completed", job_id)
+            return
 
         # Get provider based on stored model preference with fallback logic
-        model_preference = jobs[job_id].get("model_preference", "model_c")
+        model_preference = job.get("model_preference", "model_c")
 
         if model_preference == 'model_a':
             provider = openai_provider
@@ -1287,63 +1729,86 @@ async def process_validation_job_with_inline(job_id: str, html_content: str, cit
             internal_model_id = 'model_a'
             fallback_occurred = True
 
-        # Store provider in job for dashboard tracking
-        jobs[job_id]["provider"] = internal_model_id
-
-        # Run ref-list validation (always needed)
-        ref_task = validate_with_provider_fallback(
-            provider=provider,
-            internal_model_id=internal_model_id,
-            job_id=job_id,
-            citations=refs_text,
-            style=style,
-            initial_fallback=fallback_occurred
+        # Only validate what the user can afford; the rest is counted locally
+        with timer.span("quota_plan"):
+            refs_to_validate, validated_count, total_count, reservation = plan_affordable_citations(
+                job_id, token, free_used, refs_text
+            )
+        if validated_count < total_count:
+            logger.info(f"Job {job_id}: Quota covers {validated_count} of {total_count} citations - validating only those")
+
+        # Store provider and expected citation count in job for dashboard tracking and streaming
+        await jobs.aupdate(
+            job_id,
+            provider=internal_model_id,
+            citation_total=total_count,
+            citation_reserved=reservation['reserved'] if reservation else None
         )
 
-        # Run inline validation in parallel if inline citations found
+        # Run ref-list validation (always needed unless nothing is affordable)
+        ref_task = None
+        partial_results = PartialResultRecorder(job_id)
+        if validated_count:
+            ref_task = asyncio.create_task(timed(timer, "llm", validate_with_result_cache(
+                provider=provider,
+                internal_model_id=internal_model_id,
+                job_id=job_id,
+                citations=refs_to_validate,
+                style=style,
+                initial_fallback=fallback_occurred,
+                on_results=partial_results
+            )))
+
+        # Run inline validation in parallel if inline citations found.
+        # Reference entries come from the local split of the reference text (the same
+        # numbering the LLM sees), so inline matching doesn't wait for the style check.
         inline_results = None
-        if inline_citations:
+        inline_task = None
+        if inline_citations and validated_count:
+            ref_entries = [
+                {"index": i, "text": text}
+                for i, text in enumerate(prompt_manager.split_citations(refs_text))
+            ]
+            inline_task = asyncio.create_task(timed(timer, "inline_validation", validate_inline_citations(
+                inline_citations=inline_citations,
+                reference_list=ref_entries,
+                style=style,
+                provider=provider
+            )))
+
+        try:
+            ref_validation_results = await ref_task if ref_task else {"results": []}
+            await partial_results.flush()
+        except BaseException:
+            if inline_task:
+                inline_task.cancel()
+            raise
+
+        if inline_task:
             try:
-                # Prepare reference list for inline validation
-                ref_validation_results = await ref_task
-                ref_entries = [
-                    {"index": i, "text": r.get("original", "")}
-                    for i, r in enumerate(ref_validation_results["results"])
-                ]
-
-                # Run inline validation
-                inline_task = validate_inline_citations(
-                    inline_citations=inline_citations,
-                    reference_list=ref_entries,
-                    style=style,
-                    provider=provider
-                )
                 inline_results = await inline_task
 
                 # Log inline stats
                 orphan_count = len(inline_results.get("orphans", []))
                 total_inline = inline_results.get("total_found", 0)
                 logger.info(f"Job {job_id}: Inline validation complete: {total_inline} citations, {orphan_count} orphans")
+                emit_event("inline_stats", job_id, inline_citation_count=total_inline, orphan_count=orphan_count)
+
+                if validated_count == total_count and len(ref_entries) != len(ref_validation_results["results"]):
+                    logger.warning(
+                        f"Job {job_id}: Local reference split found {len(ref_entries)} entries "
+                        f"but ref validation returned {len(ref_validation_results['results'])}"
+                    )
 
             except Exception as e:
+                # Ref results are already in hand - report them without inline nesting
                 logger.error(f"Job {job_id}: Inline validation failed: {e}")
-                # Re-run ref validation to get results
-                ref_validation_results = await validate_with_provider_fallback(
-                    provider=provider,
-                    internal_model_id=internal_model_id,
-                    job_id=job_id,
-                    citations=citations_text,
-                    style=style,
-                    initial_fallback=fallback_occurred
-                )
                 inline_results = {"error": str(e)}
-        else:
-            # Only ref-list validation
-            ref_validation_results = await ref_task
 
         # Process ref-list results
         results = ref_validation_results["results"]
-        citation_count = len(results)
+        # Citations beyond the quota were never validated but still count
+        citation_count = len(results) if validated_count == total_count else total_count
         logger.info(f"Job {job_id}: Found {citation_count} reference entry result(s)")
 
         # Calculate valid/invalid counts
@@ -1352,14 +1817,16 @@ async def process_validation_job_with_inline(job_id: str, html_content: str, cit
 
         # Log validation summary for dashboard parser
         logger.info(f"Validation summary: {valid_count} valid, {invalid_count} invalid")
+        emit_event("validation_summary", job_id, citation_count=citation_count, valid=valid_count, invalid=invalid_count)
 
-        jobs[job_id]["citation_count"] = citation_count
-        update_validation_tracking(job_id, status='completed')
+        with timer.span("db_write"):
+            await jobs.aupdate(job_id, citation_count=citation_count)
+            update_validation_tracking(job_id, status='completed')
 
         # Log citations to dashboard (extract original citations from results)
         original_citations = [result.get('original', '') for result in results if result.get('original')]
         if original_citations and CITATION_LOGGING_ENABLED:
-            log_citations_to_dashboard(job_id, original_citations)
+            citation_log_writer.submit(job_id, original_citations)
 
         # Build response with inline results
         response_data = {
@@ -1426,9 +1893,11 @@ async def process_validation_job_with_inline(job_id: str, html_content: str, cit
                 response_data["results"] = response_data["results"][:affordable]
                 gating_reason = "Free tier over limit"
                 logger.info(f"Job {job_id}: Completed - free tier limit reached, returning {affordable} results with {citation_count - affordable} remaining")
+                emit_event("results_locked", job_id, partial_type="locked")
         else:
-            # Paid tier - use check_user_access function
-            access_check = check_user_access(token, citation_count)
+            # Paid tier - settle the quota reserved before validation (passes or credits)
+            with timer.span("access_check"):
+                access_check = settle_reserved_access(job_id, token, reservation, citation_count)
 
             if not access_check['has_access']:
                 # User denied access - handle differently based on access type
@@ -1436,15 +1905,15 @@ async def process_validation_job_with_inline(job_id: str, html_content: str, cit
 
                 if access_check['access_type'] == 'credits':
                     # Credits user with insufficient balance - return partial results
-                    user_credits = access_check['user_status'].balance
+                    reserved = reservation['reserved']
 
-                    # Determine how many we can process
-                    affordable = user_credits
+                    # Determine how many we can process (no more than were validated)
+                    affordable = min(reserved, len(results))
                     remaining = citation_count - affordable
 
-                    # Deduct what credits they have (if any)
-                    if affordable > 0:
-                        deduct_credits(token, affordable)
+                    # Charge the reserved credits shown, give back the rest
+                    settle_reservation(job_id, affordable)
+                    credits_remaining = reservation['balance'] + reserved - affordable
 
                     # Build partial results response
                     response_data.update({
@@ -1452,23 +1921,23 @@ async def process_validation_job_with_inline(job_id: str, html_content: str, cit
                         "partial": True,
                         "citations_checked": affordable,
                         "citations_remaining": remaining,
-                        "credits_remaining": 0,
-                        "user_status": access_check['user_status'],
+                        "credits_remaining": credits_remaining,
+                        "user_status": credits_user_status(credits_remaining),
                         "limit_type": "credits_exhausted"
                     })
 
                     # Build and store gated response
-                    gated_response = build_gated_response(response_data, user_type, job_id, "Credits exhausted")
-                    jobs[job_id]["results"] = gated_response.model_dump()
-                    jobs[job_id]["status"] = "completed"
-                    jobs[job_id]["results_gated"] = True
-                    logger.info(f"Job {job_id}: Credits exhausted ({user_credits}/{citation_count}) - returning partial results with {remaining} locked")
+                    with timer.span("gating"):
+                        gated_response = build_gated_response(response_data, user_type, job_id, "Credits exhausted")
+                    await jobs.aupdate(job_id, status="completed", results=gated_response.model_dump(), results_gated=True)
+                    logger.info(f"Job {job_id}: Credits exhausted ({reserved}/{citation_count}) - returning partial results with {remaining} locked")
+                    emit_event("job_completed", job_id)
                     return
                 else:
                     # Pass user daily limit exceeded - return error
-                    jobs[job_id]["status"] = "failed"
-                    jobs[job_id]["error"] = access_check['error_message']
+                    await jobs.aupdate(job_id, status="failed", error=access_check['error_message'])
                     update_validation_tracking(job_id, status='failed', error_message=access_check['error_message'])
+                    emit_event("job_failed", job_id, error_message=access_check['error_message'])
                     return
 
             # User has access - build response based on access type
@@ -1477,7 +1946,7 @@ async def process_validation_job_with_inline(job_id: str, html_content: str, cit
                 response_data["limit_type"] = "none"
                 gating_reason = "Pass user within daily limit"
             else:
-                # Credit user - credits already deducted by check_user_access
+                # Credit user - credits charged by settle_reserved_access
                 response_data["credits_remaining"] = access_check['user_status'].balance
                 response_data["limit_type"] = "none"
                 gating_reason = "Paid user sufficient credits"
@@ -1486,38 +1955,68 @@ async def process_validation_job_with_inline(job_id: str, html_content: str, cit
             response_data["user_status"] = access_check['user_status']
 
         # Apply gating logic and store results
-        gated_response = build_gated_response(response_data, user_type, job_id, gating_reason)
-        jobs[job_id]["results"] = gated_response.model_dump()
-        jobs[job_id]["status"] = "completed"
-        jobs[job_id]["results_gated"] = gated_response.results_gated
+        with timer.span("gating"):
+            gated_response = build_gated_response(response_data, user_type, job_id, gating_reason)
+        with timer.span("db_write"):
+            await jobs.aupdate(
+                job_id,
+                status="completed",
+                results=gated_response.model_dump(),
+                results_gated=gated_response.results_gated
+            )
         logger.info(f"Job {job_id}: Completed successfully with gating={gated_response.results_gated}")
+        emit_event("job_completed", job_id)
 
     except Exception as e:
         logger.error(f"Job {job_id}: Failed with error: {str(e)}", exc_info=True)
-        jobs[job_id]["status"] = "failed"
-        jobs[job_id]["error"] = str(e)
+        emit_event("job_failed", job_id, error_message=str(e))
+        await jobs.aupdate(job_id, status="failed", error=str(e))
 
         # Update validation tracking
         update_validation_tracking(job_id, status='failed', error_message=str(e))
 
+    finally:
+        # Give back quota the job still holds (it failed before settling)
+        if reservation is not None:
+            refund_reservation(job_id)
+        if claimed:
+            JOBS_IN_FLIGHT.dec()
+            JOBS_FINISHED.inc(status=(await jobs.aget(job_id) or {}).get("status", "unknown"))
+            await record_job_timings(job_id, style, timer)
+
+
+ORPHANED_JOB_ERROR = "Validation was interrupted by a server restart. Please try again."
+
+
+async def fail_orphaned_jobs():
+    """
+    Fail jobs left pending/processing by a worker that died (deploy, crash).
+
+    Otherwise they poll as processing until the TTL deletes them. The quota
+    they hold is refunded by release_stale_reservations().
+    """
+    for job_id in await jobs.afail_stale(DEFAULT_JOB_STALE_SECONDS, ORPHANED_JOB_ERROR):
+        logger.warning(f"Job {job_id}: Failed, worker stopped updating it")
+        emit_event("job_failed", job_id, error_message=ORPHANED_JOB_ERROR)
+        await asyncio.to_thread(update_validation_tracking, job_id, status='failed', error_message=ORPHANED_JOB_ERROR)
+
 
 async def cleanup_old_jobs():
-    """Delete jobs older than 30 minutes."""
+    """Fail orphaned jobs, delete jobs older than 30 minutes and prune old bookkeeping."""
     import asyncio
     while True:
+        await fail_orphaned_jobs()
         await asyncio.sleep(300)  # Run every 5 minutes
 
-        now = time.time()
-        threshold = 30 * 60  # 30 minutes
+        for job_id in await jobs.adelete_expired(DEFAULT_JOB_TTL_SECONDS):
+            logger.info(f"Cleaned up old job: {job_id}")
 
-        jobs_to_delete = [
-            job_id for job_id, job in jobs.items()
-            if now - job["created_at"] > threshold
-        ]
+        # Quota held by jobs whose worker died before settling
+        released = await asyncio.to_thread(release_stale_reservations, DEFAULT_JOB_TTL_SECONDS)
+        if released:
+            logger.info(f"Refunded {released} stale quota reservation(s)")
 
-        for job_id in jobs_to_delete:
-            del jobs[job_id]
-            logger.info(f"Cleaned up old job: {job_id}")
+        await asyncio.to_thread(prune_entitlement_changes)
 
 
 @app.post("/api/validate/async")
@@ -1535,6 +2034,8 @@ async def validate_citations_async(
     Returns immediately with job_id.
     Background worker processes validation.
     """
+    timer = JobTimer()
+
     # Check if request is multipart/form-data (file upload)
     content_type = http_request.headers.get("content-type", "")
     is_multipart = "multipart/form-data" in content_type
@@ -1566,7 +2067,8 @@ async def validate_citations_async(
 
             try:
                 content = await file.read()
-                html_content = convert_docx_to_html(content)
+                with timer.span("docx_to_html"):
+                    html_content = convert_docx_to_html(content)
                 is_file_upload = True
                 logger.info(f"Converted DOCX file to HTML: {len(html_content)} chars")
             except ValueError as e:
@@ -1635,6 +2137,12 @@ async def validate_citations_async(
         f"free_user_id={free_user_id or 'N/A'}, "
         f"style={style}"
     )
+    emit_event(
+        "job_created", job_id,
+        user_type='paid' if gating_user_type == 'paid' else 'free',
+        paid_user_id=paid_user_id, free_user_id=free_user_id, style=style, is_test_job=is_test_job
+    )
+    JOBS_CREATED.inc(user_type=gating_user_type)
 
     # Store model preference for async processing
     # Default is Gemini 3 Flash (model_c), OpenAI (model_a) only if explicitly requested
@@ -1655,34 +2163,38 @@ async def validate_citations_async(
         logger.info(f"Assigned missing experiment variant: {experiment_variant}")
 
     # Create job entry
-    jobs[job_id] = {
-        "status": "pending",
-        "created_at": time.time(),
-        "results": None,
-        "error": None,
-        "token": token,
-        "free_used": free_used,
-        "citation_count": 0,
-        "user_type": gating_user_type,
-        "paid_user_id": paid_user_id,
-        "free_user_id": free_user_id,
-        "model_preference": stored_model_preference,
-        "experiment_variant": experiment_variant,
-        "is_file_upload": is_file_upload
-    }
+    with timer.span("db_write"):
+        await jobs.acreate(job_id, {
+            "status": "pending",
+            "created_at": time.time(),
+            "results": None,
+            "error": None,
+            "token": token,
+            "free_used": free_used,
+            "citation_count": 0,
+            "user_type": gating_user_type,
+            "paid_user_id": paid_user_id,
+            "free_user_id": free_user_id,
+            "model_preference": stored_model_preference,
+            "experiment_variant": experiment_variant,
+            "is_file_upload": is_file_upload
+        })
 
     # Convert HTML to text with formatting markers
-    citations_text = html_to_text_with_formatting(html_content)
+    with timer.span("html_to_text"):
+        citations_text = html_to_text_with_formatting(html_content)
 
     # DEBUG LOGGING
     logger.info(f"Job {job_id}: Parsed citations text length: {len(citations_text)}")
 
     # Create initial validation tracking record
     citation_count = len([c.strip() for c in citations_text.split('\n\n') if c.strip()])
-    create_validation_record(job_id, gating_user_type, citation_count, 'pending', paid_user_id, free_user_id, is_test_job, style)
+    with timer.span("db_write"):
+        create_validation_record(job_id, gating_user_type, citation_count, 'pending', paid_user_id, free_user_id, is_test_job, style)
 
     # Start background processing with HTML content for inline validation
-    background_tasks.add_task(process_validation_job_with_inline, job_id, html_content, citations_text, style)
+    timer.enqueue()
+    background_tasks.add_task(process_validation_job_with_inline, job_id, html_content, citations_text, style, timer)
 
     return {"job_id": job_id, "status": "pending", "experiment_variant": experiment_variant}
 
@@ -1698,11 +2210,10 @@ async def get_job_status(job_id: str):
     - completed: Results ready
     - failed: Error occurred
     """
-    if job_id not in jobs:
+    job = await jobs.aget(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    job = jobs[job_id]
-
     if job["status"] == "completed":
         return {
             "status": "completed",
@@ -1719,6 +2230,146 @@ async def get_job_status(job_id: str):
         }
 
 
+# Job store polling interval and keep-alive period for /api/jobs/{job_id}/stream
+JOB_STREAM_POLL_INTERVAL = 0.25
+JOB_STREAM_KEEPALIVE_SECONDS = 15
+
+
+def get_stream_reveal_limit(job: Dict[str, Any]) -> int:
+    """
+    Number of leading citations a job's owner may see while it is still running.
+
+    Mirrors the limits applied when the job completes: free users see up to
+    FREE_LIMIT in total, credit users up to their balance, and pass users
+    everything if the list fits in today's remaining limit (otherwise the job
+    fails, so nothing is shown). Nothing is deducted here.
+    """
+    token = job.get("token")
+    if not token:
+        return max(0, FREE_LIMIT - job.get("free_used", 0))
+
+    # Quota already reserved for the job, which the balance no longer includes
+    if job.get("citation_reserved") is not None:
+        return job["citation_reserved"]
+
+    if get_active_pass(token):
+        remaining = PASS_DAILY_LIMIT - get_daily_usage_for_current_window(token)
+        citation_total = job.get("citation_total", 0)
+        return citation_total if citation_total <= remaining else 0
+
+    return get_credits(token)
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Format one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.get("/api/jobs/{job_id}/stream")
+async def stream_job_progress(job_id: str):
+    """
+    Stream job progress as Server-Sent Events.
+
+    Events:
+    - result: one citation result, as soon as it is available
+      ({"citation_number", "result", "results_gated"})
+    - progress: {"validated", "total", "locked"}
+    - completed: final gated response, same as GET /api/jobs/{job_id}
+    - failed: {"error"}
+
+    Results beyond what the user can access are counted as locked and never
+    sent; the completed event carries the authoritative response.
+    """
+    if await jobs.aget_state(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def event_stream():
+        sent = set()
+        locked = set()
+        validated = set()
+        reveal_limit = None
+        results_gated = False
+        last_progress = None
+        last_event_at = time.time()
+        job = None
+        version = None
+        cursor = 0
+
+        while True:
+            # Cheap version check; only new results are read, and the job
+            # itself only until its total is known and once it finishes
+            state = await jobs.aget_state(job_id)
+            if state is None:
+                yield format_sse("failed", {"error": "Job not found"})
+                return
+            status, current_version = state
+
+            if current_version != version:
+                version = current_version
+                if job is None or job.get("citation_total") is None or status in ("completed", "failed"):
+                    job = await jobs.aget(job_id)
+                    if job is None:
+                        yield format_sse("failed", {"error": "Job not found"})
+                        return
+                new_results, cursor = await jobs.aget_partial_results(job_id, cursor)
+
+                if new_results and reveal_limit is None:
+                    reveal_limit = await asyncio.to_thread(get_stream_reveal_limit, job)
+                    total = job.get("citation_total", len(new_results))
+                    results_gated, _ = should_gate_results_sync(
+                        job.get("user_type", "free"),
+                        {"partial": total > reveal_limit, "results": new_results[:reveal_limit]}
+                    )
+
+                for result in new_results:
+                    citation_number = result.get("citation_number", 0)
+                    validated.add(citation_number)
+                    if citation_number in sent or citation_number in locked:
+                        continue
+                    if citation_number <= reveal_limit:
+                        sent.add(citation_number)
+                        yield format_sse("result", {
+                            "citation_number": citation_number,
+                            "result": result,
+                            "results_gated": results_gated
+                        })
+                    else:
+                        locked.add(citation_number)
+                    last_event_at = time.time()
+
+                progress = {
+                    "validated": len(validated),
+                    "total": job.get("citation_total"),
+                    "locked": len(locked)
+                }
+                if progress != last_progress:
+                    last_progress = progress
+                    last_event_at = time.time()
+                    yield format_sse("progress", progress)
+
+                if job["status"] == "completed":
+                    yield format_sse("completed", {"status": "completed", "results": job["results"]})
+                    return
+                if job["status"] == "failed":
+                    yield format_sse("failed", {"status": "failed", "error": job["error"]})
+                    return
+
+            if time.time() - last_event_at >= JOB_STREAM_KEEPALIVE_SECONDS:
+                last_event_at = time.time()
+                yield ": keep-alive\n\n"
+
+            await asyncio.sleep(JOB_STREAM_POLL_INTERVAL)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # Disable nginx buffering so events flush immediately
+        }
+    )
+
+
 @app.post("/api/reveal-results")
 async def reveal_results(request: dict):
     """
@@ -1739,6 +2390,7 @@ async def reveal_results(request: dict):
         raise HTTPException(status_code=400, detail="job_id is required")
 
     logger.info(f"REVEAL_EVENT: job_id={job_id} outcome={outcome}")
+    emit_event("reveal", job_id, outcome=outcome)
 
     return {
         "success": True,
@@ -1799,6 +2451,8 @@ async def upgrade_event(request: dict):
         log_parts.append(f"product_id={product_id}")
     
     logger.info(f"UPGRADE_WORKFLOW: {' '.join(log_parts)}")
+    emit_event("upgrade", job_id, event=event, experiment_variant=variant,
+               interaction_type=interaction_type, product_id=product_id)
 
     return {
         "success": True,
@@ -1828,6 +2482,7 @@ async def track_correction_event(request: dict):
         f"CORRECTION_EVENT: job_id={job_id} action={action} "
         f"citation_number={citation_number} source_type={source_type}"
     )
+    emit_event("correction", request.get('job_id'), action=action)
     return {"status": "ok"}
 
 @app.get("/api/dashboard")
@@ -1866,7 +2521,7 @@ async def get_dashboard_data(
         all_jobs = []
         now = time.time()
 
-        for job_id, job in jobs.items():
+        for job_id, job in await jobs.aitems():
             # Convert job data to dashboard format
             job_data = {
                 "id": job_id,
@@ -1927,17 +2582,18 @@ async def get_dashboard_stats():
     logger.info("Dashboard stats request received")
 
     try:
-        # Calculate stats from jobs
-        total = len(jobs)
-        completed = sum(1 for job in jobs.values() if job.get("status") == "completed")
-        failed = sum(1 for job in jobs.values() if job.get("status") == "failed")
-        processing = sum(1 for job in jobs.values() if job.get("status") == "processing")
-        total_citations = sum(job.get("citation_count", 0) for job in jobs.values())
-        total_errors = sum(_count_errors(job) for job in jobs.values())
+        # Calculate stats from jobs (one read of the store: values() is a full scan in SQLite)
+        all_jobs = await jobs.avalues()
+        total = len(all_jobs)
+        completed = sum(1 for job in all_jobs if job.get("status") == "completed")
+        failed = sum(1 for job in all_jobs if job.get("status") == "failed")
+        processing = sum(1 for job in all_jobs if job.get("status") == "processing")
+        total_citations = sum(job.get("citation_count", 0) for job in all_jobs)
+        total_errors = sum(_count_errors(job) for job in all_jobs)
 
         # Calculate average processing time for completed jobs
         completed_jobs_with_time = [
-            job for job in jobs.values()
+            job for job in all_jobs
             if job.get("status") == "completed" and job.get("processing_time")
         ]
         avg_processing_time = 0.0
@@ -1949,7 +2605,7 @@ async def get_dashboard_stats():
             avg_processing_time = sum(times) / len(times)
 
         # Get citation pipeline metrics
-        citation_pipeline = get_citation_pipeline_metrics()
+        citation_pipeline = await asyncio.to_thread(get_citation_pipeline_metrics, all_jobs)
 
         stats = {
             "total_requests": total,
@@ -1979,9 +2635,12 @@ async def get_funnel_data(
     """
     Get upgrade funnel data for dashboard chart.
 
+    Served from pre-aggregated daily counters (dashboard.analytics.FunnelAggregator)
+    that the dashboard cron refreshes; the request never parses the log.
+
     Args:
-        from_date: ISO date string (YYYY-MM-DD) for start filter
-        to_date: ISO date string (YYYY-MM-DD) for end filter
+        from_date: ISO date string (YYYY-MM-DD) for start filter (inclusive day)
+        to_date: ISO date string (YYYY-MM-DD) for end filter (inclusive day)
         variant: Filter to specific variant ('1' or '2', None = both)
 
     Returns:
@@ -2030,8 +2689,8 @@ async def get_funnel_data(
             except ValueError:
                 raise HTTPException(status_code=400, detail="Invalid to_date format. Use YYYY-MM-DD")
 
-        # Get data from analytics
-        data = parse_upgrade_events(
+        # Get data from the incrementally aggregated funnel tables
+        data = get_upgrade_funnel(
             start_date=start_datetime,
             end_date=end_datetime,
             experiment_variant=variant
@@ -2087,13 +2746,18 @@ async def get_funnel_data(
         raise HTTPException(status_code=500, detail=f"Failed to get funnel data: {str(e)}")
 
 
-def get_citation_pipeline_metrics() -> dict:
+def get_citation_pipeline_metrics(all_jobs: Optional[list] = None) -> dict:
     """
     Get citation pipeline health metrics.
 
+    Args:
+        all_jobs: Job dicts already read from the job store (read here if None)
+
     Returns:
         dict: Citation pipeline metrics including health status, lag, and processing stats
     """
+    if all_jobs is None:
+        all_jobs = list(jobs.values())
     try:
         # Configuration
         log_path = os.environ.get('CITATION_LOG_PATH', '/opt/citations/logs/citations.log')
@@ -2184,12 +2848,12 @@ def get_citation_pipeline_metrics() -> dict:
         metrics['parser_lag_bytes'] = max(0, file_size - parser_position)
 
         # Count jobs with citations (check both has_citations flag and citation_count as fallback)
-        jobs_with_citations = sum(1 for job in jobs.values()
+        jobs_with_citations = sum(1 for job in all_jobs
                                if job.get('has_citations', False) or job.get('citation_count', 0) > 0)
         metrics['jobs_with_citations'] = jobs_with_citations
 
         # Count total citations processed (include jobs that have citations_processed via has_citations or citation_count)
-        total_citations = sum(job.get('citation_count', 0) for job in jobs.values()
+        total_citations = sum(job.get('citation_count', 0) for job in all_jobs
                             if job.get('has_citations', False) or job.get('citation_count', 0) > 0)
         metrics['total_citations_processed'] = total_citations
 
@@ -1,7 +1,10 @@
 import os
 import shutil
+import threading
+import time
+from collections import deque
 from logger import setup_logger
-from typing import List, Tuple, Dict, Any, Optional
+from typing import Deque, List, Tuple, Dict, Any, Optional
 from pathlib import Path
 import sqlite3
 from database import get_validations_db_path
@@ -37,6 +40,20 @@ def log_validation_complete(
     )
 
 
+def format_citation_block(job_id: str, citations: List[str]) -> str:
+    """
+    Build the structured log block for one job's citations.
+
+    Format:
+        <<JOB_ID:job_id>>
+        citation1
+        citation2
+        ...
+        <<<END_JOB>>>
+    """
+    return "\n".join([f"<<JOB_ID:{job_id}>>", *citations, "<<<END_JOB>>>"]) + "\n"
+
+
 def log_citations_to_dashboard(job_id: str, citations: List[str]) -> bool:
     """
     Log citations to dashboard in structured format for parsing.
@@ -75,19 +92,7 @@ def log_citations_to_dashboard(job_id: str, citations: List[str]) -> bool:
         if disk_info['has_warning']:
             logger.warning(f"Low disk space warning for citation logging - only {disk_info['available_gb']:.2f}GB available")
 
-        # Build structured content
-        content = []
-        content.append(f"<<JOB_ID:{job_id}>>")
-
-        # Add each citation (empty list will skip this loop)
-        for citation in citations:
-            content.append(citation)
-
-        # Add end marker
-        content.append("<<<END_JOB>>>")
-
-        # Write to file with newline separators
-        content_str = "\n".join(content) + "\n"
+        content_str = format_citation_block(job_id, citations)
 
         # Append to log file with enhanced error handling
         try:
@@ -178,6 +183,11 @@ else:
 MIN_DISK_SPACE_BYTES = 100 * 1024 * 1024  # 100MB minimum free space
 WARNING_DISK_SPACE_BYTES = 500 * 1024 * 1024  # 500MB warning level
 
+# Background writer: job blocks held in memory before the oldest is dropped,
+# and seconds between its disk space checks
+CITATION_LOG_MAX_BACKLOG = 10000
+DISK_CHECK_INTERVAL_SECONDS = 60.0
+
 
 def check_disk_space(path: str) -> Dict[str, Any]:
     """
@@ -224,6 +234,181 @@ def check_disk_space(path: str) -> Dict[str, Any]:
             'error': str(e)
         }
 
+
+class BufferedLogWriter:
+    """
+    Background writer for an append-only log file.
+
+    submit_text() only appends an entry to an in-memory buffer; a daemon
+    thread writes everything buffered with one append and one fsync per batch
+    (so bursts share a sync), and checks disk space at most every
+    disk_check_interval seconds. The file is os.environ[path_env], or
+    default_path, read when each batch is written.
+
+    The buffer is a ring: when max_backlog entries are waiting the oldest is
+    dropped and counted, so a stalled disk can't grow memory without bound.
+    stop() writes out the backlog (lifespan shutdown); a later submit starts
+    a new writer thread.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        path_env: str,
+        default_path: str,
+        max_backlog: int = CITATION_LOG_MAX_BACKLOG,
+        disk_check_interval: float = DISK_CHECK_INTERVAL_SECONDS
+    ):
+        self.name = name
+        self.path_env = path_env
+        self.default_path = default_path
+        self.max_backlog = max_backlog
+        self.disk_check_interval = disk_check_interval
+        self._buffer: Deque[str] = deque()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        # Entries submitted, and entries written, dropped or failed, for flush()
+        self._submitted = 0
+        self._done = 0
+        self._counts = {"written": 0, "dropped": 0, "failed": 0, "batches": 0}
+        self._disk_checked_at: Optional[float] = None
+        self._disk_ok = False
+
+    @property
+    def backlog(self) -> int:
+        """Entries waiting to be written."""
+        with self._condition:
+            return len(self._buffer)
+
+    def counts(self) -> Dict[str, int]:
+        """Entries written, dropped (backlog full) and failed, and batches written."""
+        with self._condition:
+            return dict(self._counts)
+
+    def submit_text(self, text: str) -> None:
+        """Queue text to be appended to the log (never waits for I/O)."""
+        with self._condition:
+            dropped = len(self._buffer) >= self.max_backlog
+            if dropped:
+                self._buffer.popleft()
+                self._done += 1
+                self._counts["dropped"] += 1
+            self._buffer.append(text)
+            self._submitted += 1
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=f"{self.name.replace(' ', '-')}-writer", daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+        if dropped:
+            logger.critical(f"{self.name} backlog full ({self.max_backlog} entries) - dropped the oldest entry")
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every entry submitted so far is written (or dropped). False on timeout."""
+        with self._condition:
+            target = self._submitted
+            return self._condition.wait_for(lambda: self._done >= target, timeout)
+
+    def stop(self, timeout: Optional[float] = 10.0) -> bool:
+        """Write out the backlog and end the writer thread. False if it didn't finish in time."""
+        with self._condition:
+            thread = self._thread
+            self._stopping = True
+            self._condition.notify_all()
+        if thread is not None:
+            thread.join(timeout)
+        with self._condition:
+            self._stopping = False
+            finished = thread is None or not thread.is_alive()
+            if finished:
+                self._thread = None
+        if not finished:
+            logger.critical(f"{self.name} writer did not finish within {timeout}s - {self.backlog} entries not written")
+        return finished
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._buffer or self._stopping)
+                if not self._buffer:
+                    return
+                batch = list(self._buffer)
+                self._buffer.clear()
+
+            written = self._write_batch(batch)
+
+            with self._condition:
+                self._done += len(batch)
+                self._counts["written" if written else "failed"] += len(batch)
+                self._counts["batches"] += 1
+                self._condition.notify_all()
+
+    def _write_batch(self, batch: List[str]) -> bool:
+        """Append entries to the log with a single write and fsync."""
+        log_file_path = os.environ.get(self.path_env, self.default_path)
+        log_dir = os.path.dirname(log_file_path)
+        try:
+            os.makedirs(log_dir, exist_ok=True)
+            if not self._has_disk_space(log_dir):
+                return False
+
+            # One write in append mode, so concurrent workers never interleave
+            with open(log_file_path, "ab") as f:
+                f.write("".join(batch).encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+            logger.debug(f"Wrote {len(batch)} {self.name} entries to {log_file_path}")
+            return True
+
+        except (IOError, OSError) as e:
+            logger.critical(f"Failed to write {len(batch)} {self.name} entries: {str(e)}")
+            # Re-check disk space before the next batch
+            self._disk_checked_at = None
+            return False
+
+    def _has_disk_space(self, log_dir: str) -> bool:
+        """check_disk_space() for log_dir, cached for disk_check_interval seconds."""
+        now = time.monotonic()
+        if self._disk_checked_at is not None and now - self._disk_checked_at < self.disk_check_interval:
+            return self._disk_ok
+
+        disk_info = check_disk_space(log_dir)
+        self._disk_checked_at = now
+        if disk_info['error']:
+            logger.critical(f"Disk space check failed for {self.name}: {disk_info['error']}")
+            self._disk_ok = False
+        elif not disk_info['has_minimum']:
+            logger.critical(f"Insufficient disk space for {self.name} - only {disk_info['available_gb']:.2f}GB available, minimum required: {MIN_DISK_SPACE_BYTES / (1024 * 1024 * 1024):.2f}GB")
+            self._disk_ok = False
+        else:
+            if disk_info['has_warning']:
+                logger.warning(f"Low disk space warning for {self.name} - only {disk_info['available_gb']:.2f}GB available")
+            self._disk_ok = True
+        return self._disk_ok
+
+
+class CitationLogWriter(BufferedLogWriter):
+    """
+    Background writer for the citation log.
+
+    log_citations_to_dashboard() checks disk space, opens, writes, fsyncs and
+    closes the log for every job on the calling thread, which blocks the event
+    loop when called from a validation job. submit() queues the job's block on
+    a BufferedLogWriter instead; the log format is unchanged.
+    """
+
+    def __init__(
+        self,
+        max_backlog: int = CITATION_LOG_MAX_BACKLOG,
+        disk_check_interval: float = DISK_CHECK_INTERVAL_SECONDS
+    ):
+        super().__init__("citation log", "CITATION_LOG_PATH", DEFAULT_LOG_PATH, max_backlog, disk_check_interval)
+
+    def submit(self, job_id: str, citations: List[str]) -> None:
+        """Queue one job's citations for the log (never waits for I/O)."""
+        self.submit_text(format_citation_block(job_id, citations))
+
+
 def extract_job_id_from_marker(line: str) -> str:
     """
     Extract job_id from a JOB_ID marker line.
@@ -1,14 +1,303 @@
 import sqlite3
 import os
 import logging
+import threading
 import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
 from pricing_config import get_next_utc_midnight
+from metrics import DB_POOL_CONNECTIONS, DB_POOL_EVENTS, ENTITLEMENT_CACHE_EVENTS, count_sqlite_error
 
 # Use the same logger name as app.py to ensure logs go to the same file/format
 logger = logging.getLogger("citation_validator")
 
+# Pragmas applied once when a pooled connection is opened
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA foreign_keys = ON",
+)
+
+# Per-connection prepared statement cache size (sqlite3 caches by SQL text)
+STATEMENT_CACHE_SIZE = 256
+
+# Citations a pass user may validate per UTC day
+PASS_DAILY_LIMIT = 1000
+
+# Token entitlement cache (credit balance, active pass); a TTL of 0 turns it off
+ENTITLEMENT_CACHE_TTL_SECONDS = float(os.getenv('ENTITLEMENT_CACHE_TTL_SECONDS', '30'))
+ENTITLEMENT_CACHE_MAX_ENTRIES = int(os.getenv('ENTITLEMENT_CACHE_MAX_ENTRIES', '4096'))
+
+
+class ConnectionPool:
+    """
+    Long-lived SQLite connections, one per (thread, database path).
+
+    Each function used to open and close its own connection and re-issue
+    pragmas, so one validation cost several connect/close cycles. Pooled
+    connections are opened once, get CONNECTION_PRAGMAS once, and keep their
+    prepared statements cached between calls. They also keep the WAL file
+    alive, which the lifespan keep-alive connection used to do.
+
+    Connections run in autocommit mode; use transaction() for multi-statement
+    units of work. If the database file is deleted or replaced (tests, restore
+    from backup), the next checkout reconnects instead of using the old file.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # All open connections across threads, so close_all() can reach them
+        self._connections: Dict[int, sqlite3.Connection] = {}
+        # Per-connection caches (e.g. schema descriptors), dropped with the connection
+        self._caches: Dict[int, Dict[str, Any]] = {}
+        self._stats = {
+            "connections_opened": 0,
+            "reconnects": 0,
+            "checkouts": 0,
+            "transactions": 0,
+            "rollbacks": 0,
+        }
+
+    @staticmethod
+    def _file_identity(db_path: str) -> Optional[tuple]:
+        try:
+            stat = os.stat(db_path)
+        except OSError:
+            return None
+        return (stat.st_dev, stat.st_ino)
+
+    def _open(self, db_path: str) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            db_path,
+            timeout=5.0,
+            isolation_level=None,
+            check_same_thread=False,  # Only close_all() touches another thread's connection
+            cached_statements=STATEMENT_CACHE_SIZE
+        )
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        with self._lock:
+            self._connections[id(conn)] = conn
+            self._stats["connections_opened"] += 1
+        return conn
+
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        with self._lock:
+            self._connections.pop(id(conn), None)
+            self._caches.pop(id(conn), None)
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def connection(self, db_path: str) -> sqlite3.Connection:
+        """Return this thread's connection to db_path, opening it if needed."""
+        entries = getattr(self._local, "entries", None)
+        if entries is None:
+            entries = self._local.entries = {}
+
+        identity = self._file_identity(db_path)
+        entry = entries.get(db_path)
+        if entry is not None:
+            conn, opened_identity = entry
+            if identity is not None and identity == opened_identity and id(conn) in self._connections:
+                with self._lock:
+                    self._stats["checkouts"] += 1
+                return conn
+            # File replaced/deleted, or closed by close_all()
+            self._discard(conn)
+            with self._lock:
+                self._stats["reconnects"] += 1
+
+        conn = self._open(db_path)
+        entries[db_path] = (conn, self._file_identity(db_path))
+        with self._lock:
+            self._stats["checkouts"] += 1
+        return conn
+
+    @contextmanager
+    def transaction(self, db_path: str, immediate: bool = False) -> Iterator[sqlite3.Connection]:
+        """
+        Run a unit of work in one transaction on this thread's connection.
+
+        Commits on success and rolls back if the block raises. immediate=True
+        takes the write lock up front (BEGIN IMMEDIATE) for read-then-write
+        logic that must not race with other writers.
+        """
+        conn = self.connection(db_path)
+        conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        with self._lock:
+            self._stats["transactions"] += 1
+        try:
+            yield conn
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            with self._lock:
+                self._stats["rollbacks"] += 1
+            raise
+        else:
+            if conn.in_transaction:
+                conn.execute("COMMIT")
+
+    def cache_for(self, conn: sqlite3.Connection) -> Dict[str, Any]:
+        """Dict for caching derived state that is valid as long as conn is open."""
+        with self._lock:
+            return self._caches.setdefault(id(conn), {})
+
+    def metrics(self) -> Dict[str, int]:
+        """Snapshot of pool counters plus the number of open connections."""
+        with self._lock:
+            return {**self._stats, "connections_open": len(self._connections)}
+
+    def close_all(self) -> None:
+        """Close every pooled connection (shutdown, or between tests)."""
+        with self._lock:
+            connections = list(self._connections.values())
+            self._connections.clear()
+            self._caches.clear()
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                logger.warning(f"Error closing pooled database connection: {e}")
+
+
+_pool = ConnectionPool()
+DB_POOL_EVENTS.set_function(lambda: {
+    (event,): count for event, count in _pool.metrics().items() if event != "connections_open"
+})
+DB_POOL_CONNECTIONS.set_function(lambda: _pool.metrics()["connections_open"])
+
+
+class EntitlementCache:
+    """
+    In-process TTL + LRU cache of what a token is entitled to (credit balance, active pass).
+
+    Writes made through this module drop the token they change once they
+    have committed (write-through). Commits by any other connection - other
+    worker processes, or other threads' pooled connections - show up as a
+    new PRAGMA data_version on the reading connection; triggers on users and
+    user_passes log every changed token to entitlement_changes, and only
+    the tokens logged since the last check are dropped. The TTL bounds how
+    stale an entry can get otherwise.
+    """
+
+    def __init__(self, ttl_seconds: float = ENTITLEMENT_CACHE_TTL_SECONDS,
+                 max_entries: int = ENTITLEMENT_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # (db_path, kind, token) -> (stored_at, value)
+        self._memory: "OrderedDict[Tuple[str, str, str], tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by every invalidation, so a read that raced one isn't stored
+        self._generation = 0
+        # db_path -> last entitlement_changes.seq applied
+        self._seen_changes: Dict[str, int] = {}
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0, "flushes": 0}
+
+    def _sync(self, conn: sqlite3.Connection, db_path: str) -> None:
+        """Drop the tokens other connections changed since conn last checked."""
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        conn_cache = _pool.cache_for(conn)
+        with self._lock:
+            seen = self._seen_changes.get(db_path)
+        if seen is not None and conn_cache.get("data_version") == version:
+            return
+        conn_cache["data_version"] = version
+
+        try:
+            if seen is None:
+                # First lookup for this database: nothing cached yet, start from the latest change
+                latest = conn.execute("SELECT MAX(seq) FROM entitlement_changes").fetchone()[0] or 0
+                changed = set()
+            else:
+                rows = conn.execute(
+                    "SELECT seq, token FROM entitlement_changes WHERE seq > ? ORDER BY seq", (seen,)
+                ).fetchall()
+                latest = rows[-1][0] if rows else seen
+                changed = {token for _, token in rows}
+        except sqlite3.OperationalError:
+            # Database created before the change log existed
+            self.clear()
+            return
+
+        for token in changed:
+            self.invalidate(token)
+        with self._lock:
+            self._seen_changes[db_path] = max(self._seen_changes.get(db_path, 0), latest)
+
+    def lookup(self, conn: sqlite3.Connection, key: Tuple[str, str, str]) -> Tuple[bool, Any, int]:
+        """
+        Returns:
+            tuple: (found, value, generation); pass generation to store() after reading a miss
+        """
+        if self.ttl_seconds <= 0:
+            return False, None, 0
+        self._sync(conn, key[0])
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and now - entry[0] < self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self._stats["hits"] += 1
+                return True, entry[1], self._generation
+            if entry:
+                del self._memory[key]
+            self._stats["misses"] += 1
+            return False, None, self._generation
+
+    def store(self, key: Tuple[str, str, str], value: Any, generation: int) -> None:
+        """Cache value read from the database, unless an invalidation happened since lookup()."""
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._memory[key] = (time.time(), value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def invalidate(self, token: str) -> None:
+        """Drop a token's entries (call after the write has committed)."""
+        with self._lock:
+            self._generation += 1
+            self._stats["invalidations"] += 1
+            for key in [key for key in self._memory if key[2] == token]:
+                del self._memory[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._stats["flushes"] += 1
+            self._memory.clear()
+
+    def metrics(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "entries": len(self._memory)}
+
+
+_entitlements = EntitlementCache()
+ENTITLEMENT_CACHE_EVENTS.set_function(lambda: {
+    (event,): count for event, count in _entitlements.metrics().items() if event != "entries"
+})
+
+
+def get_pool_metrics() -> Dict[str, int]:
+    """Return connection pool metrics (for health/monitoring endpoints)."""
+    return _pool.metrics()
+
+
+def close_all_connections() -> None:
+    """Close all pooled database connections (and drop cached entitlements)."""
+    _pool.close_all()
+    _entitlements.clear()
+
+
 def get_db_path() -> str:
     """Get database path, using test override if set."""
     # Check for test environment variable
@@ -35,87 +324,120 @@ def init_db():
 
         # Connect to database (creates file if it doesn't exist)
         logger.info(f"Initializing database at: {db_path}")
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-
-        # Enable foreign keys
-        conn.execute("PRAGMA foreign_keys = ON")
-
-        # Create users table
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                token TEXT PRIMARY KEY,
-                credits INTEGER DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-
-        # Create orders table
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS orders (
-                order_id TEXT PRIMARY KEY,
-                token TEXT NOT NULL,
-                credits_granted INTEGER NOT NULL,
-                pass_days INTEGER,
-                pass_type TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (token) REFERENCES users(token)
-            )
-        ''')
-
-        # Add pass columns to orders table if they don't exist
-        try:
-            cursor.execute("ALTER TABLE orders ADD COLUMN pass_days INTEGER")
-            logger.info("Added pass_days column to orders table")
-        except sqlite3.OperationalError as e:
-            if "duplicate column name" in str(e).lower():
-                pass  # Column already exists
-            else:
-                raise
+        with _pool.transaction(db_path) as conn:
+            cursor = conn.cursor()
 
-        try:
-            cursor.execute("ALTER TABLE orders ADD COLUMN pass_type TEXT")
-            logger.info("Added pass_type column to orders table")
-        except sqlite3.OperationalError as e:
-            if "duplicate column name" in str(e).lower():
-                pass  # Column already exists
-            else:
-                raise
-
-        # Create user_passes table for time-based access
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_passes (
-                token TEXT PRIMARY KEY,
-                expiration_timestamp INTEGER NOT NULL,
-                pass_type TEXT NOT NULL,
-                purchase_date INTEGER NOT NULL,
-                order_id TEXT UNIQUE NOT NULL
-            )
-        ''')
-
-        # Create index for efficient expiration checks
-        conn.execute('''
-            CREATE INDEX IF NOT EXISTS idx_user_passes_expiration
-            ON user_passes(token, expiration_timestamp)
-        ''')
-
-        # Create daily_usage table for tracking citations per day
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS daily_usage (
-                token TEXT NOT NULL,
-                reset_timestamp INTEGER NOT NULL,
-                citations_count INTEGER DEFAULT 0,
-                PRIMARY KEY (token, reset_timestamp)
-            )
-        ''')
-
-        # Commit changes
-        conn.commit()
-        conn.close()
+            # Create users table
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS users (
+                    token TEXT PRIMARY KEY,
+                    credits INTEGER DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+
+            # Create orders table
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS orders (
+                    order_id TEXT PRIMARY KEY,
+                    token TEXT NOT NULL,
+                    credits_granted INTEGER NOT NULL,
+                    pass_days INTEGER,
+                    pass_type TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (token) REFERENCES users(token)
+                )
+            ''')
+
+            # Add pass columns to orders table if they don't exist
+            try:
+                cursor.execute("ALTER TABLE orders ADD COLUMN pass_days INTEGER")
+                logger.info("Added pass_days column to orders table")
+            except sqlite3.OperationalError as e:
+                if "duplicate column name" in str(e).lower():
+                    pass  # Column already exists
+                else:
+                    raise
+
+            try:
+                cursor.execute("ALTER TABLE orders ADD COLUMN pass_type TEXT")
+                logger.info("Added pass_type column to orders table")
+            except sqlite3.OperationalError as e:
+                if "duplicate column name" in str(e).lower():
+                    pass  # Column already exists
+                else:
+                    raise
+
+            # Create user_passes table for time-based access
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS user_passes (
+                    token TEXT PRIMARY KEY,
+                    expiration_timestamp INTEGER NOT NULL,
+                    pass_type TEXT NOT NULL,
+                    purchase_date INTEGER NOT NULL,
+                    order_id TEXT UNIQUE NOT NULL
+                )
+            ''')
+
+            # Create index for efficient expiration checks
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_user_passes_expiration
+                ON user_passes(token, expiration_timestamp)
+            ''')
+
+            # Create daily_usage table for tracking citations per day
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS daily_usage (
+                    token TEXT NOT NULL,
+                    reset_timestamp INTEGER NOT NULL,
+                    citations_count INTEGER DEFAULT 0,
+                    PRIMARY KEY (token, reset_timestamp)
+                )
+            ''')
+
+            # Create reservations table: quota held for a job until it settles
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS reservations (
+                    job_id TEXT PRIMARY KEY,
+                    token TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    amount INTEGER NOT NULL,
+                    reset_timestamp INTEGER,
+                    status TEXT NOT NULL DEFAULT 'held',
+                    used INTEGER,
+                    created_at INTEGER NOT NULL
+                )
+            ''')
+
+            # Create index for the stale reservation sweep
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_reservations_status
+                ON reservations(status, created_at)
+            ''')
+
+            # Log of tokens whose credits or pass changed, so each process's
+            # EntitlementCache can drop just those tokens
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS entitlement_changes (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    token TEXT NOT NULL,
+                    changed_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))
+                )
+            ''')
+            for table in ('users', 'user_passes'):
+                for event, row in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')):
+                    conn.execute(f'''
+                        CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_entitlement_change
+                        AFTER {event} ON {table}
+                        BEGIN
+                            INSERT INTO entitlement_changes (token) VALUES ({row}.token);
+                        END
+                    ''')
 
         logger.info("Database initialized successfully")
 
     except sqlite3.Error as e:
+        count_sqlite_error(e, "credits")
         logger.error(f"Database error: {e}")
         raise
     except Exception as e:
@@ -136,23 +458,25 @@ def get_credits(token: str) -> int:
     """
     try:
         db_path = get_db_path()
-        with sqlite3.connect(db_path) as conn:
-            conn.execute("PRAGMA foreign_keys = ON")
-            conn.execute("PRAGMA busy_timeout=5000")
-            cursor = conn.cursor()
+        conn = _pool.connection(db_path)
+        key = (db_path, 'credits', token)
+        found, credits, generation = _entitlements.lookup(conn, key)
+        if found:
+            return credits
 
-            cursor.execute("SELECT credits FROM users WHERE token = ?", (token,))
-            result = cursor.fetchone()
+        result = conn.execute("SELECT credits FROM users WHERE token = ?", (token,)).fetchone()
 
-            if result:
-                credits = result[0]
-                logger.debug(f"Retrieved {credits} credits for token {token[:8]}...")
-                return credits
-            else:
-                logger.debug(f"No user found for token {token[:8]}..., returning 0")
-                return 0
+        if result:
+            credits = result[0]
+            logger.debug(f"Retrieved {credits} credits for token {token[:8]}...")
+        else:
+            credits = 0
+            logger.debug(f"No user found for token {token[:8]}..., returning 0")
+        _entitlements.store(key, credits, generation)
+        return credits
 
     except sqlite3.Error as e:
+        count_sqlite_error(e, "credits")
         logger.error(f"Database error getting credits: {e}")
         return 0
     except Exception as e:
@@ -174,9 +498,8 @@ def add_credits(token: str, amount: int, order_id: str) -> bool:
         bool: True if credits were added, False if order_id already exists
     """
     try:
-        db_path = get_db_path()
-        with sqlite3.connect(db_path) as conn:
-            conn.execute("PRAGMA foreign_keys = ON")
+        # Write lock up front so the idempotency check and the grant can't interleave
+        with _pool.transaction(get_db_path(), immediate=True) as conn:
             cursor = conn.cursor()
 
             # Check if order_id already exists (idempotency check)
@@ -197,11 +520,12 @@ def add_credits(token: str, amount: int, order_id: str) -> bool:
                 VALUES (?, ?, ?)
             ''', (order_id, token, amount))
 
-            conn.commit()
-            logger.info(f"Added {amount} credits for token {token[:8]}..., order {order_id}")
-            return True
+        _entitlements.invalidate(token)
+        logger.info(f"Added {amount} credits for token {token[:8]}..., order {order_id}")
+        return True
 
     except sqlite3.Error as e:
+        count_sqlite_error(e, "credits")
         logger.error(f"Database error adding credits: {e}")
         return False
     except Exception as e:
@@ -221,29 +545,27 @@ def deduct_credits(token: str, amount: int) -> bool:
         bool: True if credits were deducted, False if insufficient credits
     """
     try:
-        db_path = get_db_path()
-        with sqlite3.connect(db_path) as conn:
-            conn.execute("PRAGMA foreign_keys = ON")
-            cursor = conn.cursor()
-
-            # Atomic credit deduction using WHERE clause
-            cursor.execute('''
-                UPDATE users
-                SET credits = credits - ?
-                WHERE token = ? AND credits >= ?
-            ''', (amount, token, amount))
-
-            # Check if any rows were updated (i.e., if user had enough credits)
-            if cursor.rowcount > 0:
-                conn.commit()
-                logger.info(f"Deducted {amount} credits from token {token[:8]}...")
-                return True
-            else:
-                # No rows updated means insufficient credits or user doesn't exist
-                logger.warning(f"Insufficient credits for token {token[:8]}..., needed {amount}")
-                return False
+        conn = _pool.connection(get_db_path())
+
+        # Atomic credit deduction using WHERE clause (single autocommit statement)
+        cursor = conn.execute('''
+            UPDATE users
+            SET credits = credits - ?
+            WHERE token = ? AND credits >= ?
+        ''', (amount, token, amount))
+
+        # Check if any rows were updated (i.e., if user had enough credits)
+        if cursor.rowcount > 0:
+            _entitlements.invalidate(token)
+            logger.info(f"Deducted {amount} credits from token {token[:8]}...")
+            return True
+        else:
+            # No rows updated means insufficient credits or user doesn't exist
+            logger.warning(f"Insufficient credits for token {token[:8]}..., needed {amount}")
+            return False
 
     except sqlite3.Error as e:
+        count_sqlite_error(e, "credits")
         logger.error(f"Database error deducting credits: {e}")
         return False
     except Exception as e:
@@ -276,6 +598,74 @@ def get_validations_db_path() -> str:
     )
 
 
+class ValidationsSchema:
+    """
+    Column layout of the validations table and the write SQL that depends on it.
+
+    The table exists in several migrated shapes (status and/or
+    validation_status, optional user ID, is_test_job and style columns), so
+    writes must match the columns present. This is built once per pooled
+    connection instead of running PRAGMA table_info on every write.
+    """
+
+    def __init__(self, columns):
+        self.columns = frozenset(columns)
+
+        status_columns = [col for col in ('status', 'validation_status') if col in self.columns]
+        self.status_columns = tuple(status_columns or ['validation_status'])
+
+        optional_columns = [col for col in ('paid_user_id', 'free_user_id', 'is_test_job') if col in self.columns]
+        self.has_is_test_job = 'is_test_job' in self.columns
+        self.insert_columns = ('job_id', 'user_type', 'citation_count') + self.status_columns + tuple(optional_columns)
+        self.insert_sql = self._insert_sql(self.insert_columns)
+        # Style is only written when given (NULL otherwise)
+        self.insert_with_style_sql = (
+            self._insert_sql(self.insert_columns + ('style',)) if 'style' in self.columns else None
+        )
+
+        status_updates = ", ".join(f"{col} = ?" for col in self.status_columns)
+        self.update_sql = {
+            (True, False): f"UPDATE validations SET {status_updates} WHERE job_id = ?",
+            (False, True): "UPDATE validations SET error_message = ? WHERE job_id = ?",
+            (True, True): f"UPDATE validations SET {status_updates}, error_message = ? WHERE job_id = ?",
+        }
+
+    @staticmethod
+    def _insert_sql(columns: Tuple[str, ...]) -> str:
+        return (
+            f"INSERT INTO validations ({', '.join(columns)}, created_at) "
+            f"VALUES ({', '.join(['?'] * len(columns))}, datetime('now'))"
+        )
+
+
+def _validations_schema(conn: sqlite3.Connection) -> ValidationsSchema:
+    """Return the cached ValidationsSchema for this connection, building it if needed."""
+    cache = _pool.cache_for(conn)
+    schema = cache.get('validations_schema')
+    if schema is None:
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(validations)")]
+        schema = cache['validations_schema'] = ValidationsSchema(columns)
+    return schema
+
+
+def _execute_validations_write(
+    conn: sqlite3.Connection,
+    build_statement: Callable[[ValidationsSchema], Tuple[str, list]]
+) -> sqlite3.Cursor:
+    """
+    Run a validations write built from the cached schema.
+
+    If the statement fails (e.g. a migration dropped a column since the schema
+    was cached), the schema is re-read and the write retried once.
+    """
+    try:
+        return conn.execute(*build_statement(_validations_schema(conn)))
+    except sqlite3.OperationalError as e:
+        logger.info(f"Validations write failed ({e}), refreshing cached schema")
+        _pool.cache_for(conn).pop('validations_schema', None)
+        return conn.execute(*build_statement(_validations_schema(conn)))
+
+
 def create_validation_record(
     job_id: str,
     user_type: str,
@@ -310,66 +700,26 @@ def create_validation_record(
         if db_dir and not os.path.exists(db_dir):
             os.makedirs(db_dir, exist_ok=True)
 
-        with sqlite3.connect(db_path) as conn:
-            cursor = conn.cursor()
-
-            # Check what columns exist in the database
-            cursor.execute("PRAGMA table_info(validations)")
-            columns = [row[1] for row in cursor.fetchall()]
-
-            has_status = 'status' in columns
-            has_validation_status = 'validation_status' in columns
-            has_is_test_job = 'is_test_job' in columns
-            has_style = 'style' in columns
-
-            # Build the INSERT statement based on available columns
-            insert_columns = ['job_id', 'user_type', 'citation_count']
-            insert_values = [job_id, user_type, citation_count]
-
-            # Add status column(s)
-            if has_status and has_validation_status:
-                insert_columns.extend(['status', 'validation_status'])
-                insert_values.extend([status, status])
-            elif has_status:
-                insert_columns.append('status')
-                insert_values.append(status)
-            else:
-                insert_columns.append('validation_status')
-                insert_values.append(status)
-
-            # Add optional columns
-            optional_columns = ['paid_user_id', 'free_user_id']
-            optional_values = [paid_user_id, free_user_id]
-            for col, val in zip(optional_columns, optional_values):
-                if col in columns:
-                    insert_columns.append(col)
-                    insert_values.append(val)
-
-            # Add is_test_job if available
-            if has_is_test_job:
-                insert_columns.append('is_test_job')
-                insert_values.append(is_test_job)
-
-            # Add style if available
-            if has_style and style is not None:
-                insert_columns.append('style')
-                insert_values.append(style)
-
-            # Add created_at
-            insert_columns.append('created_at')
-            insert_values.append('datetime(\'now\')')
-
-            # Execute the INSERT
-            cursor.execute(f'''
-                INSERT INTO validations ({', '.join(insert_columns)})
-                VALUES ({', '.join(['?'] * (len(insert_values) - 1))}, datetime('now'))
-            ''', insert_values[:-1])  # Exclude the datetime('now') from values as it's in the SQL
-
-            conn.commit()
-            logger.info(f"Created validation record for job {job_id}")
-            return True
+        def build_insert(schema: ValidationsSchema) -> Tuple[str, list]:
+            values = [job_id, user_type, citation_count] + [status] * len(schema.status_columns)
+            if 'paid_user_id' in schema.columns:
+                values.append(paid_user_id)
+            if 'free_user_id' in schema.columns:
+                values.append(free_user_id)
+            if schema.has_is_test_job:
+                values.append(is_test_job)
+            if style is not None and schema.insert_with_style_sql:
+                return schema.insert_with_style_sql, values + [style]
+            return schema.insert_sql, values
+
+        with _pool.transaction(db_path) as conn:
+            _execute_validations_write(conn, build_insert)
+
+        logger.info(f"Created validation record for job {job_id}")
+        return True
 
     except sqlite3.Error as e:
+        count_sqlite_error(e, "validations")
         logger.error(f"Database error creating validation record: {e}")
         return False
     except Exception as e:
@@ -394,53 +744,24 @@ def update_validation_tracking(
         bool: True if update successful, False otherwise
     """
     try:
-        db_path = get_validations_db_path()
-        with sqlite3.connect(db_path) as conn:
-            cursor = conn.cursor()
-
-            # Check what status columns exist in the database
-            cursor.execute("PRAGMA table_info(validations)")
-            columns = [row[1] for row in cursor.fetchall()]
-
-            has_status = 'status' in columns
-            has_validation_status = 'validation_status' in columns
-
-            # Build dynamic update query
-            updates = []
-            params = []
-
-            if status is not None:
-                if has_status and has_validation_status:
-                    # Both columns exist - update both
-                    updates.append("status = ?")
-                    updates.append("validation_status = ?")
-                    params.extend([status, status])
-                elif has_status:
-                    # Only status exists
-                    updates.append("status = ?")
-                    params.append(status)
-                else:
-                    # Only validation_status exists
-                    updates.append("validation_status = ?")
-                    params.append(status)
+        if status is None and error_message is None:
+            logger.warning(f"No updates provided for job {job_id}")
+            return False
 
+        def build_update(schema: ValidationsSchema) -> Tuple[str, list]:
+            params = [status] * len(schema.status_columns) if status is not None else []
             if error_message is not None:
-                updates.append("error_message = ?")
                 params.append(error_message)
+            return schema.update_sql[(status is not None, error_message is not None)], params + [job_id]
 
-            if updates:
-                params.append(job_id)
-                sql = f"UPDATE validations SET {', '.join(updates)} WHERE job_id = ?"
-                cursor.execute(sql, params)
-                conn.commit()
+        with _pool.transaction(get_validations_db_path()) as conn:
+            _execute_validations_write(conn, build_update)
 
-                logger.debug(f"Updated validation tracking for job {job_id}")
-                return True
-            else:
-                logger.warning(f"No updates provided for job {job_id}")
-                return False
+        logger.debug(f"Updated validation tracking for job {job_id}")
+        return True
 
     except sqlite3.Error as e:
+        count_sqlite_error(e, "validations")
         logger.error(f"Database error updating validation tracking: {e}")
         return False
     except Exception as e:
@@ -448,13 +769,20 @@ def update_validation_tracking(
         return False
 
 
+# Shared by the quota check and usage lookup so both hit the same cached statement
+SELECT_DAILY_USAGE_SQL = """
+    SELECT citations_count FROM daily_usage
+    WHERE token = ? AND reset_timestamp = ?
+"""
+
+
 def try_increment_daily_usage(token: str, citation_count: int) -> dict:
     """
     Atomically check and increment daily usage.
 
     Returns:
     {
-        'success': bool,          # False if would exceed 1000 limit
+        'success': bool,          # False if would exceed PASS_DAILY_LIMIT
         'used_before': int,       # Usage before this increment
         'used_after': int,        # Usage after (if success)
         'remaining': int,         # Citations left in window
@@ -473,63 +801,40 @@ def try_increment_daily_usage(token: str, citation_count: int) -> dict:
 
     Oracle Feedback #1: https://docs/plans/2025-12-10-pricing-model-ab-test-design-FINAL.md
     """
-    db_path = get_db_path()
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute("PRAGMA journal_mode=WAL")
-    cursor.execute("PRAGMA busy_timeout=5000")
-
     reset_timestamp = get_next_utc_midnight()
 
-    try:
-        # CRITICAL: BEGIN IMMEDIATE acquires write lock immediately
-        # Prevents race between read and write
-        cursor.execute("BEGIN IMMEDIATE")
-
+    # CRITICAL: BEGIN IMMEDIATE acquires write lock immediately
+    # Prevents race between read and write
+    with _pool.transaction(get_db_path(), immediate=True) as conn:
         # Get current usage for this window
-        cursor.execute("""
-            SELECT citations_count FROM daily_usage
-            WHERE token = ? AND reset_timestamp = ?
-        """, (token, reset_timestamp))
-
-        row = cursor.fetchone()
+        row = conn.execute(SELECT_DAILY_USAGE_SQL, (token, reset_timestamp)).fetchone()
         current_usage = row[0] if row else 0
 
-        # Check if increment would exceed limit
-        if current_usage + citation_count > 1000:
-            conn.rollback()
-            conn.close()
+        # Check if increment would exceed limit (nothing written, commit is a no-op)
+        if current_usage + citation_count > PASS_DAILY_LIMIT:
             return {
                 'success': False,
                 'used_before': current_usage,
-                'remaining': 1000 - current_usage,
+                'remaining': PASS_DAILY_LIMIT - current_usage,
                 'reset_timestamp': reset_timestamp
             }
 
         # Safe to increment
         new_usage = current_usage + citation_count
-        cursor.execute("""
+        conn.execute("""
             INSERT INTO daily_usage (token, reset_timestamp, citations_count)
             VALUES (?, ?, ?)
             ON CONFLICT(token, reset_timestamp) DO UPDATE SET
             citations_count = citations_count + ?
         """, (token, reset_timestamp, citation_count, citation_count))
 
-        conn.commit()
-        conn.close()
-
-        return {
-            'success': True,
-            'used_before': current_usage,
-            'used_after': new_usage,
-            'remaining': 1000 - new_usage,
-            'reset_timestamp': reset_timestamp
-        }
-
-    except Exception as e:
-        conn.rollback()
-        conn.close()
-        raise
+    return {
+        'success': True,
+        'used_before': current_usage,
+        'used_after': new_usage,
+        'remaining': PASS_DAILY_LIMIT - new_usage,
+        'reset_timestamp': reset_timestamp
+    }
 
 
 def get_daily_usage_for_current_window(token: str) -> int:
@@ -538,18 +843,8 @@ def get_daily_usage_for_current_window(token: str) -> int:
 
     Returns citations used in current window (0 if new window or no usage).
     """
-    db_path = get_db_path()
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-
     reset_timestamp = get_next_utc_midnight()
-    cursor.execute("""
-        SELECT citations_count FROM daily_usage
-        WHERE token = ? AND reset_timestamp = ?
-    """, (token, reset_timestamp))
-
-    row = cursor.fetchone()
-    conn.close()
+    row = _pool.connection(get_db_path()).execute(SELECT_DAILY_USAGE_SQL, (token, reset_timestamp)).fetchone()
 
     return row[0] if row else 0
 
@@ -567,24 +862,23 @@ def get_active_pass(token: str) -> Optional[dict]:
     }
     Or None if no active pass.
     """
-    db_path = get_db_path()
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute("PRAGMA busy_timeout=5000")
-
     now = int(time.time())
     logger.debug(f"Checking active pass for {token[:8]} at {now}")
-    
-    cursor.execute("""
-        SELECT expiration_timestamp, pass_type, purchase_date
-        FROM user_passes
-        WHERE token = ? AND expiration_timestamp > ?
-    """, (token, now))
 
-    row = cursor.fetchone()
-    conn.close()
+    # Cache the token's pass row (or its absence); expiry is checked below on every call
+    db_path = get_db_path()
+    conn = _pool.connection(db_path)
+    key = (db_path, 'pass', token)
+    found, row, generation = _entitlements.lookup(conn, key)
+    if not found:
+        row = conn.execute("""
+            SELECT expiration_timestamp, pass_type, purchase_date
+            FROM user_passes
+            WHERE token = ?
+        """, (token,)).fetchone()
+        _entitlements.store(key, row, generation)
 
-    if row:
+    if row and row[0] > now:
         hours_remaining = (row[0] - now) // 3600
         pass_type = row[1]
         
@@ -633,79 +927,260 @@ def add_pass(token: str, days: int, pass_type: str, order_id: str) -> bool:
     Returns:
         True if pass granted (or already processed)
     """
-    db_path = get_db_path()
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute("PRAGMA journal_mode=WAL")
-    cursor.execute("PRAGMA busy_timeout=5000")
-
     try:
         # CRITICAL: Lock early to prevent race conditions
-        cursor.execute("BEGIN IMMEDIATE")
-
-        # Idempotency check - has this order been processed?
-        cursor.execute("SELECT 1 FROM orders WHERE order_id = ?", (order_id,))
-        if cursor.fetchone():
-            conn.rollback()
-            conn.close()
-            logger.info(f"Order {order_id} already processed (idempotent)")
-            return True
-
-        # Check for existing active pass
-        now = int(time.time())
-        cursor.execute("""
-            SELECT expiration_timestamp, pass_type
-            FROM user_passes
-            WHERE token = ? AND expiration_timestamp > ?
-        """, (token, now))
+        with _pool.transaction(get_db_path(), immediate=True) as conn:
+            cursor = conn.cursor()
 
-        existing = cursor.fetchone()
+            # Idempotency check - has this order been processed?
+            cursor.execute("SELECT 1 FROM orders WHERE order_id = ?", (order_id,))
+            if cursor.fetchone():
+                logger.info(f"Order {order_id} already processed (idempotent)")
+                return True
 
-        if existing:
-            # Extend existing pass (add days to current expiration)
-            # Oracle Feedback #15: Always extend, regardless of pass type
-            current_expiration = existing[0]
-            new_expiration = current_expiration + (days * 86400)
-            logger.info(f"Extending pass for {token}: {existing[1]} -> {pass_type} (+{days} days)")
-        else:
-            # New pass (starts now)
-            new_expiration = now + (days * 86400)
-            logger.info(f"Granting new {pass_type} pass to {token}")
-
-        # Ensure user exists in users table (needed for get_credits to work)
-        cursor.execute("INSERT OR IGNORE INTO users (token, credits) VALUES (?, 0)", (token,))
-
-        # Record the order in orders table (persistent history)
-        cursor.execute("""
-            INSERT INTO orders (order_id, token, credits_granted, pass_days, pass_type)
-            VALUES (?, ?, 0, ?, ?)
-        """, (order_id, token, days, pass_type))
-
-        # Insert or replace user pass state
-        cursor.execute("""
-            INSERT OR REPLACE INTO user_passes
-            (token, expiration_timestamp, pass_type, purchase_date, order_id)
-            VALUES (?, ?, ?, ?, ?)
-        """, (token, new_expiration, pass_type, now, order_id))
-
-        conn.commit()
-        conn.close()
+            # Check for existing active pass
+            now = int(time.time())
+            cursor.execute("""
+                SELECT expiration_timestamp, pass_type
+                FROM user_passes
+                WHERE token = ? AND expiration_timestamp > ?
+            """, (token, now))
+
+            existing = cursor.fetchone()
+
+            if existing:
+                # Extend existing pass (add days to current expiration)
+                # Oracle Feedback #15: Always extend, regardless of pass type
+                current_expiration = existing[0]
+                new_expiration = current_expiration + (days * 86400)
+                logger.info(f"Extending pass for {token}: {existing[1]} -> {pass_type} (+{days} days)")
+            else:
+                # New pass (starts now)
+                new_expiration = now + (days * 86400)
+                logger.info(f"Granting new {pass_type} pass to {token}")
+
+            # Ensure user exists in users table (needed for get_credits to work)
+            cursor.execute("INSERT OR IGNORE INTO users (token, credits) VALUES (?, 0)", (token,))
+
+            # Record the order in orders table (persistent history)
+            cursor.execute("""
+                INSERT INTO orders (order_id, token, credits_granted, pass_days, pass_type)
+                VALUES (?, ?, 0, ?, ?)
+            """, (order_id, token, days, pass_type))
+
+            # Insert or replace user pass state
+            cursor.execute("""
+                INSERT OR REPLACE INTO user_passes
+                (token, expiration_timestamp, pass_type, purchase_date, order_id)
+                VALUES (?, ?, ?, ?, ?)
+            """, (token, new_expiration, pass_type, now, order_id))
+
+        _entitlements.invalidate(token)
         return True
 
     except sqlite3.IntegrityError as e:
         # Race condition - another thread processed this order
-        conn.rollback()
-        conn.close()
         logger.warning(f"IntegrityError for order {order_id}: {e}")
         return True  # Treat as success (idempotent)
 
     except Exception as e:
-        conn.rollback()
-        conn.close()
         logger.error(f"Failed to add pass: {e}")
         raise
 
 
+def reserve_quota(job_id: str, token: str, citation_count: int) -> dict:
+    """
+    Hold a paid user's quota for a job before its citations are validated.
+
+    One short BEGIN IMMEDIATE transaction: pass users get citation_count
+    added to today's usage if it fits PASS_DAILY_LIMIT (otherwise nothing is
+    held), credit users get up to citation_count credits taken from their
+    balance. When the job finishes, settle_reservation() charges what was
+    actually used and gives the rest back.
+
+    Returns:
+    {
+        'kind': str,              # 'pass' or 'credits'
+        'reserved': int,          # Citations held for the job (0 if none)
+        'success': bool,          # True if all citation_count are held
+        'balance': int,           # Credits: balance after the hold
+        'used_before': int,       # Pass: usage in the window before the hold
+        'reset_timestamp': int    # Pass: when the daily window resets
+    }
+    """
+    now = int(time.time())
+    try:
+        with _pool.transaction(get_db_path(), immediate=True) as conn:
+            has_pass = conn.execute("""
+                SELECT 1 FROM user_passes
+                WHERE token = ? AND expiration_timestamp > ?
+            """, (token, now)).fetchone()
+
+            if has_pass:
+                reset_timestamp = get_next_utc_midnight()
+                row = conn.execute(SELECT_DAILY_USAGE_SQL, (token, reset_timestamp)).fetchone()
+                used_before = row[0] if row else 0
+                reservation = {
+                    'kind': 'pass',
+                    'reserved': 0,
+                    'success': False,
+                    'used_before': used_before,
+                    'reset_timestamp': reset_timestamp
+                }
+                if used_before + citation_count > PASS_DAILY_LIMIT:
+                    return reservation
+                reservation.update(reserved=citation_count, success=True)
+                if citation_count > 0:
+                    conn.execute("""
+                        INSERT INTO daily_usage (token, reset_timestamp, citations_count)
+                        VALUES (?, ?, ?)
+                        ON CONFLICT(token, reset_timestamp) DO UPDATE SET
+                        citations_count = citations_count + ?
+                    """, (token, reset_timestamp, citation_count, citation_count))
+            else:
+                row = conn.execute("SELECT credits FROM users WHERE token = ?", (token,)).fetchone()
+                balance = row[0] if row else 0
+                reserved = max(0, min(balance, citation_count))
+                reservation = {
+                    'kind': 'credits',
+                    'reserved': reserved,
+                    'success': reserved == citation_count,
+                    'balance': balance - reserved
+                }
+                if reserved > 0:
+                    conn.execute("UPDATE users SET credits = credits - ? WHERE token = ?", (reserved, token))
+
+            if reservation['reserved'] > 0:
+                conn.execute("""
+                    INSERT INTO reservations (job_id, token, kind, amount, reset_timestamp, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, (job_id, token, reservation['kind'], reservation['reserved'],
+                      reservation.get('reset_timestamp'), now))
+
+        if reservation['kind'] == 'credits' and reservation['reserved'] > 0:
+            _entitlements.invalidate(token)
+        logger.info(f"Reserved {reservation['reserved']}/{citation_count} {reservation['kind']} "
+                    f"for job {job_id}, token {token[:8]}...")
+        return reservation
+
+    except sqlite3.Error as e:
+        count_sqlite_error(e, "credits")
+        logger.error(f"Database error reserving quota for job {job_id}: {e}")
+        raise
+
+
+def settle_reservation(job_id: str, used: int) -> Optional[dict]:
+    """
+    Charge `used` citations of a job's reservation and give the rest back.
+
+    Credits go back to the balance, pass citations come off the daily usage
+    window they were added to. Only held reservations are settled, so
+    calling it again (or refund_reservation() after a settle) is a no-op.
+
+    Returns:
+        dict: {'kind', 'reserved', 'used', 'refunded'}, or None if the job
+        holds nothing
+
+    Raises:
+        sqlite3.Error: The reservation stays held, so a job whose results
+        were never charged fails rather than completing for free
+    """
+    try:
+        # Most jobs settle once; check without taking the write lock first
+        conn = _pool.connection(get_db_path())
+        if not conn.execute("SELECT 1 FROM reservations WHERE job_id = ? AND status = 'held'", (job_id,)).fetchone():
+            return None
+
+        with _pool.transaction(get_db_path(), immediate=True) as conn:
+            row = conn.execute("""
+                SELECT token, kind, amount, reset_timestamp FROM reservations
+                WHERE job_id = ? AND status = 'held'
+            """, (job_id,)).fetchone()
+            if not row:
+                return None
+
+            token, kind, amount, reset_timestamp = row
+            used = max(0, min(used, amount))
+            refunded = amount - used
+            if refunded and kind == 'credits':
+                conn.execute("UPDATE users SET credits = credits + ? WHERE token = ?", (refunded, token))
+            elif refunded:
+                conn.execute("""
+                    UPDATE daily_usage SET citations_count = MAX(0, citations_count - ?)
+                    WHERE token = ? AND reset_timestamp = ?
+                """, (refunded, token, reset_timestamp))
+
+            conn.execute("""
+                UPDATE reservations SET status = ?, used = ? WHERE job_id = ?
+            """, ('settled' if used else 'refunded', used, job_id))
+
+        if refunded and kind == 'credits':
+            _entitlements.invalidate(token)
+        logger.info(f"Settled reservation for job {job_id}: used {used}/{amount} {kind}, refunded {refunded}")
+        return {'kind': kind, 'reserved': amount, 'used': used, 'refunded': refunded}
+
+    except sqlite3.Error as e:
+        count_sqlite_error(e, "credits")
+        logger.error(f"Database error settling reservation for job {job_id}: {e}")
+        raise
+
+
+def refund_reservation(job_id: str) -> Optional[dict]:
+    """
+    Give back everything a job still holds (failed or abandoned jobs).
+
+    Returns None on a database error (logged): the reservation stays held
+    and release_stale_reservations() refunds it later.
+    """
+    try:
+        return settle_reservation(job_id, 0)
+    except sqlite3.Error:
+        return None
+
+
+def release_stale_reservations(max_age_seconds: int) -> int:
+    """
+    Refund reservations still held after max_age_seconds.
+
+    A worker that dies mid-job never settles; its quota comes back here.
+
+    Returns:
+        int: Number of reservations refunded
+    """
+    cutoff = int(time.time()) - max_age_seconds
+    try:
+        rows = _pool.connection(get_db_path()).execute("""
+            SELECT job_id FROM reservations
+            WHERE status = 'held' AND created_at < ?
+        """, (cutoff,)).fetchall()
+    except sqlite3.Error as e:
+        count_sqlite_error(e, "credits")
+        logger.error(f"Database error finding stale reservations: {e}")
+        return 0
+
+    return sum(1 for (job_id,) in rows if refund_reservation(job_id))
+
+
+def prune_entitlement_changes(max_age_seconds: float = 10 * ENTITLEMENT_CACHE_TTL_SECONDS) -> int:
+    """
+    Delete entitlement_changes rows older than max_age_seconds.
+
+    A cache entry is at most ENTITLEMENT_CACHE_TTL_SECONDS old and was stored
+    after its process read the log, so older rows can't invalidate anything.
+
+    Returns:
+        int: Number of rows deleted
+    """
+    cutoff = int(time.time() - max_age_seconds)
+    try:
+        with _pool.transaction(get_db_path()) as conn:
+            return conn.execute("DELETE FROM entitlement_changes WHERE changed_at < ?", (cutoff,)).rowcount
+    except sqlite3.Error as e:
+        count_sqlite_error(e, "credits")
+        logger.error(f"Database error pruning entitlement changes: {e}")
+        return 0
+
+
 if __name__ == "__main__":
     init_db()
     print(f"Database initialized at {get_db_path()}")
@@ -0,0 +1,98 @@
+"""
+Structured telemetry events for the dashboard.
+
+Each event is one JSON object per line, appended to an NDJSON file that the
+dashboard's event consumer (dashboard/event_consumer.py) folds into
+validations rows by job_id:
+
+    {"ts": "2025-11-04T10:00:00Z", "type": "job_created", "job_id": "...", "user_type": "free", ...}
+
+Unlike the free-text log lines, every event carries the job it belongs to,
+so nothing has to be matched back to a job by timestamp. Code that runs
+inside a job without knowing its id (e.g. provider token usage) gets it from
+bind_job().
+
+emit_event() only queues the line; event_log_writer appends queued events
+from a background thread, so enabling events adds no file I/O to requests.
+"""
+import json
+import os
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Optional
+
+from citation_logger import BufferedLogWriter
+from logger import setup_logger
+
+logger = setup_logger("events")
+
+# Feature toggle for safe deployment, like CITATION_LOGGING_ENABLED
+EVENT_LOGGING_ENABLED = os.getenv('EVENT_LOGGING_ENABLED', '').lower() == 'true'
+
+if os.path.exists("/opt/citations"):
+    DEFAULT_EVENT_LOG_PATH = "/opt/citations/logs/events.ndjson"
+else:
+    DEFAULT_EVENT_LOG_PATH = str(Path(__file__).parent.parent / "logs" / "events.ndjson")
+
+# Event types and the fields they carry (besides ts, type and job_id)
+EVENT_TYPES = {
+    'job_created': ('user_type', 'paid_user_id', 'free_user_id', 'style', 'is_test_job'),
+    'validation_type': ('validation_type',),
+    'llm_call': ('provider', 'style', 'fallback', 'duration_seconds'),
+    'token_usage': ('prompt', 'completion', 'total'),
+    'validation_summary': ('citation_count', 'valid', 'invalid'),
+    'inline_stats': ('inline_citation_count', 'orphan_count'),
+    'gating_decision': ('user_type', 'results_gated', 'reason'),
+    'results_locked': ('partial_type',),
+    'job_completed': (),
+    'job_failed': ('error_message',),
+    'reveal': ('outcome',),
+    'upgrade': ('event', 'experiment_variant', 'product_id', 'amount_cents', 'currency',
+                'order_id', 'interaction_type', 'token'),
+    'correction': ('action',),
+    'job_timings': ('provider', 'style', 'spans'),
+}
+
+event_log_writer = BufferedLogWriter("event log", "EVENT_LOG_PATH", DEFAULT_EVENT_LOG_PATH)
+
+_current_job_id: ContextVar[Optional[str]] = ContextVar('current_job_id', default=None)
+
+
+def bind_job(job_id: str) -> None:
+    """Attribute events emitted without a job_id in the current task to job_id."""
+    _current_job_id.set(job_id)
+
+
+def emit_event(event_type: str, job_id: Optional[str] = None, **fields: Any) -> bool:
+    """
+    Queue one event for the event log.
+
+    Args:
+        event_type: One of EVENT_TYPES
+        job_id: Job the event belongs to (defaults to the job bound with bind_job)
+        **fields: Event fields; None values are left out
+
+    Returns:
+        bool: True if the event was queued, False if disabled or failed (never raises)
+    """
+    if not EVENT_LOGGING_ENABLED:
+        return False
+
+    if event_type not in EVENT_TYPES:
+        logger.warning(f"Unknown event type {event_type}, not emitted")
+        return False
+
+    event = {
+        "ts": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "type": event_type,
+        "job_id": job_id or _current_job_id.get(),
+    }
+    event.update((field, value) for field, value in fields.items() if value is not None)
+
+    try:
+        event_log_writer.submit_text(json.dumps(event, separators=(',', ':'), default=str) + "\n")
+        return True
+    except Exception as e:
+        logger.error(f"Failed to emit {event_type} event for job {event['job_id']}: {str(e)}")
+        return False
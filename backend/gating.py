@@ -13,6 +13,8 @@ import os
 from typing import Dict, Any, Optional
 from fastapi import Request
 from logger import setup_logger
+from events import emit_event
+from metrics import GATING_DECISIONS
 
 logger = setup_logger("gating")
 
@@ -149,4 +151,6 @@ def log_gating_event(
     reason_str = reason if reason else "N/A"
     logger.info(
         f"GATING_DECISION: job_id={job_id} user_type={user_type} results_gated={results_gated} reason='{reason_str}'"
-    )
\ No newline at end of file
+    )
+    emit_event("gating_decision", job_id, user_type=user_type, results_gated=results_gated, reason=reason)
+    GATING_DECISIONS.inc(user_type=user_type, gated=results_gated)
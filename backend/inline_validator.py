@@ -7,10 +7,13 @@ It handles batching, result organization, orphan detection, and ambiguous matche
 Key functions:
 - validate_inline_citations: Main entry point for inline validation
 - _validate_batch: Validate a single batch of citations
+- _run_batches: Run batches concurrently with bounded concurrency
 - _organize_by_reference: Group results by reference index
 - _extract_orphans: Extract citations with no matching reference
 """
+import asyncio
 import json
+import os
 import re
 from typing import List, Dict, Any
 from logger import setup_logger
@@ -21,6 +24,23 @@ logger = setup_logger("inline_validator")
 # Constants
 BATCH_SIZE = 10  # Citations per LLM call
 MAX_CITATIONS = 100  # Hard limit - reject documents with more
+MAX_CONCURRENT_BATCHES_PER_JOB = int(os.getenv("INLINE_MAX_CONCURRENT_BATCHES", "10"))
+GLOBAL_MAX_CONCURRENT_BATCHES = int(os.getenv("INLINE_GLOBAL_MAX_CONCURRENT_BATCHES", "32"))
+
+# Process-wide cap on in-flight batch LLM calls, shared by all jobs.
+# Created lazily because a semaphore is bound to the event loop that first uses it.
+_global_batch_semaphore = None
+_global_batch_semaphore_loop = None
+
+
+def _get_global_batch_semaphore() -> asyncio.Semaphore:
+    """Return the process-wide batch semaphore for the running event loop."""
+    global _global_batch_semaphore, _global_batch_semaphore_loop
+    loop = asyncio.get_running_loop()
+    if _global_batch_semaphore is None or _global_batch_semaphore_loop is not loop:
+        _global_batch_semaphore = asyncio.Semaphore(max(1, GLOBAL_MAX_CONCURRENT_BATCHES))
+        _global_batch_semaphore_loop = loop
+    return _global_batch_semaphore
 
 
 async def validate_inline_citations(
@@ -65,8 +85,7 @@ async def validate_inline_citations(
 
     logger.info(f"Starting inline validation: {total_inline} citations against {len(reference_list)} references (style={style})")
 
-    # Process citations in batches sequentially (parallel deferred to v1.1)
-    all_results = []
+    # Process citations in batches concurrently; results keep document order
     batches = [
         inline_citations[i:i + BATCH_SIZE]
         for i in range(0, len(inline_citations), BATCH_SIZE)
@@ -74,10 +93,7 @@ async def validate_inline_citations(
 
     logger.info(f"Processing {len(batches)} batches of up to {BATCH_SIZE} citations each")
 
-    for batch_idx, batch in enumerate(batches, start=1):
-        logger.debug(f"Processing batch {batch_idx}/{len(batches)} ({len(batch)} citations)")
-        batch_results = await _validate_batch(batch, reference_list, style, provider)
-        all_results.extend(batch_results)
+    all_results = await _run_batches(batches, reference_list, style, provider)
 
     # Organize results by reference
     results_by_ref = _organize_by_reference(all_results, reference_list)
@@ -97,6 +113,76 @@ async def validate_inline_citations(
     return result
 
 
+async def _run_batches(
+    batches: List[List[Dict]],
+    reference_list: List[Dict],
+    style: StyleType,
+    provider
+) -> List[Dict]:
+    """
+    Validate batches concurrently and return their results in batch order.
+
+    Concurrency is bounded by a per-job semaphore (MAX_CONCURRENT_BATCHES_PER_JOB)
+    and by the process-wide cap (GLOBAL_MAX_CONCURRENT_BATCHES). A failing batch
+    yields placeholder results and does not affect the other batches.
+
+    Args:
+        batches: List of citation batches
+        reference_list: List of {index, text} reference entries
+        style: Citation style
+        provider: LLM provider instance
+
+    Returns:
+        Flat list of validation result dicts, ordered as the input batches
+    """
+    job_semaphore = asyncio.Semaphore(max(1, MAX_CONCURRENT_BATCHES_PER_JOB))
+    global_semaphore = _get_global_batch_semaphore()
+
+    async def run_one(batch_idx: int, batch: List[Dict]) -> List[Dict]:
+        async with job_semaphore, global_semaphore:
+            logger.debug(f"Processing batch {batch_idx}/{len(batches)} ({len(batch)} citations)")
+            return await _validate_batch(batch, reference_list, style, provider)
+
+    batch_outcomes = await asyncio.gather(
+        *(run_one(batch_idx, batch) for batch_idx, batch in enumerate(batches, start=1)),
+        return_exceptions=True
+    )
+
+    all_results = []
+    for batch, outcome in zip(batches, batch_outcomes):
+        if isinstance(outcome, BaseException):
+            if isinstance(outcome, asyncio.CancelledError):
+                raise outcome
+            logger.error(f"Inline batch failed unexpectedly: {str(outcome)}")
+            outcome = _error_results(batch, f"Validation error: {str(outcome)}")
+        all_results.extend(outcome)
+
+    return all_results
+
+
+def _error_results(batch: List[Dict], reason: str) -> List[Dict]:
+    """
+    Build placeholder results for a batch that could not be validated.
+
+    Args:
+        batch: List of {id, text} citation dicts
+        reason: Mismatch reason to report for each citation
+
+    Returns:
+        List of not_found result dicts, one per citation
+    """
+    return [{
+        "id": citation["id"],
+        "citation_text": citation["text"],
+        "match_status": "not_found",
+        "matched_ref_index": None,
+        "matched_ref_indices": None,
+        "mismatch_reason": reason,
+        "format_errors": [],
+        "suggested_correction": None
+    } for citation in batch]
+
+
 async def _validate_batch(
     batch: List[Dict],
     reference_list: List[Dict],
@@ -148,16 +234,7 @@ async def _validate_batch(
         logger.error(f"Failed to validate inline batch: {str(e)}", exc_info=True)
 
         # Return placeholder results on failure
-        return [{
-            "id": citation["id"],
-            "citation_text": citation["text"],
-            "match_status": "not_found",
-            "matched_ref_index": None,
-            "matched_ref_indices": None,
-            "mismatch_reason": f"Validation error: {str(e)}",
-            "format_errors": [],
-            "suggested_correction": None
-        } for citation in batch]
+        return _error_results(batch, f"Validation error: {str(e)}")
 
 
 async def _call_llm(prompt: str, provider) -> str:
@@ -249,16 +326,7 @@ def _parse_inline_response(response: str, batch: List[Dict]) -> List[Dict]:
         logger.debug(f"Response text: {response[:500]}...")
 
         # Return placeholder results on parse error
-        return [{
-            "id": citation["id"],
-            "citation_text": citation["text"],
-            "match_status": "not_found",
-            "matched_ref_index": None,
-            "matched_ref_indices": None,
-            "mismatch_reason": f"Parse error: Could not interpret LLM response",
-            "format_errors": [],
-            "suggested_correction": None
-        } for citation in batch]
+        return _error_results(batch, "Parse error: Could not interpret LLM response")
 
 
 def _format_reference_list(reference_list: List[Dict]) -> str:
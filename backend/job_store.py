@@ -0,0 +1,543 @@
+"""
+Job storage for async validation jobs.
+
+Jobs used to live in a module-level dict in app.py, which tied every job to a
+single uvicorn worker and lost in-flight jobs on deploy. JobStore is the
+interface app.py talks to; SQLiteJobStore (WAL) is the default backend and lets
+several worker processes share jobs. InMemoryJobStore keeps the old
+single-process behaviour and is the reference for other backends (e.g. Redis).
+
+A store is a read-only Mapping of job_id -> job dict, so lookups read like the
+old dict (`job_id in jobs`, `jobs[job_id]`). Writes go through create(),
+update() and transition() so each change is a single atomic operation.
+
+Results that arrive while a job runs are stored apart from the job dict
+(add_partial_results()), so streaming them neither rewrites nor re-reads the
+whole job; get_state() is a cheap version check for pollers. Async code uses
+the a* methods (aget(), aupdate(), ...), which run the store on a worker
+thread so SQLite lock waits and JSON decoding stay off the event loop.
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import abstractmethod
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from metrics import count_sqlite_error
+
+# Use the same logger name as app.py to ensure logs go to the same file/format
+logger = logging.getLogger("citation_validator")
+
+# Jobs older than this are removed by delete_expired()
+DEFAULT_JOB_TTL_SECONDS = 30 * 60
+
+# A pending/processing job nothing has written for this long lost its worker
+# (deploy, crash); fail_stale() fails it. Provider calls time out well before.
+DEFAULT_JOB_STALE_SECONDS = 10 * 60
+
+
+def get_jobs_db_path() -> str:
+    """Get job store database path, using override if set."""
+    override = os.getenv('JOBS_DB_PATH')
+    if override:
+        return override
+
+    return os.path.join(os.path.dirname(__file__), 'jobs.db')
+
+
+class JobStore(Mapping):
+    """
+    Interface for async job storage.
+
+    Implementations must make update() and transition() atomic with respect to
+    other processes sharing the same backend.
+    """
+
+    @abstractmethod
+    def create(self, job_id: str, job: Dict[str, Any]) -> None:
+        """Insert a new job. job must include "status" and "created_at"."""
+
+    @abstractmethod
+    def get(self, job_id: str, default: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Return a copy of the job dict, or default if it doesn't exist."""
+
+    @abstractmethod
+    def update(self, job_id: str, **fields: Any) -> bool:
+        """Merge fields into the job. Returns False if the job doesn't exist."""
+
+    @abstractmethod
+    def transition(self, job_id: str, from_statuses: Iterable[str], to_status: str, **fields: Any) -> bool:
+        """
+        Atomically move a job to to_status if its current status is in from_statuses.
+
+        Extra fields are written in the same operation. Returns False if the job
+        doesn't exist or is in another status (e.g. claimed by another worker).
+        """
+
+    @abstractmethod
+    def delete(self, job_id: str) -> bool:
+        """Delete a job. Returns False if it didn't exist."""
+
+    @abstractmethod
+    def delete_expired(self, ttl_seconds: float = DEFAULT_JOB_TTL_SECONDS) -> list:
+        """Delete jobs created more than ttl_seconds ago and return their ids."""
+
+    @abstractmethod
+    def fail_stale(self, stale_seconds: float, error: str) -> list:
+        """
+        Fail pending/processing jobs not written for stale_seconds and return their ids.
+
+        Their worker died, so nothing else will ever finish them; clients
+        polling the job see the failure (and error) instead of waiting for
+        delete_expired().
+        """
+
+    @abstractmethod
+    def add_partial_results(self, job_id: str, results: List[Dict[str, Any]]) -> bool:
+        """
+        Store results of a running job, keyed by citation_number.
+
+        A re-delivered citation_number (e.g. after provider fallback) replaces
+        the earlier result. get() returns them as job["partial_results"],
+        ordered by citation_number. Returns False if the job doesn't exist.
+        """
+
+    @abstractmethod
+    def get_partial_results(self, job_id: str, after: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Partial results stored since cursor `after`, in the order they were stored.
+
+        Returns the results and the cursor to pass next time (0 reads all).
+        """
+
+    @abstractmethod
+    def get_state(self, job_id: str) -> Optional[Tuple[str, int]]:
+        """(status, version) of a job, or None; version changes on every write to the job."""
+
+    def __getitem__(self, job_id: str) -> Dict[str, Any]:
+        job = self.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        return job
+
+    # Async facade for handlers and background jobs
+
+    async def aget(self, job_id: str, default: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.get, job_id, default)
+
+    async def acreate(self, job_id: str, job: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self.create, job_id, job)
+
+    async def aupdate(self, job_id: str, **fields: Any) -> bool:
+        return await asyncio.to_thread(self.update, job_id, **fields)
+
+    async def atransition(self, job_id: str, from_statuses: Iterable[str], to_status: str, **fields: Any) -> bool:
+        return await asyncio.to_thread(self.transition, job_id, from_statuses, to_status, **fields)
+
+    async def adelete_expired(self, ttl_seconds: float = DEFAULT_JOB_TTL_SECONDS) -> list:
+        return await asyncio.to_thread(self.delete_expired, ttl_seconds)
+
+    async def afail_stale(self, stale_seconds: float, error: str) -> list:
+        return await asyncio.to_thread(self.fail_stale, stale_seconds, error)
+
+    async def avalues(self) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(lambda: list(self.values()))
+
+    async def aitems(self) -> List[Tuple[str, Dict[str, Any]]]:
+        return await asyncio.to_thread(lambda: list(self.items()))
+
+    async def aadd_partial_results(self, job_id: str, results: List[Dict[str, Any]]) -> bool:
+        return await asyncio.to_thread(self.add_partial_results, job_id, results)
+
+    async def aget_partial_results(self, job_id: str, after: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        return await asyncio.to_thread(self.get_partial_results, job_id, after)
+
+    async def aget_state(self, job_id: str) -> Optional[Tuple[str, int]]:
+        return await asyncio.to_thread(self.get_state, job_id)
+
+
+class InMemoryJobStore(JobStore):
+    """Process-local job store (single worker only, lost on restart)."""
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        # job_id -> citation_number -> (cursor, result); job_id -> version, last write time
+        self._partial: Dict[str, Dict[int, Tuple[int, Dict[str, Any]]]] = {}
+        self._versions: Dict[str, int] = {}
+        self._updated: Dict[str, float] = {}
+        self._cursor = 0
+        self._lock = threading.Lock()
+
+    def create(self, job_id: str, job: Dict[str, Any]) -> None:
+        job = dict(job)
+        partial_results = job.pop("partial_results", None)
+        with self._lock:
+            self._jobs[job_id] = job
+            self._partial[job_id] = {}
+            self._versions[job_id] = 0
+            self._updated[job_id] = time.time()
+            if partial_results:
+                self._store_partial(job_id, partial_results)
+
+    def get(self, job_id: str, default: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return default
+            job = dict(job)
+            partial = self._partial[job_id]
+            if partial:
+                job["partial_results"] = [partial[n][1] for n in sorted(partial)]
+            return job
+
+    def update(self, job_id: str, **fields: Any) -> bool:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return False
+            self._write(job_id, job, fields)
+            return True
+
+    def transition(self, job_id: str, from_statuses: Iterable[str], to_status: str, **fields: Any) -> bool:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.get("status") not in set(from_statuses):
+                return False
+            self._write(job_id, job, {**fields, "status": to_status})
+            return True
+
+    def _write(self, job_id: str, job: Dict[str, Any], fields: Dict[str, Any]) -> None:
+        if "partial_results" in fields:
+            fields = dict(fields)
+            self._partial[job_id] = {}
+            self._store_partial(job_id, fields.pop("partial_results") or [])
+        job.update(fields)
+        self._versions[job_id] += 1
+        self._updated[job_id] = time.time()
+
+    def _store_partial(self, job_id: str, results: List[Dict[str, Any]]) -> None:
+        partial = self._partial[job_id]
+        for result in results:
+            self._cursor += 1
+            partial[result.get("citation_number", 0)] = (self._cursor, result)
+
+    def add_partial_results(self, job_id: str, results: List[Dict[str, Any]]) -> bool:
+        with self._lock:
+            if job_id not in self._jobs:
+                return False
+            self._store_partial(job_id, results)
+            self._versions[job_id] += 1
+            self._updated[job_id] = time.time()
+            return True
+
+    def get_partial_results(self, job_id: str, after: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        with self._lock:
+            stored = sorted(entry for entry in self._partial.get(job_id, {}).values() if entry[0] > after)
+        return [result for _, result in stored], (stored[-1][0] if stored else after)
+
+    def get_state(self, job_id: str) -> Optional[Tuple[str, int]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return (job["status"], self._versions[job_id]) if job is not None else None
+
+    def delete(self, job_id: str) -> bool:
+        with self._lock:
+            self._partial.pop(job_id, None)
+            self._versions.pop(job_id, None)
+            self._updated.pop(job_id, None)
+            return self._jobs.pop(job_id, None) is not None
+
+    def delete_expired(self, ttl_seconds: float = DEFAULT_JOB_TTL_SECONDS) -> list:
+        threshold = time.time() - ttl_seconds
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items() if job["created_at"] < threshold]
+            for job_id in expired:
+                del self._jobs[job_id]
+                del self._partial[job_id]
+                del self._versions[job_id]
+                del self._updated[job_id]
+        return expired
+
+    def fail_stale(self, stale_seconds: float, error: str) -> list:
+        threshold = time.time() - stale_seconds
+        with self._lock:
+            stale = [
+                job_id for job_id, job in self._jobs.items()
+                if job["status"] in ("pending", "processing") and self._updated[job_id] < threshold
+            ]
+            for job_id in stale:
+                self._write(job_id, self._jobs[job_id], {"status": "failed", "error": error})
+        return stale
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            return iter(list(self._jobs))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._jobs)
+
+    def __contains__(self, job_id: object) -> bool:
+        with self._lock:
+            return job_id in self._jobs
+
+
+class SQLiteJobStore(JobStore):
+    """
+    Job store backed by a SQLite database in WAL mode.
+
+    The job dict is stored as JSON; status and created_at are mirrored into
+    indexed columns for atomic transitions and TTL expiry, and version counts
+    writes for get_state(). Partial results are rows of job_results, one per
+    citation, whose AUTOINCREMENT seq is the get_partial_results() cursor.
+    Connections are kept per thread since FastAPI runs sync endpoints (and
+    the async facade) on a thread pool.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or get_jobs_db_path()
+        self._local = threading.local()
+
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir, exist_ok=True)
+
+        conn = self._conn()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                data TEXT NOT NULL,
+                version INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+        if "version" not in columns:
+            conn.execute("ALTER TABLE jobs ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs(created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_updated_at ON jobs(status, updated_at)")
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS job_results (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL,
+                citation_number INTEGER NOT NULL,
+                data TEXT NOT NULL,
+                UNIQUE (job_id, citation_number)
+            )
+        ''')
+        logger.info(f"Job store initialized at: {self.db_path}")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode; multi-statement writes use explicit BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.db_path, timeout=10.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+        return conn
+
+    def _begin_immediate(self) -> sqlite3.Connection:
+        """Take the write lock; a lock wait that times out is counted as busy."""
+        conn = self._conn()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError as e:
+            count_sqlite_error(e, "jobs")
+            raise
+        return conn
+
+    @staticmethod
+    def _insert_partial(conn: sqlite3.Connection, job_id: str, results: List[Dict[str, Any]]) -> None:
+        conn.executemany(
+            "INSERT OR REPLACE INTO job_results (job_id, citation_number, data) VALUES (?, ?, ?)",
+            [(job_id, result.get("citation_number", 0), json.dumps(result)) for result in results]
+        )
+
+    def create(self, job_id: str, job: Dict[str, Any]) -> None:
+        now = time.time()
+        job = dict(job)
+        partial_results = job.pop("partial_results", None)
+        conn = self._begin_immediate()
+        try:
+            conn.execute("DELETE FROM job_results WHERE job_id = ?", (job_id,))
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, status, created_at, updated_at, data) VALUES (?, ?, ?, ?, ?)",
+                (job_id, job["status"], job.get("created_at", now), now, json.dumps(job))
+            )
+            if partial_results:
+                self._insert_partial(conn, job_id, partial_results)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get(self, job_id: str, default: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        conn = self._conn()
+        row = conn.execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if not row:
+            return default
+        job = json.loads(row[0])
+        partial = conn.execute(
+            "SELECT data FROM job_results WHERE job_id = ? ORDER BY citation_number", (job_id,)
+        ).fetchall()
+        if partial:
+            job["partial_results"] = [json.loads(data) for data, in partial]
+        return job
+
+    def _merge(self, job_id: str, fields: Dict[str, Any], from_statuses: Optional[set] = None) -> bool:
+        fields = dict(fields)
+        replace_partial = "partial_results" in fields
+        partial_results = fields.pop("partial_results", None)
+        conn = self._begin_immediate()
+        try:
+            row = conn.execute("SELECT status, data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None or (from_statuses is not None and row[0] not in from_statuses):
+                conn.execute("ROLLBACK")
+                return False
+
+            job = json.loads(row[1])
+            job.update(fields)
+            conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ?, data = ?, version = version + 1 WHERE job_id = ?",
+                (job["status"], time.time(), json.dumps(job), job_id)
+            )
+            if replace_partial:
+                conn.execute("DELETE FROM job_results WHERE job_id = ?", (job_id,))
+                self._insert_partial(conn, job_id, partial_results or [])
+            conn.execute("COMMIT")
+            return True
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def update(self, job_id: str, **fields: Any) -> bool:
+        return self._merge(job_id, fields)
+
+    def transition(self, job_id: str, from_statuses: Iterable[str], to_status: str, **fields: Any) -> bool:
+        fields["status"] = to_status
+        return self._merge(job_id, fields, from_statuses=set(from_statuses))
+
+    def add_partial_results(self, job_id: str, results: List[Dict[str, Any]]) -> bool:
+        conn = self._begin_immediate()
+        try:
+            cursor = conn.execute(
+                "UPDATE jobs SET updated_at = ?, version = version + 1 WHERE job_id = ?", (time.time(), job_id)
+            )
+            if cursor.rowcount == 0:
+                conn.execute("ROLLBACK")
+                return False
+            self._insert_partial(conn, job_id, results)
+            conn.execute("COMMIT")
+            return True
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get_partial_results(self, job_id: str, after: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        rows = self._conn().execute(
+            "SELECT seq, data FROM job_results WHERE job_id = ? AND seq > ? ORDER BY seq", (job_id, after)
+        ).fetchall()
+        return [json.loads(data) for _, data in rows], (rows[-1][0] if rows else after)
+
+    def get_state(self, job_id: str) -> Optional[Tuple[str, int]]:
+        row = self._conn().execute("SELECT status, version FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def delete(self, job_id: str) -> bool:
+        conn = self._begin_immediate()
+        try:
+            conn.execute("DELETE FROM job_results WHERE job_id = ?", (job_id,))
+            cursor = conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return cursor.rowcount > 0
+
+    def delete_expired(self, ttl_seconds: float = DEFAULT_JOB_TTL_SECONDS) -> list:
+        threshold = time.time() - ttl_seconds
+        conn = self._begin_immediate()
+        try:
+            expired = [row[0] for row in conn.execute(
+                "SELECT job_id FROM jobs WHERE created_at < ?", (threshold,)
+            )]
+            conn.execute(
+                "DELETE FROM job_results WHERE job_id IN (SELECT job_id FROM jobs WHERE created_at < ?)", (threshold,)
+            )
+            conn.execute("DELETE FROM jobs WHERE created_at < ?", (threshold,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return expired
+
+    def fail_stale(self, stale_seconds: float, error: str) -> list:
+        threshold = time.time() - stale_seconds
+        conn = self._begin_immediate()
+        try:
+            rows = conn.execute(
+                "SELECT job_id, data FROM jobs WHERE status IN ('pending', 'processing') AND updated_at < ?",
+                (threshold,)
+            ).fetchall()
+            now = time.time()
+            for job_id, data in rows:
+                job = json.loads(data)
+                job.update(status="failed", error=error)
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', updated_at = ?, data = ?, version = version + 1 WHERE job_id = ?",
+                    (now, json.dumps(job), job_id)
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return [job_id for job_id, _ in rows]
+
+    def items(self):
+        """Return (job_id, job) pairs in one query per table."""
+        conn = self._conn()
+        jobs = {job_id: json.loads(data) for job_id, data in conn.execute("SELECT job_id, data FROM jobs")}
+        for job_id, data in conn.execute("SELECT job_id, data FROM job_results ORDER BY job_id, citation_number"):
+            if job_id in jobs:
+                jobs[job_id].setdefault("partial_results", []).append(json.loads(data))
+        return list(jobs.items())
+
+    def values(self):
+        """Return all job dicts in one query per table."""
+        return [job for _, job in self.items()]
+
+    def __iter__(self) -> Iterator[str]:
+        rows = self._conn().execute("SELECT job_id FROM jobs").fetchall()
+        return iter([row[0] for row in rows])
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+    def __contains__(self, job_id: object) -> bool:
+        row = self._conn().execute("SELECT 1 FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return row is not None
+
+
+def create_job_store() -> JobStore:
+    """
+    Create the job store selected by the JOB_STORE env var.
+
+    JOB_STORE=sqlite (default) uses SQLiteJobStore at get_jobs_db_path();
+    JOB_STORE=memory uses InMemoryJobStore.
+    """
+    backend = os.getenv('JOB_STORE', 'sqlite').lower()
+    if backend == 'memory':
+        logger.info("Using in-memory job store")
+        return InMemoryJobStore()
+    if backend != 'sqlite':
+        raise ValueError(f"Unknown JOB_STORE backend: {backend}")
+    return SQLiteJobStore()
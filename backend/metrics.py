@@ -0,0 +1,280 @@
+"""
+In-process metrics registry served in the Prometheus text format at /metrics.
+
+Counters, gauges and histograms with a fixed set of label names:
+
+    JOBS_FINISHED.inc(status="completed")
+    LLM_TOKENS.inc(120, provider="gemini", model="gemini-2.5-flash", kind="prompt")
+
+Values that already live elsewhere (the job store size, the connection pool
+counters, the stage latency histograms of timing.py) are read at scrape time
+through set_function() rather than mirrored. Like STAGE_LATENCY, the values
+are per worker process; Prometheus sums them across the scraped workers.
+"""
+import math
+import threading
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from timing import STAGE_LATENCY, STAGE_LATENCY_BUCKETS, LatencyHistogram
+
+LabelValues = Tuple[str, ...]
+
+# Exposition format version served by /metrics
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _label_value(value: Any) -> str:
+    # Booleans as true/false, like Prometheus' own labels
+    return str(value).lower() if isinstance(value, bool) else str(value)
+
+
+class Metric:
+    """A named metric with one value per combination of label values."""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values: Dict[LabelValues, Any] = {}
+        self._function = None
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} takes labels {self.label_names}, got {tuple(labels)}")
+        return tuple(_label_value(labels[name]) for name in self.label_names)
+
+    def set_function(self, function: Callable[[], Any]) -> None:
+        """
+        Read the values from function() at scrape time instead.
+
+        function returns the value of an unlabelled metric, or a dict of
+        label values tuple -> value.
+        """
+        self._function = function
+
+    def samples(self) -> Dict[LabelValues, Any]:
+        """Current values by label values."""
+        if self._function is not None:
+            values = self._function()
+            return values if isinstance(values, dict) else {(): values}
+        with self._lock:
+            return dict(self._values)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(Metric):
+    """Monotonically increasing count, e.g. requests or tokens."""
+
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        if amount < 0:
+            raise ValueError(f"Counter {self.name} can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """Value that goes up and down, e.g. jobs in flight."""
+
+    type = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    """Distribution of observations (seconds) in cumulative buckets."""
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = STAGE_LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            histogram = self._values.get(key)
+            if histogram is None:
+                histogram = self._values[key] = LatencyHistogram(self.buckets)
+            histogram.observe(value)
+
+    def samples(self) -> Dict[LabelValues, LatencyHistogram]:
+        if self._function is not None:
+            return super().samples()
+        # Copies, so a scrape never sees a histogram half way through observe()
+        with self._lock:
+            copies = {}
+            for key, histogram in self._values.items():
+                copies[key] = LatencyHistogram(histogram.buckets)
+                copies[key].merge(histogram)
+            return copies
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, bool):
+        return str(int(value))
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class MetricsRegistry:
+    """The metrics of this process, in registration order."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = STAGE_LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def get(self, name: str) -> Metric:
+        return self._metrics[name]
+
+    def exposition(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines: List[str] = []
+        for metric in metrics:
+            help_text = metric.documentation.replace("\\", "\\\\").replace("\n", "\\n")
+            lines.append(f"# HELP {metric.name} {help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for values, value in sorted(metric.samples().items()):
+                if metric.type != "histogram":
+                    lines.append(f"{metric.name}{_format_labels(metric.label_names, values)} {_format_value(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(value.buckets + (math.inf,), value.counts):
+                    cumulative += count
+                    labels = _format_labels(metric.label_names + ("le",), values + (_format_value(bound),))
+                    lines.append(f"{metric.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(metric.label_names, values)
+                lines.append(f"{metric.name}_sum{labels} {_format_value(round(value.sum, 6))}")
+                lines.append(f"{metric.name}_count{labels} {value.count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """Zero every metric that isn't read through a function (tests)."""
+        for metric in list(self._metrics.values()):
+            metric.reset()
+
+
+REGISTRY = MetricsRegistry()
+
+# HTTP
+HTTP_REQUESTS = REGISTRY.counter(
+    "citations_http_requests_total", "HTTP requests by method, route and status code", ("method", "route", "status"))
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "citations_http_request_duration_seconds", "HTTP request latency by method and route", ("method", "route"))
+
+# Validation jobs
+JOBS_CREATED = REGISTRY.counter(
+    "citations_jobs_created_total", "Async validation jobs created, by user type", ("user_type",))
+JOBS_FINISHED = REGISTRY.counter(
+    "citations_jobs_finished_total", "Validation jobs this worker ran to the end, by final status", ("status",))
+JOBS_IN_FLIGHT = REGISTRY.gauge(
+    "citations_jobs_in_flight", "Validation jobs being processed by this worker")
+JOB_STORE_SIZE = REGISTRY.gauge(
+    "citations_job_store_size", "Jobs in the job store (not yet expired)")
+JOB_STAGE_SECONDS = REGISTRY.histogram(
+    "citations_job_stage_seconds", "Validation job latency by stage, provider and style",
+    ("stage", "provider", "style"))
+JOB_STAGE_SECONDS.set_function(STAGE_LATENCY.histograms)
+
+# LLM providers
+LLM_CALLS = REGISTRY.counter(
+    "citations_llm_calls_total",
+    "LLM validation calls by provider, outcome (success, error) and whether the provider is a fallback",
+    ("provider", "outcome", "fallback"))
+LLM_TOKENS = REGISTRY.counter(
+    "citations_llm_tokens_total", "LLM tokens used, by provider, model and kind (prompt, completion)",
+    ("provider", "model", "kind"))
+
+# Gating
+GATING_DECISIONS = REGISTRY.counter(
+    "citations_gating_decisions_total", "Gating decisions by user type and whether results were gated",
+    ("user_type", "gated"))
+
+# SQLite
+SQLITE_ERRORS = REGISTRY.counter(
+    "citations_sqlite_errors_total", "SQLite errors by database and kind (busy: lock wait timed out)",
+    ("database", "kind"))
+DB_POOL_EVENTS = REGISTRY.counter(
+    "citations_db_pool_events_total", "Credits database connection pool events (checkouts, reconnects, ...)",
+    ("event",))
+DB_POOL_CONNECTIONS = REGISTRY.gauge(
+    "citations_db_pool_connections_open", "Open pooled credits database connections")
+ENTITLEMENT_CACHE_EVENTS = REGISTRY.counter(
+    "citations_entitlement_cache_events_total",
+    "Token entitlement cache events (hits, misses, invalidations: one token, flushes: whole cache)",
+    ("event",))
+
+# Citation log (citation_logger.CitationLogWriter)
+CITATION_LOG_BACKLOG = REGISTRY.gauge(
+    "citations_citation_log_backlog", "Citation log blocks waiting for the background writer")
+CITATION_LOG_BLOCKS = REGISTRY.counter(
+    "citations_citation_log_blocks_total",
+    "Citation log blocks by outcome (written, dropped: backlog full, failed: write error or low disk)",
+    ("outcome",))
+
+
+def count_sqlite_error(error: Exception, database: str) -> None:
+    """Count a SQLite error, as busy if it is a lock wait that timed out."""
+    message = str(error).lower()
+    kind = "busy" if "locked" in message or "busy" in message else "other"
+    SQLITE_ERRORS.inc(database=database, kind=kind)
+
+
+def count_tokens(provider: str, model: str, prompt: Any, completion: Any) -> None:
+    """Count one LLM response's token usage; values that aren't numbers are skipped."""
+    for kind, tokens in (("prompt", prompt), ("completion", completion)):
+        if isinstance(tokens, (int, float)) and tokens > 0:
+            LLM_TOKENS.inc(tokens, provider=provider, model=model, kind=kind)
@@ -4,12 +4,24 @@ Loads validation prompts and formats citations for LLM input.
 """
 import os
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 from logger import setup_logger
 from styles import StyleType, DEFAULT_STYLE, get_style_config
 
 logger = setup_logger("prompt_manager")
 
+# Rough output-size model used to keep each LLM call well under max_output_tokens.
+# Each CITATION #N block has fixed overhead (headers, source type, error list) and
+# echoes the citation about three times (original, corrections, corrected citation).
+CHARS_PER_TOKEN = 4
+OUTPUT_TOKENS_PER_CITATION = 350
+CHUNK_OUTPUT_TOKEN_BUDGET = int(os.getenv("CHUNK_OUTPUT_TOKEN_BUDGET", "6000"))
+
+
+def estimate_output_tokens(citation: str) -> int:
+    """Estimate how many output tokens the validator spends on one citation."""
+    return OUTPUT_TOKENS_PER_CITATION + 3 * len(citation) // CHARS_PER_TOKEN
+
 
 class PromptManager:
     """Manages loading and formatting of validation prompts."""
@@ -95,35 +107,29 @@ class PromptManager:
         logger.info(f"Loaded inline validation prompt: {prompt_path.name} ({len(prompt)} characters)")
         return prompt
 
-    def format_citations(self, citations_text: str) -> str:
+    def split_citations(self, citations_text: str) -> List[str]:
         """
-        Format citations text for LLM input.
-        Handles various separators (single/double newlines).
+        Split raw citation text into individual citations.
+
+        Citations are separated by blank lines; lines within a citation are
+        joined with spaces. A list without blank lines has one citation per
+        line. This is the same split used to number citations for the LLM, so
+        index i here corresponds to CITATION #(i+1).
 
         Args:
             citations_text: Raw citation text from user
 
         Returns:
-            str: Formatted citations ready to append to prompt
-
-        Raises:
-            ValueError: If citations_text is empty
+            List[str]: Individual citations (empty if there is no text)
         """
-        if not citations_text or not citations_text.strip():
-            logger.error("Empty citations provided")
-            raise ValueError("Citations cannot be empty")
-
-        # Clean up the input - normalize whitespace
-        citations_text = citations_text.strip()
-
-        logger.debug(f"Formatting {len(citations_text)} characters of citation text")
+        if not citations_text:
+            return []
 
         # Split citations by double newline OR single newline
-        # We'll number them for clarity
         lines = citations_text.split('\n')
 
         # Group into citations (either by blank lines or assume each line is a citation)
-        citations = []
+        groups = []
         current_citation = []
 
         for line in lines:
@@ -131,14 +137,78 @@ class PromptManager:
             if not line:
                 # Blank line - end current citation if any
                 if current_citation:
-                    citations.append(' '.join(current_citation))
+                    groups.append(current_citation)
                     current_citation = []
             else:
                 current_citation.append(line)
 
         # Don't forget the last citation
         if current_citation:
-            citations.append(' '.join(current_citation))
+            groups.append(current_citation)
+
+        if len(groups) == 1:
+            # No blank lines: one citation per line
+            return groups[0]
+        return [' '.join(group) for group in groups]
+
+    def chunk_citations(self, citations_text: str, token_budget: int = None) -> List[str]:
+        """
+        Split citations into chunks whose estimated output fits the token budget.
+
+        Chunks keep input order and are returned as blank-line separated text,
+        ready for format_citations. A single oversized citation gets its own chunk.
+
+        Args:
+            citations_text: Raw citation text from user
+            token_budget: Estimated output tokens allowed per chunk
+                          (default: CHUNK_OUTPUT_TOKEN_BUDGET)
+
+        Returns:
+            List[str]: Chunk texts (a single chunk for short lists)
+        """
+        budget = token_budget or CHUNK_OUTPUT_TOKEN_BUDGET
+        chunks = []
+        current = []
+        current_tokens = 0
+
+        for citation in self.split_citations(citations_text):
+            tokens = estimate_output_tokens(citation)
+            if current and current_tokens + tokens > budget:
+                chunks.append(current)
+                current = []
+                current_tokens = 0
+            current.append(citation)
+            current_tokens += tokens
+
+        if current:
+            chunks.append(current)
+
+        if len(chunks) > 1:
+            logger.info(f"Split {sum(len(c) for c in chunks)} citation(s) into {len(chunks)} chunks (budget={budget} tokens)")
+
+        return ['\n\n'.join(chunk) for chunk in chunks]
+
+    def format_citations(self, citations_text: str) -> str:
+        """
+        Format citations text for LLM input.
+        Handles various separators (single/double newlines).
+
+        Args:
+            citations_text: Raw citation text from user
+
+        Returns:
+            str: Formatted citations ready to append to prompt
+
+        Raises:
+            ValueError: If citations_text is empty
+        """
+        if not citations_text or not citations_text.strip():
+            logger.error("Empty citations provided")
+            raise ValueError("Citations cannot be empty")
+
+        logger.debug(f"Formatting {len(citations_text.strip())} characters of citation text")
+
+        citations = self.split_citations(citations_text)
 
         if not citations:
             logger.error("No citations found after parsing")
@@ -1,7 +1,248 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from typing import AsyncIterator, Awaitable, Callable, Dict, Any, List, Optional
+import asyncio
+import os
 import re
 
+from logger import setup_logger
+from styles import StyleType, DEFAULT_STYLE, get_style_config
+
+logger = setup_logger("providers")
+
+# Max chunks of one reference list validated at the same time
+MAX_CONCURRENT_CHUNKS = int(os.getenv("MAX_CONCURRENT_CHUNKS", "8"))
+
+# Callback receiving citation results as soon as they are available
+ResultsCallback = Callable[[List[Dict[str, Any]]], None]
+
+# Response text of one LLM call, as it is generated
+TextStream = AsyncIterator[str]
+
+# CITATION #N at the end of a (stripped) line, optionally after a ═ rule
+_CITATION_HEADER = re.compile(r'CITATION #(\d+)$')
+# ❌ [Component]: [Problem]
+_ERROR_LINE = re.compile(r'❌\s*([^:]+):\s*(.+)')
+# Markdown emphasis, converted in this order by format_markdown_to_html
+_BOLD = re.compile(r'\*\*([^*]+)\*\*')
+_UNDERSCORE_ITALIC = re.compile(r'_([^_]+)_')
+_ASTERISK_ITALIC = re.compile(r'(?<!\*)\*([^*]+)\*(?!\*)')
+
+
+def format_markdown_to_html(text: str) -> str:
+    """
+    Convert markdown formatting (bold/italics) to HTML tags.
+
+    Args:
+        text: Text with markdown formatting (**bold**, _italic_)
+
+    Returns:
+        Text with HTML tags (<strong>bold</strong>, <em>italic</em>)
+    """
+    if not text:
+        return text
+
+    # Bold first, so the single-asterisk italics pattern never sees **
+    text = _BOLD.sub(r'<strong>\1</strong>', text)
+    text = _UNDERSCORE_ITALIC.sub(r'<em>\1</em>', text)
+    return _ASTERISK_ITALIC.sub(r'<em>\1</em>', text)
+
+
+def parse_citation_block(citation_num: int, lines: List[str], style: StyleType = DEFAULT_STYLE) -> Dict[str, Any]:
+    """
+    Parse the lines of one CITATION #N block into a validation result.
+
+    Args:
+        citation_num: Citation number from the block header
+        lines: Lines of the block, after its opening ═ rule
+        style: Citation style for parsing success messages
+
+    Returns:
+        {"citation_number", "original", "source_type", "errors", "corrected_citation"}
+    """
+    result = {
+        "citation_number": citation_num,
+        "original": "",
+        "source_type": "",
+        "errors": [],
+        "corrected_citation": None
+    }
+    success_msg = get_style_config(style)["success_message"]
+
+    current_section = None
+    original_lines = []
+    corrected_lines = []
+
+    for line in lines:
+        line_stripped = line.strip()
+
+        # Track sections
+        if line_stripped.startswith('ORIGINAL:'):
+            current_section = 'original'
+            # Extract content from the same line if present
+            content = line_stripped[len('ORIGINAL:'):].strip()
+            if content:
+                original_lines.append(content)
+        elif line_stripped.startswith('SOURCE TYPE:'):
+            current_section = 'source_type'
+            result["source_type"] = line_stripped[len('SOURCE TYPE:'):].strip()
+        elif line_stripped.startswith('VALIDATION RESULTS:'):
+            current_section = 'validation'
+        elif line_stripped.startswith('CORRECTED CITATION:'):
+            current_section = 'corrected_citation'
+            content = line_stripped[len('CORRECTED CITATION:'):].strip()
+            if content:
+                corrected_lines.append(content)
+
+        # Parse content based on section
+        elif not line_stripped:
+            continue
+        elif current_section == 'original':
+            original_lines.append(line_stripped)
+        elif current_section == 'corrected_citation':
+            # Separator at the end of the corrected citation
+            if line_stripped.startswith('─'):
+                current_section = None
+            else:
+                # Multi-line wrap
+                corrected_lines.append(line_stripped)
+        elif current_section == 'validation':
+            if success_msg in line_stripped:
+                result["errors"] = []
+            elif line_stripped.startswith('❌'):
+                error_match = _ERROR_LINE.match(line_stripped)
+                if error_match:
+                    result["errors"].append({
+                        "component": error_match.group(1).strip(),
+                        "problem": error_match.group(2).strip(),
+                        "correction": ""
+                    })
+            # Correction lines may be indented, so check in line not just at start
+            elif 'Should be:' in line_stripped and result["errors"]:
+                result["errors"][-1]["correction"] = line_stripped.split('Should be:')[1].strip()
+
+    if original_lines:
+        # Convert markdown formatting back to HTML for frontend display
+        result["original"] = format_markdown_to_html(' '.join(original_lines))
+
+    # Keep the corrected citation only if there are errors and it differs from the original
+    if corrected_lines and result["errors"]:
+        cleaned_original = ' '.join(result["original"].split())
+        formatted_corrected = format_markdown_to_html(' '.join(' '.join(corrected_lines).split()))
+        if cleaned_original != formatted_corrected:
+            result["corrected_citation"] = formatted_corrected
+            logger.info(f"Parsed corrected citation for #{citation_num}")
+
+    # Apply same markdown→HTML conversion to error corrections
+    for error in result["errors"]:
+        if error["correction"]:
+            error["correction"] = format_markdown_to_html(error["correction"])
+
+    return result
+
+
+class CitationBlockParser:
+    """
+    Single-pass parser for the CITATION #N response format.
+
+    Feed it the response in any pieces (a whole completion or streamed
+    deltas): feed() returns the results of the blocks completed so far and
+    close() those still open at the end of the response. A block is complete
+    at the ─ rule closing its CORRECTED CITATION, at the next CITATION #N
+    header, or at the end of the response. Every line is looked at once, so
+    parsing time is linear in the response length.
+    """
+
+    def __init__(self, style: StyleType = DEFAULT_STYLE):
+        self.style = style
+        self._partial = ""          # text after the last newline seen
+        self._pending = None        # header number waiting for its ═ rule
+        self._number = None         # number of the open block
+        self._lines: List[str] = []
+        self._in_corrected = False
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """Add response text; returns the results of blocks it completed."""
+        if '\n' not in text:
+            self._partial += text
+            return []
+
+        lines = (self._partial + text).split('\n')
+        self._partial = lines.pop()
+        results: List[Dict[str, Any]] = []
+        for line in lines:
+            self._line(line.strip(), results)
+        return results
+
+    def close(self) -> List[Dict[str, Any]]:
+        """End of the response; returns the results of the blocks still open."""
+        results: List[Dict[str, Any]] = []
+        if self._partial:
+            self._line(self._partial.strip(), results)
+            self._partial = ""
+        self._finish(results)
+        self._pending = None
+        return results
+
+    def _line(self, line: str, results: List[Dict[str, Any]]) -> None:
+        if 'CITATION #' in line:
+            header = _CITATION_HEADER.search(line)
+            if header:
+                self._finish(results)
+                self._pending = int(header.group(1))
+                return
+
+        if self._pending is not None:
+            # A header only opens a block if a ═ rule follows it
+            if line.startswith('═'):
+                self._number, self._pending = self._pending, None
+                rest = line.lstrip('═').strip()
+                if rest:
+                    self._lines.append(rest)
+            elif line:
+                self._pending = None
+            return
+
+        if self._number is None:
+            return
+
+        self._lines.append(line)
+        if line.startswith('CORRECTED CITATION:'):
+            self._in_corrected = True
+        elif self._in_corrected and line.startswith('─'):
+            self._finish(results)
+
+    def _finish(self, results: List[Dict[str, Any]]) -> None:
+        if self._number is None:
+            return
+
+        number, lines = self._number, self._lines
+        self._number, self._lines, self._in_corrected = None, [], False
+        # A trailing ═ rule belongs to the next block's header
+        while lines and (not lines[-1] or lines[-1].startswith('═')):
+            lines.pop()
+
+        try:
+            results.append(parse_citation_block(number, lines, self.style))
+        except Exception as e:
+            block = '\n'.join(lines)
+            logger.warning(f"Failed to parse citation #{number}: {str(e)}")
+            logger.debug(f"Problematic block: {block[:200]}...")
+
+
+def parse_response(response_text: str, style: StyleType = DEFAULT_STYLE) -> List[Dict[str, Any]]:
+    """
+    Parse a complete LLM response into validation results, one per CITATION #N block.
+
+    Args:
+        response_text: Raw text from the LLM
+        style: Citation style for parsing success messages
+
+    Returns:
+        List of validation results, in response order
+    """
+    parser = CitationBlockParser(style)
+    return parser.feed(response_text) + parser.close()
+
 
 class CitationValidator(ABC):
     """
@@ -12,13 +253,20 @@ class CitationValidator(ABC):
     """
 
     @abstractmethod
-    async def validate_citations(self, citations: str, style: str = "apa7") -> Dict[str, Any]:
+    async def validate_citations(
+        self,
+        citations: str,
+        style: str = "apa7",
+        on_results: Optional[ResultsCallback] = None
+    ) -> Dict[str, Any]:
         """
         Validate citations against a style guide.
 
         Args:
             citations: Raw citation text (one or more citations)
             style: Citation style to validate against (default: "apa7")
+            on_results: Optional callback invoked with results (final
+                citation_number) as they become available, before return
 
         Returns:
         return {
@@ -34,24 +282,197 @@ class CitationValidator(ABC):
         """
         pass
 
-    def _format_markdown_to_html(self, text: str) -> str:
+    async def _validate_in_chunks(
+        self,
+        citations: str,
+        style: str,
+        validate_chunk: Callable[[str, str], Awaitable[Dict[str, Any]]],
+        on_results: Optional[ResultsCallback] = None
+    ) -> Dict[str, Any]:
         """
-        Convert markdown formatting (bold/italics) to HTML tags.
-        
+        Validate a reference list as concurrent token-budgeted chunks.
+
+        Uses self.prompt_manager.chunk_citations to split the list, runs
+        validate_chunk on each chunk, then renumbers each chunk's CITATION #N
+        results by the chunk's offset and merges them in input order. Short
+        lists are a single chunk and go straight to validate_chunk. If any chunk
+        fails the error propagates, so provider fallback still applies.
+
         Args:
-            text: Text with markdown formatting (**bold**, _italic_)
-            
+            citations: Raw citation text
+            style: Citation style
+            validate_chunk: Single-call validation coroutine (citations, style)
+            on_results: Optional callback invoked with each chunk's renumbered
+                results as soon as that chunk completes
+
         Returns:
-            Text with HTML tags (<strong>bold</strong>, <em>italic</em>)
-        """
-        if not text:
-            return text
-            
-        # Convert bold (**text**) to HTML <strong>
-        text = re.sub(r'\*\*([^*]+)\*\*', r'<strong>\1</strong>', text)
-        # Convert italics (_text_) to HTML <em>
-        text = re.sub(r'_([^_]+)_', r'<em>\1</em>', text)
-        # Convert italics (*text*) to HTML <em> (handle only single asterisks)
-        text = re.sub(r'(?<!\*)\*([^*]+)\*(?!\*)', r'<em>\1</em>', text)
-        
-        return text
+            {"results": [...]} covering every chunk
+        """
+        chunks = self.prompt_manager.chunk_citations(citations)
+        if len(chunks) <= 1:
+            validation_results = await validate_chunk(citations, style)
+            if on_results:
+                on_results(validation_results["results"])
+            return validation_results
+
+        offsets = []
+        offset = 0
+        for chunk in chunks:
+            offsets.append(offset)
+            offset += len(self.prompt_manager.split_citations(chunk))
+
+        semaphore = asyncio.Semaphore(max(1, MAX_CONCURRENT_CHUNKS))
+
+        async def run_chunk(chunk: str, chunk_offset: int) -> List[Dict[str, Any]]:
+            async with semaphore:
+                chunk_result = await validate_chunk(chunk, style)
+            results = chunk_result["results"]
+            for result in results:
+                result["citation_number"] = result.get("citation_number", 0) + chunk_offset
+            if on_results:
+                on_results(results)
+            return results
+
+        chunk_results = await asyncio.gather(*(
+            run_chunk(chunk, chunk_offset) for chunk, chunk_offset in zip(chunks, offsets)
+        ))
+
+        return {
+            "results": [result for results in chunk_results for result in results]
+        }
+
+    async def stream_citations(
+        self,
+        citations: str,
+        style: str = "apa7"
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Validate citations, yielding each result as soon as it is available.
+
+        Results have the same shape and final citation_number as those of
+        validate_citations, but arrive in completion order. This default
+        yields each chunk's results as validate_citations reports them;
+        providers that can stream their completion override it with
+        _stream_in_chunks, which yields every CITATION #N block as soon as
+        its closing delimiter arrives. Closing the iterator early cancels the
+        outstanding LLM calls.
+
+        Args:
+            citations: Raw citation text
+            style: Citation style to validate against (default: "apa7")
+
+        Yields:
+            One validation result per citation
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        validation = asyncio.ensure_future(self.validate_citations(citations, style, on_results=queue.put_nowait))
+        validation.add_done_callback(lambda _: queue.put_nowait(None))
+        try:
+            while True:
+                results = await queue.get()
+                if results is None:
+                    break
+                for result in results:
+                    yield result
+            await validation
+        finally:
+            validation.cancel()
+
+    async def _stream_in_chunks(
+        self,
+        citations: str,
+        style: str,
+        stream_chunk: Callable[[str, str], TextStream]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming counterpart of _validate_in_chunks.
+
+        Streams each chunk's response text from stream_chunk (citations, style)
+        through a CitationBlockParser and yields every result, renumbered by
+        the chunk's offset, as soon as its block is complete. Chunks run
+        concurrently like in _validate_in_chunks, and a failing chunk fails the
+        stream once the results already parsed have been yielded.
+
+        Args:
+            citations: Raw citation text
+            style: Citation style
+            stream_chunk: Single-call response text stream (citations, style)
+
+        Yields:
+            One validation result per citation
+        """
+        chunks = self.prompt_manager.chunk_citations(citations)
+        if len(chunks) <= 1:
+            results = self._stream_results(citations, style, stream_chunk)
+            try:
+                async for result in results:
+                    yield result
+            finally:
+                await results.aclose()
+            return
+
+        offsets = []
+        offset = 0
+        for chunk in chunks:
+            offsets.append(offset)
+            offset += len(self.prompt_manager.split_citations(chunk))
+
+        semaphore = asyncio.Semaphore(max(1, MAX_CONCURRENT_CHUNKS))
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def run_chunk(chunk: str, chunk_offset: int) -> None:
+            async with semaphore:
+                async for result in self._stream_results(chunk, style, stream_chunk):
+                    result["citation_number"] = result.get("citation_number", 0) + chunk_offset
+                    queue.put_nowait(result)
+
+        def finished(future: asyncio.Future) -> None:
+            if not future.cancelled():
+                future.exception()  # retrieved again below, once the queue is drained
+            queue.put_nowait(None)
+
+        tasks = [asyncio.ensure_future(run_chunk(chunk, chunk_offset))
+                 for chunk, chunk_offset in zip(chunks, offsets)]
+        all_chunks = asyncio.gather(*tasks)
+        all_chunks.add_done_callback(finished)
+        try:
+            while True:
+                result = await queue.get()
+                if result is None:
+                    break
+                yield result
+            await all_chunks
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _stream_results(
+        self,
+        citations: str,
+        style: str,
+        stream_chunk: Callable[[str, str], TextStream]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Parse one call's streamed response text, yielding each block's result when it completes."""
+        parser = CitationBlockParser(style)
+        texts = stream_chunk(citations, style)
+        try:
+            async for text in texts:
+                for result in parser.feed(text):
+                    yield result
+        finally:
+            # Ends the LLM call if the caller stopped reading early
+            await texts.aclose()
+        for result in parser.close():
+            yield result
+
+    def _parse_response(self, response_text: str, style: StyleType = DEFAULT_STYLE) -> List[Dict[str, Any]]:
+        """Parse a complete response into results; see parse_response."""
+        return parse_response(response_text, style)
+
+    def _parse_citation_block(self, citation_num: int, block: str, style: StyleType = DEFAULT_STYLE) -> Dict[str, Any]:
+        """Parse the text of one CITATION #N block; see parse_citation_block."""
+        return parse_citation_block(citation_num, block.split('\n'), style)
+
+    def _format_markdown_to_html(self, text: str) -> str:
+        """Convert markdown bold/italics to HTML; see format_markdown_to_html."""
+        return format_markdown_to_html(text)
@@ -1,13 +1,18 @@
 import os
-import re
 import time
 import asyncio
-from typing import Dict, Any, List, Optional
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Dict, Any, Iterator, Optional
 from dotenv import load_dotenv
-from providers.base import CitationValidator
+from providers.base import CitationValidator, ResultsCallback, TextStream
 from prompt_manager import PromptManager
 from logger import setup_logger
-from styles import StyleType, DEFAULT_STYLE, get_style_config
+from events import emit_event
+from timing import record as record_span
+from metrics import count_tokens
+from styles import StyleType, DEFAULT_STYLE
 
 # Try to import the new Google genai API first, fallback to legacy
 try:
@@ -26,6 +31,10 @@ except ImportError:
 
 logger = setup_logger("gemini_provider")
 
+# Max concurrent Gemini calls per process. The SDK's generate_content is blocking,
+# so calls are bridged onto a bounded thread pool instead of the event loop.
+DEFAULT_MAX_CONCURRENT_CALLS = int(os.getenv("GEMINI_MAX_CONCURRENT_CALLS", "32"))
+
 
 class GeminiProvider(CitationValidator):
     """
@@ -33,7 +42,7 @@ class GeminiProvider(CitationValidator):
     Uses the "User Content" strategy for better accuracy.
     """
 
-    def __init__(self, api_key: str = None, model: str = "gemini-3-flash-preview", temperature: float = 0.0, prompt_path: str = None):
+    def __init__(self, api_key: str = None, model: str = "gemini-3-flash-preview", temperature: float = 0.0, prompt_path: str = None, max_concurrent_calls: int = None):
         """
         Initialize Gemini provider.
 
@@ -42,6 +51,7 @@ class GeminiProvider(CitationValidator):
             model: Model name to use (default: gemini-3-flash-preview)
             temperature: Temperature for generation (default: 0.0)
             prompt_path: Optional path to specific prompt file
+            max_concurrent_calls: Max in-flight API calls (defaults to GEMINI_MAX_CONCURRENT_CALLS env var, 32)
         """
         # Load environment variables
         load_dotenv()
@@ -55,6 +65,14 @@ class GeminiProvider(CitationValidator):
 
         self.prompt_manager = PromptManager(prompt_path=prompt_path)
 
+        # Bounded worker pool for blocking SDK calls - keeps the event loop free while
+        # a 5-60s generation is in flight; excess calls queue until a worker frees up
+        self.max_concurrent_calls = max(1, max_concurrent_calls or DEFAULT_MAX_CONCURRENT_CALLS)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrent_calls,
+            thread_name_prefix="gemini-call"
+        )
+
         # Initialize client based on API availability
         if NEW_API_AVAILABLE and ("2.5" in model or "3" in model):
             self.client = new_genai.Client(api_key=self.api_key)
@@ -69,31 +87,44 @@ class GeminiProvider(CitationValidator):
             self.use_new_api = False
             logger.info(f"Gemini provider initialized with legacy API and model: {model}")
 
-    async def validate_citations(self, citations: str, style: StyleType = DEFAULT_STYLE) -> Dict[str, Any]:
+    async def validate_citations(
+        self,
+        citations: str,
+        style: StyleType = DEFAULT_STYLE,
+        on_results: Optional[ResultsCallback] = None
+    ) -> Dict[str, Any]:
         """
         Validate citations using Gemini API.
 
+        Large reference lists are split into token-budgeted chunks that are
+        validated concurrently and merged back in order.
+
         Args:
             citations: Raw citation text
             style: Citation style (default: apa7)
+            on_results: Optional callback receiving each chunk's results as it completes
 
         Returns:
             Validation results dictionary with structured errors
         """
-        logger.info(f"Starting validation for {len(citations)} characters of citation text (style={style})")
-        logger.debug(f"Citations to validate: {citations[:2000]}...")
+        return await self._validate_in_chunks(citations, style, self._validate_chunk, on_results)
 
-        start_time = time.time()
+    async def _validate_chunk(self, citations: str, style: StyleType = DEFAULT_STYLE) -> Dict[str, Any]:
+        """
+        Validate one chunk of citations with a single Gemini API call.
 
-        # Build prompt components - pass style to load correct prompt
-        prompt_template = self.prompt_manager.load_prompt(style)
-        formatted_citations = self.prompt_manager.format_citations(citations)
+        Args:
+            citations: Raw citation text
+            style: Citation style (default: apa7)
 
-        # Build the full prompt using User Content strategy
-        # According to issue notes, this gives ~79% accuracy vs ~20% for system_instruction
-        full_prompt = f"{prompt_template}\n\n{formatted_citations}"
+        Returns:
+            Validation results dictionary with structured errors
+        """
+        logger.info(f"Starting validation for {len(citations)} characters of citation text (style={style})")
+        logger.debug(f"Citations to validate: {citations[:2000]}...")
 
-        logger.debug(f"Prepared prompt ({len(full_prompt)} chars) in {time.time() - start_time:.3f}s")
+        start_time = time.time()
+        full_prompt = self._build_prompt(citations, style)
 
         # Call Gemini API
         logger.info(f"Calling Gemini API with model: {self.model}")
@@ -106,22 +137,7 @@ class GeminiProvider(CitationValidator):
                 # Log token usage from usage_metadata
                 if (hasattr(response, 'usage_metadata') and
                     response.usage_metadata):
-                    metadata = response.usage_metadata
-                    # Use actual field names from Gemini API response
-                    prompt_tokens = getattr(metadata, 'prompt_token_count', 0)
-                    api_total_tokens = getattr(metadata, 'total_token_count', 0)
-                    # candidates_token_count is the actual output tokens
-                    output_tokens = getattr(metadata, 'candidates_token_count', 0)
-
-                    # Calculate total as prompt + completion for user-facing display
-                    # This ensures transparency since users expect total = prompt + completion
-                    calculated_total = prompt_tokens + output_tokens
-
-                    # Log both the API total and calculated total for debugging
-                    if api_total_tokens != calculated_total:
-                        logger.info(f"Token usage: {prompt_tokens} prompt + {output_tokens} completion = {calculated_total} total (API reports {api_total_tokens}, difference: {api_total_tokens - calculated_total} overhead tokens)")
-                    else:
-                        logger.info(f"Token usage: {prompt_tokens} prompt + {output_tokens} completion = {calculated_total} total")
+                    self._record_usage(response.usage_metadata)
             else:
                 response_text = await self._call_legacy_api(full_prompt)
                 # Legacy API doesn't provide reliable token usage
@@ -157,40 +173,233 @@ class GeminiProvider(CitationValidator):
 
         return results
 
+    async def stream_citations(
+        self,
+        citations: str,
+        style: StyleType = DEFAULT_STYLE
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Validate citations with streamed Gemini responses, yielding each
+        result as soon as its CITATION #N block is complete.
+
+        Args:
+            citations: Raw citation text
+            style: Citation style (default: apa7)
+
+        Yields:
+            Validation results with structured errors, one per citation
+        """
+        results = self._stream_in_chunks(citations, style, self._stream_chunk)
+        try:
+            async for result in results:
+                yield result
+        finally:
+            await results.aclose()
+
+    async def _stream_chunk(self, citations: str, style: StyleType = DEFAULT_STYLE) -> TextStream:
+        """
+        Stream the response text of one chunk's Gemini API call.
+
+        Retryable errors (rate limits, timeouts, overload) are retried as in
+        _call_new_api_with_response, but only until the first text arrives:
+        a retry after that would repeat results the caller already has, so
+        later errors propagate.
+
+        Args:
+            citations: Raw citation text
+            style: Citation style (default: apa7)
+
+        Yields:
+            Response text deltas
+        """
+        logger.info(f"Starting streamed validation for {len(citations)} characters of citation text (style={style})")
+        full_prompt = self._build_prompt(citations, style)
+
+        if self.use_new_api:
+            open_stream = functools.partial(
+                self.client.models.generate_content_stream,
+                model=self.model,
+                contents=full_prompt,
+                config=self._generation_config()
+            )
+        elif legacy_genai:
+            open_stream = functools.partial(
+                legacy_genai.GenerativeModel(self.model).generate_content,
+                full_prompt,
+                generation_config={"temperature": self.temperature, "max_output_tokens": 10000},
+                stream=True
+            )
+        else:
+            raise ImportError("Legacy Google GenerativeAI not available")
+
+        max_retries = 3
+        base_delay = 2
+        api_start = time.time()
+
+        for attempt in range(max_retries):
+            attempt_start = time.perf_counter()
+            streamed = False
+            usage_metadata = None
+            try:
+                async for chunk in self._iterate_blocking(open_stream):
+                    # The last chunk carries the usage of the whole response
+                    usage_metadata = getattr(chunk, 'usage_metadata', None) or usage_metadata
+                    text = chunk.text
+                    if text:
+                        streamed = True
+                        yield text
+                if self.use_new_api and usage_metadata:
+                    self._record_usage(usage_metadata)
+                logger.info(f"Gemini streamed API call completed in {time.time() - api_start:.3f}s")
+                return
+
+            except Exception as e:
+                error_str = str(e).lower()
+
+                if (not streamed and attempt < max_retries - 1 and
+                        any(keyword in error_str for keyword in ['rate limit', 'timeout', 'overloaded', 'try again', 'resource exhausted'])):
+                    delay = base_delay * (2 ** attempt)
+                    logger.warning(f"Gemini streamed API attempt {attempt + 1} failed, retrying in {delay}s: {str(e)[:100]}")
+                    await asyncio.sleep(delay)
+                    record_span("llm_retry", time.perf_counter() - attempt_start)
+                else:
+                    logger.error(f"Gemini streamed API call failed after {time.time() - api_start:.3f}s: {str(e)}")
+                    raise
+
+    async def _iterate_blocking(self, open_iterator: Callable[[], Iterator[Any]]) -> AsyncIterator[Any]:
+        """
+        Iterate a blocking SDK stream on the provider's bounded worker pool.
+
+        open_iterator() and every next() on its result run on a worker
+        thread, which hands the items over to the event loop. If the caller
+        stops early, the worker stops reading after the item in flight.
+
+        Args:
+            open_iterator: Synchronous callable returning the SDK's stream
+
+        Yields:
+            The stream's items; an exception raised by the SDK propagates
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+        end = object()
+
+        def hand_over(item, error=None):
+            if not stop.is_set():
+                loop.call_soon_threadsafe(queue.put_nowait, (item, error))
+
+        def read_stream():
+            try:
+                for item in open_iterator():
+                    if stop.is_set():
+                        return
+                    hand_over(item)
+            except Exception as e:
+                hand_over(end, e)
+            else:
+                hand_over(end)
+
+        loop.run_in_executor(self._executor, read_stream)
+        try:
+            while True:
+                item, error = await queue.get()
+                if item is end:
+                    if error is not None:
+                        raise error
+                    return
+                yield item
+        finally:
+            stop.set()
+
+    def _build_prompt(self, citations: str, style: StyleType = DEFAULT_STYLE) -> str:
+        """Full prompt for validating citations in style."""
+        start_time = time.time()
+
+        # Build prompt components - pass style to load correct prompt
+        prompt_template = self.prompt_manager.load_prompt(style)
+        formatted_citations = self.prompt_manager.format_citations(citations)
+
+        # Build the full prompt using User Content strategy
+        # According to issue notes, this gives ~79% accuracy vs ~20% for system_instruction
+        full_prompt = f"{prompt_template}\n\n{formatted_citations}"
+
+        logger.debug(f"Prepared prompt ({len(full_prompt)} chars) in {time.time() - start_time:.3f}s")
+        return full_prompt
+
+    def _generation_config(self):
+        """GenerateContentConfig for the new API, with the model's thinking budget."""
+        # Gemini 3 Flash: Use low thinking budget for consistency
+        # Testing showed 100% consistency and ~81% accuracy with thinking_budget=1024
+        if "gemini-3-flash" in self.model:
+            return types.GenerateContentConfig(
+                temperature=self.temperature,
+                max_output_tokens=10000,
+                thinking_config=types.ThinkingConfig(thinking_budget=1024)
+            )
+        # Gemini 2.5 Pro: Use minimum thinking budget
+        if self.model == "gemini-2.5-pro":
+            # 2.5-pro requires thinking mode, but we avoid it per requirements
+            # If we must use it, set minimum thinking budget of 128 tokens
+            # This is the smallest allowed value that still enables thinking mode
+            logger.warning(f"Using minimum thinking budget for {self.model}")
+            return types.GenerateContentConfig(
+                temperature=self.temperature,
+                max_output_tokens=10000,
+                thinking_config=types.ThinkingConfig(thinking_budget=128)
+            )
+        # Default config
+        return types.GenerateContentConfig(
+            temperature=self.temperature,
+            max_output_tokens=10000,
+        )
+
+    def _record_usage(self, metadata: Any) -> None:
+        """Log, emit and count the token usage in a response's usage_metadata."""
+        # Use actual field names from Gemini API response
+        prompt_tokens = getattr(metadata, 'prompt_token_count', 0)
+        api_total_tokens = getattr(metadata, 'total_token_count', 0)
+        # candidates_token_count is the actual output tokens
+        output_tokens = getattr(metadata, 'candidates_token_count', 0)
+
+        # Calculate total as prompt + completion for user-facing display
+        # This ensures transparency since users expect total = prompt + completion
+        calculated_total = prompt_tokens + output_tokens
+
+        # Log both the API total and calculated total for debugging
+        if api_total_tokens != calculated_total:
+            logger.info(f"Token usage: {prompt_tokens} prompt + {output_tokens} completion = {calculated_total} total (API reports {api_total_tokens}, difference: {api_total_tokens - calculated_total} overhead tokens)")
+        else:
+            logger.info(f"Token usage: {prompt_tokens} prompt + {output_tokens} completion = {calculated_total} total")
+        emit_event("token_usage", prompt=prompt_tokens, completion=output_tokens, total=calculated_total)
+        count_tokens("gemini", self.model, prompt=prompt_tokens, completion=output_tokens)
+
+    async def _run_blocking(self, func, *args, **kwargs):
+        """
+        Run a blocking SDK call on the provider's bounded worker pool.
+
+        Args:
+            func: Synchronous callable (e.g. client.models.generate_content)
+            *args, **kwargs: Arguments forwarded to func
+
+        Returns:
+            Whatever func returns; exceptions propagate to the awaiting coroutine
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
     async def _call_new_api_with_response(self, prompt: str):
         """Call the new Google genai API and return the full response object."""
         max_retries = 3
         base_delay = 2
 
         for attempt in range(max_retries):
+            attempt_start = time.perf_counter()
             try:
-                # Default config
-                config = types.GenerateContentConfig(
-                    temperature=self.temperature,
-                    max_output_tokens=10000,
-                )
+                config = self._generation_config()
 
-                # Gemini 3 Flash: Use low thinking budget for consistency
-                # Testing showed 100% consistency and ~81% accuracy with thinking_budget=1024
-                if "gemini-3-flash" in self.model:
-                    config = types.GenerateContentConfig(
-                        temperature=self.temperature,
-                        max_output_tokens=10000,
-                        thinking_config=types.ThinkingConfig(thinking_budget=1024)
-                    )
-                # Gemini 2.5 Pro: Use minimum thinking budget
-                elif self.model == "gemini-2.5-pro":
-                    # 2.5-pro requires thinking mode, but we avoid it per requirements
-                    # If we must use it, set minimum thinking budget of 128 tokens
-                    # This is the smallest allowed value that still enables thinking mode
-                    config = types.GenerateContentConfig(
-                        temperature=self.temperature,
-                        max_output_tokens=10000,
-                        thinking_config=types.ThinkingConfig(thinking_budget=128)
-                    )
-                    logger.warning(f"Using minimum thinking budget for {self.model}")
-
-                response = self.client.models.generate_content(
+                response = await self._run_blocking(
+                    self.client.models.generate_content,
                     model=self.model,
                     contents=prompt,
                     config=config
@@ -210,6 +419,8 @@ class GeminiProvider(CitationValidator):
                     delay = base_delay * (2 ** attempt)
                     logger.warning(f"Gemini API attempt {attempt + 1} failed, retrying in {delay}s: {str(e)[:100]}")
                     await asyncio.sleep(delay)
+                    # Failed attempt plus backoff, on the job's latency breakdown
+                    record_span("llm_retry", time.perf_counter() - attempt_start)
                 else:
                     logger.error(f"Non-retryable Gemini API error: {str(e)}")
                     raise
@@ -221,33 +432,10 @@ class GeminiProvider(CitationValidator):
 
         for attempt in range(max_retries):
             try:
-                # Default config
-                config = types.GenerateContentConfig(
-                    temperature=self.temperature,
-                    max_output_tokens=10000,
-                )
+                config = self._generation_config()
 
-                # Gemini 3 Flash: Use low thinking budget for consistency
-                # Testing showed 100% consistency and ~81% accuracy with thinking_budget=1024
-                if "gemini-3-flash" in self.model:
-                    config = types.GenerateContentConfig(
-                        temperature=self.temperature,
-                        max_output_tokens=10000,
-                        thinking_config=types.ThinkingConfig(thinking_budget=1024)
-                    )
-                # Gemini 2.5 Pro: Use minimum thinking budget
-                elif self.model == "gemini-2.5-pro":
-                    # 2.5-pro requires thinking mode, but we avoid it per requirements
-                    # If we must use it, set minimum thinking budget of 128 tokens
-                    # This is the smallest allowed value that still enables thinking mode
-                    config = types.GenerateContentConfig(
-                        temperature=self.temperature,
-                        max_output_tokens=10000,
-                        thinking_config=types.ThinkingConfig(thinking_budget=128)
-                    )
-                    logger.warning(f"Using minimum thinking budget for {self.model}")
-
-                response = self.client.models.generate_content(
+                response = await self._run_blocking(
+                    self.client.models.generate_content,
                     model=self.model,
                     contents=prompt,
                     config=config
@@ -289,7 +477,8 @@ class GeminiProvider(CitationValidator):
 
         for attempt in range(max_retries):
             try:
-                response = model.generate_content(
+                response = await self._run_blocking(
+                    model.generate_content,
                     prompt,
                     generation_config=generation_config
                 )
@@ -312,160 +501,6 @@ class GeminiProvider(CitationValidator):
                     raise
     
 
-    def _parse_response(self, response_text: str, style: StyleType = DEFAULT_STYLE) -> List[Dict[str, Any]]:
-        """
-        Parse Gemini response text into structured validation results.
-        Uses the same parsing logic as OpenAI provider for consistency.
-
-        Args:
-            response_text: Raw text from Gemini
-            style: Citation style for parsing success messages
-
-        Returns:
-            List of validation results, one per citation
-        """
-        logger.debug("Parsing Gemini response into structured format")
-
-        results = []
-
-        # Find all citation blocks by looking for CITATION # markers
-        # Handle both formats: "═══\nCITATION #N\n═══" and "CITATION #N\n═══"
-        citation_pattern = r'(?:═+\s+)?CITATION #(\d+)\s*\n\s*═+(.+?)(?=(?:═+\s+)?CITATION #\d+|$)'
-        matches = re.finditer(citation_pattern, response_text, re.DOTALL)
-
-        for match in matches:
-            citation_num = int(match.group(1))
-            block_content = match.group(2)
-
-            try:
-                result = self._parse_citation_block(citation_num, block_content, style)
-                if result:
-                    results.append(result)
-            except Exception as e:
-                logger.warning(f"Failed to parse citation #{citation_num}: {str(e)}")
-                logger.debug(f"Problematic block: {block_content[:200]}...")
-
-        return results
-
-    def _parse_citation_block(self, citation_num: int, block: str, style: StyleType = DEFAULT_STYLE) -> Dict[str, Any]:
-        """
-        Parse a single citation block from Gemini response.
-        Mirrors the OpenAI provider's parsing logic.
-
-        Args:
-            citation_num: Citation number
-            block: Text block content for one citation
-            style: Citation style for parsing success messages
-
-        Returns:
-            Structured validation result
-        """
-        lines = block.strip().split('\n')
-
-        result = {
-            "citation_number": citation_num,
-            "original": "",
-            "source_type": "",
-            "errors": []
-        }
-
-        current_section = None
-        original_lines = []
-
-        for line in lines:
-            line_stripped = line.strip()
-
-            # Track sections
-            if line_stripped.startswith('ORIGINAL:'):
-                current_section = 'original'
-                # Extract content from the same line if present
-                content = line_stripped.replace('ORIGINAL:', '').strip()
-                if content:
-                    original_lines.append(content)
-            elif line_stripped.startswith('SOURCE TYPE:'):
-                current_section = 'source_type'
-                source_type = line_stripped.replace('SOURCE TYPE:', '').strip()
-                result["source_type"] = source_type
-            elif line_stripped.startswith('VALIDATION RESULTS:'):
-                current_section = 'validation'
-            elif line_stripped.startswith('VALIDATION RESULTS:'):
-                current_section = 'validation'
-            # Parse content based on section
-            elif current_section == 'original' and line_stripped and not line_stripped.startswith('SOURCE TYPE:'):
-                original_lines.append(line_stripped)
-            elif current_section == 'corrected_citation' and line_stripped:
-                # Handle separator at end of corrected citation
-                if line_stripped.startswith('─'):
-                    current_section = None
-                    continue
-                    
-                # Append line to corrected citation (handles multi-line wrap)
-                if result.get("corrected_citation") is None:
-                    result["corrected_citation"] = line_stripped
-                else:
-                    result["corrected_citation"] += " " + line_stripped
-            elif current_section == 'validation':
-                # Check for no errors using style-specific success message
-                success_msg = get_style_config(style)["success_message"]
-                if f'✓ {success_msg}' in line_stripped or success_msg in line_stripped:
-                    result["errors"] = []
-                # Parse error lines
-                elif line_stripped.startswith('❌'):
-                    # Format: ❌ [Component]: [Problem]
-                    error_match = re.match(r'❌\s*([^:]+):\s*(.+)', line_stripped)
-                    if error_match:
-                        error = {
-                            "component": error_match.group(1).strip(),
-                            "problem": error_match.group(2).strip(),
-                            "correction": ""
-                        }
-                        result["errors"].append(error)
-                # Parse correction lines (may be indented, so check in line not just at start)
-                elif 'Should be:' in line_stripped and result["errors"]:
-                    correction = line_stripped.split('Should be:')[1].strip()
-                    result["errors"][-1]["correction"] = correction
-            
-            # Check for CORRECTED CITATION section start (checked last to avoid consuming current line if it's the header)
-            if line_stripped.startswith('CORRECTED CITATION:'):
-                current_section = 'corrected_citation'
-                # Extract content from the same line if present
-                content = line_stripped.replace('CORRECTED CITATION:', '').strip()
-                if content:
-                    result["corrected_citation"] = content
-                
-        # Join original lines
-        if original_lines:
-            result["original"] = ' '.join(original_lines)
-            # Convert markdown formatting back to HTML for frontend display
-            result["original"] = self._format_markdown_to_html(result["original"])
-
-        # Process corrected citation
-        if "corrected_citation" in result and result["corrected_citation"]:
-            # Defensive Logic 1: If no errors, discard corrected citation
-            if not result.get("errors"):
-                result["corrected_citation"] = None
-            else:
-                # normalize strings for comparison
-                cleaned_original = re.sub(r'\s+', ' ', result.get("original", "")).strip()
-                cleaned_corrected = re.sub(r'\s+', ' ', result["corrected_citation"]).strip()
-                
-                # Apply HTML formatting to corrected
-                formatted_corrected = self._format_markdown_to_html(cleaned_corrected)
-                
-                # Defensive Logic 2: If identical to original (comparing HTML vs HTML), discard
-                if cleaned_original == formatted_corrected:
-                     result["corrected_citation"] = None
-                else:
-                     result["corrected_citation"] = formatted_corrected
-                     logger.info(f"Parsed corrected citation for #{citation_num}")
-
-        # Apply same markdown→HTML conversion to error corrections
-        for error in result["errors"]:
-            if error.get("correction"):
-                error["correction"] = self._format_markdown_to_html(error["correction"])
-
-        return result
-
     def generate_completion(self, prompt: str) -> Optional[str]:
         """
         Simple method for testing direct API access.
@@ -1,6 +1,6 @@
 """Mock LLM provider for fast E2E testing without API calls."""
-from typing import Dict, Any
-from providers.base import CitationValidator
+from typing import Dict, Any, Optional
+from providers.base import CitationValidator, ResultsCallback
 
 
 class MockProvider(CitationValidator):
@@ -9,7 +9,12 @@ class MockProvider(CitationValidator):
     Used for E2E testing to avoid slow/expensive OpenAI calls.
     """
 
-    async def validate_citations(self, citations: str, style: str = "apa7") -> Dict[str, Any]:
+    async def validate_citations(
+        self,
+        citations: str,
+        style: str = "apa7",
+        on_results: Optional[ResultsCallback] = None
+    ) -> Dict[str, Any]:
         """
         Return mock validation results instantly.
 
@@ -21,6 +26,7 @@ class MockProvider(CitationValidator):
         Args:
             citations: Raw citation text
             style: Citation style (ignored in mock)
+            on_results: Optional callback receiving the results before return
 
         Returns:
             Mock validation results matching OpenAI format
@@ -67,6 +73,9 @@ class MockProvider(CitationValidator):
                     "corrected_citation": corrected_text
                 })
 
+        if on_results:
+            on_results(results)
+
         return {
             "results": results
         }
@@ -1,13 +1,15 @@
 import os
-import re
 import time
 import asyncio
-from typing import Dict, Any, List
+from typing import AsyncIterator, Dict, Any, Optional
 from openai import AsyncOpenAI, APIError, APITimeoutError, RateLimitError, AuthenticationError
-from providers.base import CitationValidator
+from providers.base import CitationValidator, ResultsCallback, TextStream
 from prompt_manager import PromptManager
 from logger import setup_logger
-from styles import StyleType, DEFAULT_STYLE, get_style_config
+from events import emit_event
+from timing import record as record_span
+from metrics import count_tokens
+from styles import StyleType, DEFAULT_STYLE
 
 logger = setup_logger("openai_provider")
 
@@ -31,10 +33,32 @@ class OpenAIProvider(CitationValidator):
         self.prompt_manager = PromptManager()
         logger.info(f"OpenAI provider initialized with model: {model}")
 
-    async def validate_citations(self, citations: str, style: StyleType = DEFAULT_STYLE) -> Dict[str, Any]:
+    async def validate_citations(
+        self,
+        citations: str,
+        style: StyleType = DEFAULT_STYLE,
+        on_results: Optional[ResultsCallback] = None
+    ) -> Dict[str, Any]:
         """
         Validate citations using OpenAI API.
 
+        Large reference lists are split into token-budgeted chunks that are
+        validated concurrently and merged back in order.
+
+        Args:
+            citations: Raw citation text
+            style: Citation style (default: apa7)
+            on_results: Optional callback receiving each chunk's results as it completes
+
+        Returns:
+            Validation results dictionary with structured errors
+        """
+        return await self._validate_in_chunks(citations, style, self._validate_chunk, on_results)
+
+    async def _validate_chunk(self, citations: str, style: StyleType = DEFAULT_STYLE) -> Dict[str, Any]:
+        """
+        Validate one chunk of citations with a single OpenAI API call.
+
         Args:
             citations: Raw citation text
             style: Citation style (default: apa7)
@@ -45,39 +69,18 @@ class OpenAIProvider(CitationValidator):
         logger.info(f"Starting validation for {len(citations)} characters of citation text (style={style})")
         logger.debug(f"Citations to validate: {citations[:2000]}...")
 
-        # Build prompt components - pass style to load correct prompt
-        start_time = time.time()
-        prompt_template = self.prompt_manager.load_prompt(style)
-        formatted_citations = self.prompt_manager.format_citations(citations)
-        logger.debug(f"Prepared prompt components in {time.time() - start_time:.3f}s")
+        completion_kwargs = self._completion_kwargs(citations, style)
 
         # Call OpenAI API with retry logic
         logger.info(f"Calling OpenAI API with model: {self.model}")
         api_start = time.time()
 
-        # Build completion kwargs
-        completion_kwargs = {
-            "model": self.model,
-            "instructions": prompt_template,
-            "input": formatted_citations,
-            "temperature": 1 if self.model.startswith("gpt-5") else 0.1,  # GPT-5 requires temperature=1
-            "timeout": 85.0,  # 85 second timeout (stays under nginx 90s and Cloudflare 100s limits)
-            "service_tier": "priority"  # Enable Priority Processing for lower latency
-        }
-
-        # Use appropriate parameter based on model family
-        if self.model.startswith("gpt-5"):
-            completion_kwargs["max_output_tokens"] = 10000  # Increased to handle large batches without truncation
-            completion_kwargs["reasoning"] = {"effort": "medium"}  # 75.2% accuracy, only -2.5% vs baseline for better latency
-        else:
-            completion_kwargs["max_output_tokens"] = 10000
-
         # Retry logic with exponential backoff
         max_retries = 3
         retry_delay = 2  # Initial delay in seconds
 
         # Estimate request size for debugging
-        request_size_chars = len(prompt_template) + len(formatted_citations)
+        request_size_chars = len(completion_kwargs["instructions"]) + len(completion_kwargs["input"])
 
         for attempt in range(max_retries):
             attempt_start = time.time()
@@ -105,6 +108,8 @@ class OpenAIProvider(CitationValidator):
                 )
                 
                 if await self._handle_retry_error(e, attempt, max_retries, retry_delay):
+                    # Failed attempt plus backoff, on the job's latency breakdown
+                    record_span("llm_retry", time.time() - attempt_start)
                     continue  # Retry attempted
                 else:
                     # Max retries exceeded
@@ -123,15 +128,7 @@ class OpenAIProvider(CitationValidator):
             logger.warning(f"SLOW REQUEST: OpenAI API call took {api_time:.1f}s (>30s threshold)")
             logger.warning(f"Citation preview: {citations[:200]}...")
 
-        # Log usage (Response object structure differs in Responses API)
-        # Assuming response.usage has prompt_tokens/completion_tokens or similar
-        # Based on previous tests, it might be input_tokens/output_tokens
-        if hasattr(response, 'usage'):
-             # Handle potential differences in usage object keys
-             input_tokens = getattr(response.usage, 'input_tokens', getattr(response.usage, 'prompt_tokens', 0))
-             output_tokens = getattr(response.usage, 'output_tokens', getattr(response.usage, 'completion_tokens', 0))
-             total_tokens = getattr(response.usage, 'total_tokens', input_tokens + output_tokens)
-             logger.info(f"Token usage: {input_tokens} input + {output_tokens} output = {total_tokens} total")
+        self._record_usage(response)
 
         # Extract response text
         response_text = response.output_text
@@ -148,6 +145,128 @@ class OpenAIProvider(CitationValidator):
             "results": results
         }
 
+    async def stream_citations(
+        self,
+        citations: str,
+        style: StyleType = DEFAULT_STYLE
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Validate citations with streamed OpenAI responses, yielding each
+        result as soon as its CITATION #N block is complete.
+
+        Args:
+            citations: Raw citation text
+            style: Citation style (default: apa7)
+
+        Yields:
+            Validation results with structured errors, one per citation
+        """
+        results = self._stream_in_chunks(citations, style, self._stream_chunk)
+        try:
+            async for result in results:
+                yield result
+        finally:
+            await results.aclose()
+
+    async def _stream_chunk(self, citations: str, style: StyleType = DEFAULT_STYLE) -> TextStream:
+        """
+        Stream the response text of one chunk's OpenAI API call.
+
+        Timeouts and rate limits are retried as in _validate_chunk, but only
+        until the first text arrives: a retry after that would repeat results
+        the caller already has, so later errors propagate.
+
+        Args:
+            citations: Raw citation text
+            style: Citation style (default: apa7)
+
+        Yields:
+            Response text deltas
+        """
+        logger.info(f"Starting streamed validation for {len(citations)} characters of citation text (style={style})")
+        completion_kwargs = self._completion_kwargs(citations, style)
+
+        max_retries = 3
+        retry_delay = 2  # Initial delay in seconds
+        api_start = time.time()
+
+        for attempt in range(max_retries):
+            attempt_start = time.time()
+            streamed = False
+            try:
+                stream = await self.client.responses.create(**completion_kwargs, stream=True)
+                try:
+                    async for event in stream:
+                        if event.type == "response.output_text.delta":
+                            if not streamed:
+                                logger.info(f"Attempt {attempt + 1}/{max_retries}: First text after {time.time() - attempt_start:.3f}s")
+                            streamed = True
+                            yield event.delta
+                        elif event.type == "response.completed":
+                            self._record_usage(event.response)
+                        elif event.type in ("response.failed", "error"):
+                            error = getattr(getattr(event, "response", None), "error", None) or getattr(event, "message", "")
+                            raise ValueError(f"OpenAI API error: {error}")
+                finally:
+                    await stream.close()
+                logger.info(f"OpenAI streamed API call completed in {time.time() - api_start:.3f}s")
+                return
+
+            except AuthenticationError as e:
+                logger.error(f"OpenAI authentication failed: {str(e)}", exc_info=True)
+                raise ValueError("Invalid OpenAI API key. Please check your configuration.") from e
+
+            except (APITimeoutError, RateLimitError) as e:
+                error_type = "timeout" if isinstance(e, APITimeoutError) else "rate_limit"
+                if not streamed and await self._handle_retry_error(e, attempt, max_retries, retry_delay):
+                    record_span("llm_retry", time.time() - attempt_start)
+                    continue
+                raise ValueError(f"Streamed request failed due to {error_type} errors. Please try again later.") from e
+
+            except APIError as e:
+                logger.error(f"OpenAI API error: {str(e)}", exc_info=True)
+                raise ValueError(f"OpenAI API error: {str(e)}") from e
+
+    def _completion_kwargs(self, citations: str, style: StyleType = DEFAULT_STYLE) -> Dict[str, Any]:
+        """Responses API arguments for validating citations in style."""
+        # Build prompt components - pass style to load correct prompt
+        start_time = time.time()
+        prompt_template = self.prompt_manager.load_prompt(style)
+        formatted_citations = self.prompt_manager.format_citations(citations)
+        logger.debug(f"Prepared prompt components in {time.time() - start_time:.3f}s")
+
+        completion_kwargs = {
+            "model": self.model,
+            "instructions": prompt_template,
+            "input": formatted_citations,
+            "temperature": 1 if self.model.startswith("gpt-5") else 0.1,  # GPT-5 requires temperature=1
+            "timeout": 85.0,  # 85 second timeout (stays under nginx 90s and Cloudflare 100s limits)
+            "service_tier": "priority"  # Enable Priority Processing for lower latency
+        }
+
+        # Use appropriate parameter based on model family
+        if self.model.startswith("gpt-5"):
+            completion_kwargs["max_output_tokens"] = 10000  # Increased to handle large batches without truncation
+            completion_kwargs["reasoning"] = {"effort": "medium"}  # 75.2% accuracy, only -2.5% vs baseline for better latency
+        else:
+            completion_kwargs["max_output_tokens"] = 10000
+
+        return completion_kwargs
+
+    def _record_usage(self, response: Any) -> None:
+        """Log, emit and count the token usage of a response, if it has any."""
+        # Log usage (Response object structure differs in Responses API)
+        # Assuming response.usage has prompt_tokens/completion_tokens or similar
+        # Based on previous tests, it might be input_tokens/output_tokens
+        if hasattr(response, 'usage'):
+             # Handle potential differences in usage object keys
+             input_tokens = getattr(response.usage, 'input_tokens', getattr(response.usage, 'prompt_tokens', 0))
+             output_tokens = getattr(response.usage, 'output_tokens', getattr(response.usage, 'completion_tokens', 0))
+             total_tokens = getattr(response.usage, 'total_tokens', input_tokens + output_tokens)
+             logger.info(f"Token usage: {input_tokens} input + {output_tokens} output = {total_tokens} total")
+             emit_event("token_usage", prompt=input_tokens, completion=output_tokens, total=total_tokens)
+             count_tokens("openai", self.model, prompt=input_tokens, completion=output_tokens)
+
     async def _handle_retry_error(self, error: Exception, attempt: int, max_retries: int, retry_delay: int) -> bool:
         """
         Handle retryable errors with exponential backoff.
@@ -173,153 +292,3 @@ class OpenAIProvider(CitationValidator):
         logger.warning(f"OpenAI API error (attempt {attempt + 1}/{max_retries}): {str(error)}. Retrying in {wait_time}s...")
         await asyncio.sleep(wait_time)
         return True
-
-    def _parse_response(self, response_text: str, style: StyleType = DEFAULT_STYLE) -> List[Dict[str, Any]]:
-        """
-        Parse LLM response text into structured validation results.
-
-        Args:
-            response_text: Raw text from LLM
-            style: Citation style for parsing success messages
-
-        Returns:
-            List of validation results, one per citation
-        """
-        logger.debug("Parsing LLM response into structured format")
-
-        results = []
-
-        # Find all citation blocks by looking for CITATION # markers
-        # Handle both formats: "═══\nCITATION #N\n═══" and "CITATION #N\n═══"
-        citation_pattern = r'(?:═+\s+)?CITATION #(\d+)\s*\n\s*═+(.+?)(?=(?:═+\s+)?CITATION #\d+|$)'
-        matches = re.finditer(citation_pattern, response_text, re.DOTALL)
-
-        for match in matches:
-            citation_num = int(match.group(1))
-            block_content = match.group(2)
-
-            try:
-                result = self._parse_citation_block(citation_num, block_content, style)
-                if result:
-                    results.append(result)
-            except Exception as e:
-                logger.warning(f"Failed to parse citation #{citation_num}: {str(e)}")
-                logger.debug(f"Problematic block: {block_content[:200]}...")
-
-        return results
-
-    def _parse_citation_block(self, citation_num: int, block: str, style: StyleType = DEFAULT_STYLE) -> Dict[str, Any]:
-        """
-        Parse a single citation block from LLM response.
-
-        Args:
-            citation_num: Citation number
-            block: Text block content for one citation
-            style: Citation style for parsing success messages
-
-        Returns:
-            Structured validation result
-        """
-        lines = block.strip().split('\n')
-
-        result = {
-            "citation_number": citation_num,
-            "original": "",
-            "source_type": "",
-            "errors": [],
-            "corrected_citation": None
-        }
-
-        current_section = None
-        original_lines = []
-
-        for line in lines:
-            line_stripped = line.strip()
-
-            # Track sections
-            if line_stripped.startswith('ORIGINAL:'):
-                current_section = 'original'
-                # Extract content from the same line if present
-                content = line_stripped.replace('ORIGINAL:', '').strip()
-                if content:
-                    original_lines.append(content)
-            elif line_stripped.startswith('SOURCE TYPE:'):
-                current_section = 'source_type'
-                source_type = line_stripped.replace('SOURCE TYPE:', '').strip()
-                result["source_type"] = source_type
-            elif line_stripped.startswith('VALIDATION RESULTS:'):
-                current_section = 'validation'
-            elif line_stripped.startswith('CORRECTED CITATION:'):
-                current_section = 'corrected_citation'
-                # Extract content from the same line if present
-                content = line_stripped.replace('CORRECTED CITATION:', '').strip()
-                if content:
-                    result["corrected_citation"] = content
-
-            # Parse content based on section
-            elif current_section == 'original' and line_stripped and not line_stripped.startswith('SOURCE TYPE:'):
-                original_lines.append(line_stripped)
-            elif current_section == 'corrected_citation' and line_stripped:
-                # Handle separator at end of corrected citation
-                if line_stripped.startswith('─'):
-                    current_section = None
-                    continue
-                    
-                # Append line to corrected citation (handles multi-line wrap)
-                if result["corrected_citation"] is None:
-                    result["corrected_citation"] = line_stripped
-                else:
-                    result["corrected_citation"] += " " + line_stripped
-            elif current_section == 'validation':
-                # Check for no errors using style-specific success message
-                success_msg = get_style_config(style)["success_message"]
-                if f'✓ {success_msg}' in line_stripped or success_msg in line_stripped:
-                    result["errors"] = []
-                # Parse error lines
-                elif line_stripped.startswith('❌'):
-                    # Format: ❌ [Component]: [Problem]
-                    error_match = re.match(r'❌\s*([^:]+):\s*(.+)', line_stripped)
-                    if error_match:
-                        error = {
-                            "component": error_match.group(1).strip(),
-                            "problem": error_match.group(2).strip(),
-                            "correction": ""
-                        }
-                        result["errors"].append(error)
-                # Parse correction lines (may be indented, so check in line not just at start)
-                elif 'Should be:' in line_stripped and result["errors"]:
-                    correction = line_stripped.split('Should be:')[1].strip()
-                    result["errors"][-1]["correction"] = correction
-
-        # Join original lines
-        if original_lines:
-            result["original"] = ' '.join(original_lines)
-            # Convert markdown formatting back to HTML for frontend display
-            result["original"] = self._format_markdown_to_html(result["original"])
-
-        # Process corrected citation
-        if "corrected_citation" in result and result["corrected_citation"]:
-            # Defensive Logic 1: If no errors, discard corrected citation
-            if not result.get("errors"):
-                result["corrected_citation"] = None
-            else:
-                # normalize strings for comparison
-                cleaned_original = re.sub(r'\s+', ' ', result.get("original", "")).strip()
-                cleaned_corrected = re.sub(r'\s+', ' ', result["corrected_citation"]).strip()
-                
-                # Apply HTML formatting to corrected
-                formatted_corrected = self._format_markdown_to_html(cleaned_corrected)
-                
-                # Defensive Logic 2: If identical to original (comparing HTML vs HTML), discard
-                if cleaned_original == formatted_corrected:
-                     result["corrected_citation"] = None
-                else:
-                     result["corrected_citation"] = formatted_corrected
-                     logger.info(f"Parsed corrected citation for #{citation_num}")
-
-        # Apply same markdown→HTML conversion to error corrections
-        for error in result["errors"]:
-            if error.get("correction"):
-                error["correction"] = self._format_markdown_to_html(error["correction"])
-
-        return result
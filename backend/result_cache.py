@@ -0,0 +1,281 @@
+"""
+Per-citation validation result cache.
+
+Users often edit one entry of a reference list and revalidate the whole list.
+Results are cached per citation, keyed by a hash of the normalized citation
+text, the style, and the style's prompt file (name + content), so a prompt
+change invalidates old entries automatically.
+
+Two tiers:
+- in-process LRU with TTL (fast path, bounded size)
+- SQLite table with the same TTL (survives restarts, shared across workers)
+
+validate_with_cache() splits the input, serves hits from the cache, sends only
+the misses to the LLM, and merges everything back in input order.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from prompt_manager import PromptManager
+from styles import get_style_config
+
+# Use the same logger name as app.py to ensure logs go to the same file/format
+logger = logging.getLogger("citation_validator")
+
+DEFAULT_MAX_ENTRIES = int(os.getenv('CITATION_CACHE_MAX_ENTRIES', '5000'))
+DEFAULT_TTL_SECONDS = int(os.getenv('CITATION_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+
+PROMPTS_DIR = Path(__file__).parent / "prompts"
+
+# Splits citations text the way the providers number it
+_prompt_manager = PromptManager()
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def get_cache_db_path() -> str:
+    """Get result cache database path, using override if set."""
+    override = os.getenv('CITATION_CACHE_DB_PATH')
+    if override:
+        return override
+
+    return os.path.join(os.path.dirname(__file__), 'result_cache.db')
+
+
+def normalize_citation(citation: str) -> str:
+    """
+    Normalize citation text for cache keying.
+
+    Collapses whitespace and applies Unicode NFC. Case and formatting markers
+    are kept since they are exactly what the validator checks.
+    """
+    return _WHITESPACE_RE.sub(' ', unicodedata.normalize('NFC', citation)).strip()
+
+
+@lru_cache(maxsize=None)
+def _prompt_fingerprint(style: str) -> str:
+    """Prompt file name plus a digest of its content for the given style."""
+    prompt_file = get_style_config(style)["prompt_file"]
+    try:
+        digest = hashlib.sha256((PROMPTS_DIR / prompt_file).read_bytes()).hexdigest()[:16]
+    except OSError:
+        digest = "missing"
+    return f"{prompt_file}:{digest}"
+
+
+def make_cache_key(citation: str, style: str) -> str:
+    """Content-addressed key for one citation under one style/prompt version."""
+    payload = "\0".join([style, _prompt_fingerprint(style), normalize_citation(citation)])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class CitationResultCache:
+    """Two-tier (memory LRU + SQLite) cache of per-citation validation results."""
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS
+    ):
+        self.db_path = db_path or get_cache_db_path()
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # key -> (stored_at, result JSON). JSON keeps cached results immutable.
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        self.hits = 0
+        self.misses = 0
+
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir, exist_ok=True)
+
+        conn = self._conn()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS citation_results (
+                cache_key TEXT PRIMARY KEY,
+                result TEXT NOT NULL,
+                stored_at REAL NOT NULL
+            )
+        ''')
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_citation_results_stored_at ON citation_results(stored_at)")
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, key: str, stored_at: float, result_json: str) -> None:
+        with self._lock:
+            self._memory[key] = (stored_at, result_json)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def get_many(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Return {key: result} for every key with a live cache entry."""
+        now = time.time()
+        found: Dict[str, str] = {}
+        missing = []
+
+        with self._lock:
+            for key in keys:
+                entry = self._memory.get(key)
+                if entry and now - entry[0] < self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    found[key] = entry[1]
+                else:
+                    if entry:
+                        del self._memory[key]
+                    missing.append(key)
+
+        if missing:
+            placeholders = ",".join("?" for _ in missing)
+            rows = self._conn().execute(
+                f"SELECT cache_key, result, stored_at FROM citation_results "
+                f"WHERE cache_key IN ({placeholders}) AND stored_at > ?",
+                (*missing, now - self.ttl_seconds)
+            ).fetchall()
+            for key, result_json, stored_at in rows:
+                found[key] = result_json
+                self._remember(key, stored_at, result_json)
+
+        self.hits += len(found)
+        self.misses += len(set(keys) - found.keys())
+        return {key: json.loads(result_json) for key, result_json in found.items()}
+
+    def put_many(self, entries: Dict[str, Dict[str, Any]]) -> None:
+        """Store results in both tiers."""
+        if not entries:
+            return
+        now = time.time()
+        rows = [(key, json.dumps(result), now) for key, result in entries.items()]
+        for key, result_json, stored_at in rows:
+            self._remember(key, stored_at, result_json)
+
+        conn = self._conn()
+        conn.executemany(
+            "INSERT OR REPLACE INTO citation_results (cache_key, result, stored_at) VALUES (?, ?, ?)",
+            rows
+        )
+        conn.commit()
+
+    def purge_expired(self) -> int:
+        """Delete expired rows from the persistent tier. Returns rows deleted."""
+        conn = self._conn()
+        cursor = conn.execute(
+            "DELETE FROM citation_results WHERE stored_at <= ?",
+            (time.time() - self.ttl_seconds,)
+        )
+        conn.commit()
+        return cursor.rowcount
+
+
+async def validate_with_cache(
+    cache: CitationResultCache,
+    citations_text: str,
+    style: str,
+    validate_fn: Callable[..., Awaitable[Dict[str, Any]]],
+    on_results: Optional[Callable[[List[Dict[str, Any]]], None]] = None
+) -> Dict[str, Any]:
+    """
+    Validate citations, sending only cache misses to the LLM.
+
+    Args:
+        cache: Result cache
+        citations_text: Raw citations text (blank-line separated)
+        style: Citation style
+        validate_fn: Coroutine function taking citations text (and an optional
+            on_results callback) and returning {"results": [...]} with one
+            result per citation, in order
+        on_results: Optional callback receiving results as they become
+            available, numbered by position in citations_text. Cache hits are
+            reported immediately.
+
+    Returns:
+        {"results": [...]} in input order, citation_number renumbered 1..N.
+        If the LLM returns a different number of results than misses sent,
+        those results are merged by their own numbering and not cached.
+    """
+    citations = _prompt_manager.split_citations(citations_text)
+    if not citations:
+        return await validate_fn(citations_text, on_results=on_results)
+
+    keys = [make_cache_key(citation, style) for citation in citations]
+    cached = cache.get_many(keys)
+    miss_positions = [i for i, key in enumerate(keys) if key not in cached]
+
+    logger.info(f"Result cache: {len(citations) - len(miss_positions)} hit(s), {len(miss_positions)} miss(es)")
+
+    if on_results and cached:
+        on_results([
+            {**cached[key], "citation_number": position + 1}
+            for position, key in enumerate(keys) if key in cached
+        ])
+
+    def renumber_misses(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # Map numbering within the miss list back to input positions
+        renumbered = []
+        for result in results:
+            miss_index = result.get("citation_number", 0) - 1
+            if 0 <= miss_index < len(miss_positions):
+                renumbered.append({**result, "citation_number": miss_positions[miss_index] + 1})
+        return renumbered
+
+    def on_miss_results(results: List[Dict[str, Any]]) -> None:
+        on_results(renumber_misses(results))
+
+    fresh_results = []
+    if miss_positions:
+        miss_text = "\n\n".join(citations[i] for i in miss_positions)
+        validation_results = await validate_fn(miss_text, on_results=on_miss_results if on_results else None)
+        fresh_results = validation_results["results"]
+
+        if len(fresh_results) != len(miss_positions):
+            # Can't line results up with inputs one to one - don't cache them, and
+            # merge by the LLM's own numbering (what on_results already reported)
+            logger.warning(
+                f"Result cache: expected {len(miss_positions)} result(s) from LLM, got {len(fresh_results)}; "
+                f"skipping cache"
+            )
+            if len(miss_positions) == len(citations):
+                return validation_results
+            hits = [
+                {**cached[key], "citation_number": position + 1}
+                for position, key in enumerate(keys) if key in cached
+            ]
+            merged = sorted(hits + renumber_misses(fresh_results), key=lambda result: result["citation_number"])
+            return {"results": merged}
+
+        cache.put_many({
+            keys[i]: {k: v for k, v in result.items() if k != "citation_number"}
+            for i, result in zip(miss_positions, fresh_results)
+        })
+
+    fresh_by_position = dict(zip(miss_positions, fresh_results))
+    merged = []
+    for position, key in enumerate(keys):
+        result = dict(fresh_by_position[position]) if position in fresh_by_position else cached[key]
+        result["citation_number"] = position + 1
+        merged.append(result)
+
+    return {"results": merged}
@@ -156,12 +156,12 @@ class TestDashboardAPI:
         """
         # Add a mock job to test with real data
         mock_job_id = "test-job-integrity"
-        jobs[mock_job_id] = {
+        jobs.create(mock_job_id, {
             "status": "completed",
             "created_at": time.time(),
             "citation_count": 5,
             "results": {"error_count": 2}
-        }
+        })
 
         response = client.get("/api/dashboard")
         assert response.status_code == 200
@@ -176,7 +176,7 @@ class TestDashboardAPI:
         assert mock_job_id in job_ids
 
         # Clean up
-        del jobs[mock_job_id]
+        jobs.delete(mock_job_id)
 
     def test_dashboard_stats_with_real_data(self):
         """
@@ -190,7 +190,7 @@ class TestDashboardAPI:
         }
 
         for job_id, job_data in test_jobs.items():
-            jobs[job_id] = job_data
+            jobs.create(job_id, job_data)
 
         response = client.get("/api/dashboard/stats")
         assert response.status_code == 200
@@ -206,7 +206,7 @@ class TestDashboardAPI:
 
         # Clean up
         for job_id in test_jobs:
-            del jobs[job_id]
+            jobs.delete(job_id)
 
     def test_dashboard_stats_citation_pipeline_metrics(self):
         """
@@ -1,9 +1,33 @@
 import pytest
 import os
 import sqlite3
+import sys
 from fastapi.testclient import TestClient
 
 
+def close_pooled_connections():
+    """
+    Close pooled database connections.
+
+    Tests delete and recreate database files at fixed paths; a pooled
+    connection still holding the old file (and its -wal) would leak state
+    into the next test. Some tests import the module as backend.database,
+    which has its own pool.
+    """
+    for name in ('database', 'backend.database'):
+        module = sys.modules.get(name)
+        if module is not None:
+            module.close_all_connections()
+
+
+@pytest.fixture(autouse=True)
+def pooled_connections_closed():
+    """Start and finish each test without pooled database connections."""
+    close_pooled_connections()
+    yield
+    close_pooled_connections()
+
+
 @pytest.fixture
 def test_db():
     """Create a fresh test database for each test."""
@@ -51,12 +75,25 @@ def test_db():
             PRIMARY KEY (token, reset_timestamp)
         )
     ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS reservations (
+            job_id TEXT PRIMARY KEY,
+            token TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            amount INTEGER NOT NULL,
+            reset_timestamp INTEGER,
+            status TEXT NOT NULL DEFAULT 'held',
+            used INTEGER,
+            created_at INTEGER NOT NULL
+        )
+    ''')
     conn.commit()
     conn.close()
 
     yield test_db_path
 
-    # Cleanup
+    # Cleanup (close pooled connections first so -wal/-shm go with the file)
+    close_pooled_connections()
     if os.path.exists(test_db_path):
         os.remove(test_db_path)
 
@@ -103,13 +103,13 @@ class TestAsyncJobs:
         # Expect 404 for nonexistent job
         assert response.status_code == 404
 
-    def test_job_storage_dict_exists(self):
-        """Test that jobs storage dict is available in app module."""
+    def test_job_storage_exists(self):
+        """Test that the job store is available in app module."""
         import app
+        from job_store import JobStore
 
-        # This should fail because jobs dict doesn't exist yet
-        assert hasattr(app, 'jobs'), "jobs storage dict not found in app module"
-        assert isinstance(app.jobs, dict), "jobs should be a dict"
+        assert hasattr(app, 'jobs'), "job store not found in app module"
+        assert isinstance(app.jobs, JobStore), "jobs should be a JobStore"
 
     def test_process_validation_job_function_exists(self):
         """Test that process_validation_job function exists."""
@@ -274,10 +274,11 @@ class TestAsyncJobs:
 
         # Should contain infinite loop for background processing
         assert "while True:" in source
-        # Should contain 30-minute threshold for cleanup
-        assert "30 * 60" in source
+        # Should use the 30-minute job TTL for cleanup
+        assert "DEFAULT_JOB_TTL_SECONDS" in source
+        assert app.DEFAULT_JOB_TTL_SECONDS == 30 * 60
         # Should contain deletion logic
-        assert "del jobs[" in source
+        assert "jobs.adelete_expired(" in source
 
     def test_free_tier_limit_returns_accurate_citation_count(self):
         """Test that free tier limit endpoint counts citations accurately using LLM."""
@@ -449,10 +450,11 @@ class TestAsyncJobs:
 
         # Should contain infinite loop for background processing
         assert "while True:" in source
-        # Should contain 30-minute threshold for cleanup
-        assert "30 * 60" in source
+        # Should use the 30-minute job TTL for cleanup
+        assert "DEFAULT_JOB_TTL_SECONDS" in source
+        assert app.DEFAULT_JOB_TTL_SECONDS == 30 * 60
         # Should contain deletion logic
-        assert "del jobs[" in source
+        assert "jobs.adelete_expired(" in source
 
     def test_free_tier_limit_returns_accurate_citation_count(self):
         """Test that free tier limit endpoint counts citations accurately using LLM."""
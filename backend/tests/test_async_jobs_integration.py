@@ -24,7 +24,7 @@ import os
 sys.path.insert(0, os.path.dirname(__file__))
 
 from app import app
-from database import get_credits, deduct_credits, get_db_path, init_db
+from database import get_credits, deduct_credits, get_db_path, init_db, close_all_connections
 
 # Mark all tests in this module as integration tests
 pytestmark = pytest.mark.integration
@@ -50,7 +50,8 @@ def test_database():
     # Initialize database
     init_db()
     yield
-    # Cleanup
+    # Cleanup (close pooled connections first so -wal/-shm go with the file)
+    close_all_connections()
     if os.path.exists(db_path):
         os.remove(db_path)
 
@@ -0,0 +1,115 @@
+"""Tests for citation_logger.CitationLogWriter background citation logging."""
+import threading
+from unittest.mock import patch
+
+import pytest
+
+import citation_logger
+from citation_logger import CitationLogWriter, parse_citation_blocks
+
+ENOUGH_DISK = {'available_bytes': 10 ** 12, 'total_bytes': 10 ** 12, 'available_gb': 1000.0,
+               'has_minimum': True, 'has_warning': False, 'error': None}
+
+
+@pytest.fixture
+def log_path(tmp_path, monkeypatch):
+    path = tmp_path / "logs" / "citations.log"
+    monkeypatch.setenv("CITATION_LOG_PATH", str(path))
+    return path
+
+
+def test_submitted_blocks_are_written_in_order(log_path):
+    writer = CitationLogWriter()
+    for i in range(50):
+        writer.submit(f"job-{i}", [f"Citation {i}a", f"Citation {i}b"])
+
+    assert writer.flush(timeout=5)
+    assert writer.backlog == 0
+    blocks = parse_citation_blocks(log_path.read_text())
+    assert blocks == [(f"job-{i}", [f"Citation {i}a", f"Citation {i}b"]) for i in range(50)]
+    counts = writer.counts()
+    assert counts["written"] == 50
+    assert 1 <= counts["batches"] <= 50
+    writer.stop()
+
+
+def test_batches_share_one_fsync_and_disk_check(log_path):
+    writer = CitationLogWriter()
+    release = threading.Event()
+    original_write = writer._write_batch
+
+    def slow_write(batch):
+        release.wait(5)
+        return original_write(batch)
+
+    with patch.object(writer, "_write_batch", side_effect=slow_write), \
+            patch("citation_logger.check_disk_space", return_value=ENOUGH_DISK) as disk_check, \
+            patch("citation_logger.os.fsync") as fsync:
+        writer.submit("job-0", ["First"])
+        # job-1..job-3 queue up while the first batch is being written
+        for i in range(1, 4):
+            writer.submit(f"job-{i}", ["Citation"])
+        release.set()
+        assert writer.flush(timeout=5)
+
+    assert writer.counts()["batches"] <= 2
+    assert fsync.call_count == writer.counts()["batches"]
+    assert disk_check.call_count == 1
+    assert len(parse_citation_blocks(log_path.read_text())) == 4
+    writer.stop()
+
+
+def test_full_backlog_drops_oldest_blocks(log_path):
+    writer = CitationLogWriter(max_backlog=3)
+    with patch("citation_logger.threading.Thread"):
+        for i in range(5):
+            writer.submit(f"job-{i}", ["Citation"])
+
+    assert writer.backlog == 3
+    assert writer.counts()["dropped"] == 2
+
+    # The next submit starts a real writer thread, which writes what is left
+    writer._thread = None
+    writer.submit("job-5", ["Citation"])
+    assert writer.flush(timeout=5)
+    assert [job_id for job_id, _ in parse_citation_blocks(log_path.read_text())] == [
+        "job-3", "job-4", "job-5"
+    ]
+    writer.stop()
+
+
+def test_stop_writes_backlog_and_writer_restarts(log_path):
+    writer = CitationLogWriter()
+    writer.submit("job-1", ["Citation"])
+    assert writer.stop(timeout=5)
+    assert writer._thread is None
+    assert [job_id for job_id, _ in parse_citation_blocks(log_path.read_text())] == ["job-1"]
+
+    writer.submit("job-2", ["Citation"])
+    assert writer.flush(timeout=5)
+    assert [job_id for job_id, _ in parse_citation_blocks(log_path.read_text())] == ["job-1", "job-2"]
+    writer.stop()
+
+
+def test_low_disk_space_fails_batch(log_path):
+    writer = CitationLogWriter()
+    low_disk = dict(ENOUGH_DISK, available_gb=0.05, has_minimum=False, has_warning=True)
+    with patch("citation_logger.check_disk_space", return_value=low_disk):
+        writer.submit("job-1", ["Citation"])
+        assert writer.flush(timeout=5)
+
+    assert writer.counts()["failed"] == 1
+    assert not log_path.exists()
+    writer.stop()
+
+
+def test_matches_synchronous_log_format(log_path, tmp_path):
+    writer = CitationLogWriter()
+    writer.submit("job-1", ["Smith, J. (2020). Title.", "Doe, A. (2019). Other."])
+    writer.flush(timeout=5)
+    writer.stop()
+    buffered = log_path.read_text()
+
+    log_path.unlink()
+    assert citation_logger.log_citations_to_dashboard("job-1", ["Smith, J. (2020). Title.", "Doe, A. (2019). Other."])
+    assert log_path.read_text() == buffered
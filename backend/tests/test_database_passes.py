@@ -402,10 +402,13 @@ class TestDatabaseErrors:
     def test_increment_exception_handling(self):
         """Test generic exception inside try_increment_daily_usage try block."""
         # We need connect to succeed, but execute to fail inside the try block
+        def side_effect_execute(sql, *args):
+            # Fail on BEGIN IMMEDIATE (pragmas on connect succeed)
+            if sql == "BEGIN IMMEDIATE":
+                raise Exception("Transaction Failed")
+
         with patch('database.sqlite3.connect') as mock_connect:
-            mock_cursor = mock_connect.return_value.cursor.return_value
-            # Fail on BEGIN IMMEDIATE which is inside the try block
-            mock_cursor.execute.side_effect = Exception("Transaction Failed")
+            mock_connect.return_value.execute.side_effect = side_effect_execute
             
             with pytest.raises(Exception) as exc:
                 try_increment_daily_usage('user1', 50)
@@ -0,0 +1,272 @@
+"""Tests for the pooled SQLite connection layer in database.py."""
+import os
+import sqlite3
+import threading
+
+import pytest
+
+import database
+from database import ConnectionPool
+from metrics import SQLITE_ERRORS
+
+
+@pytest.fixture
+def pool():
+    pool = ConnectionPool()
+    yield pool
+    pool.close_all()
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "credits.db")
+    monkeypatch.setenv('TEST_DB_PATH', path)
+    database.init_db()
+    return path
+
+
+class TestConnectionPool:
+    """Connection reuse, pragmas and unit of work."""
+
+    def test_connection_reused_within_thread(self, pool, tmp_path):
+        path = str(tmp_path / "a.db")
+
+        assert pool.connection(path) is pool.connection(path)
+        assert pool.metrics()["connections_opened"] == 1
+        assert pool.metrics()["checkouts"] == 2
+
+    def test_pragmas_applied_once_on_open(self, pool, tmp_path):
+        conn = pool.connection(str(tmp_path / "a.db"))
+
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+
+    def test_each_thread_gets_its_own_connection(self, pool, tmp_path):
+        path = str(tmp_path / "a.db")
+        connections = []
+
+        thread = threading.Thread(target=lambda: connections.append(pool.connection(path)))
+        thread.start()
+        thread.join()
+
+        assert connections[0] is not pool.connection(path)
+        assert pool.metrics()["connections_open"] == 2
+
+    def test_reconnects_when_file_is_deleted(self, pool, tmp_path):
+        path = str(tmp_path / "a.db")
+        conn = pool.connection(path)
+
+        os.remove(path)
+
+        new_conn = pool.connection(path)
+        assert new_conn is not conn
+        assert os.path.exists(path)
+        assert pool.metrics()["reconnects"] == 1
+        assert pool.metrics()["connections_open"] == 1
+
+    def test_transaction_commits(self, pool, tmp_path):
+        path = str(tmp_path / "a.db")
+        pool.connection(path).execute("CREATE TABLE t (x INTEGER)")
+
+        with pool.transaction(path, immediate=True) as conn:
+            conn.execute("INSERT INTO t VALUES (1)")
+
+        assert sqlite3.connect(path).execute("SELECT COUNT(*) FROM t").fetchone()[0] == 1
+
+    def test_transaction_rolls_back_on_error(self, pool, tmp_path):
+        path = str(tmp_path / "a.db")
+        pool.connection(path).execute("CREATE TABLE t (x INTEGER)")
+
+        with pytest.raises(RuntimeError):
+            with pool.transaction(path) as conn:
+                conn.execute("INSERT INTO t VALUES (1)")
+                raise RuntimeError("boom")
+
+        assert pool.connection(path).execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+        assert pool.metrics()["rollbacks"] == 1
+
+    def test_close_all(self, pool, tmp_path):
+        pool.connection(str(tmp_path / "a.db"))
+        pool.connection(str(tmp_path / "b.db"))
+
+        pool.close_all()
+        assert pool.metrics()["connections_open"] == 0
+
+
+class TestDatabaseFunctionsUsePool:
+    """Request-path functions share one connection instead of reconnecting."""
+
+    def test_validation_request_path_opens_one_connection(self, db_path):
+        database.add_credits("user-token", 10, "order-1")
+        before = database.get_pool_metrics()["connections_opened"]
+
+        database.get_credits("user-token")
+        database.get_active_pass("user-token")
+        database.deduct_credits("user-token", 3)
+        database.try_increment_daily_usage("user-token", 3)
+        database.get_daily_usage_for_current_window("user-token")
+
+        assert database.get_pool_metrics()["connections_opened"] == before
+        assert database.get_credits("user-token") == 7
+
+
+class TestValidationsSchemaCache:
+    """create_validation_record/update_validation_tracking reuse the cached schema."""
+
+    @pytest.fixture
+    def validations_db(self, tmp_path, monkeypatch):
+        path = str(tmp_path / "validations.db")
+        monkeypatch.setenv('TEST_VALIDATIONS_DB_PATH', path)
+        conn = sqlite3.connect(path)
+        conn.execute('''
+            CREATE TABLE validations (
+                job_id TEXT PRIMARY KEY, created_at TEXT, user_type TEXT, citation_count INTEGER,
+                status TEXT, validation_status TEXT, error_message TEXT,
+                paid_user_id TEXT, free_user_id TEXT, is_test_job BOOLEAN, style TEXT
+            )
+        ''')
+        conn.commit()
+        conn.close()
+        return path
+
+    def read(self, path, job_id):
+        conn = sqlite3.connect(path)
+        conn.row_factory = sqlite3.Row
+        row = conn.execute("SELECT * FROM validations WHERE job_id = ?", (job_id,)).fetchone()
+        conn.close()
+        return dict(row)
+
+    def test_schema_introspected_once_per_connection(self, validations_db):
+        statements = []
+        database._pool.connection(validations_db).set_trace_callback(statements.append)
+
+        database.create_validation_record("job-1", "free", 3, free_user_id="f-1", style="mla9")
+        database.create_validation_record("job-2", "paid", 1, paid_user_id="p-1")
+        database.update_validation_tracking("job-1", status="completed")
+        database.update_validation_tracking("job-2", status="failed", error_message="boom")
+
+        assert sum("table_info" in sql for sql in statements) == 1
+        row = self.read(validations_db, "job-1")
+        assert (row["status"], row["validation_status"], row["style"], row["free_user_id"]) == \
+            ("completed", "completed", "mla9", "f-1")
+        row = self.read(validations_db, "job-2")
+        assert (row["status"], row["error_message"], row["style"]) == ("failed", "boom", None)
+
+    def test_write_retried_after_column_dropped(self, validations_db):
+        database.create_validation_record("job-1", "free", 3)
+
+        other = sqlite3.connect(validations_db)
+        other.execute("ALTER TABLE validations DROP COLUMN validation_status")
+        other.commit()
+        other.close()
+
+        assert database.update_validation_tracking("job-1", status="completed") is True
+        assert self.read(validations_db, "job-1")["status"] == "completed"
+
+    def test_errors_counted_against_validations_db(self, validations_db):
+        before = SQLITE_ERRORS.samples()
+        database.create_validation_record("job-1", "free", 3)
+
+        assert database.create_validation_record("job-1", "free", 3) is False
+        after = SQLITE_ERRORS.samples()
+        assert after[("validations", "other")] == before.get(("validations", "other"), 0) + 1
+        assert after.get(("credits", "other")) == before.get(("credits", "other"))
+
+
+class TestEntitlementCache:
+    """get_credits/get_active_pass served from memory until a write changes them."""
+
+    def queries(self, db_path):
+        statements = []
+        database._pool.connection(db_path).set_trace_callback(statements.append)
+        return statements
+
+    def test_repeat_reads_skip_the_query(self, db_path):
+        database.add_credits("user-token", 10, "order-1")
+        database.get_credits("user-token")
+        database.get_active_pass("user-token")
+        statements = self.queries(db_path)
+
+        assert database.get_credits("user-token") == 10
+        assert database.get_active_pass("user-token") is None
+        assert not [sql for sql in statements if "SELECT" in sql]
+
+    def test_writes_in_this_process_invalidate(self, db_path):
+        database.add_credits("user-token", 10, "order-1")
+        assert database.get_credits("user-token") == 10
+        assert database.get_active_pass("user-token") is None
+
+        database.deduct_credits("user-token", 3)
+        assert database.get_credits("user-token") == 7
+        database.reserve_quota("job-1", "user-token", 2)
+        assert database.get_credits("user-token") == 5
+        database.settle_reservation("job-1", 0)
+        assert database.get_credits("user-token") == 7
+        database.add_pass("user-token", 7, "7day", "order-2")
+        assert database.get_active_pass("user-token")["pass_type"] == "7day"
+
+    def test_commits_by_other_connections_invalidate(self, db_path):
+        database.add_credits("user-token", 10, "order-1")
+        assert database.get_credits("user-token") == 10
+
+        # Another worker process writing the same database
+        other = sqlite3.connect(db_path)
+        other.execute("UPDATE users SET credits = 4 WHERE token = 'user-token'")
+        other.commit()
+        other.close()
+
+        assert database.get_credits("user-token") == 4
+
+    def test_other_connections_invalidate_only_the_tokens_they_change(self, db_path):
+        database.add_credits("changed", 10, "order-1")
+        database.add_credits("untouched", 5, "order-2")
+        assert database.get_credits("changed") == 10
+        assert database.get_credits("untouched") == 5
+        flushes = database._entitlements.metrics()["flushes"]
+
+        other = sqlite3.connect(db_path)
+        other.execute("UPDATE users SET credits = 4 WHERE token = 'changed'")
+        other.execute("INSERT INTO user_passes VALUES ('untouched-pass', 1, '1day', 0, 'order-3')")
+        other.commit()
+        other.close()
+        statements = self.queries(db_path)
+
+        assert database.get_credits("changed") == 4
+        assert database.get_credits("untouched") == 5
+        assert [sql for sql in statements if "FROM users" in sql] == [
+            "SELECT credits FROM users WHERE token = 'changed'"
+        ]
+        assert database._entitlements.metrics()["flushes"] == flushes
+
+    def test_prune_entitlement_changes(self, db_path, monkeypatch):
+        database.add_credits("user-token", 10, "order-1")
+        assert database.prune_entitlement_changes() == 0
+
+        later = database.time.time() + 3600
+        monkeypatch.setattr(database.time, "time", lambda: later)
+        assert database.prune_entitlement_changes(600) == 1
+
+    def test_cached_pass_still_expires(self, db_path, monkeypatch):
+        database.add_pass("user-token", 1, "1day", "order-1")
+        assert database.get_active_pass("user-token") is not None
+
+        later = database.time.time() + 2 * 86400
+        monkeypatch.setattr(database.time, "time", lambda: later)
+        assert database.get_active_pass("user-token") is None
+
+    def test_lru_bound_and_racing_invalidation(self, db_path):
+        cache = database.EntitlementCache(ttl_seconds=60, max_entries=2)
+        conn = database._pool.connection(db_path)
+
+        for token in ("a", "b", "c"):
+            _, _, generation = cache.lookup(conn, (db_path, "credits", token))
+            cache.store((db_path, "credits", token), 1, generation)
+        assert cache.lookup(conn, (db_path, "credits", "a"))[0] is False
+        assert cache.lookup(conn, (db_path, "credits", "c"))[0] is True
+
+        # A value read before an invalidation must not be cached after it
+        _, _, generation = cache.lookup(conn, (db_path, "credits", "d"))
+        cache.invalidate("d")
+        cache.store((db_path, "credits", "d"), 1, generation)
+        assert cache.lookup(conn, (db_path, "credits", "d"))[0] is False
@@ -0,0 +1,147 @@
+"""Tests for quota reservations: reserve_quota, settle_reservation, refund_reservation."""
+import sqlite3
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+import database
+from database import (
+    PASS_DAILY_LIMIT,
+    add_credits,
+    add_pass,
+    get_credits,
+    get_daily_usage_for_current_window,
+    init_db,
+    refund_reservation,
+    release_stale_reservations,
+    reserve_quota,
+    settle_reservation,
+)
+
+
+@pytest.fixture(autouse=True)
+def credits_db(tmp_path, monkeypatch):
+    monkeypatch.setenv('TEST_DB_PATH', str(tmp_path / 'credits.db'))
+    init_db()
+
+
+def reservation_status(job_id):
+    row = database._pool.connection(database.get_db_path()).execute(
+        "SELECT status, used FROM reservations WHERE job_id = ?", (job_id,)
+    ).fetchone()
+    return tuple(row) if row else None
+
+
+class TestCreditReservations:
+    def test_reserve_holds_credits_and_settle_refunds_unused(self):
+        add_credits('user', 10, 'order-1')
+
+        reservation = reserve_quota('job-1', 'user', 4)
+        assert reservation == {'kind': 'credits', 'reserved': 4, 'success': True, 'balance': 6}
+        assert get_credits('user') == 6
+
+        assert settle_reservation('job-1', 3) == {'kind': 'credits', 'reserved': 4, 'used': 3, 'refunded': 1}
+        assert get_credits('user') == 7
+        assert reservation_status('job-1') == ('settled', 3)
+
+    def test_short_balance_reserves_what_it_covers(self):
+        add_credits('user', 3, 'order-1')
+
+        reservation = reserve_quota('job-1', 'user', 5)
+        assert reservation == {'kind': 'credits', 'reserved': 3, 'success': False, 'balance': 0}
+        assert get_credits('user') == 0
+
+    def test_no_credits_holds_nothing(self):
+        reservation = reserve_quota('job-1', 'unknown-user', 5)
+
+        assert reservation['reserved'] == 0
+        assert reservation_status('job-1') is None
+        assert settle_reservation('job-1', 5) is None
+
+    def test_refund_returns_everything_once(self):
+        add_credits('user', 10, 'order-1')
+        reserve_quota('job-1', 'user', 4)
+
+        assert refund_reservation('job-1')['refunded'] == 4
+        assert refund_reservation('job-1') is None
+        assert settle_reservation('job-1', 4) is None
+        assert get_credits('user') == 10
+        assert reservation_status('job-1') == ('refunded', 0)
+
+    def test_settle_failure_raises_and_keeps_hold(self):
+        add_credits('user', 10, 'order-1')
+        reserve_quota('job-1', 'user', 4)
+
+        with patch.object(database._pool, 'transaction', side_effect=sqlite3.OperationalError("database is locked")):
+            with pytest.raises(sqlite3.Error):
+                settle_reservation('job-1', 4)
+            assert refund_reservation('job-1') is None
+        assert reservation_status('job-1') == ('held', None)
+
+    def test_settle_never_charges_more_than_reserved(self):
+        add_credits('user', 10, 'order-1')
+        reserve_quota('job-1', 'user', 2)
+
+        assert settle_reservation('job-1', 5)['used'] == 2
+        assert get_credits('user') == 8
+
+    def test_concurrent_reservations_never_overdraw(self):
+        add_credits('user', 10, 'order-1')
+        reservations = []
+
+        def reserve(i):
+            reservations.append(reserve_quota(f'job-{i}', 'user', 3))
+
+        threads = [threading.Thread(target=reserve, args=(i,)) for i in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sum(r['reserved'] for r in reservations) == 10
+        assert get_credits('user') == 0
+
+
+class TestPassReservations:
+    def test_pass_reserves_daily_usage(self):
+        add_pass('user', 7, '7day', 'order-1')
+
+        reservation = reserve_quota('job-1', 'user', 40)
+        assert reservation['kind'] == 'pass'
+        assert reservation['reserved'] == 40 and reservation['success']
+        assert get_daily_usage_for_current_window('user') == 40
+
+        settle_reservation('job-1', 30)
+        assert get_daily_usage_for_current_window('user') == 30
+
+    def test_pass_over_daily_limit_holds_nothing(self):
+        add_pass('user', 7, '7day', 'order-1')
+        reserve_quota('job-1', 'user', PASS_DAILY_LIMIT - 10)
+
+        reservation = reserve_quota('job-2', 'user', 20)
+        assert not reservation['success']
+        assert reservation['reserved'] == 0
+        assert reservation['used_before'] == PASS_DAILY_LIMIT - 10
+        assert get_daily_usage_for_current_window('user') == PASS_DAILY_LIMIT - 10
+
+    def test_pass_takes_priority_over_credits(self):
+        add_credits('user', 10, 'order-1')
+        add_pass('user', 1, '1day', 'order-2')
+
+        assert reserve_quota('job-1', 'user', 5)['kind'] == 'pass'
+        assert get_credits('user') == 10
+
+
+def test_stale_reservations_are_refunded():
+    add_credits('user', 10, 'order-1')
+    reserve_quota('job-old', 'user', 4)
+    reserve_quota('job-new', 'user', 2)
+    conn = database._pool.connection(database.get_db_path())
+    conn.execute("UPDATE reservations SET created_at = ? WHERE job_id = 'job-old'", (int(time.time()) - 3600,))
+
+    assert release_stale_reservations(1800) == 1
+    assert get_credits('user') == 8
+    assert reservation_status('job-old') == ('refunded', 0)
+    assert reservation_status('job-new') == ('held', None)
@@ -0,0 +1,116 @@
+"""Tests for events.py structured dashboard events."""
+import asyncio
+import base64
+import json
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+import events
+from events import bind_job, emit_event
+
+
+@pytest.fixture
+def event_log(tmp_path, monkeypatch):
+    path = tmp_path / "events.ndjson"
+    monkeypatch.setenv("EVENT_LOG_PATH", str(path))
+    monkeypatch.setattr(events, "EVENT_LOGGING_ENABLED", True)
+    return path
+
+
+def read_events(path):
+    assert events.event_log_writer.flush(timeout=5)
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+class TestEmitEvent:
+    def test_writes_one_json_line_per_event(self, event_log):
+        assert emit_event("llm_call", "job-1", provider="model_c", style="apa7", fallback=False, duration_seconds=1.5)
+        assert emit_event("reveal", "job-1", outcome="revealed", extra=None)
+
+        first, second = read_events(event_log)
+        assert first["type"] == "llm_call"
+        assert first["job_id"] == "job-1"
+        assert first["provider"] == "model_c"
+        assert first["duration_seconds"] == 1.5
+        assert time.strptime(first["ts"], "%Y-%m-%dT%H:%M:%SZ")
+        assert second == {"ts": second["ts"], "type": "reveal", "job_id": "job-1", "outcome": "revealed"}
+
+    def test_disabled_or_unknown_type_writes_nothing(self, event_log, monkeypatch):
+        assert not emit_event("no_such_event", "job-1")
+        monkeypatch.setattr(events, "EVENT_LOGGING_ENABLED", False)
+        assert not emit_event("reveal", "job-1", outcome="revealed")
+
+        assert not event_log.exists()
+
+    def test_unwritable_path_is_counted_as_failed(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(events, "EVENT_LOGGING_ENABLED", True)
+        blocker = tmp_path / "file"
+        blocker.write_text("")
+        monkeypatch.setenv("EVENT_LOG_PATH", str(blocker / "events.ndjson"))
+        failed = events.event_log_writer.counts()["failed"]
+
+        assert emit_event("reveal", "job-1", outcome="revealed")
+        assert events.event_log_writer.flush(timeout=5)
+        assert events.event_log_writer.counts()["failed"] == failed + 1
+
+    def test_emit_does_no_file_io_on_the_calling_thread(self, event_log):
+        caller = threading.get_ident()
+        writer_threads = set()
+        original_open = open
+
+        def tracking_open(*args, **kwargs):
+            writer_threads.add(threading.get_ident())
+            return original_open(*args, **kwargs)
+
+        with patch("builtins.open", tracking_open):
+            assert emit_event("reveal", "job-1", outcome="revealed")
+            assert events.event_log_writer.flush(timeout=5)
+
+        assert writer_threads and caller not in writer_threads
+        assert [event["type"] for event in read_events(event_log)] == ["reveal"]
+
+    def test_bound_job_attributes_events_in_its_tasks_only(self, event_log):
+        async def job(job_id):
+            bind_job(job_id)
+            await asyncio.sleep(0)
+            # e.g. provider token usage from an inline validation subtask
+            await asyncio.create_task(asyncio.sleep(0))
+            emit_event("token_usage", prompt=1, completion=2, total=3)
+
+        async def main():
+            await asyncio.gather(job("job-a"), job("job-b"))
+
+        asyncio.run(main())
+        emit_event("token_usage", prompt=1, completion=2, total=3)
+
+        assert [event["job_id"] for event in read_events(event_log)] == ["job-a", "job-b", None]
+
+
+def test_free_limit_job_emits_lifecycle_events(event_log):
+    from app import app
+
+    client = TestClient(app)
+    headers = {"X-Free-Used": base64.b64encode(b"10").decode()}
+    response = client.post("/api/validate/async", json={"citations": "<p>Test citation</p>", "style": "apa7"},
+                           headers=headers)
+    assert response.status_code == 200
+    job_id = response.json()["job_id"]
+
+    for _ in range(30):
+        if client.get(f"/api/jobs/{job_id}").json()["status"] == "completed":
+            break
+        time.sleep(1)
+
+    job_events = [event for event in read_events(event_log) if event["job_id"] == job_id]
+    assert [event["type"] for event in job_events] == [
+        "job_created", "validation_type", "results_locked", "gating_decision", "job_completed", "job_timings"
+    ]
+    assert job_events[0]["user_type"] == "free"
+    assert job_events[0]["style"] == "apa7"
+    assert job_events[0]["is_test_job"] is False
+    assert job_events[1]["validation_type"] == "ref_only"
+    assert job_events[3]["results_gated"] is True
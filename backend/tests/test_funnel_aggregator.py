@@ -0,0 +1,150 @@
+"""Tests for the incremental upgrade funnel aggregator (dashboard/analytics.py)."""
+import json
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+# Add project root to path (parent of backend)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from dashboard.analytics import FunnelAggregator, parse_upgrade_events, refresh_upgrade_funnel
+
+LINES = [
+    "2025-12-15 09:00:00 INFO: UPGRADE_WORKFLOW: job_id=job-1 event=pricing_table_shown token=tok1 variant=1",
+    "2025-12-15 09:01:00 INFO: UPGRADE_WORKFLOW: job_id=job-1 event=product_selected token=tok1 variant=1 product_id=prod_1",
+    "2025-12-15 09:02:00 INFO: UPGRADE_WORKFLOW: job_id=job-1 event=purchase_completed token=tok1 variant=1 product_id=prod_1 amount_cents=1000",
+    "2025-12-16 10:00:00 INFO: UPGRADE_WORKFLOW: job_id=job-2 event=pricing_table_shown token=tok2 variant=1",
+    "2025-12-16 10:00:05 INFO: UPGRADE_WORKFLOW: job_id=None event=pricing_table_shown token=None variant=2.2",
+    "2025-12-16 10:00:06 INFO: UPGRADE_WORKFLOW: job_id=job-3 event=pricing_table_shown token=tok3 variant=9",
+    "2025-12-16 11:00:00 INFO: unrelated line",
+    "2025-12-17 12:00:00 INFO: UPGRADE_EVENT: " + json.dumps({
+        "timestamp": datetime(2025, 12, 17, 12, 0, 0).timestamp(), "event": "checkout_started",
+        "experiment_variant": "2", "token": "tok4"
+    }),
+    "2025-12-17 12:00:01 INFO: UPGRADE_EVENT: {not json",
+]
+
+
+def write_lines(path, lines, mode='a'):
+    with open(path, mode) as f:
+        for line in lines:
+            f.write(line + "\n")
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    path = str(tmp_path / "app.log")
+    write_lines(path, LINES, mode='w')
+    return path
+
+
+@pytest.fixture
+def aggregator(tmp_path, log_file):
+    return FunnelAggregator(db_path=str(tmp_path / "funnel.db"), log_file_path=log_file)
+
+
+class TestQueryMatchesFullScan:
+    """query() answers like parse_upgrade_events() for whole-day filters."""
+
+    @pytest.mark.parametrize("start,end,variant", [
+        (None, None, None),
+        (datetime(2025, 12, 16), None, None),
+        (datetime(2025, 12, 15), datetime(2025, 12, 16, 23, 59, 59), None),
+        (None, None, '1'),
+        (None, None, '2'),
+    ])
+    def test_same_result(self, aggregator, log_file, start, end, variant):
+        assert aggregator.refresh() == 7
+
+        assert aggregator.query(start, end, variant) == parse_upgrade_events(log_file, start, end, variant)
+
+    def test_counts(self, aggregator):
+        aggregator.refresh()
+        data = aggregator.query()
+
+        assert data['variant_1']['pricing_table_shown'] == 2
+        assert data['variant_1']['revenue_cents'] == 1000
+        assert data['unique_tokens']['variant_1'] == 2
+        assert data['variant_2']['checkout_started'] == 1
+        assert data['total_events'] == 6
+        assert data['date_range'] == {'start': '2025-12-15T09:00:00', 'end': '2025-12-17T12:00:00'}
+
+
+class TestIncrementalRefresh:
+    """Only appended bytes are parsed, each line exactly once."""
+
+    def test_second_refresh_reads_only_new_lines(self, aggregator, log_file):
+        aggregator.refresh()
+        assert aggregator.refresh() == 0
+
+        write_lines(log_file, [LINES[0]])
+        assert aggregator.refresh() == 1
+        assert aggregator.query()['variant_1']['pricing_table_shown'] == 3
+
+    def test_partial_line_waits_for_newline(self, aggregator, log_file):
+        aggregator.refresh()
+
+        with open(log_file, 'a') as f:
+            f.write(LINES[0][:40])
+        assert aggregator.refresh() == 0
+
+        with open(log_file, 'a') as f:
+            f.write(LINES[0][40:] + "\n")
+        assert aggregator.refresh() == 1
+
+    def test_offsets_survive_restart(self, tmp_path, aggregator, log_file):
+        aggregator.refresh()
+
+        restarted = FunnelAggregator(db_path=aggregator.db_path, log_file_path=log_file)
+        assert restarted.refresh() == 0
+        assert restarted.query()['total_events'] == 6
+
+    def test_rotation_reads_rest_of_rotated_file(self, aggregator, log_file):
+        aggregator.refresh()
+        # Written after the last refresh, then the log is rotated
+        write_lines(log_file, [LINES[0]])
+        os.rename(log_file, log_file + ".1")
+        write_lines(log_file, [LINES[3]], mode='w')
+
+        assert aggregator.refresh() == 2
+        data = aggregator.query()
+        assert data['variant_1']['pricing_table_shown'] == 4
+        assert data['total_events'] == 8
+
+    def test_truncation_restarts_from_beginning(self, aggregator, log_file):
+        aggregator.refresh()
+        write_lines(log_file, [LINES[0]], mode='w')
+
+        assert aggregator.refresh() == 1
+        assert aggregator.query()['total_events'] == 7
+
+    def test_missing_log_file(self, tmp_path):
+        aggregator = FunnelAggregator(db_path=str(tmp_path / "funnel.db"), log_file_path=str(tmp_path / "missing.log"))
+
+        assert aggregator.refresh() == 0
+        assert aggregator.query()['total_events'] == 0
+
+
+def test_funnel_data_endpoint_serves_the_last_refresh(tmp_path, log_file, monkeypatch):
+    from fastapi.testclient import TestClient
+    import app
+
+    monkeypatch.setenv('APP_LOG_PATH', log_file)
+    monkeypatch.setenv('FUNNEL_DB_PATH', str(tmp_path / "funnel.db"))
+    client = TestClient(app.app)
+    params = {"from_date": "2025-12-16", "to_date": "2025-12-16"}
+
+    assert client.get("/api/funnel-data", params=params).json()["variant_1"]["pricing_table_shown"] == 0
+
+    # The cron's refresh, not the request, reads the log
+    assert refresh_upgrade_funnel() == 7
+    response = client.get("/api/funnel-data", params=params)
+    assert response.status_code == 200
+    assert response.json()["variant_1"]["pricing_table_shown"] == 1
+
+    write_lines(log_file, [LINES[3]])
+    assert client.get("/api/funnel-data", params=params).json()["variant_1"]["pricing_table_shown"] == 1
+    refresh_upgrade_funnel()
+    assert client.get("/api/funnel-data", params=params).json()["variant_1"]["pricing_table_shown"] == 2
@@ -225,6 +225,152 @@ Smith, J. (2020). _The Book Title_. Publisher.
             # Should not have retried
             assert api_mock.call_count == 1
 
+    @pytest.mark.asyncio
+    async def test_api_call_runs_off_event_loop_thread(self, gemini_provider_new_api):
+        """Test that the blocking SDK call is executed on the worker pool, not the event loop."""
+        import threading
+        loop_thread = threading.current_thread()
+        call_threads = []
+
+        def fake_generate_content(**kwargs):
+            call_threads.append(threading.current_thread())
+            response = Mock()
+            response.text = "ok"
+            return response
+
+        gemini_provider_new_api.client.models.generate_content = Mock(side_effect=fake_generate_content)
+
+        result = await gemini_provider_new_api._call_new_api("Test prompt")
+
+        assert result == "ok"
+        assert len(call_threads) == 1
+        assert call_threads[0] is not loop_thread
+        assert call_threads[0].name.startswith("gemini-call")
+
+    @pytest.mark.asyncio
+    async def test_slow_api_call_does_not_block_event_loop(self, mock_api_key):
+        """Test that concurrent calls overlap and other coroutines keep running."""
+        import time as time_module
+        with patch('providers.gemini_provider.NEW_API_AVAILABLE', True), \
+             patch('providers.gemini_provider.new_genai'):
+            provider = GeminiProvider(api_key=mock_api_key, model="gemini-2.5-flash", max_concurrent_calls=4)
+        provider.client = Mock()
+
+        def slow_generate_content(**kwargs):
+            time_module.sleep(0.2)
+            response = Mock()
+            response.text = "ok"
+            return response
+
+        provider.client.models.generate_content = Mock(side_effect=slow_generate_content)
+
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            for _ in range(5):
+                await asyncio.sleep(0.02)
+                ticks += 1
+
+        start = time_module.monotonic()
+        results = await asyncio.gather(
+            *(provider._call_new_api(f"prompt {i}") for i in range(4)),
+            ticker()
+        )
+        elapsed = time_module.monotonic() - start
+
+        assert results[:4] == ["ok"] * 4
+        # Event loop stayed responsive while calls were in flight
+        assert ticks == 5
+        # Four 0.2s calls ran concurrently rather than back-to-back (0.8s)
+        assert elapsed < 0.6
+
+    def test_max_concurrent_calls_configurable(self, mock_api_key):
+        """Test that the worker pool size follows max_concurrent_calls."""
+        with patch('providers.gemini_provider.NEW_API_AVAILABLE', True), \
+             patch('providers.gemini_provider.new_genai'):
+            provider = GeminiProvider(api_key=mock_api_key, model="gemini-2.5-flash", max_concurrent_calls=3)
+
+        assert provider.max_concurrent_calls == 3
+        assert provider._executor._max_workers == 3
+
+    @pytest.mark.asyncio
+    async def test_large_list_validated_in_concurrent_chunks(self, gemini_provider_new_api):
+        """Test that a large list is chunked, run concurrently, and renumbered in order."""
+        citations = "\n\n".join(f"Author{i}, A. (2020). Title {i}. Publisher." for i in range(1, 26))
+        in_flight = 0
+        peak = 0
+
+        async def fake_chunk(chunk, style):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.05)
+            in_flight -= 1
+            originals = chunk.split("\n\n")
+            return {"results": [
+                {"citation_number": n, "original": text, "source_type": "book", "errors": []}
+                for n, text in enumerate(originals, 1)
+            ]}
+
+        with patch('prompt_manager.CHUNK_OUTPUT_TOKEN_BUDGET', 2000), \
+             patch.object(gemini_provider_new_api, '_validate_chunk', side_effect=fake_chunk) as chunk_mock:
+            result = await gemini_provider_new_api.validate_citations(citations, "apa7")
+
+        assert chunk_mock.call_count > 1
+        assert peak > 1
+        assert [r["citation_number"] for r in result["results"]] == list(range(1, 26))
+        assert [r["original"] for r in result["results"]] == citations.split("\n\n")
+
+    @pytest.mark.asyncio
+    async def test_chunk_results_reported_as_each_chunk_completes(self, gemini_provider_new_api):
+        """Test that on_results receives renumbered results per chunk, fastest first."""
+        citations = "\n\n".join(f"Author{i}, A. (2020). Title {i}. Publisher." for i in range(1, 21))
+        reported = []
+
+        async def fake_chunk(chunk, style):
+            originals = chunk.split("\n\n")
+            # Later chunks finish first
+            await asyncio.sleep(0.1 if "Author1," in chunk else 0.01)
+            return {"results": [
+                {"citation_number": n, "original": text, "source_type": "book", "errors": []}
+                for n, text in enumerate(originals, 1)
+            ]}
+
+        with patch('prompt_manager.CHUNK_OUTPUT_TOKEN_BUDGET', 2000), \
+             patch.object(gemini_provider_new_api, '_validate_chunk', side_effect=fake_chunk):
+            await gemini_provider_new_api.validate_citations(
+                citations, "apa7", on_results=lambda results: reported.append([r["citation_number"] for r in results])
+            )
+
+        assert len(reported) > 1
+        assert 1 not in reported[0]
+        assert sorted(n for batch in reported for n in batch) == list(range(1, 21))
+
+    @pytest.mark.asyncio
+    async def test_small_list_is_single_call(self, gemini_provider_new_api):
+        """Test that short lists skip chunking and make one call."""
+        with patch.object(gemini_provider_new_api, '_validate_chunk',
+                          AsyncMock(return_value={"results": []})) as chunk_mock:
+            await gemini_provider_new_api.validate_citations("Smith, J. (2020). Title.\n\nJones, K. (2019). Other.", "apa7")
+
+        chunk_mock.assert_awaited_once_with("Smith, J. (2020). Title.\n\nJones, K. (2019). Other.", "apa7")
+
+    @pytest.mark.asyncio
+    async def test_chunk_failure_propagates(self, gemini_provider_new_api):
+        """Test that a failing chunk fails the whole validation so fallback can run."""
+        citations = "\n\n".join(f"Author{i}, A. (2020). Title {i}." for i in range(1, 21))
+
+        async def fake_chunk(chunk, style):
+            if "Author1," in chunk:
+                raise Exception("Gemini API error")
+            return {"results": []}
+
+        with patch('prompt_manager.CHUNK_OUTPUT_TOKEN_BUDGET', 1000), \
+             patch.object(gemini_provider_new_api, '_validate_chunk', side_effect=fake_chunk):
+            with pytest.raises(Exception, match="Gemini API error"):
+                await gemini_provider_new_api.validate_citations(citations, "apa7")
+
     def test_parse_response_success(self, gemini_provider_new_api, sample_gemini_response):
         """Test successful response parsing."""
         results = gemini_provider_new_api._parse_response(sample_gemini_response)
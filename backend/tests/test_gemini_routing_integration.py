@@ -192,7 +192,7 @@ class TestGeminiRoutingIntegration:
 
             # Setup mock job with model info
             job_id = "test-job-123"
-            mock_jobs.__getitem__.return_value = {
+            mock_jobs.aget = AsyncMock(return_value={
                 "status": "completed",
                 "results": [{
                     "citation_number": 1,
@@ -203,9 +203,7 @@ class TestGeminiRoutingIntegration:
                 "model_preference": "model_b",
                 "provider_used": "gemini",
                 "fallback_occurred": False
-            }
-            # Also need to support "in" operator for check
-            mock_jobs.__contains__.return_value = True
+            })
 
             async with AsyncClient(transport=ASGITransport(app=app.app), base_url="http://test") as ac:
                 response = await ac.get(f"/api/jobs/{job_id}")
@@ -9,6 +9,9 @@ Tests cover:
 - Orphan extraction
 - Error handling
 """
+import asyncio
+import json
+import time
 import pytest
 from unittest.mock import AsyncMock, Mock, patch
 from inline_validator import (
@@ -108,6 +111,100 @@ class TestValidateInlineCitations:
         # Should be called twice (2 batches)
         assert mock_provider._call_new_api.call_count == 2
 
+    @pytest.mark.asyncio
+    async def test_batches_run_concurrently_and_preserve_order(self):
+        """Test that batches overlap in time and results keep document order."""
+        inline_citations = [
+            {"id": f"c{i}", "text": f"(Author, 2020)"}
+            for i in range(1, 51)
+        ]
+        reference_list = [{"index": 0, "text": "Author, A. (2020). Work."}]
+
+        async def fake_call(prompt):
+            ids = [line.split(":")[0] for line in prompt.splitlines() if line.startswith("c") and ": (" in line]
+            # Earlier batches finish last to exercise ordering
+            await asyncio.sleep(0.25 - int(ids[0][1:]) * 0.004)
+            return json.dumps([{"id": cid, "match_status": "matched", "matched_ref_index": 0} for cid in ids])
+
+        mock_provider = Mock()
+        mock_provider._call_new_api = AsyncMock(side_effect=fake_call)
+
+        start = time.monotonic()
+        result = await validate_inline_citations(
+            inline_citations=inline_citations,
+            reference_list=reference_list,
+            style="apa7",
+            provider=mock_provider
+        )
+        elapsed = time.monotonic() - start
+
+        assert mock_provider._call_new_api.call_count == 5
+        assert [r["id"] for r in result["results_by_ref"][0]] == [f"c{i}" for i in range(1, 51)]
+        # Five ~0.25s batches should take about one batch's latency, not five
+        assert elapsed < 0.6
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_does_not_affect_others(self):
+        """Test that one failing batch yields placeholders while others succeed."""
+        inline_citations = [
+            {"id": f"c{i}", "text": f"(Author, 2020)"}
+            for i in range(1, 21)
+        ]
+        reference_list = [{"index": 0, "text": "Author, A. (2020). Work."}]
+
+        async def fake_call(prompt):
+            if "c1: " in prompt:
+                raise Exception("quota exceeded")
+            return json.dumps([{"id": f"c{i}", "match_status": "matched", "matched_ref_index": 0} for i in range(11, 21)])
+
+        mock_provider = Mock()
+        mock_provider._call_new_api = AsyncMock(side_effect=fake_call)
+
+        result = await validate_inline_citations(
+            inline_citations=inline_citations,
+            reference_list=reference_list,
+            style="apa7",
+            provider=mock_provider
+        )
+
+        assert result["total_validated"] == 20
+        assert [o["id"] for o in result["orphans"]] == [f"c{i}" for i in range(1, 11)]
+        assert all("quota exceeded" in o["mismatch_reason"] for o in result["orphans"])
+        assert [r["id"] for r in result["results_by_ref"][0]] == [f"c{i}" for i in range(11, 21)]
+
+    @pytest.mark.asyncio
+    async def test_per_job_concurrency_cap(self):
+        """Test that no more than MAX_CONCURRENT_BATCHES_PER_JOB batches are in flight."""
+        inline_citations = [
+            {"id": f"c{i}", "text": f"(Author, 2020)"}
+            for i in range(1, 61)
+        ]
+        reference_list = [{"index": 0, "text": "Author, A. (2020). Work."}]
+        in_flight = 0
+        peak = 0
+
+        async def fake_call(prompt):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return '{"results": []}'
+
+        mock_provider = Mock()
+        mock_provider._call_new_api = AsyncMock(side_effect=fake_call)
+
+        with patch('inline_validator.MAX_CONCURRENT_BATCHES_PER_JOB', 2):
+            await validate_inline_citations(
+                inline_citations=inline_citations,
+                reference_list=reference_list,
+                style="apa7",
+                provider=mock_provider
+            )
+
+        assert mock_provider._call_new_api.call_count == 6
+        assert peak == 2
+
 
 class TestParseInlineResponse:
     """Tests for _parse_inline_response function."""
@@ -186,3 +186,84 @@ class TestStyleSupport:
         # Wait for completion
         result_data = wait_for_job_completion(job_id)
         assert result_data["status"] == "completed"
+
+
+class TestPipelinedInlineValidation:
+    """Tests for running ref-list and inline validation concurrently."""
+
+    HTML = """
+    <p>According to (Smith, 2019) and (Jones, 2020), the results...</p>
+    <h2>References</h2>
+    <p>Smith, J. (2019). Title. Journal.</p>
+    <p>Jones, K. (2020). Article. Journal.</p>
+    """
+
+    def _create_job(self, job_id):
+        import app as app_module
+        app_module.jobs.create(job_id, {
+            "status": "pending",
+            "created_at": time.time(),
+            "results": None,
+            "error": None,
+            "token": None,
+            "free_used": 0,
+            "style": "apa7",
+            "model_preference": "model_a",
+        })
+        return app_module
+
+    @pytest.mark.asyncio
+    async def test_inline_starts_before_ref_validation_finishes(self):
+        """Inline matching should use local ref entries and overlap the ref LLM call."""
+        import asyncio
+        from unittest.mock import patch
+
+        app_module = self._create_job("pipelined-job")
+        events = []
+        seen_refs = []
+
+        async def fake_ref_validation(**kwargs):
+            events.append("ref_start")
+            await asyncio.sleep(0.1)
+            events.append("ref_end")
+            return {"results": [
+                {"citation_number": 1, "original": "Smith, J. (2019). Title. Journal.", "source_type": "journal", "errors": []},
+                {"citation_number": 2, "original": "Jones, K. (2020). Article. Journal.", "source_type": "journal", "errors": []},
+            ]}
+
+        async def fake_inline_validation(inline_citations, reference_list, style, provider):
+            events.append("inline_start")
+            seen_refs.extend(reference_list)
+            return {"results_by_ref": {0: [], 1: []}, "orphans": [], "total_found": len(inline_citations), "total_validated": 0}
+
+        with patch.object(app_module, "validate_with_provider_fallback", side_effect=fake_ref_validation), \
+             patch.object(app_module, "validate_inline_citations", side_effect=fake_inline_validation):
+            await app_module.process_validation_job_with_inline("pipelined-job", self.HTML, self.HTML, "apa7")
+
+        job = app_module.jobs["pipelined-job"]
+        app_module.jobs.delete("pipelined-job")
+        assert job["status"] == "completed"
+        assert events.index("inline_start") < events.index("ref_end")
+        assert [r["index"] for r in seen_refs] == [0, 1]
+        assert seen_refs[0]["text"].startswith("Smith, J. (2019)")
+
+    @pytest.mark.asyncio
+    async def test_inline_failure_reuses_ref_results(self):
+        """A failed inline check should not trigger a second ref-list LLM call."""
+        from unittest.mock import AsyncMock, patch
+
+        app_module = self._create_job("inline-fail-job")
+        ref_validation = AsyncMock(return_value={"results": [
+            {"citation_number": 1, "original": "Smith, J. (2019). Title. Journal.", "source_type": "journal", "errors": []},
+            {"citation_number": 2, "original": "Jones, K. (2020). Article. Journal.", "source_type": "journal", "errors": []},
+        ]})
+
+        with patch.object(app_module, "validate_with_provider_fallback", ref_validation), \
+             patch.object(app_module, "validate_inline_citations", AsyncMock(side_effect=Exception("boom"))):
+            await app_module.process_validation_job_with_inline("inline-fail-job", self.HTML, self.HTML, "apa7")
+
+        job = app_module.jobs["inline-fail-job"]
+        app_module.jobs.delete("inline-fail-job")
+        assert job["status"] == "completed"
+        assert ref_validation.await_count == 1
+        assert len(job["results"]["results"]) == 2
@@ -0,0 +1,252 @@
+"""Tests for job_store.py job storage backends."""
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from job_store import InMemoryJobStore, SQLiteJobStore, JobStore, create_job_store
+
+
+def make_job(status="pending", created_at=None):
+    return {
+        "status": status,
+        "created_at": created_at if created_at is not None else time.time(),
+        "results": None,
+        "error": None,
+        "token": None,
+        "free_used": 0,
+    }
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return InMemoryJobStore()
+    return SQLiteJobStore(str(tmp_path / "jobs.db"))
+
+
+class TestJobStoreBasics:
+    """Behaviour shared by every JobStore backend."""
+
+    def test_create_and_get(self, store):
+        store.create("job-1", make_job())
+
+        assert "job-1" in store
+        assert store["job-1"]["status"] == "pending"
+        assert store.get("missing") is None
+        assert len(store) == 1
+
+    def test_missing_job_raises_key_error(self, store):
+        with pytest.raises(KeyError):
+            store["missing"]
+
+    def test_update_merges_fields(self, store):
+        store.create("job-1", make_job())
+
+        assert store.update("job-1", status="completed", results={"results": []}, results_gated=False)
+        job = store["job-1"]
+        assert job["status"] == "completed"
+        assert job["results"] == {"results": []}
+        assert job["free_used"] == 0
+
+    def test_update_missing_job(self, store):
+        assert store.update("missing", status="failed") is False
+
+    def test_returned_job_is_a_copy(self, store):
+        store.create("job-1", make_job())
+        store["job-1"]["status"] = "failed"
+
+        assert store["job-1"]["status"] == "pending"
+
+    def test_transition_requires_expected_status(self, store):
+        store.create("job-1", make_job())
+
+        assert store.transition("job-1", ("pending",), "processing")
+        assert store["job-1"]["status"] == "processing"
+        # Second claim loses
+        assert store.transition("job-1", ("pending",), "processing") is False
+        assert store.transition("missing", ("pending",), "processing") is False
+
+    def test_transition_writes_extra_fields(self, store):
+        store.create("job-1", make_job(status="processing"))
+
+        assert store.transition("job-1", ("processing",), "failed", error="boom")
+        assert store["job-1"]["error"] == "boom"
+
+    def test_delete_expired(self, store):
+        store.create("old", make_job(created_at=time.time() - 3600))
+        store.create("new", make_job())
+
+        assert store.delete_expired(30 * 60) == ["old"]
+        assert "old" not in store
+        assert "new" in store
+
+    def test_items_and_values(self, store):
+        store.create("job-1", make_job())
+        store.create("job-2", make_job(status="completed"))
+
+        assert dict(store.items()).keys() == {"job-1", "job-2"}
+        assert sorted(job["status"] for job in store.values()) == ["completed", "pending"]
+
+    def test_fail_stale_fails_abandoned_jobs(self, store):
+        with patch("job_store.time.time", return_value=time.time() - 3600):
+            store.create("abandoned", make_job(status="processing"))
+            store.create("never-started", make_job())
+            store.create("done", make_job(status="completed"))
+        store.create("running", make_job(status="processing"))
+
+        assert sorted(store.fail_stale(10 * 60, "Please try again.")) == ["abandoned", "never-started"]
+        assert store["abandoned"]["status"] == "failed"
+        assert store["abandoned"]["error"] == "Please try again."
+        assert store["done"]["status"] == "completed"
+        assert store["running"]["status"] == "processing"
+        assert store.fail_stale(10 * 60, "Please try again.") == []
+
+
+    def test_partial_results_are_read_incrementally(self, store):
+        store.create("job-1", make_job(status="processing"))
+        assert store.add_partial_results("job-1", [{"citation_number": 2}])
+
+        first, cursor = store.get_partial_results("job-1")
+        assert first == [{"citation_number": 2}]
+        assert store.get_partial_results("job-1", cursor) == ([], cursor)
+
+        store.add_partial_results("job-1", [{"citation_number": 1}, {"citation_number": 2, "errors": []}])
+        later, _ = store.get_partial_results("job-1", cursor)
+        assert later == [{"citation_number": 1}, {"citation_number": 2, "errors": []}]
+        assert store["job-1"]["partial_results"] == later
+        assert not store.add_partial_results("missing", [{"citation_number": 1}])
+
+    def test_state_version_changes_on_every_write(self, store):
+        store.create("job-1", make_job())
+        status, version = store.get_state("job-1")
+
+        store.add_partial_results("job-1", [{"citation_number": 1}])
+        store.transition("job-1", ("pending",), "processing")
+
+        assert store.get_state("job-1")[0] == "processing"
+        assert store.get_state("job-1")[1] > version
+        assert status == "pending"
+        assert store.get_state("missing") is None
+
+    def test_async_facade_runs_off_the_event_loop(self, store):
+        threads = []
+        original_get = store.get
+
+        def tracking_get(*args):
+            threads.append(threading.get_ident())
+            return original_get(*args)
+
+        async def main():
+            await store.acreate("job-1", make_job())
+            assert await store.atransition("job-1", ("pending",), "processing")
+            with patch.object(store, "get", tracking_get):
+                return await store.aget("job-1")
+
+        assert asyncio.run(main())["status"] == "processing"
+        assert threads and threads[0] != threading.get_ident()
+
+
+class TestSQLiteJobStore:
+    """SQLite-specific behaviour: persistence and sharing across workers."""
+
+    def test_jobs_survive_restart(self, tmp_path):
+        db_path = str(tmp_path / "jobs.db")
+        SQLiteJobStore(db_path).create("job-1", make_job())
+
+        assert SQLiteJobStore(db_path)["job-1"]["status"] == "pending"
+
+    def test_only_one_worker_claims_a_job(self, tmp_path):
+        db_path = str(tmp_path / "jobs.db")
+        SQLiteJobStore(db_path).create("job-1", make_job())
+
+        workers = [SQLiteJobStore(db_path) for _ in range(8)]
+        claims = []
+        barrier = threading.Barrier(len(workers))
+
+        def claim(worker):
+            barrier.wait()
+            claims.append(worker.transition("job-1", ("pending",), "processing"))
+
+        threads = [threading.Thread(target=claim, args=(w,)) for w in workers]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert claims.count(True) == 1
+
+    def test_updates_visible_to_other_workers(self, tmp_path):
+        db_path = str(tmp_path / "jobs.db")
+        api_worker = SQLiteJobStore(db_path)
+        background_worker = SQLiteJobStore(db_path)
+
+        api_worker.create("job-1", make_job())
+        background_worker.update("job-1", status="completed", results={"results": []})
+
+        assert api_worker["job-1"]["status"] == "completed"
+
+
+class TestCreateJobStore:
+    """Backend selection via JOB_STORE."""
+
+    def test_default_is_sqlite(self, monkeypatch, tmp_path):
+        monkeypatch.delenv("JOB_STORE", raising=False)
+        monkeypatch.setenv("JOBS_DB_PATH", str(tmp_path / "jobs.db"))
+
+        store = create_job_store()
+        assert isinstance(store, SQLiteJobStore)
+        assert store.db_path == str(tmp_path / "jobs.db")
+
+    def test_memory_backend(self, monkeypatch):
+        monkeypatch.setenv("JOB_STORE", "memory")
+
+        store = create_job_store()
+        assert isinstance(store, InMemoryJobStore)
+        assert isinstance(store, JobStore)
+
+    def test_unknown_backend(self, monkeypatch):
+        monkeypatch.setenv("JOB_STORE", "redis")
+
+        with pytest.raises(ValueError, match="Unknown JOB_STORE"):
+            create_job_store()
+
+
+def test_dashboard_stats_read_the_store_once(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+    import app
+
+    store = SQLiteJobStore(str(tmp_path / "jobs.db"))
+    store.create("job-1", {**make_job(status="completed"), "citation_count": 3, "processing_time": "2.0s"})
+    store.create("job-2", {**make_job(status="failed"), "citation_count": 1})
+    monkeypatch.setattr(app, "jobs", store)
+
+    with patch.object(store, "values", wraps=store.values) as values, \
+            patch.object(app, "get_citation_pipeline_metrics", return_value={}):
+        stats = TestClient(app.app).get("/api/dashboard/stats").json()
+
+    assert values.call_count == 1
+    assert (stats["total_requests"], stats["completed"], stats["failed"]) == (2, 1, 1)
+    assert stats["total_citations"] == 4
+    assert stats["avg_processing_time"] == "2.0s"
+
+
+def test_orphaned_job_polls_as_failed_after_restart(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+    import app
+
+    db_path = str(tmp_path / "jobs.db")
+    with patch("job_store.time.time", return_value=time.time() - 3600):
+        SQLiteJobStore(db_path).create("job-1", make_job(status="processing"))
+
+    # A new worker starts on the same database after the old one died
+    monkeypatch.setattr(app, "jobs", SQLiteJobStore(db_path))
+    with patch.object(app, "update_validation_tracking") as tracking:
+        asyncio.run(app.fail_orphaned_jobs())
+
+    response = TestClient(app.app).get("/api/jobs/job-1").json()
+    assert response["status"] == "failed"
+    assert response["error"] == app.ORPHANED_JOB_ERROR
+    tracking.assert_called_once_with("job-1", status="failed", error_message=app.ORPHANED_JOB_ERROR)
@@ -0,0 +1,174 @@
+"""Tests for streaming job progress (/api/jobs/{job_id}/stream)."""
+import asyncio
+import json
+import time
+
+import pytest
+from unittest.mock import patch
+
+import app
+
+
+def make_result(n):
+    return {"citation_number": n, "original": f"Citation {n}", "source_type": "journal", "errors": []}
+
+
+def parse_events(chunks):
+    """Parse SSE text into (event, data) tuples, skipping comments."""
+    events = []
+    for message in "".join(chunks).split("\n\n"):
+        if not message.strip() or message.startswith(":"):
+            continue
+        lines = dict(line.split(": ", 1) for line in message.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+@pytest.fixture
+def job_id():
+    job_id = f"stream-test-{time.time()}"
+    app.jobs.create(job_id, {
+        "status": "processing",
+        "created_at": time.time(),
+        "results": None,
+        "error": None,
+        "token": None,
+        "free_used": 0,
+        "user_type": "free",
+        "citation_total": 3,
+    })
+    yield job_id
+    app.jobs.delete(job_id)
+
+
+class TestPartialResultRecorder:
+    """PartialResultRecorder on_results callback."""
+
+    @pytest.mark.asyncio
+    async def test_results_stored_in_citation_order(self, job_id):
+        on_results = app.PartialResultRecorder(job_id)
+        on_results([make_result(3)])
+        await asyncio.sleep(0)
+        on_results([make_result(1), make_result(2)])
+        await on_results.flush()
+
+        assert [r["citation_number"] for r in app.jobs[job_id]["partial_results"]] == [1, 2, 3]
+
+    @pytest.mark.asyncio
+    async def test_redelivered_result_replaces_earlier_one(self, job_id):
+        on_results = app.PartialResultRecorder(job_id)
+        on_results([make_result(1)])
+        await asyncio.sleep(0)
+        on_results([{**make_result(1), "source_type": "book"}])
+        await on_results.flush()
+
+        assert app.jobs[job_id]["partial_results"] == [{**make_result(1), "source_type": "book"}]
+
+    @pytest.mark.asyncio
+    async def test_only_new_results_are_written_in_batches(self, job_id):
+        on_results = app.PartialResultRecorder(job_id)
+        with patch.object(app.jobs, "add_partial_results", wraps=app.jobs.add_partial_results) as add:
+            for n in range(1, 21):
+                on_results([make_result(n)])
+                await asyncio.sleep(0)
+            await on_results.flush()
+
+        assert len(app.jobs[job_id]["partial_results"]) == 20
+        assert 1 < add.call_count < 20
+        assert sum(len(call.args[1]) for call in add.call_args_list) == 20
+
+
+class TestStreamJobProgress:
+    """SSE endpoint behaviour."""
+
+    @pytest.mark.asyncio
+    async def test_results_stream_before_completion(self, job_id):
+        response = await app.stream_job_progress(job_id)
+        chunks = []
+        status_at_first_result = []
+
+        async def consume():
+            async for chunk in response.body_iterator:
+                chunks.append(chunk)
+                if "event: result" in chunk and not status_at_first_result:
+                    status_at_first_result.append(app.jobs[job_id]["status"])
+
+        async def produce():
+            on_results = app.PartialResultRecorder(job_id)
+            await asyncio.sleep(0.1)
+            on_results([make_result(1)])
+            await asyncio.sleep(0.5)
+            on_results([make_result(2), make_result(3)])
+            await on_results.flush()
+            app.jobs.update(job_id, status="completed", results={"results": [make_result(n) for n in (1, 2, 3)]})
+
+        with patch.object(app, "JOB_STREAM_POLL_INTERVAL", 0.02):
+            await asyncio.wait_for(asyncio.gather(consume(), produce()), timeout=5)
+
+        assert status_at_first_result == ["processing"]
+        events = parse_events(chunks)
+        names = [name for name, _ in events]
+        assert [data["citation_number"] for name, data in events if name == "result"] == [1, 2, 3]
+        assert names.index("result") < names.index("completed")
+        assert names[-1] == "completed"
+        assert events[-1][1]["results"]["results"][0]["citation_number"] == 1
+
+    @pytest.mark.asyncio
+    async def test_free_limit_applied_incrementally(self, job_id):
+        app.jobs.update(
+            job_id,
+            free_used=app.FREE_LIMIT - 2,
+            partial_results=[make_result(n) for n in (1, 2, 3)],
+            status="completed",
+            results={"results": [], "partial": True}
+        )
+
+        response = await app.stream_job_progress(job_id)
+        events = parse_events([chunk async for chunk in response.body_iterator])
+
+        assert [data["citation_number"] for name, data in events if name == "result"] == [1, 2]
+        progress = [data for name, data in events if name == "progress"][-1]
+        assert progress == {"validated": 3, "total": 3, "locked": 1}
+
+    @pytest.mark.asyncio
+    async def test_poll_reads_only_new_results(self, job_id):
+        app.jobs.add_partial_results(job_id, [make_result(1)])
+        response = await app.stream_job_progress(job_id)
+        chunks = []
+
+        async def consume():
+            async for chunk in response.body_iterator:
+                chunks.append(chunk)
+
+        async def produce():
+            await asyncio.sleep(0.2)
+            app.jobs.add_partial_results(job_id, [make_result(2)])
+            await asyncio.sleep(0.2)
+            app.jobs.update(job_id, status="completed", results={"results": []})
+
+        with patch.object(app, "JOB_STREAM_POLL_INTERVAL", 0.02), \
+                patch.object(app.jobs, "get", wraps=app.jobs.get) as get, \
+                patch.object(app.jobs, "get_partial_results", wraps=app.jobs.get_partial_results) as read:
+            await asyncio.wait_for(asyncio.gather(consume(), produce()), timeout=5)
+
+        # Once for the job's details, once for the final response; results once each
+        assert get.call_count == 2
+        assert read.call_count == 3
+        events = parse_events(chunks)
+        assert [data["citation_number"] for name, data in events if name == "result"] == [1, 2]
+        assert [data for name, data in events if name == "progress"][-1]["validated"] == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_job(self, job_id):
+        app.jobs.update(job_id, status="failed", error="boom")
+
+        response = await app.stream_job_progress(job_id)
+        events = parse_events([chunk async for chunk in response.body_iterator])
+
+        assert events[-1] == ("failed", {"status": "failed", "error": "boom"})
+
+    def test_unknown_job_returns_404(self):
+        from fastapi.testclient import TestClient
+
+        response = TestClient(app.app).get("/api/jobs/does-not-exist/stream")
+        assert response.status_code == 404
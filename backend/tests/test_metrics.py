@@ -0,0 +1,111 @@
+"""Tests for metrics.py registry and the /metrics endpoint."""
+import base64
+import sqlite3
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from metrics import SQLITE_ERRORS, MetricsRegistry, count_sqlite_error
+
+
+class TestMetricsRegistry:
+    def test_exposition_format(self):
+        registry = MetricsRegistry()
+        requests = registry.counter("test_requests_total", "Requests\nby route", ("route", "status"))
+        in_flight = registry.gauge("test_in_flight", "Jobs in flight")
+        latency = registry.histogram("test_latency_seconds", "Latency", ("route",), buckets=(0.1, 1))
+
+        requests.inc(route="/api/jobs/{job_id}", status=200)
+        requests.inc(2, route='/say "hi"', status=500)
+        in_flight.inc()
+        in_flight.inc()
+        in_flight.dec()
+        latency.observe(0.05, route="/a")
+        latency.observe(0.5, route="/a")
+        latency.observe(5, route="/a")
+
+        assert registry.exposition().splitlines() == [
+            "# HELP test_requests_total Requests\\nby route",
+            "# TYPE test_requests_total counter",
+            'test_requests_total{route="/api/jobs/{job_id}",status="200"} 1',
+            'test_requests_total{route="/say \\"hi\\"",status="500"} 2',
+            "# HELP test_in_flight Jobs in flight",
+            "# TYPE test_in_flight gauge",
+            "test_in_flight 1",
+            "# HELP test_latency_seconds Latency",
+            "# TYPE test_latency_seconds histogram",
+            'test_latency_seconds_bucket{route="/a",le="0.1"} 1',
+            'test_latency_seconds_bucket{route="/a",le="1"} 2',
+            'test_latency_seconds_bucket{route="/a",le="+Inf"} 3',
+            'test_latency_seconds_sum{route="/a"} 5.55',
+            'test_latency_seconds_count{route="/a"} 3',
+        ]
+
+    def test_function_values_are_read_at_scrape_time(self):
+        registry = MetricsRegistry()
+        size = registry.gauge("test_size", "Size")
+        events = registry.counter("test_events_total", "Events", ("event",))
+        items = []
+        size.set_function(lambda: len(items))
+        events.set_function(lambda: {("checkouts",): 3})
+
+        items.append(1)
+        exposition = registry.exposition()
+
+        assert "test_size 1\n" in exposition
+        assert 'test_events_total{event="checkouts"} 3\n' in exposition
+
+    def test_invalid_use_is_rejected(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("test_total", "Test", ("provider",))
+
+        with pytest.raises(ValueError):
+            counter.inc(provider="gemini", model="x")
+        with pytest.raises(ValueError):
+            counter.inc(-1, provider="gemini")
+        with pytest.raises(ValueError):
+            registry.gauge("test_total", "Duplicate")
+
+
+def test_sqlite_busy_errors_are_counted_separately():
+    before = SQLITE_ERRORS.samples()
+    count_sqlite_error(sqlite3.OperationalError("database is locked"), "jobs")
+    count_sqlite_error(sqlite3.OperationalError("no such table: jobs"), "jobs")
+    after = SQLITE_ERRORS.samples()
+
+    assert after[("jobs", "busy")] == before.get(("jobs", "busy"), 0) + 1
+    assert after[("jobs", "other")] == before.get(("jobs", "other"), 0) + 1
+
+
+def test_metrics_endpoint_reports_requests_and_jobs():
+    from app import app
+
+    client = TestClient(app)
+    headers = {"X-Free-Used": base64.b64encode(b"10").decode()}
+    response = client.post("/api/validate/async", json={"citations": "<p>Test citation</p>", "style": "apa7"},
+                           headers=headers)
+    job_id = response.json()["job_id"]
+    for _ in range(30):
+        if client.get(f"/api/jobs/{job_id}").json()["status"] == "completed":
+            break
+        time.sleep(1)
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+
+    samples = {}
+    for line in response.text.splitlines():
+        if not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+
+    assert samples['citations_http_requests_total{method="POST",route="/api/validate/async",status="200"}'] >= 1
+    assert samples['citations_http_requests_total{method="GET",route="/api/jobs/{job_id}",status="200"}'] >= 1
+    assert samples['citations_jobs_created_total{user_type="free"}'] >= 1
+    assert samples['citations_jobs_finished_total{status="completed"}'] >= 1
+    assert samples['citations_gating_decisions_total{user_type="free",gated="true"}'] >= 1
+    assert samples["citations_jobs_in_flight"] == 0
+    assert samples["citations_job_store_size"] >= 1
+    assert any(name.startswith("citations_job_stage_seconds_count{stage=\"queue_wait\"") for name in samples)
@@ -93,6 +93,64 @@ class TestBuildPromptStyles:
         assert "MLA" in prompt.upper()
 
 
+class TestSplitCitations:
+    """Test PromptManager.split_citations."""
+
+    def test_split_on_blank_lines_joins_wrapped_lines(self):
+        """Blank lines separate citations; wrapped lines are joined."""
+        pm = PromptManager()
+        text = "Smith, J. (2020).\nTitle.\n\n\nJones, K. (2019). Other."
+        assert pm.split_citations(text) == ["Smith, J. (2020). Title.", "Jones, K. (2019). Other."]
+
+    def test_list_without_blank_lines_has_one_citation_per_line(self):
+        """Single-newline separated lists are split per line, as the LLM numbers them."""
+        pm = PromptManager()
+        text = "\n".join(f"Author{i}, A. (2020). Title {i}." for i in range(30))
+        assert len(pm.split_citations(text)) == 30
+        assert pm.format_citations(text).count("\n\n") == 29
+
+    def test_split_matches_format_numbering(self):
+        """Index i of the split is CITATION #(i+1) in the formatted prompt."""
+        pm = PromptManager()
+        text = "A. (2020). One.\n\nB. (2021). Two."
+        formatted = pm.format_citations(text)
+        for i, citation in enumerate(pm.split_citations(text), 1):
+            assert f"{i}. {citation}" in formatted
+
+    def test_split_empty_text(self):
+        """Empty text yields no citations."""
+        assert PromptManager().split_citations("  \n\n ") == []
+
+
+class TestChunkCitations:
+    """Test PromptManager.chunk_citations."""
+
+    def test_short_list_is_one_chunk(self):
+        """Short lists stay in a single chunk."""
+        pm = PromptManager()
+        text = "A. (2020). One.\n\nB. (2021). Two."
+        assert pm.chunk_citations(text) == [text]
+
+    def test_chunks_respect_budget_and_order(self):
+        """Each chunk stays within the estimated output budget; order is kept."""
+        from prompt_manager import estimate_output_tokens
+        pm = PromptManager()
+        citations = [f"Author{i}, A. (2020). Title number {i}. Publisher." for i in range(30)]
+        chunks = pm.chunk_citations("\n\n".join(citations), token_budget=2000)
+
+        assert len(chunks) > 1
+        for chunk in chunks:
+            assert sum(estimate_output_tokens(c) for c in pm.split_citations(chunk)) <= 2000
+        assert [c for chunk in chunks for c in pm.split_citations(chunk)] == citations
+
+    def test_oversized_citation_gets_own_chunk(self):
+        """A citation larger than the budget is not dropped."""
+        pm = PromptManager()
+        huge = "X" * 20000
+        chunks = pm.chunk_citations(f"A. (2020). One.\n\n{huge}\n\nB. (2021). Two.", token_budget=1000)
+        assert chunks == ["A. (2020). One.", huge, "B. (2021). Two."]
+
+
 class TestApiStylesEndpoint:
     """Test /api/styles endpoint behavior."""
 
@@ -0,0 +1,293 @@
+"""Tests for streamed validation: CitationValidator.stream_citations, the providers and app.stream_with_provider_fallback."""
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
+
+import pytest
+from openai import RateLimitError
+
+import app
+from providers.base import CitationValidator
+from providers.gemini_provider import GeminiProvider
+from providers.mock_provider import MockProvider
+from providers.openai_provider import OpenAIProvider
+from prompt_manager import PromptManager
+
+RULE = "═" * 40
+SEPARATOR = "─" * 40
+
+
+def block(number, original):
+    return (f"{RULE}\nCITATION #{number}\n{RULE}\nORIGINAL: {original}\nSOURCE TYPE: Book\n"
+            f"VALIDATION RESULTS:\n❌ Title: Wrong case\nShould be: fixed\n{SEPARATOR}\n"
+            f"CORRECTED CITATION:\n{original} Fixed.\n{SEPARATOR}\n")
+
+
+def response_for(citations):
+    entries = [entry for entry in citations.split("\n\n") if entry.strip()]
+    return "".join(block(i, entry) for i, entry in enumerate(entries, 1))
+
+
+def deltas(text, size=9):
+    return [text[start:start + size] for start in range(0, len(text), size)]
+
+
+def citation_list(count):
+    return "\n\n".join(f"Author{i}, A. (2020). Title {i}." for i in range(1, count + 1))
+
+
+class FakeStreamingProvider(CitationValidator):
+    """Streams a well-formed response for whatever it is asked to validate."""
+
+    def __init__(self):
+        self.prompt_manager = PromptManager()
+        self.delivered = []
+
+    async def validate_citations(self, citations, style="apa7", on_results=None):
+        raise NotImplementedError
+
+    async def stream_citations(self, citations, style="apa7"):
+        async for result in self._stream_in_chunks(citations, style, self._stream_chunk):
+            yield result
+
+    async def _stream_chunk(self, citations, style):
+        for text in deltas(response_for(citations)):
+            self.delivered.append(text)
+            await asyncio.sleep(0)
+            yield text
+
+
+async def collect(results):
+    return [result async for result in results]
+
+
+@pytest.mark.asyncio
+async def test_blocks_are_yielded_before_the_response_ends():
+    provider = FakeStreamingProvider()
+    results = provider.stream_citations(citation_list(3))
+
+    first = await results.__anext__()
+    assert first["citation_number"] == 1
+    assert len("".join(provider.delivered)) < len(response_for(citation_list(3)))
+
+    rest = await collect(results)
+    assert [result["citation_number"] for result in rest] == [2, 3]
+
+
+@pytest.mark.asyncio
+async def test_chunks_are_renumbered_by_offset():
+    provider = FakeStreamingProvider()
+    with patch("prompt_manager.CHUNK_OUTPUT_TOKEN_BUDGET", 1000):
+        chunks = provider.prompt_manager.chunk_citations(citation_list(20))
+        results = await collect(provider.stream_citations(citation_list(20)))
+
+    assert len(chunks) > 1
+    assert sorted(result["citation_number"] for result in results) == list(range(1, 21))
+    assert {result["original"] for result in results} == {
+        f"Author{i}, A. (2020). Title {i}." for i in range(1, 21)
+    }
+
+
+@pytest.mark.asyncio
+async def test_default_stream_yields_validate_citations_results():
+    results = await collect(MockProvider().stream_citations("First citation.\nSecond citation."))
+
+    assert [result["citation_number"] for result in results] == [1, 2]
+
+
+def openai_events(text, usage=None):
+    events = [SimpleNamespace(type="response.output_text.delta", delta=piece) for piece in deltas(text)]
+    events.append(SimpleNamespace(type="response.completed", response=SimpleNamespace(
+        usage=usage or SimpleNamespace(input_tokens=10, output_tokens=20, total_tokens=30))))
+    return events
+
+
+class FakeOpenAIStream:
+    def __init__(self, events, error=None):
+        self.events = events
+        self.error = error
+        self.closed = False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for event in self.events:
+            yield event
+        if self.error:
+            raise self.error
+
+    async def close(self):
+        self.closed = True
+
+
+def rate_limit():
+    return RateLimitError(message="Rate limited", response=MagicMock(), body={})
+
+
+class TestOpenAIStreaming:
+    @pytest.fixture
+    def provider(self):
+        return OpenAIProvider(api_key="test-key")
+
+    @pytest.mark.asyncio
+    async def test_streams_results(self, provider):
+        stream = FakeOpenAIStream(openai_events(response_for(citation_list(2))))
+        provider.client = Mock()
+        provider.client.responses.create = AsyncMock(return_value=stream)
+
+        results = await collect(provider.stream_citations(citation_list(2)))
+
+        assert [result["citation_number"] for result in results] == [1, 2]
+        assert results[0]["corrected_citation"] == "Author1, A. (2020). Title 1. Fixed."
+        assert provider.client.responses.create.call_args.kwargs["stream"] is True
+        assert stream.closed
+
+    @pytest.mark.asyncio
+    async def test_retries_before_first_text(self, provider):
+        provider.client = Mock()
+        provider.client.responses.create = AsyncMock(side_effect=[
+            rate_limit(), FakeOpenAIStream(openai_events(response_for(citation_list(1))))
+        ])
+
+        with patch("providers.openai_provider.asyncio.sleep", AsyncMock()):
+            results = await collect(provider.stream_citations(citation_list(1)))
+
+        assert len(results) == 1
+        assert provider.client.responses.create.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_no_retry_after_text(self, provider):
+        partial = openai_events(block(1, "Author1, A. (2020). Title 1.") + RULE)[:-1]
+        provider.client = Mock()
+        provider.client.responses.create = AsyncMock(return_value=FakeOpenAIStream(partial, error=rate_limit()))
+
+        results = provider.stream_citations(citation_list(2))
+        assert (await results.__anext__())["citation_number"] == 1
+        with pytest.raises(ValueError):
+            await results.__anext__()
+        assert provider.client.responses.create.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_closing_early_closes_the_stream(self, provider):
+        stream = FakeOpenAIStream(openai_events(response_for(citation_list(3))))
+        provider.client = Mock()
+        provider.client.responses.create = AsyncMock(return_value=stream)
+
+        results = provider.stream_citations(citation_list(3))
+        await results.__anext__()
+        await results.aclose()
+
+        assert stream.closed
+
+
+class TestGeminiStreaming:
+    @pytest.fixture
+    def provider(self):
+        with patch('providers.gemini_provider.NEW_API_AVAILABLE', True), \
+             patch('providers.gemini_provider.new_genai'):
+            provider = GeminiProvider(api_key="test-gemini-api-key", model="gemini-2.5-flash")
+        provider.client = Mock()
+        provider.use_new_api = True
+        return provider
+
+    @staticmethod
+    def chunks(text):
+        pieces = [SimpleNamespace(text=piece, usage_metadata=None) for piece in deltas(text)]
+        pieces[-1].usage_metadata = SimpleNamespace(
+            prompt_token_count=10, candidates_token_count=20, total_token_count=30)
+        return pieces
+
+    @pytest.mark.asyncio
+    async def test_streams_results_from_worker_pool(self, provider):
+        provider.client.models.generate_content_stream = Mock(
+            return_value=iter(self.chunks(response_for(citation_list(3)))))
+
+        results = await collect(provider.stream_citations(citation_list(3)))
+
+        assert [result["citation_number"] for result in results] == [1, 2, 3]
+        assert provider.client.models.generate_content_stream.call_args.kwargs["model"] == "gemini-2.5-flash"
+
+    @pytest.mark.asyncio
+    async def test_retryable_error_before_first_text_is_retried(self, provider):
+        provider.client.models.generate_content_stream = Mock(side_effect=[
+            Exception("Resource exhausted"), iter(self.chunks(response_for(citation_list(1))))
+        ])
+
+        with patch("providers.gemini_provider.asyncio.sleep", AsyncMock()):
+            results = await collect(provider.stream_citations(citation_list(1)))
+
+        assert len(results) == 1
+        assert provider.client.models.generate_content_stream.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_error_after_text_propagates(self, provider):
+        def failing_stream():
+            yield from self.chunks(block(1, "Author1, A. (2020). Title 1."))
+            raise Exception("Resource exhausted")
+
+        provider.client.models.generate_content_stream = Mock(return_value=failing_stream())
+
+        results = provider.stream_citations(citation_list(2))
+        assert (await results.__anext__())["citation_number"] == 1
+        with pytest.raises(Exception, match="Resource exhausted"):
+            await results.__anext__()
+        assert provider.client.models.generate_content_stream.call_count == 1
+
+
+class FailingAfterFirstResult(FakeStreamingProvider):
+    async def _stream_chunk(self, citations, style):
+        yield block(1, "Author1, A. (2020). Title 1.")
+        raise RuntimeError("Gemini API error")
+
+
+@pytest.mark.asyncio
+async def test_fallback_skips_results_already_streamed():
+    gemini = FailingAfterFirstResult()
+    openai = FakeStreamingProvider()
+
+    with patch.object(app, "gemini_provider", gemini), patch.object(app, "openai_provider", openai), \
+            patch.object(app.jobs, "update") as update_job:
+        results = await collect(app.stream_with_provider_fallback(
+            gemini, "model_b", "job-1", citation_list(3), "apa7"))
+
+    assert [result["citation_number"] for result in results] == [1, 2, 3]
+    assert results[0]["original"] == "Author1, A. (2020). Title 1."
+    update_job.assert_called_once_with("job-1", provider="model_a")
+
+
+@pytest.mark.asyncio
+async def test_openai_failure_is_not_retried_on_another_provider():
+    openai = FailingAfterFirstResult()
+
+    with patch.object(app, "openai_provider", openai):
+        results = app.stream_with_provider_fallback(openai, "model_a", "job-1", citation_list(3), "apa7")
+        assert (await results.__anext__())["citation_number"] == 1
+        with pytest.raises(RuntimeError):
+            await results.__anext__()
+
+
+@pytest.mark.asyncio
+async def test_streaming_flag_reports_each_result_from_the_stream():
+    provider = FakeStreamingProvider()
+    reported = []
+
+    with patch.object(app, "STREAMING_VALIDATION_ENABLED", True), patch.object(app, "openai_provider", provider):
+        validation_results = await app.validate_with_provider_fallback(
+            provider, "model_a", "job-1", citation_list(3), "apa7", on_results=reported.append)
+
+    assert reported == [[result] for result in validation_results["results"]]
+    assert [result["citation_number"] for result in validation_results["results"]] == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_without_the_streaming_flag_validate_citations_is_used():
+    provider = MockProvider()
+
+    with patch.object(app, "STREAMING_VALIDATION_ENABLED", False), \
+            patch.object(provider, "stream_citations") as stream_citations:
+        validation_results = await app.validate_with_provider_fallback(
+            provider, "model_a", "job-1", "First citation.\nSecond citation.", "apa7", on_results=lambda results: None)
+
+    stream_citations.assert_not_called()
+    assert len(validation_results["results"]) == 2
@@ -0,0 +1,193 @@
+"""Tests for app.plan_affordable_citations and quota-aware validation jobs."""
+import base64
+import re
+import sqlite3
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import FREE_LIMIT, app, html_to_text_with_formatting, plan_affordable_citations
+from database import add_credits, add_pass, get_credits, get_daily_usage_for_current_window, init_db
+
+CITATIONS = "\n\n".join(f"Author{i}, A. (2020). Title {i}. Publisher." for i in range(1, 6))
+
+
+@pytest.fixture
+def credits_db(tmp_path, monkeypatch):
+    monkeypatch.setenv("TEST_DB_PATH", str(tmp_path / "credits.db"))
+    init_db()
+
+
+def test_free_user_partway_through_quota_gets_remaining_slice():
+    text, validated, total, reservation = plan_affordable_citations("job-1", None, FREE_LIMIT - 2, CITATIONS)
+
+    assert (validated, total, reservation) == (2, 5, None)
+    assert text == "\n\n".join(CITATIONS.split("\n\n")[:2])
+
+
+def test_free_user_with_enough_quota_gets_full_text():
+    assert plan_affordable_citations("job-1", None, 0, CITATIONS) == (CITATIONS, 5, 5, None)
+
+
+def test_free_user_over_quota_validates_nothing():
+    text, validated, total, _ = plan_affordable_citations("job-1", None, FREE_LIMIT + 3, CITATIONS)
+
+    assert (text, validated, total) == ("", 0, 5)
+
+
+def test_credits_user_with_short_balance_reserves_affordable_slice(credits_db):
+    add_credits("token", 3, "order-1")
+    text, validated, total, reservation = plan_affordable_citations("job-1", "token", 0, CITATIONS)
+
+    assert (validated, total) == (3, 5)
+    assert text.count("Publisher.") == 3
+    assert reservation["reserved"] == 3
+    assert get_credits("token") == 0
+
+
+def test_newline_separated_list_is_counted_per_line(credits_db):
+    add_credits("token", 10, "order-1")
+    html = "<p>" + "<br>".join(f"Author{i}, A. (2020). Title {i}." for i in range(30)) + "</p>"
+
+    text, validated, total, reservation = plan_affordable_citations(
+        "job-1", "token", 0, html_to_text_with_formatting(html))
+    assert (validated, total) == (10, 30)
+    assert text.count("Title") == 10
+    assert reservation["reserved"] == 10
+
+
+def test_pass_user_gets_full_text(credits_db):
+    add_pass("token", 7, "7day", "order-1")
+
+    text, validated, total, reservation = plan_affordable_citations("job-1", "token", 0, CITATIONS)
+    assert (text, validated, total) == (CITATIONS, 5, 5)
+    assert reservation["kind"] == "pass"
+    assert get_daily_usage_for_current_window("token") == 5
+
+
+def _fake_validation(provider, internal_model_id, job_id, citations, style, initial_fallback=False,
+                     on_results=None):
+    entries = [entry for entry in citations.split("\n\n") if entry.strip()]
+    return {"results": [
+        {"citation_number": i, "original": entry, "source_type": "book", "errors": []}
+        for i, entry in enumerate(entries, 1)
+    ]}
+
+
+def _one_extra_result(*args, **kwargs):
+    validation = _fake_validation(*args, **kwargs)
+    results = validation["results"]
+    results.append(dict(results[-1], citation_number=len(results) + 1))
+    return validation
+
+
+def _run_job(headers, validation=_fake_validation):
+    client = TestClient(app)
+    html = "".join(f"<p>{citation}</p>" for citation in CITATIONS.split("\n\n"))
+    with patch("app.validate_with_result_cache", AsyncMock(side_effect=validation)) as validate:
+        response = client.post("/api/validate/async", json={"citations": html, "style": "apa7"}, headers=headers)
+        job = client.get(f"/api/jobs/{response.json()['job_id']}").json()
+    return job, validate
+
+
+def test_free_job_sends_only_affordable_citations_to_llm():
+    job, validate = _run_job({"X-Free-Used": base64.b64encode(str(FREE_LIMIT - 2).encode()).decode()})
+
+    sent = validate.call_args.kwargs["citations"]
+    assert len(re.findall(r"Title \d", sent)) == 2
+    results = job["results"]
+    assert results["citations_checked"] == 2
+    assert results["citations_remaining"] == 3
+    assert len(results["results"]) == 2
+
+
+def test_credits_job_charges_only_validated_citations(credits_db):
+    add_credits("quota-plan-token", 3, "order-1")
+    job, validate = _run_job({"X-User-Token": "quota-plan-token"})
+
+    assert len(re.findall(r"Title \d", validate.call_args.kwargs["citations"])) == 3
+    results = job["results"]
+    assert results["partial"] is True
+    assert results["citations_checked"] == 3
+    assert results["citations_remaining"] == 2
+    assert results["credits_remaining"] == 0
+    assert get_credits("quota-plan-token") == 0
+
+
+def test_credits_job_with_enough_credits_is_charged_once(credits_db):
+    add_credits("quota-plan-token", 8, "order-1")
+    job, _ = _run_job({"X-User-Token": "quota-plan-token"})
+
+    assert job["results"]["credits_remaining"] == 3
+    assert get_credits("quota-plan-token") == 3
+
+
+def test_extra_llm_result_is_charged(credits_db):
+    add_credits("quota-plan-token", 8, "order-1")
+    job, _ = _run_job({"X-User-Token": "quota-plan-token"}, validation=_one_extra_result)
+
+    results = job["results"]
+    assert not results["partial"]
+    assert len(results["results"]) == 6
+    assert results["credits_remaining"] == 2
+    assert get_credits("quota-plan-token") == 2
+
+
+def test_extra_llm_result_beyond_balance_is_locked(credits_db):
+    add_credits("quota-plan-token", 5, "order-1")
+    job, _ = _run_job({"X-User-Token": "quota-plan-token"}, validation=_one_extra_result)
+
+    results = job["results"]
+    assert results["partial"]
+    assert len(results["results"]) == 5
+    assert results["citations_remaining"] == 1
+    assert get_credits("quota-plan-token") == 0
+
+
+def test_extra_llm_result_counts_against_pass_daily_limit(credits_db):
+    add_pass("quota-plan-token", 7, "7day", "order-1")
+    job, _ = _run_job({"X-User-Token": "quota-plan-token"}, validation=_one_extra_result)
+
+    assert len(job["results"]["results"]) == 6
+    assert get_daily_usage_for_current_window("quota-plan-token") == 6
+
+
+def test_extra_llm_result_over_pass_daily_limit_fails_job(credits_db):
+    add_pass("quota-plan-token", 7, "7day", "order-1")
+    plan_affordable_citations("earlier-job", "quota-plan-token", 0, "\n\n".join(["Citation."] * 995))
+
+    job, _ = _run_job({"X-User-Token": "quota-plan-token"}, validation=_one_extra_result)
+
+    assert job["status"] == "failed"
+    assert "Daily limit" in job["error"]
+    assert get_daily_usage_for_current_window("quota-plan-token") == 995
+
+
+def test_failed_settlement_fails_job_and_refunds(credits_db):
+    add_credits("quota-plan-token", 8, "order-1")
+    with patch("app.settle_reservation", side_effect=sqlite3.OperationalError("database is locked")):
+        job, _ = _run_job({"X-User-Token": "quota-plan-token"})
+
+    assert job["status"] == "failed"
+    assert get_credits("quota-plan-token") == 8
+
+
+def test_failed_job_refunds_reserved_credits(credits_db):
+    add_credits("quota-plan-token", 8, "order-1")
+    job, _ = _run_job({"X-User-Token": "quota-plan-token"}, validation=RuntimeError("LLM unavailable"))
+
+    assert job["status"] == "failed"
+    assert get_credits("quota-plan-token") == 8
+
+
+def test_pass_user_over_daily_limit_skips_llm(credits_db):
+    add_pass("quota-plan-token", 7, "7day", "order-1")
+    plan_affordable_citations("earlier-job", "quota-plan-token", 0, "\n\n".join(["Citation."] * 998))
+
+    job, validate = _run_job({"X-User-Token": "quota-plan-token"})
+
+    validate.assert_not_called()
+    assert job["status"] == "failed"
+    assert "Daily limit" in job["error"]
+    assert get_daily_usage_for_current_window("quota-plan-token") == 998
@@ -0,0 +1,102 @@
+"""Tests for the shared CITATION #N response parser in providers/base.py."""
+from pathlib import Path
+
+import pytest
+
+from providers.base import CitationBlockParser, parse_response
+
+RECORDED_RESPONSES = Path(__file__).parents[2] / "competitive_benchmark"
+
+RULE = "═" * 63
+SEPARATOR = "─" * 63
+
+RESPONSE = f"""{RULE}
+CITATION #1
+{RULE}
+ORIGINAL: Smith, J. (2020). The book title. Publisher.
+SOURCE TYPE: Book
+VALIDATION RESULTS:
+✓ No APA 7 formatting errors detected
+
+{SEPARATOR}
+CORRECTED CITATION:
+Smith, J. (2020). The book title. Publisher.
+{SEPARATOR}
+
+{RULE}
+CITATION #2
+{RULE}
+ORIGINAL: Doe, J. (2021). Article Title. Journal Name, 15(3), 123-145.
+SOURCE TYPE: Journal Article
+VALIDATION RESULTS:
+❌ Title: Article titles should be in sentence case
+   Should be: Article title
+
+{SEPARATOR}
+CORRECTED CITATION:
+Doe, J. (2021). Article title. _Journal Name_, _15_(3), 123-145.
+{SEPARATOR}
+"""
+
+
+def test_parse_response():
+    results = parse_response(RESPONSE)
+
+    assert [result["citation_number"] for result in results] == [1, 2]
+    assert results[0]["errors"] == []
+    assert results[0]["corrected_citation"] is None
+    assert results[1]["errors"] == [{
+        "component": "Title",
+        "problem": "Article titles should be in sentence case",
+        "correction": "Article title"
+    }]
+    assert results[1]["corrected_citation"] == (
+        "Doe, J. (2021). Article title. <em>Journal Name</em>, <em>15</em>(3), 123-145."
+    )
+
+
+@pytest.mark.parametrize("piece_size", [1, 7, 64])
+def test_incremental_parse_matches_whole_response(piece_size):
+    parser = CitationBlockParser()
+    results = []
+    for start in range(0, len(RESPONSE), piece_size):
+        results += parser.feed(RESPONSE[start:start + piece_size])
+    results += parser.close()
+
+    assert results == parse_response(RESPONSE)
+
+
+def test_block_is_emitted_at_its_closing_separator():
+    parser = CitationBlockParser()
+    closing = RESPONSE.index(SEPARATOR, RESPONSE.index("Smith, J. (2020). The book title. Publisher.\n" + SEPARATOR))
+
+    assert parser.feed(RESPONSE[:closing]) == []
+    emitted = parser.feed(RESPONSE[closing:closing + len(SEPARATOR) + 1])
+    assert [result["citation_number"] for result in emitted] == [1]
+
+
+def test_block_without_corrected_citation_is_emitted_at_next_header():
+    response = f"CITATION #1\n{RULE}\nORIGINAL: One.\n{RULE}\nCITATION #2\n{RULE}\nORIGINAL: Two.\n"
+    parser = CitationBlockParser()
+
+    first = parser.feed(response)
+    assert [(result["citation_number"], result["original"]) for result in first] == [(1, "One.")]
+    assert [result["original"] for result in parser.close()] == ["Two."]
+
+
+def test_header_without_rule_does_not_open_a_block():
+    response = f"CITATION #1\n{RULE}\nORIGINAL: One.\nSee CITATION #3\nnot a rule\nORIGINAL: Stray.\n"
+
+    results = parse_response(response)
+    assert [(result["citation_number"], result["original"]) for result in results] == [(1, "One.")]
+
+
+@pytest.mark.parametrize("name", ["gpt51_batch_response.txt", "gpt51_batch_response_low.txt"])
+def test_recorded_responses(name):
+    path = RECORDED_RESPONSES / name
+    if not path.exists():
+        pytest.skip(f"{name} not available")
+
+    results = parse_response(path.read_text())
+    assert [result["citation_number"] for result in results] == list(range(1, 122))
+    assert all(result["original"] and result["source_type"] for result in results)
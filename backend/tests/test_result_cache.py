@@ -0,0 +1,152 @@
+"""Tests for result_cache.py per-citation result cache."""
+import time
+from unittest.mock import AsyncMock
+
+import pytest
+
+from result_cache import (
+    CitationResultCache,
+    make_cache_key,
+    normalize_citation,
+    validate_with_cache,
+)
+
+
+def llm_results(citations_text, on_results=None):
+    """Build a provider-style response with one result per blank-line separated citation."""
+    citations = [c for c in citations_text.split("\n\n") if c.strip()]
+    return {"results": [
+        {"citation_number": i, "original": c, "source_type": "journal", "errors": []}
+        for i, c in enumerate(citations, 1)
+    ]}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return CitationResultCache(db_path=str(tmp_path / "cache.db"), max_entries=100, ttl_seconds=3600)
+
+
+class TestCacheKey:
+    """Cache key normalization."""
+
+    def test_whitespace_is_normalized(self):
+        assert normalize_citation("  Smith, J.\n(2020).   Title. ") == "Smith, J. (2020). Title."
+        assert make_cache_key("Smith, J. (2020).  Title.", "apa7") == make_cache_key("Smith, J. (2020). Title.", "apa7")
+
+    def test_case_and_style_change_key(self):
+        base = make_cache_key("Smith, J. (2020). Title.", "apa7")
+        assert make_cache_key("Smith, J. (2020). title.", "apa7") != base
+        assert make_cache_key("Smith, J. (2020). Title.", "mla9") != base
+
+
+class TestCitationResultCache:
+    """Memory and SQLite tiers."""
+
+    def test_put_and_get(self, cache):
+        cache.put_many({"k1": {"original": "A", "errors": []}})
+
+        assert cache.get_many(["k1", "k2"]) == {"k1": {"original": "A", "errors": []}}
+        assert cache.hits == 1
+        assert cache.misses == 1
+
+    def test_returned_results_are_copies(self, cache):
+        cache.put_many({"k1": {"original": "A", "errors": []}})
+        cache.get_many(["k1"])["k1"]["errors"].append("mutated")
+
+        assert cache.get_many(["k1"])["k1"]["errors"] == []
+
+    def test_lru_eviction_falls_back_to_sqlite(self, tmp_path):
+        cache = CitationResultCache(db_path=str(tmp_path / "cache.db"), max_entries=2, ttl_seconds=3600)
+        cache.put_many({"k1": {"n": 1}, "k2": {"n": 2}, "k3": {"n": 3}})
+
+        assert list(cache._memory) == ["k2", "k3"]
+        # Evicted from memory but still served from the persistent tier
+        assert cache.get_many(["k1"]) == {"k1": {"n": 1}}
+
+    def test_persists_across_instances(self, tmp_path):
+        db_path = str(tmp_path / "cache.db")
+        CitationResultCache(db_path=db_path).put_many({"k1": {"n": 1}})
+
+        assert CitationResultCache(db_path=db_path).get_many(["k1"]) == {"k1": {"n": 1}}
+
+    def test_ttl_expiry(self, tmp_path):
+        cache = CitationResultCache(db_path=str(tmp_path / "cache.db"), ttl_seconds=0.05)
+        cache.put_many({"k1": {"n": 1}})
+        time.sleep(0.1)
+
+        assert cache.get_many(["k1"]) == {}
+        assert cache.purge_expired() == 1
+
+
+class TestValidateWithCache:
+    """Merging cached and fresh results."""
+
+    @pytest.mark.asyncio
+    async def test_only_misses_are_sent_to_llm(self, cache):
+        validate_fn = AsyncMock(side_effect=llm_results)
+
+        await validate_with_cache(cache, "A. (2020). One.\n\nB. (2021). Two.", "apa7", validate_fn)
+        result = await validate_with_cache(
+            cache, "A. (2020). One.\n\nC. (2022). New.\n\nB. (2021). Two.", "apa7", validate_fn
+        )
+
+        assert validate_fn.await_count == 2
+        assert validate_fn.await_args_list[1].args[0] == "C. (2022). New."
+        assert [r["original"] for r in result["results"]] == ["A. (2020). One.", "C. (2022). New.", "B. (2021). Two."]
+        assert [r["citation_number"] for r in result["results"]] == [1, 2, 3]
+
+    @pytest.mark.asyncio
+    async def test_all_hits_skip_llm(self, cache):
+        validate_fn = AsyncMock(side_effect=llm_results)
+        text = "A. (2020). One.\n\nB. (2021). Two."
+
+        await validate_with_cache(cache, text, "apa7", validate_fn)
+        result = await validate_with_cache(cache, text, "apa7", validate_fn)
+
+        assert validate_fn.await_count == 1
+        assert len(result["results"]) == 2
+
+    @pytest.mark.asyncio
+    async def test_result_count_mismatch_is_not_cached(self, cache):
+        validate_fn = AsyncMock(return_value={"results": [
+            {"citation_number": 1, "original": "A. (2020). One. B. (2021). Two.", "source_type": "journal", "errors": []}
+        ]})
+
+        result = await validate_with_cache(cache, "A. (2020). One.\n\nB. (2021). Two.", "apa7", validate_fn)
+
+        assert len(result["results"]) == 1
+        assert cache.get_many([make_cache_key("A. (2020). One.", "apa7")]) == {}
+
+    @pytest.mark.asyncio
+    async def test_miss_count_mismatch_merges_without_second_llm_call(self, cache):
+        await validate_with_cache(cache, "A. (2020). One.", "apa7", AsyncMock(side_effect=llm_results))
+        validate_fn = AsyncMock(return_value={"results": [
+            {"citation_number": 1, "original": "C. (2022). New. B. (2021). Two.", "source_type": "journal", "errors": []}
+        ]})
+
+        result = await validate_with_cache(
+            cache, "C. (2022). New.\n\nA. (2020). One.\n\nB. (2021). Two.", "apa7", validate_fn
+        )
+
+        assert validate_fn.await_count == 1
+        assert [(r["citation_number"], r["original"]) for r in result["results"]] == [
+            (1, "C. (2022). New. B. (2021). Two."), (2, "A. (2020). One.")
+        ]
+        assert cache.get_many([make_cache_key("C. (2022). New.", "apa7")]) == {}
+
+    @pytest.mark.asyncio
+    async def test_on_results_reports_hits_first_then_renumbered_misses(self, cache):
+        async def validate_fn(citations_text, on_results=None):
+            results = llm_results(citations_text)
+            if on_results:
+                on_results(results["results"])
+            return results
+
+        await validate_with_cache(cache, "A. (2020). One.", "apa7", validate_fn)
+        reported = []
+        await validate_with_cache(
+            cache, "C. (2022). New.\n\nA. (2020). One.", "apa7", validate_fn,
+            on_results=lambda results: reported.append([(r["citation_number"], r["original"]) for r in results])
+        )
+
+        assert reported == [[(2, "A. (2020). One.")], [(1, "C. (2022). New.")]]
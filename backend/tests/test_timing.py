@@ -0,0 +1,120 @@
+"""Tests for timing.py job latency spans and stage histograms."""
+import asyncio
+import base64
+import time
+
+from fastapi.testclient import TestClient
+
+from timing import JobTimer, LatencyHistogram, StageLatency, bind_timer, record, timed
+
+
+class TestJobTimer:
+    def test_spans_add_up_and_survive_exceptions(self):
+        timer = JobTimer()
+        timer.record("html_to_text", 0.25)
+        timer.record("html_to_text", 0.5)
+        try:
+            with timer.span("gating"):
+                raise ValueError("boom")
+        except ValueError:
+            pass
+
+        spans = timer.finish()
+        assert spans["html_to_text"] == 0.75
+        assert "gating" in spans
+        assert spans["total"] >= spans["gating"]
+
+    def test_queue_wait_recorded_once_on_dequeue(self):
+        timer = JobTimer()
+        timer.dequeue()
+        assert "queue_wait" not in timer.spans
+
+        timer.enqueue()
+        time.sleep(0.01)
+        timer.dequeue()
+        timer.dequeue()
+        assert 0.01 <= timer.spans["queue_wait"] < 1
+
+    def test_bound_timer_collects_records_from_its_tasks(self):
+        timers = {"a": JobTimer(), "b": JobTimer()}
+
+        async def job(name):
+            bind_timer(timers[name])
+            # e.g. provider retries inside the LLM task
+            await timed(timers[name], "llm", asyncio.create_task(retry(name)))
+
+        async def retry(name):
+            record("llm_retry", 1.0 if name == "a" else 2.0)
+
+        async def main():
+            await asyncio.gather(job("a"), job("b"))
+
+        asyncio.run(main())
+        record("llm_retry", 5.0)  # outside a job: ignored
+
+        assert timers["a"].spans["llm_retry"] == 1.0
+        assert timers["b"].spans["llm_retry"] == 2.0
+        assert "llm" in timers["a"].spans
+
+
+class TestLatencyHistogram:
+    def test_quantiles_interpolate_within_buckets(self):
+        histogram = LatencyHistogram(buckets=(1, 2, 4))
+        for seconds in (0.5, 1.5, 1.5, 3.0):
+            histogram.observe(seconds)
+
+        assert histogram.quantile(0.5) == 1.5
+        assert histogram.quantile(1.0) == 4
+        assert LatencyHistogram().quantile(0.5) is None
+
+        data = histogram.to_dict()
+        assert data["count"] == 4
+        assert data["sum"] == 6.5
+        assert data["buckets"] == {"1": 1, "2": 3, "4": 4, "+Inf": 4}
+
+    def test_observations_above_last_bucket(self):
+        histogram = LatencyHistogram(buckets=(1, 2))
+        histogram.observe(10)
+        assert histogram.quantile(0.99) == 2
+        assert histogram.to_dict()["buckets"]["+Inf"] == 1
+
+    def test_stage_latency_groups_by_provider_and_style(self):
+        stages = StageLatency(buckets=(1, 10))
+        stages.observe({"llm": 5.0, "total": 6.0}, "model_c", "apa7")
+        stages.observe({"llm": 0.5, "total": 0.6}, "model_g", "apa7")
+        stages.observe({"queue_wait": 0.1, "total": 0.2}, None, "mla9")
+
+        snapshot = stages.snapshot()
+        assert snapshot["stages"]["total"]["count"] == 3
+        assert snapshot["stages"]["llm"]["count"] == 2
+        assert set(snapshot["by_provider"]) == {"model_c", "model_g", "none"}
+        assert snapshot["by_provider"]["model_c"]["llm"]["sum"] == 5.0
+        assert snapshot["by_style"]["apa7"]["total"]["count"] == 2
+
+        stages.reset()
+        assert stages.snapshot() == {"stages": {}, "by_provider": {}, "by_style": {}}
+
+
+def test_free_limit_job_reports_stage_latency():
+    from app import app, jobs
+    from timing import STAGE_LATENCY
+
+    STAGE_LATENCY.reset()
+    client = TestClient(app)
+    headers = {"X-Free-Used": base64.b64encode(b"10").decode()}
+    response = client.post("/api/validate/async", json={"citations": "<p>Test citation</p>", "style": "apa7"},
+                           headers=headers)
+    assert response.status_code == 200
+    job_id = response.json()["job_id"]
+
+    for _ in range(30):
+        if client.get(f"/api/jobs/{job_id}").json()["status"] == "completed":
+            break
+        time.sleep(1)
+
+    timings = jobs.get(job_id)["timings"]
+    assert {"queue_wait", "html_to_text", "db_write", "split_document", "total"} <= set(timings)
+
+    metrics = client.get("/api/metrics").json()
+    assert metrics["stages"]["total"]["count"] == 1
+    assert metrics["by_style"]["apa7"]["queue_wait"]["count"] == 1
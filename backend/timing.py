@@ -0,0 +1,213 @@
+"""
+Per-job latency spans and per-stage latency histograms.
+
+A JobTimer collects how long each stage of a validation job took:
+
+    timer = JobTimer()
+    with timer.span("split_document"):
+        body_html, refs_html, has_header = split_document(html_content)
+
+Spans with the same name add up (html_to_text runs in the request and again
+on the reference section). Code further down the call stack, such as the
+providers' retry loops, records on the job's timer through bind_timer() and
+record() without the timer being passed down. Finished timers are observed
+into STAGE_LATENCY, the per-process histograms served by /api/metrics (and
+in the Prometheus format by /metrics, see metrics.py).
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Dict, Iterator, Optional, Sequence, Tuple, TypeVar
+
+# Upper bounds (seconds) of the histogram buckets; stages range from
+# sub-millisecond SQLite writes to multi-minute LLM calls
+STAGE_LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+
+class JobTimer:
+    """Named latency spans of one job, in seconds."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.enqueued_at: Optional[float] = None
+        self.spans: Dict[str, float] = {}
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """Time the body of the with block as stage `name` (also if it raises)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float) -> None:
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def enqueue(self) -> None:
+        """Mark the job as handed to the background task queue."""
+        self.enqueued_at = time.perf_counter()
+
+    def dequeue(self) -> None:
+        """Record queue_wait when the background task starts."""
+        if self.enqueued_at is not None:
+            self.record("queue_wait", time.perf_counter() - self.enqueued_at)
+            self.enqueued_at = None
+
+    def finish(self) -> Dict[str, float]:
+        """Spans plus the total since the timer started, rounded for storage."""
+        spans = dict(self.spans, total=time.perf_counter() - self.started)
+        return {name: round(seconds, 4) for name, seconds in spans.items()}
+
+
+T = TypeVar("T")
+
+
+async def timed(timer: JobTimer, name: str, awaitable: Awaitable[T]) -> T:
+    """Await awaitable as span `name`, e.g. inside a task running alongside others."""
+    with timer.span(name):
+        return await awaitable
+
+
+_current_timer: ContextVar[Optional[JobTimer]] = ContextVar('current_timer', default=None)
+
+
+def bind_timer(timer: JobTimer) -> None:
+    """Make timer the target of record() in the current task (and tasks it starts)."""
+    _current_timer.set(timer)
+
+
+def record(name: str, seconds: float) -> None:
+    """Add to span `name` of the bound job timer; no-op outside a job."""
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.record(name, seconds)
+
+
+class LatencyHistogram:
+    """Cumulative-bucket histogram, like a Prometheus histogram."""
+
+    def __init__(self, buckets: Sequence[float] = STAGE_LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.count += other.count
+        self.sum += other.sum
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate the q-quantile by linear interpolation inside its bucket.
+
+        Observations above the last bucket report the last bucket's bound.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            if cumulative + count >= rank and count:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def to_dict(self) -> Dict[str, object]:
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 4),
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": buckets,
+        }
+
+
+class StageLatency:
+    """
+    Thread-safe stage latency histograms labelled by provider and style.
+
+    Kept per worker process; each worker's /api/metrics reports the jobs it ran.
+    """
+
+    def __init__(self, buckets: Sequence[float] = STAGE_LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, str, str], LatencyHistogram] = {}
+
+    def observe(self, spans: Dict[str, float], provider: Optional[str], style: Optional[str]) -> None:
+        """Add one finished job's spans (from JobTimer.finish())."""
+        with self._lock:
+            for stage, seconds in spans.items():
+                key = (stage, provider or "none", style or "none")
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = LatencyHistogram(self.buckets)
+                histogram.observe(seconds)
+
+    def _merged(self, label: Optional[int]) -> Dict[str, Dict[str, LatencyHistogram]]:
+        """Histograms merged by stage, grouped by the label at key index `label` (or all in one group)."""
+        groups: Dict[str, Dict[str, LatencyHistogram]] = {}
+        for key, histogram in self._histograms.items():
+            stages = groups.setdefault(key[label] if label else "all", {})
+            merged = stages.get(key[0])
+            if merged is None:
+                merged = stages[key[0]] = LatencyHistogram(self.buckets)
+            merged.merge(histogram)
+        return groups
+
+    def snapshot(self) -> Dict[str, object]:
+        """
+        Returns:
+            dict: {"stages": {stage: histogram},
+                   "by_provider": {provider: {stage: histogram}},
+                   "by_style": {style: {stage: histogram}}}
+        """
+        with self._lock:
+            def as_dicts(groups):
+                return {group: {stage: h.to_dict() for stage, h in sorted(stages.items())}
+                        for group, stages in sorted(groups.items())}
+
+            return {
+                "stages": as_dicts(self._merged(None)).get("all", {}),
+                "by_provider": as_dicts(self._merged(1)),
+                "by_style": as_dicts(self._merged(2)),
+            }
+
+    def histograms(self) -> Dict[Tuple[str, str, str], LatencyHistogram]:
+        """Copies of the histograms by (stage, provider, style), e.g. for /metrics."""
+        with self._lock:
+            copies = {}
+            for key, histogram in self._histograms.items():
+                copies[key] = LatencyHistogram(self.buckets)
+                copies[key].merge(histogram)
+            return copies
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+
+STAGE_LATENCY = StageLatency()
@@ -1,11 +1,199 @@
 import re
 import json
+import glob
 import os
+import sqlite3
+import threading
+from contextlib import closing
 from datetime import datetime, timedelta
 from typing import Optional, Dict, List, Any
 from pathlib import Path
 
 
+# Funnel variants (4-variant scheme for A/B test)
+# 1.1: Credits + Button, 1.2: Credits + Inline
+# 2.1: Passes + Button, 2.2: Passes + Inline
+VARIANTS = ('1.1', '1.2', '2.1', '2.2')
+
+# Legacy variants mapped to the new format (backward compatibility)
+# Legacy '1' -> '1.1' (Credits + Button)
+# Legacy '2' -> '2.1' (Passes + Button)
+LEGACY_VARIANTS = {'1': '1.1', '2': '2.1'}
+
+FUNNEL_EVENTS = (
+    'pricing_table_shown',
+    'product_selected',
+    'checkout_started',
+    'purchase_completed',
+    'purchase_failed',
+    'credits_applied',
+)
+
+TIMESTAMP_RE = re.compile(r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})')
+
+# Note: token is truncated to first 8 chars in logs for privacy
+UPGRADE_WORKFLOW_RE = re.compile(
+    r'UPGRADE_WORKFLOW: job_id=([\w-]+|None) event=(\w+) token=([\w]+|None)(?: variant=(\w+))?(?: product_id=([\w_]+))?(?: amount_cents=(\d+))?'
+)
+
+
+def normalize_variant(variant: Optional[str]) -> Optional[str]:
+    """Map a logged variant to one of VARIANTS, or None if unknown."""
+    variant = LEGACY_VARIANTS.get(variant, variant)
+    return variant if variant in VARIANTS else None
+
+
+def parse_upgrade_event_line(line: str) -> Optional[tuple]:
+    """
+    Parse one app.log line into an upgrade funnel event.
+
+    Args:
+        line: Raw log line
+
+    Returns:
+        (event_time, event_name, variant, token, amount_cents) with the variant
+        as logged (not normalized), or None if the line is not a funnel event
+    """
+    if 'UPGRADE_WORKFLOW:' not in line and 'UPGRADE_EVENT:' not in line:
+        return None
+
+    line = line.strip()
+
+    event_time = None
+    event_name = None
+    variant = None
+    token = None
+    amount_cents = None
+
+    # Helper to extract timestamp from log line prefix
+    # Format: 2025-12-16 10:00:00 ...
+    ts_match = TIMESTAMP_RE.search(line)
+    if ts_match:
+        try:
+            event_time = datetime.strptime(ts_match.group(1), "%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            pass
+
+    # Method 1: Regex for UPGRADE_WORKFLOW (New Format)
+    if 'UPGRADE_WORKFLOW:' in line:
+        workflow_match = UPGRADE_WORKFLOW_RE.search(line)
+
+        if workflow_match:
+            event_name = workflow_match.group(2)
+            token = workflow_match.group(3)
+            variant = workflow_match.group(4)
+            if workflow_match.group(6):
+                amount_cents = int(workflow_match.group(6))
+
+            # Handle 'None' string from log
+            if token == 'None':
+                token = None
+
+    # Method 2: Legacy JSON (UPGRADE_EVENT)
+    else:
+        try:
+            json_start = line.index('UPGRADE_EVENT:') + len('UPGRADE_EVENT:')
+            json_str = line[json_start:].strip()
+            event = json.loads(json_str)
+
+            timestamp = event.get('timestamp')
+            event_name = event.get('event')
+            variant = event.get('experiment_variant')
+            token = event.get('token')
+            amount_cents = event.get('amount_cents')
+
+            if timestamp:
+                try:
+                    event_time = datetime.fromtimestamp(timestamp)
+                except (ValueError, OSError):
+                    pass
+        except (json.JSONDecodeError, ValueError):
+            return None
+
+    # Skip if parsing failed
+    if not event_name or not event_time:
+        return None
+
+    return event_time, event_name, variant, token, amount_cents
+
+
+def _empty_variants_data() -> Dict[str, Dict[str, Any]]:
+    return {
+        variant: {**{event: 0 for event in FUNNEL_EVENTS}, 'revenue_cents': 0, 'tokens': set()}
+        for variant in VARIANTS
+    }
+
+
+def _calculate_conversion_rates(data: Dict[str, Any]) -> Dict[str, float]:
+    rates = {}
+
+    # Prevent division by zero
+    shown = data['pricing_table_shown'] or 1
+    selected = data['product_selected'] or 1
+    started = data['checkout_started'] or 1
+
+    rates['table_to_selection'] = data['product_selected'] / shown
+    rates['selection_to_checkout'] = data['checkout_started'] / selected
+    rates['checkout_to_purchase'] = data['purchase_completed'] / started
+    rates['overall'] = data['purchase_completed'] / shown
+
+    return rates
+
+
+def _build_funnel_result(
+    variants_data: Dict[str, Dict[str, Any]],
+    total_events: int,
+    first_timestamp: Optional[datetime],
+    last_timestamp: Optional[datetime]
+) -> Dict[str, Any]:
+    """Shape per-variant counters into the parse_upgrade_events() result."""
+    # Build result with 4 variants
+    def build_variant_result(v_key):
+        return {
+            'pricing_table_shown': variants_data[v_key]['pricing_table_shown'],
+            'product_selected': variants_data[v_key]['product_selected'],
+            'checkout_started': variants_data[v_key]['checkout_started'],
+            'purchase_completed': variants_data[v_key]['purchase_completed'],
+            'purchase_failed': variants_data[v_key]['purchase_failed'],
+            'credits_applied': variants_data[v_key]['credits_applied'],
+            'conversion_rates': _calculate_conversion_rates(variants_data[v_key]),
+            'revenue_cents': variants_data[v_key]['revenue_cents']
+        }
+
+    return {
+        'variant_1_1': build_variant_result('1.1'),
+        'variant_1_2': build_variant_result('1.2'),
+        'variant_2_1': build_variant_result('2.1'),
+        'variant_2_2': build_variant_result('2.2'),
+        # Legacy aliases for backward compatibility
+        'variant_1': build_variant_result('1.1'),
+        'variant_2': build_variant_result('2.1'),
+        'total_events': total_events,
+        'date_range': {
+            'start': first_timestamp.isoformat() if first_timestamp else None,
+            'end': last_timestamp.isoformat() if last_timestamp else None
+        },
+        'unique_tokens': {
+            'variant_1_1': len(variants_data['1.1']['tokens']),
+            'variant_1_2': len(variants_data['1.2']['tokens']),
+            'variant_2_1': len(variants_data['2.1']['tokens']),
+            'variant_2_2': len(variants_data['2.2']['tokens']),
+            # Legacy aliases
+            'variant_1': len(variants_data['1.1']['tokens']),
+            'variant_2': len(variants_data['2.1']['tokens'])
+        },
+        'conversion_rates': {
+            'variant_1_1': _calculate_conversion_rates(variants_data['1.1']),
+            'variant_1_2': _calculate_conversion_rates(variants_data['1.2']),
+            'variant_2_1': _calculate_conversion_rates(variants_data['2.1']),
+            'variant_2_2': _calculate_conversion_rates(variants_data['2.2']),
+            # Legacy aliases
+            'variant_1': _calculate_conversion_rates(variants_data['1.1']),
+            'variant_2': _calculate_conversion_rates(variants_data['2.1'])
+        }
+    }
+
+
 def parse_upgrade_events(
     log_file_path: str = None,
     start_date: Optional[datetime] = None,
@@ -68,7 +256,7 @@ def parse_upgrade_events(
     """
     # Default log path
     if log_file_path is None:
-        log_file_path = os.environ.get('APP_LOG_PATH', '/opt/citations/logs/app.log')
+        log_file_path = _default_log_file_path()
 
     # Check if file exists
     if not os.path.exists(log_file_path):
@@ -77,100 +265,18 @@ def parse_upgrade_events(
             f"Set APP_LOG_PATH environment variable or pass log_file_path argument."
         )
 
-    # Initialize counters per variant (4-variant scheme for A/B test)
-    # 1.1: Credits + Button, 1.2: Credits + Inline
-    # 2.1: Passes + Button, 2.2: Passes + Inline
-    variant_template = {
-        'pricing_table_shown': 0,
-        'product_selected': 0,
-        'checkout_started': 0,
-        'purchase_completed': 0,
-        'purchase_failed': 0,
-        'credits_applied': 0,
-        'revenue_cents': 0,
-        'tokens': set()  # Track unique users
-    }
-    variants_data = {
-        '1.1': variant_template.copy(),
-        '1.2': {**variant_template, 'tokens': set()},
-        '2.1': {**variant_template, 'tokens': set()},
-        '2.2': {**variant_template, 'tokens': set()},
-    }
-    # Re-initialize tokens as sets (copy doesn't deep copy)
-    for v in variants_data.values():
-        v['tokens'] = set()
-
+    variants_data = _empty_variants_data()
     total_events = 0
     first_timestamp = None
     last_timestamp = None
 
     # Read and parse log file
     with open(log_file_path, 'r', encoding='utf-8') as f:
-        for line_num, line in enumerate(f, 1):
-            line = line.strip()
-
-            # Initialize event variables
-            timestamp = None
-            event_time = None
-            event_name = None
-            variant = None
-            token = None
-            amount_cents = None
-            
-            # Helper to extract timestamp from log line prefix
-            # Format: 2025-12-16 10:00:00 ...
-            ts_match = re.search(r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})', line)
-            if ts_match:
-                try:
-                    event_time = datetime.strptime(ts_match.group(1), "%Y-%m-%d %H:%M:%S")
-                    timestamp = event_time.timestamp()
-                except ValueError:
-                    pass
-
-            # Method 1: Regex for UPGRADE_WORKFLOW (New Format)
-            if 'UPGRADE_WORKFLOW:' in line:
-                # Regex to match key-value pairs including token
-                # Note: token is truncated to first 8 chars in logs for privacy
-                workflow_match = re.search(
-                    r'UPGRADE_WORKFLOW: job_id=([\w-]+|None) event=(\w+) token=([\w]+|None)(?: variant=(\w+))?(?: product_id=([\w_]+))?(?: amount_cents=(\d+))?', 
-                    line
-                )
-                
-                if workflow_match:
-                    event_name = workflow_match.group(2)
-                    token = workflow_match.group(3)
-                    variant = workflow_match.group(4)
-                    if workflow_match.group(6):
-                        amount_cents = int(workflow_match.group(6))
-                    
-                    # Handle 'None' string from log
-                    if token == 'None':
-                        token = None
-
-            # Method 2: Legacy JSON (UPGRADE_EVENT)
-            elif 'UPGRADE_EVENT:' in line:
-                try:
-                    json_start = line.index('UPGRADE_EVENT:') + len('UPGRADE_EVENT:')
-                    json_str = line[json_start:].strip()
-                    event = json.loads(json_str)
-                    
-                    timestamp = event.get('timestamp')
-                    event_name = event.get('event')
-                    variant = event.get('experiment_variant')
-                    token = event.get('token')
-                    amount_cents = event.get('amount_cents')
-                    
-                    if timestamp:
-                        try:
-                            event_time = datetime.fromtimestamp(timestamp)
-                        except (ValueError, OSError):
-                            pass
-                except (json.JSONDecodeError, ValueError):
-                    continue
-
-            # Skip if parsing failed
-            if not event_name or not event_time:
+        for line in f:
+            parsed = parse_upgrade_event_line(line)
+            if parsed is None:
                 continue
+            event_time, event_name, variant, token, amount_cents = parsed
 
             # Apply date filters
             if start_date and event_time < start_date:
@@ -188,15 +294,8 @@ def parse_upgrade_events(
             if last_timestamp is None or event_time > last_timestamp:
                 last_timestamp = event_time
 
-            # Map legacy variants to new format (backward compatibility)
-            # Legacy '1' -> '1.1' (Credits + Button)
-            # Legacy '2' -> '2.1' (Passes + Button)
-            if variant == '1':
-                variant = '1.1'
-            elif variant == '2':
-                variant = '2.1'
-            elif variant not in ['1.1', '1.2', '2.1', '2.2']:
-                # print(f"Warning: Unknown variant '{variant}' at line {line_num}")
+            variant = normalize_variant(variant)
+            if variant is None:
                 continue
 
             # Increment counters
@@ -215,69 +314,313 @@ def parse_upgrade_events(
 
             total_events += 1
 
-    # Calculate conversion rates for each variant
-    def calculate_conversion_rates(data):
-        rates = {}
+    return _build_funnel_result(variants_data, total_events, first_timestamp, last_timestamp)
 
-        # Prevent division by zero
-        shown = data['pricing_table_shown'] or 1
-        selected = data['product_selected'] or 1
-        started = data['checkout_started'] or 1
 
-        rates['table_to_selection'] = data['product_selected'] / shown
-        rates['selection_to_checkout'] = data['checkout_started'] / selected
-        rates['checkout_to_purchase'] = data['purchase_completed'] / started
-        rates['overall'] = data['purchase_completed'] / shown
+def _default_log_file_path() -> str:
+    return os.environ.get('APP_LOG_PATH', '/opt/citations/logs/app.log')
 
-        return rates
 
-    # Build result with 4 variants
-    def build_variant_result(v_key):
-        return {
-            'pricing_table_shown': variants_data[v_key]['pricing_table_shown'],
-            'product_selected': variants_data[v_key]['product_selected'],
-            'checkout_started': variants_data[v_key]['checkout_started'],
-            'purchase_completed': variants_data[v_key]['purchase_completed'],
-            'purchase_failed': variants_data[v_key]['purchase_failed'],
-            'credits_applied': variants_data[v_key]['credits_applied'],
-            'conversion_rates': calculate_conversion_rates(variants_data[v_key]),
-            'revenue_cents': variants_data[v_key]['revenue_cents']
-        }
+def _default_funnel_db_path() -> str:
+    override = os.environ.get('FUNNEL_DB_PATH')
+    if override:
+        return override
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'funnel.db')
 
-    result = {
-        'variant_1_1': build_variant_result('1.1'),
-        'variant_1_2': build_variant_result('1.2'),
-        'variant_2_1': build_variant_result('2.1'),
-        'variant_2_2': build_variant_result('2.2'),
-        # Legacy aliases for backward compatibility
-        'variant_1': build_variant_result('1.1'),
-        'variant_2': build_variant_result('2.1'),
-        'total_events': total_events,
-        'date_range': {
-            'start': first_timestamp.isoformat() if first_timestamp else None,
-            'end': last_timestamp.isoformat() if last_timestamp else None
-        },
-        'unique_tokens': {
-            'variant_1_1': len(variants_data['1.1']['tokens']),
-            'variant_1_2': len(variants_data['1.2']['tokens']),
-            'variant_2_1': len(variants_data['2.1']['tokens']),
-            'variant_2_2': len(variants_data['2.2']['tokens']),
-            # Legacy aliases
-            'variant_1': len(variants_data['1.1']['tokens']),
-            'variant_2': len(variants_data['2.1']['tokens'])
-        },
-        'conversion_rates': {
-            'variant_1_1': calculate_conversion_rates(variants_data['1.1']),
-            'variant_1_2': calculate_conversion_rates(variants_data['1.2']),
-            'variant_2_1': calculate_conversion_rates(variants_data['2.1']),
-            'variant_2_2': calculate_conversion_rates(variants_data['2.2']),
-            # Legacy aliases
-            'variant_1': calculate_conversion_rates(variants_data['1.1']),
-            'variant_2': calculate_conversion_rates(variants_data['2.1'])
-        }
-    }
 
-    return result
+class FunnelAggregator:
+    """
+    Incremental upgrade funnel aggregator backed by SQLite.
+
+    Purpose: parse_upgrade_events() rescans the whole app.log on every call.
+    FunnelAggregator remembers how far into the log it has read (byte offset
+    plus file identity) and only parses lines appended since the last
+    refresh(), folding them into per-day/per-variant counters and per-day
+    unique token sets. query() answers from those tables, so its cost depends
+    on the number of days asked for, not on the size of the log.
+
+    Date filters work on whole days (an event is included if its day is
+    within [start_date.date(), end_date.date()]).
+
+    Rotation:
+        - log replaced (new inode): the rest of the old file is read from its
+          rotated name (app.log.1, ...) if it is still there, then the new
+          file is read from the start
+        - log truncated in place (copytruncate): read from the start
+    """
+
+    # Bytes read per transaction when catching up
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, db_path: Optional[str] = None, log_file_path: Optional[str] = None):
+        self.db_path = db_path or _default_funnel_db_path()
+        self.log_file_path = log_file_path or _default_log_file_path()
+        self._lock = threading.Lock()
+
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        with closing(self._connect()) as conn:
+            conn.executescript('''
+                CREATE TABLE IF NOT EXISTS funnel_log_offsets (
+                    log_path TEXT PRIMARY KEY,
+                    device INTEGER NOT NULL,
+                    inode INTEGER NOT NULL,
+                    offset INTEGER NOT NULL
+                );
+                -- variant is stored as logged ('' if missing) so legacy
+                -- variant filters keep working; normalized when queried
+                CREATE TABLE IF NOT EXISTS funnel_daily_counts (
+                    day TEXT NOT NULL,
+                    variant TEXT NOT NULL,
+                    event_name TEXT NOT NULL,
+                    event_count INTEGER NOT NULL,
+                    revenue_cents INTEGER NOT NULL,
+                    first_event_at TEXT NOT NULL,
+                    last_event_at TEXT NOT NULL,
+                    PRIMARY KEY (day, variant, event_name)
+                );
+                CREATE TABLE IF NOT EXISTS funnel_daily_tokens (
+                    day TEXT NOT NULL,
+                    variant TEXT NOT NULL,
+                    token TEXT NOT NULL,
+                    PRIMARY KEY (day, variant, token)
+                ) WITHOUT ROWID;
+            ''')
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=10.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def refresh(self) -> int:
+        """
+        Fold log lines appended since the last refresh into the counters.
+
+        Returns:
+            Number of funnel events ingested
+        """
+        with self._lock, closing(self._connect()) as conn:
+            try:
+                stat = os.stat(self.log_file_path)
+            except FileNotFoundError:
+                return 0
+
+            row = conn.execute(
+                "SELECT device, inode, offset FROM funnel_log_offsets WHERE log_path = ?",
+                (self.log_file_path,)
+            ).fetchone()
+
+            ingested = 0
+            offset = 0
+            if row:
+                device, inode, stored_offset = row
+                if (device, inode) != (stat.st_dev, stat.st_ino):
+                    rotated_path = self._find_rotated_file(device, inode)
+                    if rotated_path:
+                        ingested += self._ingest(conn, rotated_path, stored_offset, (device, inode))
+                elif stored_offset <= stat.st_size:
+                    offset = stored_offset
+
+            ingested += self._ingest(conn, self.log_file_path, offset, (stat.st_dev, stat.st_ino))
+            return ingested
+
+    def _find_rotated_file(self, device: int, inode: int) -> Optional[str]:
+        for path in glob.glob(glob.escape(self.log_file_path) + '.*'):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if (stat.st_dev, stat.st_ino) == (device, inode):
+                return path
+        return None
+
+    def _ingest(self, conn: sqlite3.Connection, path: str, offset: int, identity: tuple) -> int:
+        """Parse complete lines of path from offset; counters and offset commit together per chunk."""
+        ingested = 0
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            pending = b''
+            while True:
+                chunk = f.read(self.CHUNK_SIZE)
+                if not chunk:
+                    break
+                data = pending + chunk
+                # Only consume complete lines; a partially written last line
+                # is picked up by the next refresh
+                end = data.rfind(b'\n') + 1
+                pending = data[end:]
+                if not end:
+                    continue
+
+                events = []
+                for line in data[:end].decode('utf-8', errors='replace').splitlines():
+                    parsed = parse_upgrade_event_line(line)
+                    if parsed is not None:
+                        events.append(parsed)
+
+                offset += end
+                with conn:
+                    self._store_events(conn, events)
+                    conn.execute(
+                        "INSERT INTO funnel_log_offsets (log_path, device, inode, offset) VALUES (?, ?, ?, ?) "
+                        "ON CONFLICT(log_path) DO UPDATE SET device = excluded.device, "
+                        "inode = excluded.inode, offset = excluded.offset",
+                        (self.log_file_path, identity[0], identity[1], offset)
+                    )
+                ingested += len(events)
+        return ingested
+
+    @staticmethod
+    def _store_events(conn: sqlite3.Connection, events: List[tuple]) -> None:
+        counts: Dict[tuple, list] = {}
+        tokens = set()
+
+        for event_time, event_name, variant, token, amount_cents in events:
+            day = event_time.date().isoformat()
+            variant = variant or ''
+            at = event_time.isoformat()
+            key = (day, variant, event_name)
+            entry = counts.get(key)
+            if entry is None:
+                entry = counts[key] = [0, 0, at, at]
+            entry[0] += 1
+            if amount_cents and event_name == 'purchase_completed':
+                entry[1] += amount_cents
+            entry[2] = min(entry[2], at)
+            entry[3] = max(entry[3], at)
+            if token:
+                tokens.add((day, variant, token))
+
+        conn.executemany('''
+            INSERT INTO funnel_daily_counts
+                (day, variant, event_name, event_count, revenue_cents, first_event_at, last_event_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(day, variant, event_name) DO UPDATE SET
+                event_count = event_count + excluded.event_count,
+                revenue_cents = revenue_cents + excluded.revenue_cents,
+                first_event_at = MIN(first_event_at, excluded.first_event_at),
+                last_event_at = MAX(last_event_at, excluded.last_event_at)
+        ''', [(*key, *entry) for key, entry in counts.items()])
+        conn.executemany(
+            "INSERT OR IGNORE INTO funnel_daily_tokens (day, variant, token) VALUES (?, ?, ?)",
+            tokens
+        )
+
+    def query(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        experiment_variant: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Funnel analytics from the aggregated tables.
+
+        Args:
+            start_date: Include days on or after this date
+            end_date: Include days on or before this date
+            experiment_variant: Filter to a variant as logged ('1', '2', '1.1', ...)
+
+        Returns:
+            Same structure as parse_upgrade_events()
+        """
+        conditions = []
+        params: List[Any] = []
+        if start_date:
+            conditions.append("day >= ?")
+            params.append(start_date.date().isoformat())
+        if end_date:
+            conditions.append("day <= ?")
+            params.append(end_date.date().isoformat())
+        if experiment_variant:
+            conditions.append("variant = ?")
+            params.append(experiment_variant)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        with closing(self._connect()) as conn:
+            count_rows = conn.execute(f'''
+                SELECT variant, event_name, SUM(event_count), SUM(revenue_cents),
+                       MIN(first_event_at), MAX(last_event_at)
+                FROM funnel_daily_counts {where}
+                GROUP BY variant, event_name
+            ''', params).fetchall()
+            token_rows = conn.execute(
+                f"SELECT DISTINCT variant, token FROM funnel_daily_tokens {where}", params
+            ).fetchall()
+
+        variants_data = _empty_variants_data()
+        total_events = 0
+        first_event_at = None
+        last_event_at = None
+
+        for variant, event_name, event_count, revenue_cents, first_at, last_at in count_rows:
+            # Date range covers every event, including unknown variants
+            first_event_at = first_at if first_event_at is None else min(first_event_at, first_at)
+            last_event_at = last_at if last_event_at is None else max(last_event_at, last_at)
+
+            variant = normalize_variant(variant or None)
+            if variant is None:
+                continue
+
+            variant_data = variants_data[variant]
+            if event_name in variant_data:
+                variant_data[event_name] += event_count
+            variant_data['revenue_cents'] += revenue_cents
+            total_events += event_count
+
+        for variant, token in token_rows:
+            variant = normalize_variant(variant or None)
+            if variant is not None:
+                variants_data[variant]['tokens'].add(token)
+
+        return _build_funnel_result(
+            variants_data,
+            total_events,
+            datetime.fromisoformat(first_event_at) if first_event_at else None,
+            datetime.fromisoformat(last_event_at) if last_event_at else None
+        )
+
+
+_aggregators: Dict[tuple, FunnelAggregator] = {}
+_aggregators_lock = threading.Lock()
+
+
+def get_funnel_aggregator(db_path: Optional[str] = None, log_file_path: Optional[str] = None) -> FunnelAggregator:
+    """Shared FunnelAggregator for a (database, log file) pair."""
+    key = (db_path or _default_funnel_db_path(), log_file_path or _default_log_file_path())
+    with _aggregators_lock:
+        if key not in _aggregators:
+            _aggregators[key] = FunnelAggregator(*key)
+        return _aggregators[key]
+
+
+def refresh_upgrade_funnel(log_file_path: Optional[str] = None, db_path: Optional[str] = None) -> int:
+    """
+    Fold log lines appended since the previous refresh into the funnel tables.
+
+    Run from the dashboard cron (parse_logs_cron.py), so requests never parse
+    the log. Returns the number of funnel events ingested.
+    """
+    return get_funnel_aggregator(db_path, log_file_path).refresh()
+
+
+def get_upgrade_funnel(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    experiment_variant: Optional[str] = None,
+    log_file_path: Optional[str] = None,
+    db_path: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Incremental equivalent of parse_upgrade_events() for the dashboard.
+
+    Answers from the pre-aggregated tables only, as of the last
+    refresh_upgrade_funnel(); the log is not read. Date filters work on
+    whole days.
+    """
+    return get_funnel_aggregator(db_path, log_file_path).query(start_date, end_date, experiment_variant)
 
 
 def get_funnel_summary(log_file_path: str = None, days: int = 7) -> str:
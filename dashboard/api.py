@@ -20,7 +20,7 @@ from pydantic import BaseModel, Field, validator
 # Add dashboard directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from database import get_database, DatabaseManager
+from database import get_database, DatabaseManager, decode_page_cursor, encode_page_cursor
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -124,6 +124,23 @@ def validate_order_by(order_by: str) -> None:
     if order_by not in valid_columns:
         raise HTTPException(status_code=400, detail=f"order_by must be one of: {', '.join(valid_columns)}")
 
+def parse_page_cursor(cursor: Optional[str], order_by: str) -> Optional[tuple]:
+    """Validate and decode the cursor parameter (keyset pagination)"""
+    if not cursor:
+        return None
+    if order_by != 'created_at':
+        raise HTTPException(status_code=400, detail="cursor requires order_by=created_at")
+    try:
+        return decode_page_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def next_page_cursor(validations: List[Dict[str, Any]], limit: int, order_by: str) -> Optional[str]:
+    """Cursor for the page after a full page ordered by created_at"""
+    if order_by != 'created_at' or len(validations) < limit:
+        return None
+    return encode_page_cursor(validations[-1])
+
 # Connection pool for better performance under load
 class DatabaseConnectionPool:
     """Simple connection pool for database instances"""
@@ -226,6 +243,7 @@ class ValidationResponse(BaseModel):
     validation_type: Optional[str] = Field(None, description="Type of validation: ref_only or full_doc")
     inline_citation_count: Optional[int] = Field(None, description="Number of inline citations found")
     orphan_count: Optional[int] = Field(None, description="Number of orphan inline citations")
+    stage_timings: Optional[Dict[str, float]] = Field(None, description="Seconds spent per job stage (queue_wait, llm, gating, ...)")
 
 
 class StatsResponse(BaseModel):
@@ -279,16 +297,40 @@ class GatedStatsResponse(BaseModel):
     avg_time_to_reveal_seconds: float
     by_user_type: Dict[str, Dict[str, Any]]
     by_outcome: Dict[str, int]
+    by_style: Dict[str, Dict[str, Any]] = {}
+    by_provider: Dict[str, Dict[str, Any]] = {}
+    by_experiment_variant: Dict[str, Dict[str, Any]] = {}
     daily_trends: List[Dict[str, Any]]
     conversion_metrics: Dict[str, Any]
 
 
+class LatencyStatsResponse(BaseModel):
+    """Per-stage job latency statistics response model"""
+    timed_jobs: int
+    stages: Dict[str, Dict[str, Any]]
+    by_provider: Dict[str, Dict[str, Dict[str, Any]]]
+    by_style: Dict[str, Dict[str, Dict[str, Any]]]
+
+
 class ValidationsListResponse(BaseModel):
     """Validations list response model with pagination"""
     validations: List[ValidationResponse]
-    total: int
+    total: Optional[int] = None
     limit: int
     offset: int
+    next_cursor: Optional[str] = None
+
+
+# Columns ValidationResponse can't be built without
+VALIDATION_RESPONSE_REQUIRED_FIELDS = ['job_id', 'created_at', 'user_type', 'status']
+
+# Columns /api/dashboard maps into jobs (no error_message or other detail-only text)
+DASHBOARD_COLUMNS = [
+    'job_id', 'created_at', 'user_type', 'paid_user_id', 'free_user_id', 'citation_count',
+    'duration_seconds', 'results_gated', 'results_revealed_at', 'gated_outcome', 'upgrade_state',
+    'interaction_type', 'experiment_variant', 'product_id', 'amount_cents', 'currency', 'order_id',
+    'provider', 'token_usage_prompt', 'token_usage_completion', 'token_usage_total'
+]
 
 
 class InlineStatsResponse(BaseModel):
@@ -429,7 +471,8 @@ async def get_validation(job_id: str, database: DatabaseManager = Depends(get_db
             "product_id": validation.get("product_id"),
             "amount_cents": validation.get("amount_cents"),
             "currency": validation.get("currency"),
-            "order_id": validation.get("order_id")
+            "order_id": validation.get("order_id"),
+            "stage_timings": json.loads(validation["stage_timings"]) if validation.get("stage_timings") else None
         }
         return ValidationResponse(**validation_data)
     except HTTPException:
@@ -498,6 +541,9 @@ async def get_validations(
     order_dir: str = Query("DESC", pattern="^(ASC|DESC)$", description="Sort direction"),
     validation_type: Optional[str] = Query(None, description="Filter by validation type (ref_only, full_doc)"),
     has_inline: Optional[bool] = Query(None, description="Filter for validations with inline citations"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (keyset pagination)"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (default: all)"),
+    include_total: bool = Query(True, description="Count all matching validations"),
     database: DatabaseManager = Depends(get_db)
 ):
     """
@@ -520,6 +566,10 @@ async def get_validations(
     - order_dir: Sort direction (ASC/DESC)
     - validation_type: Filter by validation type (ref_only, full_doc)
     - has_inline: If true, only return full_doc validations with inline citations
+    - cursor: Return the page after this one instead of using offset; every
+      full page ordered by created_at comes with a next_cursor
+    - fields: Only return these fields (job_id, created_at, user_type and status always)
+    - include_total: Set to false to skip counting matches (total is null)
     """
     # Input validation
     validate_pagination_params(limit, offset)
@@ -530,6 +580,14 @@ async def get_validations(
     validate_date_format(to_date, "to_date")
     validate_date_range(from_date, to_date)
     validate_order_by(order_by)
+    after = parse_page_cursor(cursor, order_by)
+
+    columns = None
+    if fields:
+        columns = VALIDATION_RESPONSE_REQUIRED_FIELDS + [field.strip() for field in fields.split(',') if field.strip()]
+        unknown = [col for col in columns if col not in ValidationResponse.model_fields]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
 
     try:
         validations = database.get_validations(
@@ -546,22 +604,26 @@ async def get_validations(
             order_by=order_by,
             order_dir=order_dir,
             validation_type=validation_type,
-            has_inline=has_inline
+            has_inline=has_inline,
+            after=after,
+            columns=columns
         )
 
         # Get total count for pagination
-        total = database.get_validations_count(
-            status=status,
-            user_type=user_type,
-            search=search,
-            paid_user_id=paid_user_id,
-            free_user_id=free_user_id,
-            is_test_job=is_test_job,
-            from_date=from_date,
-            to_date=to_date,
-            validation_type=validation_type,
-            has_inline=has_inline
-        )
+        total = None
+        if include_total:
+            total = database.get_validations_count(
+                status=status,
+                user_type=user_type,
+                search=search,
+                paid_user_id=paid_user_id,
+                free_user_id=free_user_id,
+                is_test_job=is_test_job,
+                from_date=from_date,
+                to_date=to_date,
+                validation_type=validation_type,
+                has_inline=has_inline
+            )
 
         # Convert to response models
         validation_responses = []
@@ -572,7 +634,8 @@ async def get_validations(
             validations=validation_responses,
             total=total,
             limit=limit,
-            offset=offset
+            offset=offset,
+            next_cursor=next_page_cursor(validations, limit, order_by)
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get validations: {str(e)}")
@@ -631,13 +694,15 @@ async def get_dashboard_data(
     to_date: Optional[str] = Query(None, description="Filter by created_at <= date (ISO format: YYYY-MM-DDTHH:MM:SSZ)"),
     order_by: str = Query("created_at", description="Column to sort by"),
     order_dir: str = Query("DESC", pattern="^(ASC|DESC)$", description="Sort direction"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (keyset pagination)"),
     database: DatabaseManager = Depends(get_db)
 ):
     """
     Get dashboard data in format expected by frontend
 
     Returns validation data with field names mapped for frontend compatibility.
-    Used by the React dashboard frontend.
+    Used by the React dashboard frontend. Full pages ordered by created_at
+    include a next_cursor for keyset pagination.
     """
     # Input validation
     validate_pagination_params(limit, offset)
@@ -648,6 +713,7 @@ async def get_dashboard_data(
     validate_date_format(to_date, "to_date")
     validate_date_range(from_date, to_date)
     validate_order_by(order_by)
+    after = parse_page_cursor(cursor, order_by)
 
     try:
         validations = database.get_validations(
@@ -659,7 +725,9 @@ async def get_dashboard_data(
             from_date=from_date,
             to_date=to_date,
             order_by=order_by,
-            order_dir=order_dir
+            order_dir=order_dir,
+            after=after,
+            columns=DASHBOARD_COLUMNS
         )
 
         # Map database fields to frontend expected format
@@ -719,7 +787,7 @@ async def get_dashboard_data(
             }
             jobs.append(job_data)
 
-        return {"jobs": jobs}
+        return {"jobs": jobs, "next_cursor": next_page_cursor(validations, limit, order_by)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get dashboard data: {str(e)}")
 
@@ -839,125 +907,83 @@ async def get_gated_stats(
         raise HTTPException(status_code=500, detail=f"Failed to get gated statistics: {str(e)}")
 
 
+@app.get("/api/latency", response_model=LatencyStatsResponse)
+async def get_latency_stats(
+    from_date: Optional[str] = Query(None, description="Start date (ISO format: YYYY-MM-DDTHH:MM:SSZ)"),
+    to_date: Optional[str] = Query(None, description="End date (ISO format: YYYY-MM-DDTHH:MM:SSZ)"),
+    exclude_tests: Optional[bool] = Query(None, description="Exclude test jobs"),
+    database: DatabaseManager = Depends(get_db)
+):
+    """
+    Get per-stage job latency statistics
+
+    Breaks job latency down by stage (queue wait, document parsing, LLM,
+    retries, gating, DB writes, total) with count, average and p50/p95/p99
+    in seconds, overall and by provider and style. Only jobs with stage
+    timings (from the backend's job_timings events) are counted.
+
+    Query Parameters:
+    - from_date: Filter validations created after this date
+    - to_date: Filter validations created before this date
+    - exclude_tests: Leave out test jobs
+    """
+    # Input validation
+    validate_date_format(from_date, "from_date")
+    validate_date_format(to_date, "to_date")
+    validate_date_range(from_date, to_date)
+
+    try:
+        stats = database.get_latency_stats(from_date=from_date, to_date=to_date, exclude_tests=bool(exclude_tests))
+        return LatencyStatsResponse(**stats)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get latency statistics: {str(e)}")
+
+
 @app.get("/api/chart-data", response_model=Dict[str, Any])
 async def get_chart_data(
     from_date: Optional[str] = Query(None, description="Start date (ISO format: YYYY-MM-DDTHH:MM:SSZ)"),
     to_date: Optional[str] = Query(None, description="End date (ISO format: YYYY-MM-DDTHH:MM:SSZ)"),
     exclude_tests: Optional[bool] = Query(None, description="Exclude test jobs from chart data"),
+    granularity: str = Query("day", description="Bucket size: day or hour"),
     database: DatabaseManager = Depends(get_db)
 ):
     """
     Get time-series data for dashboard charts
 
-    Returns aggregated time-series data for visualizations:
-    - Daily validation counts
+    Returns aggregated time-series data for visualizations, read from the
+    daily/hourly rollup tables:
+    - Daily (or hourly) validation counts
     - Average duration per day
     - Success/failure rates
 
     Query Parameters:
     - from_date: Filter validations created after this date
     - to_date: Filter validations created before this date
+    - granularity: "day" (returns "daily", with site visitors) or "hour" (returns "hourly")
     """
     # Input validation
     validate_date_format(from_date, "from_date")
     validate_date_format(to_date, "to_date")
     validate_date_range(from_date, to_date)
 
+    if granularity not in ('day', 'hour'):
+        raise HTTPException(status_code=400, detail="granularity must be one of: day, hour")
+
     try:
-        # Simple aggregation query
-        query = """
-            SELECT
-                DATE(created_at) as date,
-                COUNT(*) as total_validations,
-                COUNT(CASE WHEN validation_status = 'completed' THEN 1 END) as completed,
-                COUNT(CASE WHEN validation_status = 'failed' THEN 1 END) as failed,
-                COUNT(CASE WHEN validation_status = 'pending' THEN 1 END) as pending,
-                SUM(CASE WHEN validation_status = 'completed' THEN citation_count ELSE 0 END) as successful_citations,
-                SUM(CASE WHEN validation_status = 'failed' THEN citation_count ELSE 0 END) as failed_citations,
-                SUM(citation_count) as total_citations,
-                COUNT(DISTINCT CASE WHEN user_type = 'free' THEN free_user_id END) as unique_free_users,
-                COUNT(DISTINCT COALESCE(paid_user_id, free_user_id)) as total_unique_users,
-                SUM(valid_citations_count) as valid_citations,
-                SUM(invalid_citations_count) as invalid_citations
-            FROM validations
-            WHERE 1=1
-        """
-        params = []
-
-        if from_date:
-            query += " AND created_at >= ?"
-            params.append(from_date)
-
-        if to_date:
-            query += " AND created_at <= ?"
-            params.append(to_date)
-
-        if exclude_tests:
-            query += " AND (is_test_job = 0 OR is_test_job IS NULL)"
-
-        query += " GROUP BY DATE(created_at) ORDER BY date ASC"
-
-        cursor = database.conn.cursor()
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
+        chart_data = database.get_chart_data(
+            from_date=from_date, to_date=to_date, exclude_tests=bool(exclude_tests), granularity=granularity
+        )
+
+        if granularity == 'hour':
+            return {"hourly": chart_data["series"], "providers": chart_data["providers"]}
 
-        # Convert to list of dicts
-        daily_data = []
-        for row in rows:
-            daily_data.append({
-                "date": row[0],
-                "total_validations": row[1],
-                "completed": row[2],
-                "failed": row[3],
-                "pending": row[4],
-                "successful_citations": row[5] or 0,
-                "failed_citations": row[6] or 0,
-                "total_citations": row[7] or 0,
-                "unique_free_users": row[8] or 0,
-                "total_unique_users": row[9] or 0,
-                "valid_citations": row[10] or 0,
-                "invalid_citations": row[11] or 0
-            })
-
-        # Also get provider distribution
-        provider_query = """
-            SELECT provider, COUNT(*) as count
-            FROM validations
-            WHERE 1=1
-        """
-        provider_params = []
-
-        if from_date:
-            provider_query += " AND created_at >= ?"
-            provider_params.append(from_date)
-
-        if to_date:
-            provider_query += " AND created_at <= ?"
-            provider_params.append(to_date)
-
-        if exclude_tests:
-            provider_query += " AND (is_test_job = 0 OR is_test_job IS NULL)"
-
-        provider_query += " GROUP BY provider"
-
-        cursor.execute(provider_query, provider_params)
-        provider_rows = cursor.fetchall()
-
-        provider_data = {}
-        for row in provider_rows:
-            provider = row[0] or 'unknown'
-            provider_data[provider] = row[1]
-
-        # Get site visits data
+        # Merge site visits into the daily points
+        daily_data = chart_data["series"]
         visits_data = database.get_daily_site_visitors(from_date, to_date)
-        
-        # Merge visits into daily_data
-        # Note: daily_data is a list of dicts, visits_data is a dict {date: count}
         for day in daily_data:
-            day_date = day["date"]
-            day["site_visitors"] = visits_data.get(day_date, 0)
+            day["site_visitors"] = visits_data.get(day["date"], 0)
 
-        return {"daily": daily_data, "providers": provider_data}
+        return {"daily": daily_data, "providers": chart_data["providers"]}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get chart data: {str(e)}")
@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Parallel backfill of the dashboard database from rotated app and Nginx logs.
+
+Each app log is parsed in its own worker process, which spools the jobs it
+owns to disk. Only jobs whose events span files are held in memory and merged
+by job_id; everything is written in bounded batches.
+
+Usage:
+    python3 dashboard/backfill_logs.py --app-logs /opt/citations/logs/app.log* \\
+        --nginx-logs /var/log/nginx/access.log* [--since 2025-09-01] [--workers 4]
+"""
+import argparse
+import logging
+import os
+import pickle
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from itertools import chain
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# cron_parser and friends import their siblings as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cron_parser import INSERT_BATCH_SIZE, CronLogParser
+from database import DatabaseManager
+from log_parser import (
+    METRIC_LINE_MARKERS,
+    STREAM_PENDING_JOB_TIMEOUT_SECONDS,
+    StreamingJobParser,
+    _finalize_job_data,
+    add_upgrade_state,
+    extract_timestamp,
+    read_log_lines,
+)
+from nginx_log_parser import parse_nginx_logs
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = "/opt/citations/dashboard/data/validations.db"
+
+# How long a job can still get events that need its context: a worker reads
+# this much of the log before the lines it owns, and this much after them
+BACKFILL_OVERLAP_SECONDS = STREAM_PENDING_JOB_TIMEOUT_SECONDS
+
+
+def first_timestamp(log_file_path: str) -> Optional[datetime]:
+    """Timestamp of the first timestamped line in an app log, or None."""
+    for line in read_log_lines(log_file_path):
+        timestamp = extract_timestamp(line)
+        if timestamp:
+            return timestamp
+    return None
+
+
+def date_app_logs(log_file_paths: List[str]) -> List[Tuple[datetime, str]]:
+    """
+    (first timestamp, path) of each app log, oldest first.
+
+    Rotation suffixes (app.log.1, app.log.2.gz, ...) count backwards in time
+    and mix with uncompressed files, so the contents decide the order. Files
+    without any timestamped line are dropped.
+    """
+    dated = []
+    for path in log_file_paths:
+        timestamp = first_timestamp(path)
+        if timestamp is None:
+            logger.warning(f"Skipping {path}: no timestamped lines")
+            continue
+        dated.append((timestamp, path))
+    return sorted(dated)
+
+
+def _changes_since(snapshot: Dict[str, Any], job: Dict[str, Any]) -> Dict[str, Any]:
+    """Partial record with the fields of job that differ from snapshot."""
+    changes = {"job_id": job["job_id"]}
+    for field, value in job.items():
+        if snapshot.get(field) != value:
+            if field == "corrections_copied":
+                value -= snapshot.get(field, 0)
+            changes[field] = value
+    return changes
+
+
+def _parse_app_log(
+    log_file_paths: List[str],
+    own_start: Optional[str],
+    own_end: Optional[str],
+    start_timestamp: Optional[datetime],
+    overlap_seconds: int,
+    spool_path: str
+) -> List[Dict[str, Any]]:
+    """
+    Worker: parse the lines logged in [own_start, own_end) with their context.
+
+    Lines are read from the start of the first file onwards, so each file is
+    read (and decompressed) once in full; only the start of the next one is
+    read again. What comes before own_start is a lead-in: only its
+    lifecycle events are replayed, so metric matching and user ID
+    association see the same candidate jobs as parsing the files as one log.
+    Jobs seen in it belong to the previous worker, so only what this range
+    changes about them is returned. The overlap_seconds after own_end
+    complete this worker's jobs; jobs first seen there belong to the next
+    worker. CORRECTION_EVENT lines are only counted by the worker whose
+    range contains them.
+
+    Complete job records are pickled to spool_path in batches of
+    INSERT_BATCH_SIZE as they finish, so memory is bounded by the jobs open
+    at any one time.
+
+    Args:
+        log_file_paths: This worker's app log and every later one, oldest first
+        own_start: First owned "YYYY-MM-DD HH:MM:SS", or None for the beginning
+        own_end: End of the owned range (exclusive), or None for the end
+
+    Returns:
+        Raw partial job records (no created_at), in log order
+    """
+    # Timestamp prefixes compare like the times they encode
+    read_end = None
+    if own_end:
+        read_end = (datetime.strptime(own_end, "%Y-%m-%d %H:%M:%S") +
+                    timedelta(seconds=overlap_seconds)).strftime("%Y-%m-%d %H:%M:%S")
+
+    parser = StreamingJobParser(finalize=False)
+    lead_in: Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+    # ids of the jobs open when the owned range ended
+    owned_open = None
+    partial: List[Dict[str, Any]] = []
+    batch: List[Dict[str, Any]] = []
+
+    def keep(records: List[Dict[str, Any]]) -> None:
+        for record in records:
+            entry = lead_in.get(record["job_id"])
+            if entry is not None and entry[0] is record:
+                del lead_in[record["job_id"]]
+                record = _changes_since(entry[1], record)
+                if len(record) > 1:
+                    partial.append(record)
+                continue
+            if owned_open is not None:
+                if id(record) not in owned_open:
+                    continue
+                owned_open.discard(id(record))
+            if record.get("created_at"):
+                batch.append(record)
+            else:
+                partial.append(record)
+        if len(batch) >= INSERT_BATCH_SIZE:
+            pickle.dump(batch, spool)
+            batch.clear()
+
+    phase = "lead-in" if own_start else "own"
+    lines = chain.from_iterable(read_log_lines(path, start_timestamp) for path in log_file_paths)
+    with open(spool_path, "wb") as spool:
+        for line in lines:
+            stamp = line[:19] if line[:1].isdigit() else None
+            if stamp:
+                if phase == "lead-in" and stamp >= own_start:
+                    # Jobs finished during the lead-in are the previous worker's
+                    phase = "own"
+                    lead_in = {job_id: (job, dict(job)) for job_id, job in parser.jobs.items()}
+                if phase == "own" and own_end and stamp >= own_end:
+                    phase = "overlap"
+                    owned_open = {id(job) for job in parser.jobs.values()}
+                if phase == "overlap" and stamp > read_end:
+                    break
+
+            if phase == "lead-in":
+                if (stamp and 'CORRECTION_EVENT:' not in line and
+                        not any(marker in line for marker in METRIC_LINE_MARKERS)):
+                    parser.feed(line)
+                continue
+            if phase == "overlap" and 'CORRECTION_EVENT:' in line:
+                continue
+            keep(parser.feed(line))
+
+        if phase != "lead-in":
+            keep(parser.finish())
+        if batch:
+            pickle.dump(batch, spool)
+
+    return partial
+
+
+def _read_spool(spool_path: str) -> Iterator[Dict[str, Any]]:
+    """Job records pickled by _parse_app_log, in the order they were written."""
+    with open(spool_path, "rb") as spool:
+        while True:
+            try:
+                yield from pickle.load(spool)
+            except EOFError:
+                return
+
+
+def merge_job_records(records: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Merge raw job records from several files by job_id.
+
+    Records must be in log order (older files first). Later non-null fields
+    win, upgrade states are combined in funnel order and correction counts
+    add up, which is what parsing the files as one log would give for a job
+    whose events are split across them.
+
+    Returns:
+        Merged jobs indexed by job_id, in first-seen order
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    for record in records:
+        job = merged.get(record["job_id"])
+        if job is None:
+            merged[record["job_id"]] = dict(record)
+            continue
+
+        for field, value in record.items():
+            if value is None:
+                continue
+            if field == "upgrade_state":
+                for state in value.split(','):
+                    add_upgrade_state(job, state)
+            elif field == "corrections_copied":
+                job[field] = job.get(field, 0) + value
+            else:
+                job[field] = value
+
+    return merged
+
+
+def iter_app_logs(
+    log_file_paths: List[str],
+    start_timestamp: Optional[datetime] = None,
+    workers: Optional[int] = None,
+    overlap_seconds: int = BACKFILL_OVERLAP_SECONDS
+) -> Iterator[Dict[str, Any]]:
+    """
+    Parse app logs in parallel and merge jobs that span files.
+
+    Each worker owns the lines from overlap_seconds after its file starts to
+    overlap_seconds after the next one starts. Jobs that got events in more
+    than one worker's range (or after the record a worker spooled) are held
+    back and yielded last, merged; everything else streams from the spools.
+
+    Args:
+        log_file_paths: App log files in any order (supports .gz)
+        start_timestamp: Optional timestamp to start parsing from
+        workers: Worker processes (defaults to the CPU count)
+        overlap_seconds: How far each worker reads around its own range
+
+    Yields:
+        Finalized job dictionaries, as parse_logs() returns them
+    """
+    dated = date_app_logs(log_file_paths)
+    ordered = [path for _, path in dated]
+    bounds = [None] + [
+        (start + timedelta(seconds=overlap_seconds)).strftime("%Y-%m-%d %H:%M:%S") for start, _ in dated[1:]
+    ]
+
+    with tempfile.TemporaryDirectory(prefix="backfill-") as spool_dir:
+        spool_paths = [os.path.join(spool_dir, f"{index}.pickle") for index in range(len(ordered))]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            per_file = pool.map(
+                _parse_app_log,
+                [ordered[index:] for index in range(len(ordered))],
+                bounds,
+                bounds[1:] + [None],
+                [start_timestamp] * len(ordered),
+                [overlap_seconds] * len(ordered),
+                spool_paths
+            )
+            partial = [record for file_records in per_file for record in file_records]
+
+        spanning = {record["job_id"] for record in partial}
+        held = []
+        for spool_path in spool_paths:
+            for record in _read_spool(spool_path):
+                if record["job_id"] in spanning:
+                    held.append(record)
+                else:
+                    yield from _finalize_job_data({record["job_id"]: record})
+
+    yield from _finalize_job_data(merge_job_records(held + partial))
+
+
+def parse_nginx_log_files(
+    log_file_paths: List[str],
+    start_timestamp: Optional[datetime] = None,
+    workers: Optional[int] = None
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Parse Nginx access logs in parallel.
+
+    Yields:
+        The visits of each file, in the order of log_file_paths
+    """
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(parse_nginx_logs, log_file_paths, [start_timestamp] * len(log_file_paths))
+
+
+def _advance_metadata(db: DatabaseManager, key: str, update: Callable, *args) -> None:
+    """Run a CronLogParser metadata update, but never move the cron's position back."""
+    previous = db.get_metadata(key)
+    update(db, *args)
+    if previous and db.get_metadata(key) < previous:
+        db.set_metadata(key, previous)
+
+
+def backfill(
+    db_path: str,
+    app_log_paths: List[str],
+    nginx_log_paths: List[str],
+    start_timestamp: Optional[datetime] = None,
+    workers: Optional[int] = None
+) -> Tuple[int, int]:
+    """
+    Parse all files in parallel and write them to the database in batches.
+
+    Returns:
+        (jobs written, visits written)
+    """
+    cron_parser = CronLogParser(db_path)
+    job_count = visit_count = 0
+
+    with DatabaseManager(db_path) as db:
+        if app_log_paths:
+            job_count, latest_job = cron_parser._insert_job_stream(
+                db, iter_app_logs(app_log_paths, start_timestamp, workers)
+            )
+            if latest_job:
+                _advance_metadata(db, "last_parsed_timestamp", cron_parser._update_timestamp_metadata, [latest_job])
+
+        latest_visit = None
+        for visits in parse_nginx_log_files(nginx_log_paths, start_timestamp, workers) if nginx_log_paths else []:
+            if not visits:
+                continue
+            cron_parser._insert_parsed_visits(db, visits)
+            visit_count += len(visits)
+            newest = max(visits, key=lambda visit: visit["timestamp"])
+            if latest_visit is None or newest["timestamp"] > latest_visit["timestamp"]:
+                latest_visit = newest
+        if latest_visit:
+            _advance_metadata(db, "last_nginx_parsed_timestamp", cron_parser._update_nginx_timestamp_metadata, [latest_visit])
+
+    logger.info(f"Wrote {job_count} jobs from {len(app_log_paths)} app logs "
+                f"and {visit_count} visits from {len(nginx_log_paths)} Nginx logs")
+    return job_count, visit_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill the dashboard database from rotated logs")
+    parser.add_argument("--app-logs", nargs="*", default=[], help="App log files (app.log, app.log.N.gz, ...)")
+    parser.add_argument("--nginx-logs", nargs="*", default=[], help="Nginx access log files")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="Only parse entries from this date/time")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--db", default=os.environ.get("CITATION_DB_PATH", DEFAULT_DB_PATH), help="Database path")
+    args = parser.parse_args()
+
+    if not args.app_logs and not args.nginx_logs:
+        parser.error("nothing to backfill: pass --app-logs and/or --nginx-logs")
+
+    job_count, visit_count = backfill(args.db, args.app_logs, args.nginx_logs, args.since, args.workers)
+    print(f"Backfilled {job_count} jobs and {visit_count} visits into {args.db}")
+
+
+if __name__ == "__main__":
+    main()
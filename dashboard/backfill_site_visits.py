@@ -21,6 +21,9 @@ logger = logging.getLogger(__name__)
 DEFAULT_DB_PATH = "/opt/citations/dashboard/data/validations.db"
 DEFAULT_LOG_PATH = "/var/log/nginx/access.log"
 
+# Visits written per transaction
+BATCH_SIZE = 5000
+
 def backfill_visits(log_path, db_path):
     if not os.path.exists(log_path):
         logger.error(f"Log file not found at {log_path}")
@@ -55,14 +58,14 @@ def backfill_visits(log_path, db_path):
         # Given the volume, we'll just insert for now.
         
         count = 0
-        for visit in visits:
+        for start in range(0, len(visits), BATCH_SIZE):
+            batch = visits[start:start + BATCH_SIZE]
             try:
-                db.insert_site_visit(visit)
-                count += 1
-                if count % 1000 == 0:
-                    print(f"Inserted {count} visits...", end='\r')
+                db.insert_site_visits(batch)
+                count += len(batch)
+                print(f"Inserted {count} visits...", end='\r')
             except Exception as e:
-                logger.warning(f"Failed to insert visit: {e}")
+                logger.warning(f"Failed to insert batch of {len(batch)} visits: {e}")
                 
         print(f"Inserted {count} visits total.")
         
@@ -5,14 +5,18 @@ Handles incremental log parsing with metadata tracking
 """
 import logging
 from datetime import datetime, timedelta
-from typing import List, Dict
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from database import DatabaseManager
-from log_parser import parse_logs
+from event_consumer import consume_events
+from log_parser import iter_logs
 from nginx_log_parser import parse_nginx_logs
 
 logger = logging.getLogger(__name__)
 
+# Jobs written per transaction while streaming a log into the database
+INSERT_BATCH_SIZE = 1000
+
 
 class CronLogParser:
     """
@@ -92,26 +96,103 @@ class CronLogParser:
             now = datetime.now()
             db.set_metadata("last_nginx_parsed_timestamp", now.strftime("%Y-%m-%d %H:%M:%S"))
 
-    def _insert_parsed_jobs(self, db: DatabaseManager, parsed_jobs: List[Dict]):
+    def _insert_parsed_jobs(self, db: DatabaseManager, parsed_jobs: List[Dict],
+                            metadata: Optional[Dict[str, str]] = None):
         """
         Insert parsed jobs into database
 
+        Writes all jobs in one transaction (see _write_parsed_jobs), then
+        brings the dashboard's daily/hourly rollups up to date.
+
         Args:
             db: Database manager instance
             parsed_jobs: List of parsed jobs to insert
+            metadata: Parser metadata to commit together with the jobs
         """
-        for job in parsed_jobs:
-            try:
-                db.insert_validation(job)
+        self._write_parsed_jobs(db, parsed_jobs, metadata)
+        self._refresh_rollups(db)
 
-            except Exception as e:
-                # Log job insertion error for individual job
-                logger.warning(f"Failed to insert job {job.get('job_id', 'unknown')}: {str(e)}")
+    def _write_parsed_jobs(self, db: DatabaseManager, parsed_jobs: List[Dict],
+                           metadata: Optional[Dict[str, str]] = None):
+        """
+        Write parsed jobs in one transaction
 
-                # Log to parser_errors table for later review
+        If the batch fails, falls back to inserting jobs one by one so a bad
+        record doesn't block the rest.
+
+        Args:
+            db: Database manager instance
+            parsed_jobs: List of parsed jobs to insert
+            metadata: Parser metadata to commit together with the jobs
+        """
+        try:
+            missing_job_ids = db.insert_validations(parsed_jobs, metadata=metadata)
+        except Exception as e:
+            logger.warning(f"Batch job insertion failed, retrying jobs individually: {str(e)}")
+            self._insert_jobs_individually(db, parsed_jobs, metadata)
+        else:
+            for job_id in missing_job_ids:
+                # Partial update (e.g. upgrade event) for a job not in the database
+                logger.warning(f"Failed to insert job {job_id}: no existing record for partial update")
                 error_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                error_msg = f"Job insertion failed: {str(e)}"
-                db.insert_parser_error(error_time, error_msg, f"Job ID: {job.get('job_id', 'unknown')}")
+                db.insert_parser_error(error_time, "Job insertion failed: no existing record for partial update", f"Job ID: {job_id}")
+
+    def _refresh_rollups(self, db: DatabaseManager):
+        """Bring the dashboard's daily/hourly rollups up to date"""
+        try:
+            days = db.refresh_rollups()
+            logger.info(f"Refreshed dashboard rollups for {days} days")
+        except Exception as e:
+            # Readers serve the previous rollups until the next run succeeds
+            logger.warning(f"Rollup refresh failed: {str(e)}")
+
+    def _insert_job_stream(self, db: DatabaseManager, parsed_jobs: Iterable[Dict]) -> Tuple[int, Optional[Dict]]:
+        """
+        Write a stream of parsed jobs in batches of INSERT_BATCH_SIZE
+
+        With jobs from iter_logs(), memory is bounded by the jobs open at any
+        one time rather than the size of the log. A job that gets events
+        after it was written comes back as a partial record, which the
+        database merges into the stored row. Rollups are refreshed once, after
+        the last batch.
+
+        Args:
+            db: Database manager instance
+            parsed_jobs: Iterable of parsed jobs (read only once)
+
+        Returns:
+            Number of job records written, and the one created last (or None)
+        """
+        job_count = 0
+        latest_job = None
+        batch = []
+        for job in parsed_jobs:
+            batch.append(job)
+            if job.get("created_at") and (latest_job is None or job["created_at"] > latest_job["created_at"]):
+                latest_job = job
+            if len(batch) >= INSERT_BATCH_SIZE:
+                self._write_parsed_jobs(db, batch)
+                job_count += len(batch)
+                batch = []
+
+        if batch:
+            self._write_parsed_jobs(db, batch)
+            job_count += len(batch)
+        if job_count:
+            self._refresh_rollups(db)
+        return job_count, latest_job
+
+    def _insert_jobs_individually(self, db: DatabaseManager, parsed_jobs: List[Dict],
+                                  metadata: Optional[Dict[str, str]] = None):
+        """Insert jobs one by one, logging failures to parser_errors"""
+        for job_id, e in db.insert_validations_individually(parsed_jobs, metadata=metadata):
+            # Log job insertion error for individual job
+            logger.warning(f"Failed to insert job {job_id or 'unknown'}: {str(e)}")
+
+            # Log to parser_errors table for later review
+            error_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            error_msg = f"Job insertion failed: {str(e)}"
+            db.insert_parser_error(error_time, error_msg, f"Job ID: {job_id or 'unknown'}")
 
     def _insert_parsed_visits(self, db: DatabaseManager, parsed_visits: List[Dict]):
         """
@@ -121,6 +202,12 @@ class CronLogParser:
             db: Database manager instance
             parsed_visits: List of parsed visits
         """
+        try:
+            db.insert_site_visits(parsed_visits)
+            return
+        except Exception as e:
+            logger.warning(f"Batch visit insertion failed, retrying visits individually: {str(e)}")
+
         for visit in parsed_visits:
             try:
                 db.insert_site_visit(visit)
@@ -162,15 +249,15 @@ class CronLogParser:
 
             try:
                 logger.info(f"Parsing logs from {last_timestamp}")
-                parsed_jobs = parse_logs(log_file_path, start_timestamp=last_timestamp)
+                job_count, latest_job = self._insert_job_stream(
+                    db, iter_logs(log_file_path, start_timestamp=last_timestamp)
+                )
 
-                if parsed_jobs:
-                    logger.info(f"Found {len(parsed_jobs)} new jobs to insert")
-                    # Insert to database
-                    self._insert_parsed_jobs(db, parsed_jobs)
+                if job_count:
+                    logger.info(f"Inserted {job_count} new jobs")
 
                     # Update last parsed timestamp
-                    self._update_timestamp_metadata(db, parsed_jobs)
+                    self._update_timestamp_metadata(db, [latest_job] if latest_job else [])
                     logger.info(f"Updated last_parsed_timestamp")
                 else:
                     logger.info("No new jobs found in log segment")
@@ -190,6 +277,25 @@ class CronLogParser:
                 else:
                     db.set_metadata("last_parsed_timestamp", error_time)
 
+    def parse_events(self, event_log_path: str):
+        """
+        Ingest the backend's structured events added since the last run
+
+        Replaces parse_incremental() once the backend writes an event log:
+        every event names its job, so nothing is matched by timestamp.
+
+        Args:
+            event_log_path: Path to the NDJSON event log
+        """
+        with DatabaseManager(self.db_path) as db:
+            try:
+                job_count = consume_events(db, event_log_path, self._insert_parsed_jobs)
+                logger.info(f"Ingested events for {job_count} jobs")
+            except Exception as e:
+                error_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                logger.error(f"Error consuming events: {str(e)}")
+                db.insert_parser_error(error_time, str(e), f"Error consuming {event_log_path}")
+
     def parse_nginx_incremental(self, nginx_log_path: str):
         """
         Parse Nginx logs incrementally
@@ -239,15 +345,15 @@ class CronLogParser:
 
             try:
                 logger.info(f"Running initial load from {three_days_ago}")
-                parsed_jobs = parse_logs(log_file_path, start_timestamp=three_days_ago)
+                job_count, latest_job = self._insert_job_stream(
+                    db, iter_logs(log_file_path, start_timestamp=three_days_ago)
+                )
 
-                if parsed_jobs:
-                    logger.info(f"Initial load found {len(parsed_jobs)} jobs from last 3 days")
-                    # Insert to database
-                    self._insert_parsed_jobs(db, parsed_jobs)
+                if job_count:
+                    logger.info(f"Initial load inserted {job_count} jobs from last 3 days")
 
                     # Update last parsed timestamp
-                    self._update_timestamp_metadata(db, parsed_jobs)
+                    self._update_timestamp_metadata(db, [latest_job] if latest_job else [])
                     logger.info(f"Initial load completed and timestamp updated")
                 else:
                     logger.info(f"No jobs found in initial load from last 3 days")
@@ -6,8 +6,252 @@ Handles validations, parser metadata, and parser errors
 import sqlite3
 import os
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
+import base64
 import json
+import math
+
+
+# Fields insert_validation copies from validation_data when the column exists
+VALIDATION_FIELDS = (
+    'created_at', 'completed_at', 'duration_seconds', 'citation_count',
+    'token_usage_prompt', 'token_usage_completion', 'token_usage_total',
+    'valid_citations_count', 'invalid_citations_count',
+    'user_type', 'error_message', 'paid_user_id', 'free_user_id',
+    'results_gated', 'results_revealed_at', 'gated_outcome', 'upgrade_state',
+    'provider', 'is_test_job',
+    'experiment_variant', 'product_id', 'amount_cents', 'currency', 'order_id',
+    'interaction_type', 'corrections_copied', 'style',
+    'validation_type', 'inline_citation_count', 'orphan_count', 'stage_timings'
+)
+
+# Materialized validations rollups: granularity -> (rollup table, unique users
+# table, created_at prefix length of a bucket). Buckets are the raw created_at
+# prefix ('YYYY-MM-DD', 'YYYY-MM-DDTHH'), so a date range splits exactly into
+# whole buckets and the two partial ones at its ends.
+ROLLUP_TABLES = {
+    'day': ('validations_daily_rollup', 'validations_daily_users', 10),
+    'hour': ('validations_hourly_rollup', 'validations_hourly_users', 13),
+}
+
+# Bump when ROLLUP_DIMENSIONS/ROLLUP_MEASURES change to rebuild all rollups
+ROLLUP_VERSION = '1'
+
+ROLLUP_DIMENSIONS = (
+    'user_type', 'style', 'provider', 'experiment_variant',
+    'validation_type', 'gated_outcome', 'is_test_job'
+)
+
+# (column, aggregate over validations); every column adds up across buckets
+ROLLUP_MEASURES = (
+    ('total', "COUNT(*)"),
+    ('completed', "SUM(CASE WHEN {status} = 'completed' THEN 1 ELSE 0 END)"),
+    ('failed', "SUM(CASE WHEN {status} = 'failed' THEN 1 ELSE 0 END)"),
+    ('pending', "SUM(CASE WHEN {status} = 'pending' THEN 1 ELSE 0 END)"),
+    ('citations', "SUM(citation_count)"),
+    ('citations_n', "COUNT(citation_count)"),
+    ('completed_citations', "SUM(CASE WHEN {status} = 'completed' THEN citation_count ELSE 0 END)"),
+    ('failed_citations', "SUM(CASE WHEN {status} = 'failed' THEN citation_count ELSE 0 END)"),
+    ('valid_citations', "SUM(valid_citations_count)"),
+    ('invalid_citations', "SUM(invalid_citations_count)"),
+    ('duration_sum', "SUM(duration_seconds)"),
+    ('duration_n', "COUNT(duration_seconds)"),
+    ('token_usage_prompt', "SUM(token_usage_prompt)"),
+    ('token_usage_completion', "SUM(token_usage_completion)"),
+    ('token_usage_total', "SUM(token_usage_total)"),
+    ('gated', "SUM(CASE WHEN {results_gated} = 1 THEN 1 ELSE 0 END)"),
+    ('revealed', "SUM(CASE WHEN {results_gated} = 1 AND {results_revealed_at} IS NOT NULL THEN 1 ELSE 0 END)"),
+    ('reveal_seconds_sum', "SUM({reveal_seconds})"),
+    ('reveal_n', "COUNT({reveal_seconds})"),
+    ('full_doc', "SUM(CASE WHEN validation_type = 'full_doc' THEN 1 ELSE 0 END)"),
+    ('full_doc_inline_citations',
+     "SUM(CASE WHEN validation_type = 'full_doc' THEN COALESCE(inline_citation_count, 0) ELSE 0 END)"),
+    ('inline_citations', "SUM(COALESCE(inline_citation_count, 0))"),
+    ('orphans', "SUM(COALESCE(orphan_count, 0))"),
+)
+
+# Columns of the original CREATE TABLE that databases created before them lack
+ROLLUP_OPTIONAL_COLUMNS = (
+    'results_gated', 'results_revealed_at', 'gated_outcome', 'provider', 'paid_user_id', 'free_user_id'
+)
+
+INSERT_SITE_VISIT_SQL = """
+    INSERT INTO site_visits (
+        timestamp, ip_address, path, status_code, referer, user_agent, visitor_id
+    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+class ValidationsSchema:
+    """
+    Cached column layout of the validations table
+
+    The table exists in several migrated shapes (status and/or
+    validation_status, optional gating/user/analytics columns). This is built
+    once from PRAGMA table_info and holds the column-aware INSERT SQL, so
+    reads and writes don't re-introspect the table on every call.
+    """
+
+    def __init__(self, columns: List[str]):
+        self.columns = frozenset(columns)
+        self.has_status = 'status' in self.columns
+        self.has_validation_status = 'validation_status' in self.columns
+
+        # Status columns written on UPDATE (only those that exist)
+        self.update_status_columns = tuple(
+            col for col in ('status', 'validation_status') if col in self.columns
+        )
+        # Status columns written on INSERT (validation_status if neither exists)
+        status_columns = list(self.update_status_columns) or ['validation_status']
+        # Status for aggregates: prefer status, fall back to validation_status
+        if self.has_status and self.has_validation_status:
+            self.status_expression = "COALESCE(status, validation_status)"
+        elif self.has_status:
+            self.status_expression = "status"
+        else:
+            self.status_expression = "validation_status"
+
+        optional_columns = ['completed_at', 'duration_seconds', 'citation_count',
+                            'token_usage_prompt', 'token_usage_completion', 'token_usage_total',
+                            'valid_citations_count', 'invalid_citations_count']
+        # User ID and gating columns are only written as complete groups
+        if all(col in self.columns for col in ['paid_user_id', 'free_user_id']):
+            optional_columns.extend(['paid_user_id', 'free_user_id'])
+        if all(col in self.columns for col in ['results_gated', 'results_revealed_at', 'gated_outcome']):
+            optional_columns.extend(['results_gated', 'results_revealed_at', 'gated_outcome'])
+        optional_columns.extend([
+            'upgrade_state', 'provider', 'is_test_job',
+            'experiment_variant', 'product_id', 'amount_cents', 'currency', 'order_id',
+            'interaction_type', 'corrections_copied', 'style',
+            'validation_type', 'inline_citation_count', 'orphan_count', 'stage_timings'
+        ])
+
+        self.insert_columns = tuple(
+            ['job_id', 'created_at', 'user_type', 'error_message'] + status_columns +
+            [col for col in optional_columns if col in self.columns]
+        )
+        self.insert_sql = (
+            f"INSERT OR REPLACE INTO validations ({', '.join(self.insert_columns)}) "
+            f"VALUES ({', '.join(['?'] * len(self.insert_columns))})"
+        )
+        self.updatable_fields = tuple(field for field in VALIDATION_FIELDS if field in self.columns)
+        self._update_sql: Dict[tuple, str] = {}
+
+        # Batch UPSERT: insert new rows like insert_sql; for existing rows only
+        # overwrite fields that are not None (same as insert_validation's UPDATE)
+        self.upsert_columns = tuple(self.insert_columns) + tuple(
+            col for col in self.updatable_fields if col not in self.insert_columns
+        )
+        merged_columns = [col for col in self.upsert_columns if col != 'job_id']
+        assignments = ', '.join(f"{col} = COALESCE(excluded.{col}, validations.{col})" for col in merged_columns)
+        self.upsert_sql = (
+            f"INSERT INTO validations ({', '.join(self.upsert_columns)}) "
+            f"VALUES ({', '.join(['?'] * len(self.upsert_columns))}) "
+            f"ON CONFLICT(job_id) DO UPDATE SET {assignments}"
+        )
+        # Partial update (no created_at/user_type/status): existing rows only
+        self.merge_update_sql = (
+            f"UPDATE validations SET "
+            f"{', '.join(f'{col} = COALESCE(?, {col})' for col in merged_columns)} "
+            f"WHERE job_id = ?"
+        )
+
+    def insert_values(self, validation_data: Dict[str, Any]) -> List[Any]:
+        """Values for insert_sql, in insert_columns order"""
+        values = []
+        for col in self.insert_columns:
+            if col in ('job_id', 'created_at', 'user_type'):
+                values.append(validation_data[col])
+            elif col in ('status', 'validation_status'):
+                values.append(validation_data["status"])  # Map to both if present
+            else:
+                values.append(validation_data.get(col))
+        return values
+
+    def upsert_values(self, validation_data: Dict[str, Any]) -> List[Any]:
+        """Values for upsert_sql/merge_update_sql, in upsert_columns order"""
+        values = []
+        for col in self.upsert_columns:
+            if col in ('status', 'validation_status'):
+                values.append(validation_data.get("status"))  # Map to both if present
+            else:
+                values.append(validation_data.get(col))
+        return values
+
+    def update_sql(self, set_columns: tuple) -> str:
+        """UPDATE statement for the given columns, memoized per column set"""
+        sql = self._update_sql.get(set_columns)
+        if sql is None:
+            assignments = ', '.join(f"{col} = ?" for col in set_columns)
+            sql = self._update_sql[set_columns] = f"UPDATE validations SET {assignments} WHERE job_id = ?"
+        return sql
+
+
+def encode_page_cursor(validation: Dict[str, Any]) -> str:
+    """Opaque cursor for the page after this record (see get_validations(after=...))"""
+    key = json.dumps([validation["created_at"], validation["job_id"]])
+    return base64.urlsafe_b64encode(key.encode()).decode()
+
+
+def decode_page_cursor(cursor: str) -> Tuple[str, str]:
+    """
+    (created_at, job_id) of a cursor from encode_page_cursor()
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        created_at, job_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise ValueError(f"Invalid page cursor: {cursor}")
+    if not isinstance(created_at, str) or not isinstance(job_id, str):
+        raise ValueError(f"Invalid page cursor: {cursor}")
+    return created_at, job_id
+
+
+def _add_rollup_rows(rows) -> Dict[str, Any]:
+    """Sum the ROLLUP_MEASURES of rollup rows (None counts as 0)"""
+    rows = list(rows)
+    return {name: sum(row[name] or 0 for row in rows) for name, _ in ROLLUP_MEASURES}
+
+
+def _ratio(numerator, denominator) -> float:
+    """numerator / denominator, or 0.0 when there is nothing to divide by"""
+    return numerator / denominator if denominator else 0.0
+
+
+def _gated_breakdown(rows: List[Dict[str, Any]], dimension: str) -> Dict[str, Dict[str, Any]]:
+    """Gated/revealed counts and reveal rate per value of a rollup dimension"""
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        groups.setdefault(row[dimension] or 'unknown', []).append(row)
+
+    breakdown = {}
+    for key, group_rows in groups.items():
+        totals = _add_rollup_rows(group_rows)
+        breakdown[key] = {
+            "total_validations": totals["total"],
+            "gated": totals["gated"],
+            "revealed": totals["revealed"],
+            "reveal_rate": round(_ratio(totals["revealed"], totals["gated"]) * 100, 1)
+        }
+    return breakdown
+
+
+def _latency_summary(values: List[float]) -> Dict[str, Any]:
+    """Count, average and nearest-rank p50/p95/p99 of stage latencies in seconds"""
+    values = sorted(values)
+
+    def percentile(q: float) -> float:
+        return values[max(0, math.ceil(q * len(values)) - 1)]
+
+    return {
+        "count": len(values),
+        "avg": round(sum(values) / len(values), 3),
+        "p50": percentile(0.5),
+        "p95": percentile(0.95),
+        "p99": percentile(0.99),
+    }
 
 
 class DatabaseManager:
@@ -22,6 +266,7 @@ class DatabaseManager:
         """
         self.db_path = db_path
         self.conn = None
+        self._validations_schema: Optional[ValidationsSchema] = None
         self._connect()
         self._create_schema()
 
@@ -142,7 +387,9 @@ class DatabaseManager:
             'style': 'TEXT',
             'validation_type': "TEXT DEFAULT 'ref_only'",
             'inline_citation_count': 'INTEGER DEFAULT 0',
-            'orphan_count': 'INTEGER DEFAULT 0'
+            'orphan_count': 'INTEGER DEFAULT 0',
+            # JSON object of stage -> seconds (backend/timing.py spans)
+            'stage_timings': 'TEXT'
         }
 
 
@@ -168,9 +415,101 @@ class DatabaseManager:
         if 'validation_type' in columns:
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_validation_type ON validations(validation_type)")
 
+        # Composite indexes in list order (created_at, job_id) for keyset pagination:
+        # a filtered page walks one index range and stops after `limit` rows, and
+        # counts (and job_id searches) are answered from the index alone
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_validations_created_job ON validations(created_at, job_id)")
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_validations_user_type_created ON validations(user_type, created_at, job_id)"
+        )
+        for filter_column in ('status', 'validation_status', 'is_test_job'):
+            if filter_column in columns:
+                cursor.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_validations_{filter_column}_created "
+                    f"ON validations({filter_column}, created_at, job_id)"
+                )
+
+        self._create_rollup_schema(cursor)
+
   
         self.conn.commit()
 
+        # Columns may have changed
+        self.invalidate_schema()
+
+    def _create_rollup_schema(self, cursor):
+        """
+        Create the daily/hourly rollup tables and the triggers that track
+        which days they are stale for
+
+        Any write to validations (cron, backend) marks its created_at day in
+        validations_rollup_dirty; refresh_rollups() recomputes those days.
+        On first use (or a ROLLUP_VERSION change) every day is marked.
+        """
+        dimensions = ', '.join(
+            f"{dim} INTEGER NOT NULL" if dim == 'is_test_job' else f"{dim} TEXT"
+            for dim in ROLLUP_DIMENSIONS
+        )
+        measures = ', '.join(
+            f"{name} REAL" if name.endswith('_sum') else f"{name} INTEGER"
+            for name, _ in ROLLUP_MEASURES
+        )
+        for table, users_table, _ in ROLLUP_TABLES.values():
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS {table} (bucket TEXT NOT NULL, {dimensions}, {measures})")
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_bucket ON {table}(bucket)")
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {users_table} (
+                    bucket TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    user_key TEXT NOT NULL,
+                    is_test_job INTEGER NOT NULL,
+                    PRIMARY KEY (bucket, kind, user_key, is_test_job)
+                ) WITHOUT ROWID
+            """)
+
+        cursor.execute("CREATE TABLE IF NOT EXISTS validations_rollup_dirty (day TEXT PRIMARY KEY)")
+        # Trigger statements take the conflict policy of the statement that fired
+        # them (an UPSERT aborts), so skip marked days instead of OR IGNORE
+        for event, rows in (('INSERT', ('NEW',)), ('UPDATE', ('OLD', 'NEW')), ('DELETE', ('OLD',))):
+            marks = ' '.join(
+                f"INSERT INTO validations_rollup_dirty (day) SELECT substr({row}.created_at, 1, 10) "
+                f"WHERE NOT EXISTS (SELECT 1 FROM validations_rollup_dirty "
+                f"WHERE day = substr({row}.created_at, 1, 10));"
+                for row in rows
+            )
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_validations_rollup_{event.lower()}
+                AFTER {event} ON validations
+                BEGIN {marks} END
+            """)
+
+        cursor.execute("SELECT value FROM parser_metadata WHERE key = 'rollup_version'")
+        row = cursor.fetchone()
+        if not row or row[0] != ROLLUP_VERSION:
+            for table, users_table, _ in ROLLUP_TABLES.values():
+                cursor.execute(f"DELETE FROM {table}")
+                cursor.execute(f"DELETE FROM {users_table}")
+            cursor.execute("""
+                INSERT OR IGNORE INTO validations_rollup_dirty (day)
+                SELECT DISTINCT substr(created_at, 1, 10) FROM validations
+            """)
+            cursor.execute(
+                "INSERT OR REPLACE INTO parser_metadata (key, value) VALUES ('rollup_version', ?)",
+                (ROLLUP_VERSION,)
+            )
+
+    @property
+    def validations_schema(self) -> ValidationsSchema:
+        """Validations table layout, introspected once and cached until invalidate_schema()"""
+        if self._validations_schema is None:
+            cursor = self.conn.execute("PRAGMA table_info(validations)")
+            self._validations_schema = ValidationsSchema([col[1] for col in cursor.fetchall()])
+        return self._validations_schema
+
+    def invalidate_schema(self):
+        """Drop the cached validations schema (call after migrating the table)"""
+        self._validations_schema = None
+
     def get_table_schema(self, table_name: str) -> List[str]:
         """
         Get column definitions for a table
@@ -222,7 +561,7 @@ class DatabaseManager:
         indexes = cursor.fetchall()
         return [idx[0] for idx in indexes]
 
-    def insert_validation(self, validation_data: Dict[str, Any]):
+    def insert_validation(self, validation_data: Dict[str, Any], commit: bool = True):
         """
         Insert or update a validation record (UPSERT)
         Handles both status and validation_status columns for backward compatibility
@@ -232,6 +571,7 @@ class DatabaseManager:
 
         Args:
             validation_data: Dictionary with validation fields
+            commit: Commit the write (False leaves it to the caller's transaction)
         """
         cursor = self.conn.cursor()
         job_id = validation_data.get("job_id")
@@ -239,147 +579,149 @@ class DatabaseManager:
         if not job_id:
             return
 
-        # Check what columns exist in the database
-        cursor.execute("PRAGMA table_info(validations)")
-        columns = [col[1] for col in cursor.fetchall()]
-
-        has_status = 'status' in columns
-        has_validation_status = 'validation_status' in columns
-        has_gating_columns = all(col in columns for col in ['results_gated', 'results_revealed_at', 'gated_outcome'])
-        has_upgrade_state = 'upgrade_state' in columns
-
         # Check if record exists
         cursor.execute("SELECT 1 FROM validations WHERE job_id = ?", (job_id,))
         exists = cursor.fetchone()
 
+        try:
+            self._write_validation(cursor, validation_data, exists)
+        except sqlite3.OperationalError:
+            # Table migrated by another process since the schema was cached
+            self.invalidate_schema()
+            self._write_validation(cursor, validation_data, exists)
+
+        if commit:
+            self.conn.commit()
+
+    def _write_validation(self, cursor, validation_data: Dict[str, Any], exists: bool):
+        """Run the UPDATE or INSERT for insert_validation using the cached schema"""
+        schema = self.validations_schema
+
         if exists:
             # UPDATE strategy: Only update fields that are present and not None in validation_data
             # This allows partial updates (like upgrade_state) without wiping other fields
-            update_clauses = []
-            update_params = []
-
-            # Simple fields mapping
-            simple_fields = [
-                'created_at', 'completed_at', 'duration_seconds', 'citation_count',
-                'token_usage_prompt', 'token_usage_completion', 'token_usage_total',
-                'valid_citations_count', 'invalid_citations_count',
-                'user_type', 'error_message', 'paid_user_id', 'free_user_id',
-                'results_gated', 'results_revealed_at', 'gated_outcome', 'upgrade_state',
-                'provider', 'is_test_job',
-                'experiment_variant', 'product_id', 'amount_cents', 'currency', 'order_id',
-                'interaction_type', 'corrections_copied', 'style',
-                'validation_type', 'inline_citation_count', 'orphan_count'
-            ]
-            
-            for field in simple_fields:
-                if field in columns and field in validation_data and validation_data[field] is not None:
-                    update_clauses.append(f"{field} = ?")
-                    update_params.append(validation_data[field])
+            set_columns = [field for field in schema.updatable_fields
+                           if validation_data.get(field) is not None]
+            params = [validation_data[field] for field in set_columns]
 
             # Status fields handling
             status_val = validation_data.get("status")
             if status_val is not None:
-                if has_status:
-                    update_clauses.append("status = ?")
-                    update_params.append(status_val)
-                if has_validation_status:
-                    update_clauses.append("validation_status = ?")
-                    update_params.append(status_val)
-            
-            if update_clauses:
-                query = f"UPDATE validations SET {', '.join(update_clauses)} WHERE job_id = ?"
-                update_params.append(job_id)
-                cursor.execute(query, update_params)
-                self.conn.commit()
+                set_columns.extend(schema.update_status_columns)
+                params.extend([status_val] * len(schema.update_status_columns))
 
+            if set_columns:
+                cursor.execute(schema.update_sql(tuple(set_columns)), params + [validation_data["job_id"]])
         else:
             # INSERT strategy for new records
-            # Build dynamic column and value lists
-            base_columns = ['job_id', 'created_at', 'user_type', 'error_message']
-            optional_columns = ['completed_at', 'duration_seconds', 'citation_count',
-                              'token_usage_prompt', 'token_usage_completion', 'token_usage_total',
-                              'valid_citations_count', 'invalid_citations_count']
-    
-            # Add user ID columns if they exist
-            if all(col in columns for col in ['paid_user_id', 'free_user_id']):
-                optional_columns.extend(['paid_user_id', 'free_user_id'])
-    
-            # Determine which status column to use
-            if has_status and has_validation_status:
-                status_columns = ['status', 'validation_status']
-            elif has_status:
-                status_columns = ['status']
+            cursor.execute(schema.insert_sql, schema.insert_values(validation_data))
+
+    def insert_validations(
+        self,
+        validations: List[Dict[str, Any]],
+        metadata: Optional[Dict[str, str]] = None
+    ) -> List[str]:
+        """
+        Insert or update many validation records in one transaction
+
+        Same result as calling insert_validation for each record, as a single
+        executemany UPSERT (INSERT ... ON CONFLICT DO UPDATE, COALESCE keeps
+        existing values for fields that are None). Records without
+        created_at/user_type/status are partial updates and only touch
+        existing rows.
+
+        Args:
+            validations: Validation dictionaries (e.g. parse_logs output)
+            metadata: Parser metadata to set in the same transaction, e.g. the
+                log position the records were read up to
+
+        Returns:
+            job_ids of partial updates that had no existing record to update
+        """
+        try:
+            return self._write_validations(validations, metadata)
+        except sqlite3.OperationalError:
+            # Table migrated by another process since the schema was cached
+            self.conn.rollback()
+            self.invalidate_schema()
+            return self._write_validations(validations, metadata)
+
+    def insert_validations_individually(
+        self,
+        validations: List[Dict[str, Any]],
+        metadata: Optional[Dict[str, str]] = None
+    ) -> List[Tuple[Optional[str], Exception]]:
+        """
+        Insert or update validation records one by one, in one transaction
+
+        Slow path for a batch that insert_validations rejected: each record
+        is written under its own savepoint, so a bad record is rolled back
+        alone and the rest commit together with the metadata.
+
+        Args:
+            validations: Validation dictionaries
+            metadata: Parser metadata to set in the same transaction
+
+        Returns:
+            (job_id, error) for each record that could not be written
+        """
+        failures = []
+        cursor = self.conn.cursor()
+        try:
+            if not self.conn.in_transaction:
+                cursor.execute("BEGIN")
+            for validation_data in validations:
+                cursor.execute("SAVEPOINT write_validation")
+                try:
+                    self.insert_validation(validation_data, commit=False)
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO write_validation")
+                    failures.append((validation_data.get("job_id"), e))
+                cursor.execute("RELEASE write_validation")
+            if metadata:
+                self._write_metadata(cursor, metadata)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+        return failures
+
+    def _write_validations(
+        self,
+        validations: List[Dict[str, Any]],
+        metadata: Optional[Dict[str, str]] = None
+    ) -> List[str]:
+        schema = self.validations_schema
+        complete = []
+        partial = []
+        for validation_data in validations:
+            if not validation_data.get("job_id"):
+                continue
+            if all(validation_data.get(field) is not None for field in ('created_at', 'user_type', 'status')):
+                complete.append(schema.upsert_values(validation_data))
             else:
-                status_columns = ['validation_status']
-    
-            # Add gating columns if they exist
-            if has_gating_columns:
-                optional_columns.extend(['results_gated', 'results_revealed_at', 'gated_outcome'])
-    
-            # Add upgrade_state column if it exists
-            if has_upgrade_state:
-                optional_columns.append('upgrade_state')
-
-            # Add provider column if it exists
-            if 'provider' in columns:
-                optional_columns.append('provider')
-
-            # Add is_test_job column if it exists
-            if 'is_test_job' in columns:
-                optional_columns.append('is_test_job')
-
-            # Add new analytics columns if they exist
-            new_analytics_cols = ['experiment_variant', 'product_id', 'amount_cents', 'currency', 'order_id']
-            for col in new_analytics_cols:
-                if col in columns:
-                    optional_columns.append(col)
-
-            # Add inline validation columns if they exist
-            inline_cols = ['interaction_type', 'corrections_copied', 'style',
-                          'validation_type', 'inline_citation_count', 'orphan_count']
-            for col in inline_cols:
-                if col in columns:
-                    optional_columns.append(col)
-
-            # Build final column list and values
-            insert_columns = base_columns + status_columns
-            for col in optional_columns:
-                if col in columns:
-                    insert_columns.append(col)
-    
-            # Build values tuple
-            values = []
-            for col in insert_columns:
-                if col == 'job_id':
-                    values.append(validation_data["job_id"])
-                elif col == 'created_at':
-                    values.append(validation_data["created_at"])
-                elif col == 'user_type':
-                    values.append(validation_data["user_type"])
-                elif col == 'error_message':
-                    values.append(validation_data.get("error_message"))
-                elif col in ['status', 'validation_status']:
-                    values.append(validation_data["status"])  # Map to both if present
-                elif col in ['completed_at', 'duration_seconds', 'citation_count',
-                            'token_usage_prompt', 'token_usage_completion', 'token_usage_total',
-                            'valid_citations_count', 'invalid_citations_count',
-                            'results_gated', 'results_revealed_at', 'gated_outcome',
-                            'paid_user_id', 'free_user_id', 'upgrade_state', 'provider', 'is_test_job',
-                            'experiment_variant', 'product_id', 'amount_cents', 'currency', 'order_id',
-                            'interaction_type', 'corrections_copied', 'style',
-                            'validation_type', 'inline_citation_count', 'orphan_count']:
-                    values.append(validation_data.get(col))
-    
-            # Build the INSERT statement dynamically
-            placeholders = ', '.join(['?'] * len(insert_columns))
-            column_list = ', '.join(insert_columns)
-    
-            cursor.execute(f"""
-                INSERT OR REPLACE INTO validations ({column_list})
-                VALUES ({placeholders})
-            """, values)
-    
+                partial.append(validation_data)
+
+        missing = []
+        try:
+            cursor = self.conn.cursor()
+            cursor.executemany(schema.upsert_sql, complete)
+            for validation_data in partial:
+                cursor.execute(
+                    schema.merge_update_sql,
+                    schema.upsert_values(validation_data)[1:] + [validation_data["job_id"]]
+                )
+                if cursor.rowcount == 0:
+                    missing.append(validation_data["job_id"])
+            if metadata:
+                self._write_metadata(cursor, metadata)
             self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+        return missing
 
     def get_validation(self, job_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -418,7 +760,9 @@ class DatabaseManager:
         order_by: str = "created_at",
         order_dir: str = "DESC",
         validation_type: Optional[str] = None,
-        has_inline: Optional[bool] = None
+        has_inline: Optional[bool] = None,
+        after: Optional[Tuple[str, str]] = None,
+        columns: Optional[List[str]] = None
     ) -> List[Dict[str, Any]]:
         """
         Get validations with filtering and pagination
@@ -439,76 +783,45 @@ class DatabaseManager:
             order_dir: ASC or DESC
             validation_type: Filter by validation_type (ref_only, full_doc)
             has_inline: If true, only return full_doc with inline_citation_count > 0
+            after: (created_at, job_id) of the last record of the previous page
+                (see decode_page_cursor); keyset pagination, requires
+                order_by="created_at" and makes deep pages as cheap as the first
+            columns: Only read these columns (job_id, created_at and status are
+                always included); None reads every column
 
         Returns:
             List of validation records
         """
         cursor = self.conn.cursor()
-        cursor.execute("PRAGMA table_info(validations)")
-        columns = [col[1] for col in cursor.fetchall()]
-
-        query = "SELECT * FROM validations WHERE 1=1"
-        params = []
-
-        # Handle status filtering - check which column exists
-        if status:
-            has_status = 'status' in columns
-            has_validation_status = 'validation_status' in columns
-
-            if has_status and has_validation_status:
-                query += " AND (status = ? OR validation_status = ?)"
-                params.extend([status, status])
-            elif has_status:
-                query += " AND status = ?"
-                params.append(status)
-            elif has_validation_status:
-                query += " AND validation_status = ?"
-                params.append(status)
-
-        if user_type:
-            query += " AND user_type = ?"
-            params.append(user_type)
-
-        if search:
-            query += " AND job_id LIKE ?"
-            params.append(f"%{search}%")
-
-        if from_date:
-            query += " AND created_at >= ?"
-            params.append(from_date)
-
-        if to_date:
-            query += " AND created_at <= ?"
-            params.append(to_date)
-
-        # Add user ID filtering if columns exist
-        if 'paid_user_id' in columns and paid_user_id:
-            query += " AND paid_user_id = ?"
-            params.append(paid_user_id)
-
-        if 'free_user_id' in columns and free_user_id:
-            query += " AND free_user_id = ?"
-            params.append(free_user_id)
-
-        # Add test job filtering if column exists
-        if 'is_test_job' in columns and is_test_job is not None:
-            query += " AND is_test_job = ?"
-            params.append(is_test_job)
-
-        # Add validation_type filtering if column exists
-        if 'validation_type' in columns and validation_type is not None:
-            query += " AND validation_type = ?"
-            params.append(validation_type)
+        schema = self.validations_schema
+
+        where, params = self._validation_filters(
+            status=status, user_type=user_type, search=search, from_date=from_date, to_date=to_date,
+            paid_user_id=paid_user_id, free_user_id=free_user_id, is_test_job=is_test_job,
+            validation_type=validation_type, has_inline=has_inline
+        )
+
+        if after is not None:
+            if order_by != "created_at":
+                raise ValueError("Keyset pagination requires order_by='created_at'")
+            comparison = "<" if order_dir.upper() == "DESC" else ">"
+            where += f" AND (created_at, job_id) {comparison} (?, ?)"
+            params.extend(after)
+
+        if columns is None:
+            select = "*"
+        else:
+            required = ['job_id', 'created_at'] + list(schema.update_status_columns)
+            select = ', '.join(
+                col for col in dict.fromkeys(required + list(columns)) if col in schema.columns
+            )
 
-        # Add has_inline filtering if columns exist
-        if 'validation_type' in columns and 'inline_citation_count' in columns and has_inline is not None:
-            if has_inline:
-                query += " AND validation_type = 'full_doc' AND inline_citation_count > 0"
-            else:
-                query += " AND (validation_type = 'ref_only' OR inline_citation_count = 0)"
+        query = f"SELECT {select} FROM validations WHERE {where}"
 
-        # Add ordering
+        # Add ordering (job_id breaks ties so pages don't overlap)
         query += f" ORDER BY {order_by} {order_dir}"
+        if order_by != "job_id":
+            query += f", job_id {order_dir}"
 
         # Add pagination
         query += " LIMIT ? OFFSET ?"
@@ -552,13 +865,42 @@ class DatabaseManager:
             Total count of matching validations
         """
         cursor = self.conn.cursor()
-        cursor.execute("PRAGMA table_info(validations)")
-        columns = [col[1] for col in cursor.fetchall()]
 
-        query = "SELECT COUNT(*) FROM validations WHERE 1=1"
+        where, params = self._validation_filters(
+            status=status, user_type=user_type, search=search, from_date=from_date, to_date=to_date,
+            paid_user_id=paid_user_id, free_user_id=free_user_id, is_test_job=is_test_job,
+            validation_type=validation_type, has_inline=has_inline
+        )
+
+        cursor.execute(f"SELECT COUNT(*) FROM validations WHERE {where}", params)
+        result = cursor.fetchone()
+
+        return result[0] if result else 0
+
+    def _validation_filters(
+        self,
+        status: Optional[str] = None,
+        user_type: Optional[str] = None,
+        search: Optional[str] = None,
+        from_date: Optional[str] = None,
+        to_date: Optional[str] = None,
+        paid_user_id: Optional[str] = None,
+        free_user_id: Optional[str] = None,
+        is_test_job: Optional[bool] = None,
+        validation_type: Optional[str] = None,
+        has_inline: Optional[bool] = None
+    ) -> Tuple[str, List[Any]]:
+        """
+        WHERE clause and params for the get_validations() filters
+
+        Returns:
+            (SQL condition, params)
+        """
+        columns = self.validations_schema.columns
+        query = "1=1"
         params = []
 
-        # Add filters (same as get_validations)
+        # Handle status filtering - check which column exists
         if status:
             has_status = 'status' in columns
             has_validation_status = 'validation_status' in columns
@@ -615,10 +957,7 @@ class DatabaseManager:
             else:
                 query += " AND (validation_type = 'ref_only' OR inline_citation_count = 0)"
 
-        cursor.execute(query, params)
-        result = cursor.fetchone()
-
-        return result[0] if result else 0
+        return query, params
 
     def get_user_journey(
         self,
@@ -642,8 +981,7 @@ class DatabaseManager:
             return []
 
         cursor = self.conn.cursor()
-        cursor.execute("PRAGMA table_info(validations)")
-        columns = [col[1] for col in cursor.fetchall()]
+        columns = self.validations_schema.columns
 
         query = "SELECT * FROM validations WHERE 1=1"
         params = []
@@ -684,8 +1022,7 @@ class DatabaseManager:
             Dictionary with user analytics data
         """
         cursor = self.conn.cursor()
-        cursor.execute("PRAGMA table_info(validations)")
-        columns = [col[1] for col in cursor.fetchall()]
+        columns = self.validations_schema.columns
 
         # Check if user ID columns exist
         has_paid_user_id = 'paid_user_id' in columns
@@ -791,14 +1128,26 @@ class DatabaseManager:
             key: Metadata key
             value: Metadata value
         """
+        self.set_metadata_values({key: value})
+
+    def set_metadata_values(self, values: Dict[str, str]):
+        """
+        Set several parser metadata values in one transaction
+
+        Args:
+            values: Metadata keys and values
+        """
         cursor = self.conn.cursor()
-        cursor.execute("""
-            INSERT OR REPLACE INTO parser_metadata (key, value)
-            VALUES (?, ?)
-        """, (key, value))
+        self._write_metadata(cursor, values)
 
         self.conn.commit()
 
+    def _write_metadata(self, cursor: sqlite3.Cursor, values: Dict[str, str]):
+        cursor.executemany("""
+            INSERT OR REPLACE INTO parser_metadata (key, value)
+            VALUES (?, ?)
+        """, list(values.items()))
+
     def get_metadata(self, key: str) -> Optional[str]:
         """
         Get parser metadata value
@@ -828,8 +1177,60 @@ class DatabaseManager:
                 - processing_time_ms: Processing time in milliseconds (optional)
         """
         cursor = self.conn.cursor()
+        self._ensure_citations_dashboard_table(cursor)
 
-        # Check if citations_dashboard table exists, create if it doesn't
+        cursor.execute("""
+            INSERT INTO citations_dashboard (
+                job_id, citation_text, citation_type, user_type,
+                processing_time_ms, validation_status
+            ) VALUES (?, ?, ?, ?, ?, ?)
+        """, self._citation_values(citation_data))
+
+        self.conn.commit()
+
+    def insert_citations_to_dashboard(self, citations: List[Dict[str, Any]]) -> int:
+        """
+        Insert many citation records into citations_dashboard in one transaction
+
+        Citations already stored for the same job (same job_id and
+        citation_text) are skipped, including duplicates within the batch.
+
+        Args:
+            citations: Citation dictionaries (see insert_citation_to_dashboard)
+
+        Returns:
+            Number of citations inserted
+        """
+        cursor = self.conn.cursor()
+        self._ensure_citations_dashboard_table(cursor)
+
+        # Existing tables may already hold duplicates, so there is no unique
+        # constraint to conflict on; skip rows that are already present instead
+        rows = [
+            values + values[:2]
+            for values in (self._citation_values(citation) for citation in citations)
+        ]
+        try:
+            cursor.executemany("""
+                INSERT INTO citations_dashboard (
+                    job_id, citation_text, citation_type, user_type,
+                    processing_time_ms, validation_status
+                )
+                SELECT ?, ?, ?, ?, ?, ?
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM citations_dashboard WHERE job_id = ? AND citation_text = ?
+                )
+            """, rows)
+            inserted = cursor.rowcount
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+        return inserted
+
+    def _ensure_citations_dashboard_table(self, cursor):
+        """Create citations_dashboard (and its job_id index) if it doesn't exist"""
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS citations_dashboard (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -844,22 +1245,18 @@ class DatabaseManager:
                 gating_applied INTEGER DEFAULT 0
             )
         """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_citations_dashboard_job_id ON citations_dashboard(job_id)")
 
-        cursor.execute("""
-            INSERT INTO citations_dashboard (
-                job_id, citation_text, citation_type, user_type,
-                processing_time_ms, validation_status
-            ) VALUES (?, ?, ?, ?, ?, ?)
-        """, (
+    @staticmethod
+    def _citation_values(citation_data: Dict[str, Any]) -> tuple:
+        return (
             citation_data.get('job_id'),
             citation_data.get('citation_text'),
             citation_data.get('citation_type'),
             citation_data.get('user_type'),
             citation_data.get('processing_time_ms'),
             citation_data.get('validation_status', 'processed')
-        ))
-
-        self.conn.commit()
+        )
 
     def insert_parser_error(self, timestamp: str, error_message: str, log_line: str):
         """
@@ -886,11 +1283,26 @@ class DatabaseManager:
             visit_data: Dictionary with visit fields
         """
         cursor = self.conn.cursor()
-        cursor.execute("""
-            INSERT INTO site_visits (
-                timestamp, ip_address, path, status_code, referer, user_agent, visitor_id
-            ) VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (
+        cursor.execute(INSERT_SITE_VISIT_SQL, self._site_visit_values(visit_data))
+        self.conn.commit()
+
+    def insert_site_visits(self, visits: List[Dict[str, Any]]):
+        """
+        Insert many site visit records in one transaction
+
+        Args:
+            visits: Visit dictionaries (see insert_site_visit)
+        """
+        try:
+            self.conn.executemany(INSERT_SITE_VISIT_SQL, [self._site_visit_values(visit) for visit in visits])
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+    @staticmethod
+    def _site_visit_values(visit_data: Dict[str, Any]) -> tuple:
+        return (
             visit_data['timestamp'],
             visit_data.get('ip_address'),
             visit_data.get('path'),
@@ -898,8 +1310,7 @@ class DatabaseManager:
             visit_data.get('referer'),
             visit_data.get('user_agent'),
             visit_data.get('visitor_id')
-        ))
-        self.conn.commit()
+        )
 
     def get_parser_errors(self, limit: int = 50) -> List[Dict[str, Any]]:
         """
@@ -937,58 +1348,21 @@ class DatabaseManager:
         Returns:
             Dictionary with summary statistics
         """
-        cursor = self.conn.cursor()
-        cursor.execute("PRAGMA table_info(validations)")
-        columns = [col[1] for col in cursor.fetchall()]
-
-        has_status = 'status' in columns
-        has_validation_status = 'validation_status' in columns
-
-        if has_status and has_validation_status:
-            # Both columns exist, use COALESCE to prioritize status but fallback to validation_status
-            status_condition = "COALESCE(status, validation_status)"
-        elif has_status:
-            status_condition = "status"
-        else:
-            status_condition = "validation_status"
-
-        query = f"""
-            SELECT
-                COUNT(*) as total_validations,
-                COUNT(CASE WHEN {status_condition} = 'completed' THEN 1 END) as completed,
-                COUNT(CASE WHEN {status_condition} = 'failed' THEN 1 END) as failed,
-                COUNT(CASE WHEN {status_condition} = 'pending' THEN 1 END) as pending,
-                SUM(citation_count) as total_citations,
-                COUNT(CASE WHEN user_type = 'free' THEN 1 END) as free_users,
-                COUNT(CASE WHEN user_type = 'paid' THEN 1 END) as paid_users,
-                AVG(duration_seconds) as avg_duration_seconds,
-                AVG(citation_count) as avg_citations_per_validation
-            FROM validations
-            WHERE 1=1
-        """
-        params = []
-
-        if from_date:
-            query += " AND created_at >= ?"
-            params.append(from_date)
-
-        if to_date:
-            query += " AND created_at <= ?"
-            params.append(to_date)
-
-        cursor.execute(query, params)
-        result = cursor.fetchone()
+        by_user_type = {
+            row["user_type"]: row for row in self._query_rollups(('user_type',), from_date, to_date)
+        }
+        totals = _add_rollup_rows(by_user_type.values())
 
         return {
-            "total_validations": result[0] or 0,
-            "completed": result[1] or 0,
-            "failed": result[2] or 0,
-            "pending": result[3] or 0,
-            "total_citations": result[4] or 0,
-            "free_users": result[5] or 0,
-            "paid_users": result[6] or 0,
-            "avg_duration_seconds": round(result[7] or 0, 1),
-            "avg_citations_per_validation": round(result[8] or 0, 1)
+            "total_validations": totals["total"],
+            "completed": totals["completed"],
+            "failed": totals["failed"],
+            "pending": totals["pending"],
+            "total_citations": totals["citations"],
+            "free_users": by_user_type.get('free', {}).get("total") or 0,
+            "paid_users": by_user_type.get('paid', {}).get("total") or 0,
+            "avg_duration_seconds": round(_ratio(totals["duration_sum"], totals["duration_n"]), 1),
+            "avg_citations_per_validation": round(_ratio(totals["citations"], totals["citations_n"]), 1)
         }
 
     def get_daily_site_visitors(
@@ -1046,9 +1420,7 @@ class DatabaseManager:
         Returns:
             Dictionary with inline validation metrics
         """
-        cursor = self.conn.cursor()
-        cursor.execute("PRAGMA table_info(validations)")
-        columns = [col[1] for col in cursor.fetchall()]
+        columns = self.validations_schema.columns
 
         # Check if required columns exist
         if not all(col in columns for col in ['validation_type', 'inline_citation_count', 'orphan_count']):
@@ -1063,34 +1435,13 @@ class DatabaseManager:
                 "orphan_rate": 0.0
             }
 
-        query = """
-            SELECT
-                COUNT(*) as total_validations,
-                SUM(CASE WHEN validation_type = 'full_doc' THEN 1 ELSE 0 END) as full_doc_count,
-                SUM(COALESCE(inline_citation_count, 0)) as total_inline_citations,
-                SUM(COALESCE(orphan_count, 0)) as total_orphans,
-                AVG(CASE WHEN validation_type = 'full_doc' THEN COALESCE(inline_citation_count, 0) ELSE NULL END) as avg_inline_per_doc
-            FROM validations
-            WHERE 1=1
-        """
-        params = []
+        totals = _add_rollup_rows(self._query_rollups((), from_date, to_date))
 
-        if from_date:
-            query += " AND created_at >= ?"
-            params.append(from_date)
-
-        if to_date:
-            query += " AND created_at <= ?"
-            params.append(to_date)
-
-        cursor.execute(query, params)
-        result = cursor.fetchone()
-
-        total_validations = result[0] or 0
-        full_doc_count = result[1] or 0
-        total_inline_citations = result[2] or 0
-        total_orphans = result[3] or 0
-        avg_inline_per_doc = result[4] or 0.0
+        total_validations = totals["total"]
+        full_doc_count = totals["full_doc"]
+        total_inline_citations = totals["inline_citations"]
+        total_orphans = totals["orphans"]
+        avg_inline_per_doc = _ratio(totals["full_doc_inline_citations"], full_doc_count)
 
         full_doc_percentage = (full_doc_count / total_validations * 100) if total_validations > 0 else 0.0
         orphan_rate = (total_orphans / total_inline_citations * 100) if total_inline_citations > 0 else 0.0
@@ -1105,6 +1456,389 @@ class DatabaseManager:
             "orphan_rate": round(orphan_rate, 1)
         }
 
+    def get_chart_data(
+        self,
+        from_date: Optional[str] = None,
+        to_date: Optional[str] = None,
+        exclude_tests: bool = False,
+        granularity: str = 'day'
+    ) -> Dict[str, Any]:
+        """
+        Get time-series data for dashboard charts
+
+        Args:
+            from_date: Filter start date
+            to_date: Filter end date
+            exclude_tests: Leave out test jobs
+            granularity: 'day' (points keyed by "date") or 'hour' (keyed by "hour")
+
+        Returns:
+            Dictionary with "series" (one point per bucket, oldest first) and
+            "providers" (validation count per provider)
+        """
+        label = "date" if granularity == 'day' else "hour"
+        users = self._query_rollup_users(granularity, from_date, to_date, exclude_tests)
+
+        # Hour buckets of 'YYYY-MM-DD HH:MM:SS' and ISO rows share a point
+        points: Dict[str, List[Dict[str, Any]]] = {}
+        for row in self._query_rollups(('bucket',), from_date, to_date, exclude_tests, granularity):
+            key = row["bucket"] if granularity == 'day' else row["bucket"].replace(' ', 'T') + ":00"
+            points.setdefault(key, []).append(row)
+
+        series = []
+        for key in sorted(points):
+            totals = _add_rollup_rows(points[key])
+            bucket_users = [users.get(row["bucket"], {}) for row in points[key]]
+            series.append({
+                label: key,
+                "total_validations": totals["total"],
+                "completed": totals["completed"],
+                "failed": totals["failed"],
+                "pending": totals["pending"],
+                "successful_citations": totals["completed_citations"],
+                "failed_citations": totals["failed_citations"],
+                "total_citations": totals["citations"],
+                "unique_free_users": sum(counts.get('free', 0) for counts in bucket_users),
+                "total_unique_users": sum(counts.get('all', 0) for counts in bucket_users),
+                "valid_citations": totals["valid_citations"],
+                "invalid_citations": totals["invalid_citations"],
+                "avg_duration_seconds": round(_ratio(totals["duration_sum"], totals["duration_n"]), 1),
+                "total_tokens": totals["token_usage_total"]
+            })
+
+        providers = {
+            row["provider"] or 'unknown': row["total"]
+            for row in self._query_rollups(('provider',), from_date, to_date, exclude_tests)
+        }
+
+        return {"series": series, "providers": providers}
+
+    def get_gated_stats(
+        self,
+        from_date: Optional[str] = None,
+        to_date: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Get engagement statistics for gated results
+
+        Time to reveal is measured from completed_at to results_revealed_at.
+
+        Args:
+            from_date: Filter start date
+            to_date: Filter end date
+
+        Returns:
+            Dictionary with gating/reveal totals and breakdowns by user type,
+            outcome, style, provider, experiment variant and day
+        """
+        rows = self._query_rollups(
+            ('user_type', 'style', 'provider', 'experiment_variant', 'gated_outcome'), from_date, to_date
+        )
+        totals = _add_rollup_rows(rows)
+        reveal_rate = round(_ratio(totals["revealed"], totals["gated"]) * 100, 1)
+
+        by_outcome: Dict[str, int] = {}
+        for row in rows:
+            if row["gated_outcome"]:
+                by_outcome[row["gated_outcome"]] = by_outcome.get(row["gated_outcome"], 0) + row["total"]
+
+        daily_trends = [
+            {
+                "date": row["bucket"],
+                "total_validations": row["total"],
+                "gated": row["gated"] or 0,
+                "revealed": row["revealed"] or 0,
+                "reveal_rate": round(_ratio(row["revealed"], row["gated"]) * 100, 1)
+            }
+            for row in self._query_rollups(('bucket',), from_date, to_date)
+        ]
+
+        return {
+            "total_gated": totals["gated"],
+            "revealed_count": totals["revealed"],
+            "reveal_rate": reveal_rate,
+            "avg_time_to_reveal_seconds": round(_ratio(totals["reveal_seconds_sum"], totals["reveal_n"]), 1),
+            "by_user_type": _gated_breakdown(rows, 'user_type'),
+            "by_outcome": by_outcome,
+            "by_style": _gated_breakdown(rows, 'style'),
+            "by_provider": _gated_breakdown(rows, 'provider'),
+            "by_experiment_variant": _gated_breakdown(rows, 'experiment_variant'),
+            "daily_trends": daily_trends,
+            "conversion_metrics": {
+                "total_validations": totals["total"],
+                "gated_rate": round(_ratio(totals["gated"], totals["total"]) * 100, 1),
+                "reveal_rate": reveal_rate
+            }
+        }
+
+    def get_latency_stats(
+        self,
+        from_date: Optional[str] = None,
+        to_date: Optional[str] = None,
+        exclude_tests: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Get per-stage latency percentiles from the jobs' stage timings
+
+        Args:
+            from_date: Filter start date
+            to_date: Filter end date
+            exclude_tests: Leave out test jobs
+
+        Returns:
+            Dictionary with the number of timed jobs and per-stage count, avg,
+            p50, p95 and p99 (seconds) overall, by provider and by style
+        """
+        columns = self.validations_schema.columns
+        empty = {"timed_jobs": 0, "stages": {}, "by_provider": {}, "by_style": {}}
+        if not {'stage_timings', 'provider', 'style'} <= columns:
+            return empty
+
+        where, params = self._validation_filters(
+            from_date=from_date, to_date=to_date, is_test_job=False if exclude_tests else None
+        )
+        cursor = self.conn.cursor()
+        cursor.execute(
+            f"SELECT provider, style, stage_timings FROM validations "
+            f"WHERE {where} AND stage_timings IS NOT NULL",
+            params
+        )
+
+        timed_jobs = 0
+        stages: Dict[str, List[float]] = {}
+        groups: Dict[str, Dict[str, Dict[str, List[float]]]] = {"by_provider": {}, "by_style": {}}
+        for row in cursor.fetchall():
+            try:
+                spans = json.loads(row["stage_timings"])
+            except ValueError:
+                continue
+            timed_jobs += 1
+            for stage, seconds in spans.items():
+                stages.setdefault(stage, []).append(seconds)
+                for group, key in (("by_provider", row["provider"]), ("by_style", row["style"])):
+                    groups[group].setdefault(key or 'unknown', {}).setdefault(stage, []).append(seconds)
+
+        def summarize(by_stage: Dict[str, List[float]]) -> Dict[str, Dict[str, Any]]:
+            return {stage: _latency_summary(values) for stage, values in sorted(by_stage.items())}
+
+        return {
+            "timed_jobs": timed_jobs,
+            "stages": summarize(stages),
+            "by_provider": {key: summarize(value) for key, value in sorted(groups["by_provider"].items())},
+            "by_style": {key: summarize(value) for key, value in sorted(groups["by_style"].items())},
+        }
+
+    def refresh_rollups(self) -> int:
+        """
+        Recompute the daily and hourly rollups for days written since the last refresh
+
+        Run by the cron after ingestion only. Readers never refresh (that
+        would take the write lock on dashboard requests), so validations
+        written since the last run show up in whole-day totals on the next
+        cron run; partial edge buckets are always read from validations.
+
+        Returns:
+            Number of days recomputed
+        """
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT 1 FROM validations_rollup_dirty LIMIT 1")
+        if cursor.fetchone() is None:
+            return 0
+
+        # Hold the write lock so no day is marked between reading and clearing the marks
+        if not self.conn.in_transaction:
+            cursor.execute("BEGIN IMMEDIATE")
+        try:
+            cursor.execute("SELECT day FROM validations_rollup_dirty")
+            days = [row[0] for row in cursor.fetchall()]
+            for day in days:
+                self._rebuild_rollup_day(cursor, day)
+            cursor.execute("DELETE FROM validations_rollup_dirty")
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+        return len(days)
+
+    def _rebuild_rollup_day(self, cursor, day: str):
+        """Replace the rollup rows of one created_at day from validations"""
+        # Every created_at (and bucket) starting with day
+        day_range = (day, day + '~')
+        has_user_ids = {'paid_user_id', 'free_user_id'} <= self.validations_schema.columns
+        is_test_job = self._rollup_expressions()['is_test_job']
+        columns = ', '.join(('bucket',) + ROLLUP_DIMENSIONS + tuple(name for name, _ in ROLLUP_MEASURES))
+
+        for table, users_table, length in ROLLUP_TABLES.values():
+            cursor.execute(f"DELETE FROM {table} WHERE bucket >= ? AND bucket < ?", day_range)
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) "
+                f"{self._rollup_select(length, 'created_at >= ? AND created_at < ?')}",
+                day_range
+            )
+
+            cursor.execute(f"DELETE FROM {users_table} WHERE bucket >= ? AND bucket < ?", day_range)
+            if has_user_ids:
+                cursor.execute(f"""
+                    INSERT OR IGNORE INTO {users_table} (bucket, kind, user_key, is_test_job)
+                    SELECT substr(created_at, 1, {length}), 'free', free_user_id, {is_test_job}
+                    FROM validations
+                    WHERE created_at >= ? AND created_at < ?
+                      AND user_type = 'free' AND free_user_id IS NOT NULL
+                    UNION ALL
+                    SELECT substr(created_at, 1, {length}), 'all', COALESCE(paid_user_id, free_user_id), {is_test_job}
+                    FROM validations
+                    WHERE created_at >= ? AND created_at < ?
+                      AND COALESCE(paid_user_id, free_user_id) IS NOT NULL
+                """, day_range * 2)
+
+    def _rollup_expressions(self) -> Dict[str, str]:
+        """SQL for the ROLLUP_MEASURES placeholders and dimensions, for this table's columns"""
+        schema = self.validations_schema
+        expressions = {col: col if col in schema.columns else 'NULL' for col in ROLLUP_OPTIONAL_COLUMNS}
+        expressions['status'] = schema.status_expression
+        expressions['is_test_job'] = "CASE WHEN is_test_job IS NULL OR is_test_job = 0 THEN 0 ELSE 1 END"
+        expressions['reveal_seconds'] = (
+            f"CASE WHEN {expressions['results_gated']} = 1 THEN "
+            f"(julianday({expressions['results_revealed_at']}) - julianday(completed_at)) * 86400 END"
+        )
+        return expressions
+
+    def _rollup_select(self, length: int, where: str) -> str:
+        """Rollup rows (bucket, dimensions, measures) aggregated directly from validations"""
+        expressions = self._rollup_expressions()
+        dimensions = ', '.join(f"{expressions.get(dim, dim)} AS {dim}" for dim in ROLLUP_DIMENSIONS)
+        measures = ', '.join(f"{sql.format(**expressions)} AS {name}" for name, sql in ROLLUP_MEASURES)
+        group_by = ', '.join(str(position) for position in range(1, len(ROLLUP_DIMENSIONS) + 2))
+        return (
+            f"SELECT substr(created_at, 1, {length}) AS bucket, {dimensions}, {measures} "
+            f"FROM validations WHERE {where} GROUP BY {group_by}"
+        )
+
+    @staticmethod
+    def _rollup_ranges(length: int, from_date: Optional[str], to_date: Optional[str]) -> tuple:
+        """
+        Split a created_at range into whole buckets and the partial buckets at its ends
+
+        Returns:
+            (condition on bucket selecting whole buckets, params,
+             condition on validations covering the partial buckets or None, params)
+        """
+        whole, whole_params = ["1=1"], []
+        edges = set()
+        if from_date:
+            whole.append("bucket >= ?")
+            whole_params.append(from_date)
+            if from_date[:length] < from_date:
+                edges.add(from_date[:length])
+        if to_date:
+            whole.append("bucket < ?")
+            whole_params.append(to_date[:length])
+            edges.add(to_date[:length])
+
+        if not edges:
+            return " AND ".join(whole), whole_params, None, []
+
+        edge_ranges = " OR ".join(["(created_at >= ? AND created_at < ?)"] * len(edges))
+        edge, edge_params = [f"({edge_ranges})"], [value for bucket in sorted(edges) for value in (bucket, bucket + '~')]
+        if from_date:
+            edge.append("created_at >= ?")
+            edge_params.append(from_date)
+        if to_date:
+            edge.append("created_at <= ?")
+            edge_params.append(to_date)
+
+        return " AND ".join(whole), whole_params, " AND ".join(edge), edge_params
+
+    def _query_rollups(
+        self,
+        group_by: tuple,
+        from_date: Optional[str] = None,
+        to_date: Optional[str] = None,
+        exclude_tests: bool = False,
+        granularity: str = 'day'
+    ) -> List[Dict[str, Any]]:
+        """
+        Sum ROLLUP_MEASURES over validations created in [from_date, to_date]
+
+        Whole buckets come from the rollup table; the partial buckets at the
+        ends of the range are aggregated from validations with the same SQL,
+        so the result equals a direct query over validations as of the last
+        refresh_rollups().
+
+        Args:
+            group_by: Rollup columns to group by ('bucket' and/or ROLLUP_DIMENSIONS)
+            from_date: Filter start date
+            to_date: Filter end date
+            exclude_tests: Leave out test jobs
+            granularity: Key of ROLLUP_TABLES
+
+        Returns:
+            One dictionary per group with the group_by columns and summed measures
+        """
+        table, _, length = ROLLUP_TABLES[granularity]
+        whole, params, edge, edge_params = self._rollup_ranges(length, from_date, to_date)
+
+        columns = ', '.join(('bucket',) + ROLLUP_DIMENSIONS + tuple(name for name, _ in ROLLUP_MEASURES))
+        sources = [f"SELECT {columns} FROM {table} WHERE {whole}"]
+        if edge:
+            sources.append(self._rollup_select(length, edge))
+            params = params + edge_params
+
+        keys = ', '.join(group_by)
+        sums = ', '.join(f"SUM({name}) AS {name}" for name, _ in ROLLUP_MEASURES)
+        query = f"SELECT {keys + ', ' if keys else ''}{sums} FROM ({' UNION ALL '.join(sources)})"
+        if exclude_tests:
+            query += " WHERE is_test_job = 0"
+        if keys:
+            query += f" GROUP BY {keys} ORDER BY {keys}"
+
+        cursor = self.conn.cursor()
+        cursor.execute(query, params)
+        return [dict(row) for row in cursor.fetchall()]
+
+    def _query_rollup_users(
+        self,
+        granularity: str,
+        from_date: Optional[str] = None,
+        to_date: Optional[str] = None,
+        exclude_tests: bool = False
+    ) -> Dict[str, Dict[str, int]]:
+        """
+        Count distinct users per bucket of validations created in [from_date, to_date]
+
+        Returns:
+            {bucket: {'free': distinct free users, 'all': distinct paid or free users}}
+        """
+        _, users_table, length = ROLLUP_TABLES[granularity]
+        whole, params, edge, edge_params = self._rollup_ranges(length, from_date, to_date)
+        cursor = self.conn.cursor()
+
+        query = f"SELECT bucket, kind, COUNT(DISTINCT user_key) FROM {users_table} WHERE {whole}"
+        if exclude_tests:
+            query += " AND is_test_job = 0"
+        cursor.execute(query + " GROUP BY bucket, kind", params)
+        users: Dict[str, Dict[str, int]] = {}
+        for bucket, kind, count in cursor.fetchall():
+            users.setdefault(bucket, {})[kind] = count
+
+        if edge and {'paid_user_id', 'free_user_id'} <= self.validations_schema.columns:
+            query = f"""
+                SELECT
+                    substr(created_at, 1, {length}),
+                    COUNT(DISTINCT CASE WHEN user_type = 'free' THEN free_user_id END),
+                    COUNT(DISTINCT COALESCE(paid_user_id, free_user_id))
+                FROM validations
+                WHERE {edge}
+            """
+            if exclude_tests:
+                query += " AND (is_test_job = 0 OR is_test_job IS NULL)"
+            cursor.execute(query + " GROUP BY 1", edge_params)
+            for bucket, free_users, all_users in cursor.fetchall():
+                users[bucket] = {'free': free_users, 'all': all_users}
+
+        return users
+
     def delete_old_records(self, days: int = 90) -> int:
         """
         Delete validation records older than specified days
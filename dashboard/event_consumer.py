@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Consumer for the backend's structured event log (backend/events.py)
+
+Events are NDJSON lines that each name their job, so they fold straight into
+validations rows by job_id: no regex extraction and no timestamp-proximity
+matching of metrics to jobs. The read position is kept in parser_metadata
+and follows the file across rotation.
+"""
+import json
+import logging
+import os
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from database import DatabaseManager
+from log_parser import UPGRADE_EVENT_STATES, _finalize_job_data, add_upgrade_state
+
+logger = logging.getLogger(__name__)
+
+EVENT_POSITION_KEY = "event_log_position"
+EVENT_INODE_KEY = "event_log_inode"
+
+# Fields that accumulate over a job's events (and across consumer runs)
+ADDITIVE_FIELDS = ('corrections_copied', 'token_usage_prompt', 'token_usage_completion', 'token_usage_total')
+
+UPGRADE_EVENT_FIELDS = ('experiment_variant', 'product_id', 'amount_cents', 'currency', 'order_id', 'interaction_type')
+
+
+def _job_created(job: Dict[str, Any], event: Dict[str, Any]) -> None:
+    job["created_at"] = event["ts"]
+    job["user_type"] = event.get("user_type", "free")
+    job.setdefault("status", "pending")
+    for field in ("paid_user_id", "free_user_id", "style"):
+        if event.get(field) is not None:
+            job[field] = event[field]
+    job["is_test_job"] = bool(event.get("is_test_job", False))
+
+
+def _validation_type(job: Dict[str, Any], event: Dict[str, Any]) -> None:
+    job["validation_type"] = event.get("validation_type")
+
+
+def _llm_call(job: Dict[str, Any], event: Dict[str, Any]) -> None:
+    job["provider"] = event.get("provider")
+    job["style"] = event.get("style", job.get("style"))
+    job["duration_seconds"] = event.get("duration_seconds")
+
+
+def _token_usage(job: Dict[str, Any], event: Dict[str, Any]) -> None:
+    # A job can make several LLM calls (cache misses, inline matching)
+    for field, key in (("token_usage_prompt", "prompt"), ("token_usage_completion", "completion"),
+                       ("token_usage_total", "total")):
+        job[field] = job.get(field, 0) + event.get(key, 0)
+
+
+def _validation_summary(job: Dict[str, Any], event: Dict[str, Any]) -> None:
+    job["citation_count"] = event.get("citation_count")
+    job["valid_citations_count"] = event.get("valid")
+    job["invalid_citations_count"] = event.get("invalid")
+
+
+def _inline_stats(job: Dict[str, Any], event: Dict[str, Any]) -> None:
+    job["inline_citation_count"] = event.get("inline_citation_count", 0)
+    job["orphan_count"] = event.get("orphan_count", 0)
+
+
+def _gating_decision(job: Dict[str, Any], event: Dict[str, Any]) -> None:
+    job["results_gated"] = event.get("results_gated")
+
+
+def _results_locked(job: Dict[str, Any], event: Dict[str, Any]) -> None:
+    if job.get("upgrade_state") != "success":
+        add_upgrade_state(job, "locked")
+
+
+def _job_completed(job: Dict[str, Any], event: Dict[str, Any]) -> None:
+    job["status"] = "completed"
+    job["completed_at"] = event["ts"]
+
+
+def _job_failed(job: Dict[str, Any], event: Dict[str, Any]) -> None:
+    job["status"] = "failed"
+    job["completed_at"] = event["ts"]
+    job["error_message"] = event.get("error_message")
+
+
+def _reveal(job: Dict[str, Any], event: Dict[str, Any]) -> None:
+    job["results_revealed_at"] = event["ts"]
+    job["gated_outcome"] = event.get("outcome")
+
+
+def _upgrade(job: Dict[str, Any], event: Dict[str, Any]) -> None:
+    for field in UPGRADE_EVENT_FIELDS:
+        if event.get(field) is not None:
+            job[field] = event[field]
+    if event.get("token") and not job.get("paid_user_id"):
+        job["paid_user_id"] = event["token"]
+    new_state = UPGRADE_EVENT_STATES.get(event.get("event"))
+    if new_state:
+        add_upgrade_state(job, new_state)
+
+
+def _correction(job: Dict[str, Any], event: Dict[str, Any]) -> None:
+    job["corrections_copied"] = job.get("corrections_copied", 0) + 1
+
+
+def _job_timings(job: Dict[str, Any], event: Dict[str, Any]) -> None:
+    job["stage_timings"] = json.dumps(event.get("spans") or {}, sort_keys=True)
+
+
+EVENT_HANDLERS: Dict[str, Callable[[Dict[str, Any], Dict[str, Any]], None]] = {
+    'job_created': _job_created,
+    'validation_type': _validation_type,
+    'llm_call': _llm_call,
+    'token_usage': _token_usage,
+    'validation_summary': _validation_summary,
+    'inline_stats': _inline_stats,
+    'gating_decision': _gating_decision,
+    'results_locked': _results_locked,
+    'job_completed': _job_completed,
+    'job_failed': _job_failed,
+    'reveal': _reveal,
+    'upgrade': _upgrade,
+    'correction': _correction,
+    'job_timings': _job_timings,
+}
+
+
+def fold_events(events: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Fold events into job records keyed by job_id.
+
+    Args:
+        events: Decoded events in log order
+
+    Returns:
+        Raw (unfinalized) job records indexed by job_id, in first-seen order.
+        Records without created_at are partial updates of jobs created earlier.
+    """
+    jobs: Dict[str, Dict[str, Any]] = {}
+    for event in events:
+        job_id = event.get("job_id")
+        handler = EVENT_HANDLERS.get(event.get("type"))
+        if not job_id or handler is None:
+            continue
+        job = jobs.setdefault(job_id, {"job_id": job_id})
+        handler(job, event)
+    return jobs
+
+
+def read_events(event_log_path: str, position: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Read the complete event lines after a byte offset.
+
+    A trailing line without its newline is still being written and is left
+    for the next read; malformed lines are logged and skipped.
+
+    Args:
+        event_log_path: Path to the NDJSON event log
+        position: Byte offset to start reading from
+
+    Returns:
+        (events, byte offset after the last complete line)
+    """
+    events = []
+    with open(event_log_path, 'rb') as f:
+        f.seek(position)
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            position += len(line)
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                logger.warning(f"Skipping malformed event at byte {position - len(line)} of {event_log_path}")
+    return events, position
+
+
+def read_new_events(event_log_path: str, position: int, inode: Optional[int]) -> Tuple[List[Dict[str, Any]], int, int]:
+    """
+    Read the events written since (position, inode), following rotation.
+
+    If the log was rotated, the rest of the rotated file (event_log_path.1)
+    is read before the new file from its start.
+
+    Returns:
+        (events, new position, inode of event_log_path)
+    """
+    stat = os.stat(event_log_path)
+    events: List[Dict[str, Any]] = []
+
+    if inode is not None and stat.st_ino != inode:
+        rotated_path = f"{event_log_path}.1"
+        if os.path.exists(rotated_path) and os.stat(rotated_path).st_ino == inode:
+            events, _ = read_events(rotated_path, position)
+        else:
+            logger.warning(f"Event log {event_log_path} was replaced; events after byte {position} of the old file are lost")
+        position = 0
+    elif stat.st_size < position:
+        logger.info(f"Event log truncated: last position {position} > current file size {stat.st_size}")
+        position = 0
+
+    new_events, position = read_events(event_log_path, position)
+    return events + new_events, position, stat.st_ino
+
+
+def merge_with_existing(db: DatabaseManager, job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Combine a partial record with the stored row for fields that accumulate.
+
+    Upgrade states join the stored funnel states and counters add to the
+    stored ones, instead of replacing them as a plain partial update would.
+    """
+    if not any(field in job for field in ('upgrade_state',) + ADDITIVE_FIELDS):
+        return job
+    existing = db.get_validation(job["job_id"])
+    if existing is None:
+        return job
+
+    merged = dict(job)
+    if job.get("upgrade_state") and existing.get("upgrade_state"):
+        merged["upgrade_state"] = existing["upgrade_state"]
+        for state in job["upgrade_state"].split(','):
+            add_upgrade_state(merged, state)
+    for field in ADDITIVE_FIELDS:
+        if job.get(field) is not None and existing.get(field) is not None:
+            merged[field] = existing[field] + job[field]
+    return merged
+
+
+def consume_events(db: DatabaseManager, event_log_path: str, insert_jobs: Callable) -> int:
+    """
+    Write the events added to the log since the last run to the database.
+
+    Args:
+        db: Database manager instance
+        event_log_path: Path to the NDJSON event log
+        insert_jobs: Writes job records and the given parser metadata in one
+            transaction, e.g. CronLogParser._insert_parsed_jobs
+
+    Returns:
+        Number of job records written
+    """
+    position = int(db.get_metadata(EVENT_POSITION_KEY) or 0)
+    inode = db.get_metadata(EVENT_INODE_KEY)
+    events, position, inode = read_new_events(event_log_path, position, int(inode) if inode else None)
+
+    jobs = fold_events(events)
+    new_jobs = {job_id: job for job_id, job in jobs.items() if job.get("created_at")}
+    records = _finalize_job_data(new_jobs) + [
+        merge_with_existing(db, job) for job_id, job in jobs.items() if job_id not in new_jobs
+    ]
+
+    # The position is committed with the records: a crash in between would
+    # replay the segment and merge_with_existing would add the usage twice
+    metadata = {EVENT_POSITION_KEY: str(position), EVENT_INODE_KEY: str(inode)}
+    if records:
+        insert_jobs(db, records, metadata)
+    else:
+        db.set_metadata_values(metadata)
+    logger.info(f"Consumed {len(events)} events for {len(records)} jobs from {event_log_path}")
+    return len(records)
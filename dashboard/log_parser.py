@@ -1,16 +1,62 @@
 import re
 import os
 import logging
-from datetime import datetime
-from typing import Optional, Dict, Any, List, Tuple
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, Iterable, Iterator, List, Tuple
 import gzip
 
 # Time window for associating user IDs with jobs (5 minutes)
 USER_ID_ASSOCIATION_TIMEOUT_SECONDS = 300
 
+# Time window for matching timestamp-only metric lines to jobs
+JOB_MATCH_WINDOW_SECONDS = 120
+
+# Streaming parser: how long a completed job stays open for late per-job
+# events (reveal, upgrade clicks) before it is emitted, and how long a job
+# without a completion line is kept before it is emitted as pending
+STREAM_JOB_LINGER_SECONDS = 300
+STREAM_PENDING_JOB_TIMEOUT_SECONDS = 3600
+
+# Substrings every metric line must contain (see apply_metrics); lets the
+# single-pass parser skip timestamp parsing on all other lines
+METRIC_LINE_MARKERS = (
+    'API call completed in',
+    'Token usage:',
+    'Validation summary: ',
+    'Citation text preview: ',
+)
+
+# Substrings at least one of which every job lifecycle event line contains
+# (see apply_job_event); lines without any are skipped without running the
+# extractor chain
+JOB_EVENT_LINE_MARKERS = (
+    'Job ',
+    'job_id=',
+    'Creating async job',
+    'Validation request',
+    'CORRECTION_EVENT:',
+)
+
+TIMESTAMP_RE = re.compile(r'^(\d{4})-(\d{2})-(\d{2}) (\d{2}):(\d{2}):(\d{2})')
+
 # Funnel states in logical order
 EXPECTED_STATE_ORDER = ['locked', 'shown', 'clicked', 'modal', 'checkout', 'success']
 
+# Upgrade workflow events -> funnel states
+# Note: Some events map to shorter state names for clarity
+# e.g., 'pricing_table_shown' -> 'shown'
+UPGRADE_EVENT_STATES = {
+    'pricing_table_shown': 'shown',
+    'pricing_viewed': 'shown',  # Synonym for inline variants
+    'upgrade_presented': 'locked',  # When upgrade banner is first shown (locked state)
+    'clicked_upgrade': 'clicked',
+    'modal_proceed': 'modal',
+    'checkout_started': 'checkout',
+    'success': 'success',
+    'purchase_completed': 'success'
+}
+
 
 def add_upgrade_state(job: Dict[str, Any], new_state: str) -> None:
     """
@@ -50,13 +96,12 @@ def extract_timestamp(log_line: str) -> Optional[datetime]:
         datetime object if timestamp found, None otherwise
     """
     # Pattern matches: 2025-11-04 21:42:48
-    timestamp_pattern = r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})'
-    match = re.search(timestamp_pattern, log_line)
+    match = TIMESTAMP_RE.match(log_line)
 
     if match:
-        timestamp_str = match.group(1)
+        # Called for most lines, so build the datetime directly (strptime is slow)
         try:
-            return datetime.strptime(timestamp_str, "%Y-%m-%d %H:%M:%S")
+            return datetime(*map(int, match.groups()))
         except ValueError:
             return None
 
@@ -755,6 +800,205 @@ def extract_full_citations(log_lines: List[str], start_index: int) -> Optional[t
     return None
 
 
+class UserIdCandidates:
+    """
+    Jobs that can still be given user IDs by a "Validation request" line.
+
+    Finds the same job as scanning all jobs in insertion order for the first
+    one without user IDs created within USER_ID_ASSOCIATION_TIMEOUT_SECONDS,
+    but only looks at jobs created around the request timestamp.
+    """
+
+    def __init__(self, jobs: Dict[str, Dict[str, Any]]):
+        self._jobs = jobs
+        # job_id -> rank in jobs (dict insertion order)
+        self._order: Dict[str, int] = {}
+        self._next_order = 0
+        # Sorted (created_at, order, job_id)
+        self._entries: List[Tuple[datetime, int, str]] = []
+
+    def _sync_order(self) -> None:
+        # Jobs are only appended (or removed through discard()), so the
+        # job_ids after the last known one are the new ones
+        new_jobs = []
+        for job_id in reversed(self._jobs):
+            if job_id in self._order:
+                break
+            new_jobs.append(job_id)
+        for job_id in reversed(new_jobs):
+            self._order[job_id] = self._next_order
+            self._next_order += 1
+
+    def add(self, job_id: str) -> None:
+        """Register a newly created job."""
+        self._sync_order()
+        insort(self._entries, (self._jobs[job_id]["created_at"], self._order[job_id], job_id))
+
+    def find(self, timestamp: datetime) -> Optional[Dict[str, Any]]:
+        """Return (and stop tracking) the job that should receive user IDs logged at timestamp."""
+        window = timedelta(seconds=USER_ID_ASSOCIATION_TIMEOUT_SECONDS)
+        lo = bisect_right(self._entries, (timestamp - window,))
+        hi = bisect_left(self._entries, (timestamp + window,))
+
+        best = None
+        for index in range(lo, hi):
+            created_at, order, job_id = self._entries[index]
+            job = self._jobs.get(job_id)
+            if (job is not None and
+                job.get("created_at") == created_at and
+                job.get("paid_user_id") is None and
+                job.get("free_user_id") is None and
+                abs((timestamp - created_at).total_seconds()) < USER_ID_ASSOCIATION_TIMEOUT_SECONDS and
+                (best is None or order < best[0])):
+                best = (order, index)
+
+        if best is None:
+            return None
+        job_id = self._entries.pop(best[1])[2]
+        return self._jobs[job_id]
+
+    def discard(self, job_id: str) -> None:
+        """Forget a job that has been removed from jobs."""
+        self._order.pop(job_id, None)
+
+    def prune(self, before: datetime) -> None:
+        """Drop candidates created before `before`; requests that late can no longer match them."""
+        del self._entries[:bisect_left(self._entries, (before,))]
+
+
+class JobTimeIndex:
+    """
+    Sorted interval index over job lifetimes for timestamp -> job matching.
+
+    find() returns the same job as find_job_by_timestamp() (the first job in
+    insertion order that was active at the timestamp) with a bisect instead of
+    a scan over every job. Each job contributes at most two windows no longer
+    than window_seconds: the start of its lifetime and, if completed, the end.
+    """
+
+    def __init__(self, jobs: Dict[str, Dict[str, Any]], window_seconds: int = JOB_MATCH_WINDOW_SECONDS):
+        self._window = timedelta(seconds=window_seconds)
+        self._jobs = []
+        windows = []
+
+        for order, (job_id, job) in enumerate(jobs.items()):
+            job["job_id"] = job_id
+            self._jobs.append(job)
+
+            created_at = job.get("created_at")
+            completed_at = job.get("completed_at")
+            if not created_at:
+                continue
+            if completed_at:
+                if completed_at < created_at:
+                    continue
+                windows.append((created_at, min(completed_at, created_at + self._window), order))
+                windows.append((max(created_at, completed_at - self._window), completed_at, order))
+            else:
+                windows.append((created_at, created_at + self._window, order))
+
+        windows.sort()
+        self._starts = [start for start, _, _ in windows]
+        self._windows = windows
+
+    def find(self, timestamp: datetime) -> Optional[Dict[str, Any]]:
+        """Return the job active at timestamp, or None."""
+        # No window is longer than self._window, so only windows starting in
+        # [timestamp - window, timestamp] can contain timestamp
+        lo = bisect_left(self._starts, timestamp - self._window)
+        hi = bisect_right(self._starts, timestamp)
+
+        best = None
+        for index in range(lo, hi):
+            _, end, order = self._windows[index]
+            if end >= timestamp and (best is None or order < best):
+                best = order
+
+        return self._jobs[best] if best is not None else None
+
+
+class CitationBlock:
+    """Lines of one multiline ORIGINAL: block and the timestamp used to match it to a job."""
+
+    __slots__ = ("lines", "timestamp", "collecting")
+
+    def __init__(self, timestamp: Optional[datetime]):
+        self.lines: List[str] = []
+        self.timestamp = timestamp
+        self.collecting = True
+
+    def feed(self, line: str, timestamp: Optional[datetime]) -> bool:
+        """
+        Consume the next log line. Returns True once the block is complete.
+
+        Same rules as extract_full_citations()/extract_citations_from_all_lines():
+        lines are collected up to the next timestamped or empty line, and if
+        the line before ORIGINAL: had no timestamp the next valid one is used.
+        """
+        if self.collecting:
+            if not line or TIMESTAMP_RE.match(line):
+                self.collecting = False
+            else:
+                self.lines.append(line)
+        if self.timestamp is None:
+            self.timestamp = timestamp
+        return not self.collecting and self.timestamp is not None
+
+    def result(self) -> Optional[Tuple[str, bool]]:
+        """(sanitized_text, was_truncated), or None if the block was empty."""
+        if not self.lines:
+            return None
+        return sanitize_text('\n'.join(self.lines), 10000)
+
+
+class CitationBlockCollector:
+    """Incrementally collects ORIGINAL: blocks from a stream of stripped log lines."""
+
+    def __init__(self):
+        self.blocks: List[CitationBlock] = []
+        self._open: List[CitationBlock] = []
+        self._previous_line: Optional[str] = None
+
+    def feed(self, line: str) -> None:
+        """Consume the next stripped log line."""
+        if self._open:
+            timestamp = None
+            if any(block.timestamp is None for block in self._open):
+                timestamp = extract_timestamp(line)
+            self._open = [block for block in self._open if not block.feed(line, timestamp)]
+
+        if line == "ORIGINAL:":
+            # Get timestamp from previous line (if available); otherwise the
+            # block takes the next timestamp it is fed
+            timestamp = extract_timestamp(self._previous_line) if self._previous_line is not None else None
+            block = CitationBlock(timestamp)
+            self.blocks.append(block)
+            self._open.append(block)
+
+        self._previous_line = line
+
+    def pop_ready(self, cutoff: Optional[datetime] = None) -> List[CitationBlock]:
+        """
+        Remove and return complete blocks timestamped at or before cutoff.
+
+        With no cutoff every block is returned, complete or not, as
+        extract_citations_from_all_lines() does at the end of the input.
+        """
+        if cutoff is None:
+            ready, self.blocks, self._open = self.blocks, [], []
+            return ready
+
+        ready = []
+        pending = []
+        for block in self.blocks:
+            if not block.collecting and block.timestamp is not None and block.timestamp <= cutoff:
+                ready.append(block)
+            else:
+                pending.append(block)
+        self.blocks = pending
+        return ready
+
+
 def parse_job_events(log_lines: List[str]) -> Dict[str, Dict[str, Any]]:
     """
     Pass 1: Extract job lifecycle events from log lines.
@@ -766,214 +1010,216 @@ def parse_job_events(log_lines: List[str]) -> Dict[str, Dict[str, Any]]:
         Dictionary of jobs indexed by job_id
     """
     jobs = {}
+    user_id_candidates = UserIdCandidates(jobs)
 
     for line in log_lines:
-        # Check for job creation
-        creation_result = extract_creation(line)
-        if creation_result:
-            job_id, timestamp, user_type = creation_result
-            jobs[job_id] = {
-                "job_id": job_id,
-                "created_at": timestamp,
-                "user_type": user_type,
-                "status": "pending",
-                "paid_user_id": None,
-                "free_user_id": None
-            }
-            continue
-
-        # Check for partial results event
-        partial_results = extract_partial_results_event(line)
-        if partial_results:
-            job_id, partial_type = partial_results
-            
-            # Allow partial updates for existing jobs
-            if job_id not in jobs:
-                jobs[job_id] = {"job_id": job_id}
-                
-            if job_id in jobs and jobs[job_id].get('upgrade_state') != 'success':
-                add_upgrade_state(jobs[job_id], 'locked')
-                    
-                jobs[job_id]["partial_results_type"] = partial_type  # Store for debugging
-            # Do not continue, as this line might also be a completion event
-
-        # Check for job completion
-        completion_result = extract_completion(line)
-        if completion_result:
-            job_id, timestamp = completion_result
-            if job_id in jobs:
-                jobs[job_id]["completed_at"] = timestamp
-                jobs[job_id]["status"] = "completed"
-            continue
+        apply_job_event(jobs, line, user_id_candidates)
 
-        # Check for job failure
-        failure_result = extract_failure(line)
-        if failure_result:
-            job_id, timestamp, error_message = failure_result
-            if job_id in jobs:
-                jobs[job_id]["status"] = "failed"
-                jobs[job_id]["error_message"] = error_message
-                jobs[job_id]["completed_at"] = timestamp
-            continue
-
-        # Still check for gating decision for compatibility
-        gating_result = extract_gating_decision(line)
-        if gating_result:
-            job_id, results_gated, reason = gating_result
-            if job_id in jobs:
-                jobs[job_id]["results_gated"] = results_gated
-            continue
-
-        # Check for provider selection
-        provider_result = extract_provider_selection(line)
-        if provider_result:
-            job_id, style, provider = provider_result
-            if job_id in jobs:
-                jobs[job_id]["provider"] = provider
-                jobs[job_id]["style"] = style
-            continue
+    return jobs
 
-        # Check for citation count (direct job_id matching, preferred over timestamp-based)
-        citation_result = extract_citation_count_with_job(line)
-        if citation_result:
-            job_id, count = citation_result
-            if job_id in jobs:
-                jobs[job_id]["citation_count"] = count
-            continue
 
-        # Check for duration (direct job_id matching, preferred over timestamp-based)
-        duration_result = extract_duration_with_job(line)
-        if duration_result:
-            job_id, duration = duration_result
-            if job_id in jobs:
-                jobs[job_id]["duration_seconds"] = duration
-            continue
+def apply_job_event(jobs: Dict[str, Dict[str, Any]], line: str, user_id_candidates: "UserIdCandidates") -> None:
+    """
+    Apply the job lifecycle event on one log line (if any) to jobs.
 
-        # Check for reveal event
-        reveal_result = extract_reveal_event(line)
-        if reveal_result:
-            job_id, outcome = reveal_result
-            if job_id in jobs:
-                # Extract timestamp from beginning of line for reveal time
-                timestamp = extract_timestamp(line)
-                if timestamp:
-                    jobs[job_id]["results_revealed_at"] = timestamp.isoformat() + 'Z'
-                jobs[job_id]["gated_outcome"] = outcome
-            continue
+    Args:
+        jobs: Dictionary of jobs indexed by job_id, updated in place
+        line: Stripped log line
+        user_id_candidates: Index of jobs still waiting for user IDs
+    """
+    for marker in JOB_EVENT_LINE_MARKERS:
+        if marker in line:
+            break
+    else:
+        return
+
+    # Check for job creation
+    creation_result = extract_creation(line)
+    if creation_result:
+        job_id, timestamp, user_type = creation_result
+        jobs[job_id] = {
+            "job_id": job_id,
+            "created_at": timestamp,
+            "user_type": user_type,
+            "status": "pending",
+            "paid_user_id": None,
+            "free_user_id": None
+        }
+        user_id_candidates.add(job_id)
+        return
 
-        # Check for upgrade workflow event
-        upgrade_result = extract_upgrade_workflow_event(line)
-        if upgrade_result:
-            job_id = upgrade_result["job_id"]
-            event = upgrade_result["event"]
+    # Check for partial results event
+    partial_results = extract_partial_results_event(line)
+    if partial_results:
+        job_id, partial_type = partial_results
+        
+        # Allow partial updates for existing jobs
+        if job_id not in jobs:
+            jobs[job_id] = {"job_id": job_id}
             
-            # Allow partial updates for existing jobs
-            if job_id not in jobs:
-                jobs[job_id] = {"job_id": job_id}
-                
-            if job_id in jobs:
-                # Store extra fields if present
-                for field in ["experiment_variant", "product_id", "amount_cents", "currency", "order_id", "interaction_type"]:
-                    if field in upgrade_result:
-                        jobs[job_id][field] = upgrade_result[field]
+        if job_id in jobs and jobs[job_id].get('upgrade_state') != 'success':
+            add_upgrade_state(jobs[job_id], 'locked')
                 
-                # Set paid_user_id from token if present and not set
-                if "token" in upgrade_result and not jobs[job_id].get("paid_user_id"):
-                    jobs[job_id]["paid_user_id"] = upgrade_result["token"]
-
-                # Map events to state values
-                # Note: Some events map to shorter state names for clarity
-                # e.g., 'pricing_table_shown' -> 'shown'
-                event_to_state = {
-                    'pricing_table_shown': 'shown',
-                    'pricing_viewed': 'shown',  # Synonym for inline variants
-                    'upgrade_presented': 'locked',  # When upgrade banner is first shown (locked state)
-                    'clicked_upgrade': 'clicked',
-                    'modal_proceed': 'modal',
-                    'checkout_started': 'checkout',
-                    'success': 'success',
-                    'purchase_completed': 'success'
-                }
-
-                # Get the new state
-                new_state = event_to_state.get(event)
-                if new_state:
-                    add_upgrade_state(jobs[job_id], new_state)
-            continue
-
-        # Check for validation type
-        validation_type_result = extract_validation_type(line)
-        if validation_type_result:
-            job_id, val_type = validation_type_result
-            if job_id not in jobs:
-                jobs[job_id] = {"job_id": job_id}
-            jobs[job_id]["validation_type"] = val_type
-            continue
-
-        # Check for inline validation stats
-        inline_stats_result = extract_inline_validation_stats(line)
-        if inline_stats_result:
-            job_id, inline_count, orphan_count = inline_stats_result
-            if job_id not in jobs:
-                jobs[job_id] = {"job_id": job_id}
-            jobs[job_id]["inline_citation_count"] = inline_count
-            jobs[job_id]["orphan_count"] = orphan_count
-            continue
-
-        # Check for validation complete with inline stats (combined format)
-        validation_complete_result = extract_validation_complete_inline(line)
-        if validation_complete_result:
-            job_id = validation_complete_result["job_id"]
-            if job_id not in jobs:
-                jobs[job_id] = {"job_id": job_id}
-            jobs[job_id]["validation_type"] = validation_complete_result["validation_type"]
-            jobs[job_id]["citation_count"] = validation_complete_result["citation_count"]
-            jobs[job_id]["inline_citation_count"] = validation_complete_result["inline_citation_count"]
-            jobs[job_id]["orphan_count"] = validation_complete_result["orphan_count"]
-            # Also update duration if not set
-            if jobs[job_id].get("duration_seconds") is None:
-                jobs[job_id]["duration_seconds"] = validation_complete_result["duration"]
-            continue
-
-        # Check for validation request with user IDs
-        if "Validation request" in line:
-            paid_user_id, free_user_id = extract_user_ids(line)
-            if paid_user_id is not None or free_user_id is not None:
-                # Find the most recent job that doesn't have user IDs set yet
-                # This associates the user IDs with the job that was just created
-                timestamp = extract_timestamp(line)
-                if timestamp:
-                    # Look for a job created within the last 5 minutes that doesn't have user IDs
-                    for job_id, job in jobs.items():
-                        if (job.get("paid_user_id") is None and
-                            job.get("free_user_id") is None and
-                            job.get("created_at") and
-                            abs((timestamp - job["created_at"]).total_seconds()) < USER_ID_ASSOCIATION_TIMEOUT_SECONDS):
-                            job["paid_user_id"] = paid_user_id
-                            job["free_user_id"] = free_user_id
-                            break
-
-        # Check for correction event
-        correction_result = extract_correction_event(line)
-        if correction_result:
-            job_id = correction_result["job_id"]
-            if job_id not in jobs:
-                jobs[job_id] = {"job_id": job_id}
-            jobs[job_id]["corrections_copied"] = jobs[job_id].get("corrections_copied", 0) + 1
-            continue
-
-        # Check for test job detection
-
-        test_job_id = extract_test_job_indicator(line)
-        if test_job_id:
-            # Allow partial updates for existing jobs
-            if test_job_id not in jobs:
-                jobs[test_job_id] = {"job_id": test_job_id}
+            jobs[job_id]["partial_results_type"] = partial_type  # Store for debugging
+        # Do not continue, as this line might also be a completion event
+
+    # Check for job completion
+    completion_result = extract_completion(line)
+    if completion_result:
+        job_id, timestamp = completion_result
+        if job_id in jobs:
+            jobs[job_id]["completed_at"] = timestamp
+            jobs[job_id]["status"] = "completed"
+        return
+
+    # Check for job failure
+    failure_result = extract_failure(line)
+    if failure_result:
+        job_id, timestamp, error_message = failure_result
+        if job_id in jobs:
+            jobs[job_id]["status"] = "failed"
+            jobs[job_id]["error_message"] = error_message
+            jobs[job_id]["completed_at"] = timestamp
+        return
+
+    # Still check for gating decision for compatibility
+    gating_result = extract_gating_decision(line)
+    if gating_result:
+        job_id, results_gated, reason = gating_result
+        if job_id in jobs:
+            jobs[job_id]["results_gated"] = results_gated
+        return
+
+    # Check for provider selection
+    provider_result = extract_provider_selection(line)
+    if provider_result:
+        job_id, style, provider = provider_result
+        if job_id in jobs:
+            jobs[job_id]["provider"] = provider
+            jobs[job_id]["style"] = style
+        return
+
+    # Check for citation count (direct job_id matching, preferred over timestamp-based)
+    citation_result = extract_citation_count_with_job(line)
+    if citation_result:
+        job_id, count = citation_result
+        if job_id in jobs:
+            jobs[job_id]["citation_count"] = count
+        return
+
+    # Check for duration (direct job_id matching, preferred over timestamp-based)
+    duration_result = extract_duration_with_job(line)
+    if duration_result:
+        job_id, duration = duration_result
+        if job_id in jobs:
+            jobs[job_id]["duration_seconds"] = duration
+        return
+
+    # Check for reveal event
+    reveal_result = extract_reveal_event(line)
+    if reveal_result:
+        job_id, outcome = reveal_result
+        if job_id in jobs:
+            # Extract timestamp from beginning of line for reveal time
+            timestamp = extract_timestamp(line)
+            if timestamp:
+                jobs[job_id]["results_revealed_at"] = timestamp.isoformat() + 'Z'
+            jobs[job_id]["gated_outcome"] = outcome
+        return
+
+    # Check for upgrade workflow event
+    upgrade_result = extract_upgrade_workflow_event(line)
+    if upgrade_result:
+        job_id = upgrade_result["job_id"]
+        event = upgrade_result["event"]
+        
+        # Allow partial updates for existing jobs
+        if job_id not in jobs:
+            jobs[job_id] = {"job_id": job_id}
             
-            jobs[test_job_id]["is_test_job"] = True
-            continue
+        if job_id in jobs:
+            # Store extra fields if present
+            for field in ["experiment_variant", "product_id", "amount_cents", "currency", "order_id", "interaction_type"]:
+                if field in upgrade_result:
+                    jobs[job_id][field] = upgrade_result[field]
+            
+            # Set paid_user_id from token if present and not set
+            if "token" in upgrade_result and not jobs[job_id].get("paid_user_id"):
+                jobs[job_id]["paid_user_id"] = upgrade_result["token"]
+
+            new_state = UPGRADE_EVENT_STATES.get(event)
+            if new_state:
+                add_upgrade_state(jobs[job_id], new_state)
+        return
+
+    # Check for validation type
+    validation_type_result = extract_validation_type(line)
+    if validation_type_result:
+        job_id, val_type = validation_type_result
+        if job_id not in jobs:
+            jobs[job_id] = {"job_id": job_id}
+        jobs[job_id]["validation_type"] = val_type
+        return
+
+    # Check for inline validation stats
+    inline_stats_result = extract_inline_validation_stats(line)
+    if inline_stats_result:
+        job_id, inline_count, orphan_count = inline_stats_result
+        if job_id not in jobs:
+            jobs[job_id] = {"job_id": job_id}
+        jobs[job_id]["inline_citation_count"] = inline_count
+        jobs[job_id]["orphan_count"] = orphan_count
+        return
+
+    # Check for validation complete with inline stats (combined format)
+    validation_complete_result = extract_validation_complete_inline(line)
+    if validation_complete_result:
+        job_id = validation_complete_result["job_id"]
+        if job_id not in jobs:
+            jobs[job_id] = {"job_id": job_id}
+        jobs[job_id]["validation_type"] = validation_complete_result["validation_type"]
+        jobs[job_id]["citation_count"] = validation_complete_result["citation_count"]
+        jobs[job_id]["inline_citation_count"] = validation_complete_result["inline_citation_count"]
+        jobs[job_id]["orphan_count"] = validation_complete_result["orphan_count"]
+        # Also update duration if not set
+        if jobs[job_id].get("duration_seconds") is None:
+            jobs[job_id]["duration_seconds"] = validation_complete_result["duration"]
+        return
+
+    # Check for validation request with user IDs
+    if "Validation request" in line:
+        paid_user_id, free_user_id = extract_user_ids(line)
+        if paid_user_id is not None or free_user_id is not None:
+            # Find the most recent job that doesn't have user IDs set yet
+            # This associates the user IDs with the job that was just created
+            timestamp = extract_timestamp(line)
+            if timestamp:
+                # Look for a job created within the last 5 minutes that doesn't have user IDs
+                job = user_id_candidates.find(timestamp)
+                if job:
+                    job["paid_user_id"] = paid_user_id
+                    job["free_user_id"] = free_user_id
+
+    # Check for correction event
+    correction_result = extract_correction_event(line)
+    if correction_result:
+        job_id = correction_result["job_id"]
+        if job_id not in jobs:
+            jobs[job_id] = {"job_id": job_id}
+        jobs[job_id]["corrections_copied"] = jobs[job_id].get("corrections_copied", 0) + 1
+        return
+
+    # Check for test job detection
+
+    test_job_id = extract_test_job_indicator(line)
+    if test_job_id:
+        # Allow partial updates for existing jobs
+        if test_job_id not in jobs:
+            jobs[test_job_id] = {"job_id": test_job_id}
+        
+        jobs[test_job_id]["is_test_job"] = True
+        return
 
-    return jobs
 
 
 def find_job_by_timestamp(jobs: Dict[str, Dict[str, Any]], timestamp: datetime, window_seconds: int = 120) -> Optional[Dict[str, Any]]:
@@ -1014,6 +1260,48 @@ def find_job_by_timestamp(jobs: Dict[str, Dict[str, Any]], timestamp: datetime,
     return None
 
 
+def apply_metrics(job: Dict[str, Any], line: str) -> None:
+    """
+    Apply metrics found on a timestamp-matched log line to its job.
+
+    Args:
+        job: Job the line was matched to, updated in place
+        line: Log line to extract metrics from
+    """
+    # Extract duration (fallback for old logs without job_id prefix)
+    # Prefer direct job_id matching from parse_job_events (Pass 1)
+    if job.get("duration_seconds") is None:
+        duration = extract_duration(line)
+        if duration is not None:
+            job["duration_seconds"] = duration
+
+    # Note: citation_count is now extracted in parse_job_events via direct job_id matching
+    # (see extract_citation_count_with_job) - no longer using timestamp-based matching
+    # Note: duration_seconds is now also extracted in parse_job_events via direct job_id matching
+    # (see extract_duration_with_job) - timestamp-based matching is a fallback for old logs
+
+    # Extract token usage
+    token_usage = extract_token_usage(line)
+    if token_usage is not None:
+        job["token_usage_prompt"] = token_usage["prompt"]
+        job["token_usage_completion"] = token_usage["completion"]
+        job["token_usage_total"] = token_usage["total"]
+
+    # Extract validation results (valid/invalid counts)
+    validation_results = extract_validation_results(line)
+    if validation_results is not None:
+        valid_count, invalid_count = validation_results
+        job["valid_citations_count"] = valid_count
+        job["invalid_citations_count"] = invalid_count
+
+    # Extract citation preview (single line)
+    preview_result = extract_citations_preview(line)
+    if preview_result is not None:
+        citations_preview, preview_truncated = preview_result
+        job["citations_preview"] = citations_preview
+        job["citations_preview_truncated"] = preview_truncated
+
+
 def parse_metrics(log_lines: List[str], jobs: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
     """
     Pass 2: Match metrics to jobs based on timestamp proximity.
@@ -1025,48 +1313,19 @@ def parse_metrics(log_lines: List[str], jobs: Dict[str, Dict[str, Any]]) -> Dict
     Returns:
         Updated jobs dictionary with metrics added
     """
+    index = JobTimeIndex(jobs)
+
     for line in log_lines:
         timestamp = extract_timestamp(line)
         if not timestamp:
             continue
 
         # Find which job this metric belongs to
-        job = find_job_by_timestamp(jobs, timestamp)
+        job = index.find(timestamp)
         if not job:
             continue
 
-        # Extract duration (fallback for old logs without job_id prefix)
-        # Prefer direct job_id matching from parse_job_events (Pass 1)
-        if job.get("duration_seconds") is None:
-            duration = extract_duration(line)
-            if duration is not None:
-                job["duration_seconds"] = duration
-
-        # Note: citation_count is now extracted in parse_job_events via direct job_id matching
-        # (see extract_citation_count_with_job) - no longer using timestamp-based matching
-        # Note: duration_seconds is now also extracted in parse_job_events via direct job_id matching
-        # (see extract_duration_with_job) - timestamp-based matching is a fallback for old logs
-
-        # Extract token usage
-        token_usage = extract_token_usage(line)
-        if token_usage is not None:
-            job["token_usage_prompt"] = token_usage["prompt"]
-            job["token_usage_completion"] = token_usage["completion"]
-            job["token_usage_total"] = token_usage["total"]
-
-        # Extract validation results (valid/invalid counts)
-        validation_results = extract_validation_results(line)
-        if validation_results is not None:
-            valid_count, invalid_count = validation_results
-            job["valid_citations_count"] = valid_count
-            job["invalid_citations_count"] = invalid_count
-
-        # Extract citation preview (single line)
-        preview_result = extract_citations_preview(line)
-        if preview_result is not None:
-            citations_preview, preview_truncated = preview_result
-            job["citations_preview"] = citations_preview
-            job["citations_preview_truncated"] = preview_truncated
+        apply_metrics(job, line)
 
     return jobs
 
@@ -1082,71 +1341,293 @@ def extract_citations_from_all_lines(log_lines: List[str], jobs: Dict[str, Dict[
     Returns:
         Updated jobs dictionary with full citations added
     """
-    for i, line in enumerate(log_lines):
-        # Look for ORIGINAL: pattern
-        if line.strip() == "ORIGINAL:":
-            # Get timestamp from previous line (if available)
-            timestamp = None
-            if i > 0:
-                timestamp = extract_timestamp(log_lines[i-1])
+    index = JobTimeIndex(jobs)
+    collector = CitationBlockCollector()
 
-            # If no timestamp in previous line, try to find next timestamp
-            if not timestamp:
-                for j in range(i + 1, len(log_lines)):
-                    timestamp = extract_timestamp(log_lines[j])
-                    if timestamp:
-                        break
+    for line in log_lines:
+        collector.feed(line.strip())
 
-            # Find which job this citation belongs to
-            if timestamp:
-                job = find_job_by_timestamp(jobs, timestamp)
-                if job:
-                    # Extract full citations
-                    full_result = extract_full_citations(log_lines, i)
-                    if full_result is not None:
-                        citations_full, full_truncated = full_result
-                        job["citations_full"] = citations_full
-                        job["citations_full_truncated"] = full_truncated
+    _apply_citation_blocks(collector.blocks, index)
+    return jobs
+
+
+def _apply_citation_blocks(blocks: List[CitationBlock], index: JobTimeIndex) -> None:
+    for block in blocks:
+        # Find which job this citation belongs to
+        if block.timestamp:
+            job = index.find(block.timestamp)
+            if job:
+                full_result = block.result()
+                if full_result is not None:
+                    citations_full, full_truncated = full_result
+                    job["citations_full"] = citations_full
+                    job["citations_full_truncated"] = full_truncated
+
+
+def parse_log_lines(log_lines: Iterable[str], jobs: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Parse stripped log lines in a single pass.
+
+    Gives the same jobs as parse_job_events, parse_metrics and
+    extract_citations_from_all_lines run one after the other. Lifecycle events
+    are applied as lines stream past; metric lines and ORIGINAL: blocks are
+    kept with their timestamps and matched to jobs through a JobTimeIndex once
+    every job's lifetime is known.
+
+    Args:
+        log_lines: Iterable of stripped log lines (read only once)
+        jobs: Optional empty dict to fill instead of a new one, so a line
+            generator can see which jobs its lines created
+
+    Returns:
+        Dictionary of jobs indexed by job_id
+    """
+    if jobs is None:
+        jobs = {}
+    user_id_candidates = UserIdCandidates(jobs)
+    collector = CitationBlockCollector()
+    metric_lines: List[Tuple[datetime, str]] = []
 
+    for line in log_lines:
+        apply_job_event(jobs, line, user_id_candidates)
+        collector.feed(line)
+
+        for marker in METRIC_LINE_MARKERS:
+            if marker in line:
+                timestamp = extract_timestamp(line)
+                if timestamp:
+                    metric_lines.append((timestamp, line))
+                break
+
+    index = JobTimeIndex(jobs)
+    for timestamp, line in metric_lines:
+        job = index.find(timestamp)
+        if job:
+            apply_metrics(job, line)
+
+    _apply_citation_blocks(collector.blocks, index)
     return jobs
 
 
-def parse_logs(log_file_path: str, start_timestamp: Optional[datetime] = None) -> List[Dict[str, Any]]:
+class StreamingJobParser:
+    """
+    Memory-bounded variant of parse_log_lines() for large log archives.
+
+    Lines are fed one at a time and finished jobs are handed back as soon as
+    nothing later in a chronological log can change them, so memory depends
+    on how many jobs overlap in time rather than on the size of the input.
+
+    Metric lines and ORIGINAL: blocks are matched to jobs once the log has
+    moved window_seconds past them (every job they could match is known by
+    then). A completed job is emitted linger_seconds after its completion, a
+    job that never completes after pending_timeout_seconds. Per-job events
+    logged after that (e.g. a late upgrade click) start a new partial record
+    for the job_id, the same as when the cron parses the log in segments.
+
+    With finalize=False jobs are handed back as the raw dicts parse_log_lines()
+    builds, for callers that merge records before finalizing them.
     """
-    Main function: Parse log file and return list of validation events.
+
+    def __init__(
+        self,
+        window_seconds: int = JOB_MATCH_WINDOW_SECONDS,
+        linger_seconds: int = STREAM_JOB_LINGER_SECONDS,
+        pending_timeout_seconds: int = STREAM_PENDING_JOB_TIMEOUT_SECONDS,
+        finalize: bool = True
+    ):
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.finalize = finalize
+        self._user_id_candidates = UserIdCandidates(self.jobs)
+        self._collector = CitationBlockCollector()
+        self._metric_lines: List[Tuple[datetime, str]] = []
+        # job_id -> log time at which a job without created_at was first seen
+        self._first_seen: Dict[str, Optional[datetime]] = {}
+
+        self._window = timedelta(seconds=window_seconds)
+        self._linger = timedelta(seconds=linger_seconds)
+        self._pending_timeout = timedelta(seconds=pending_timeout_seconds)
+
+        # Latest "YYYY-MM-DD HH:MM:SS" prefix seen; compares like the time it encodes
+        self._watermark = ""
+        self._now: Optional[datetime] = None
+        self._next_flush: Optional[datetime] = None
+
+    def feed(self, line: str) -> List[Dict[str, Any]]:
+        """
+        Consume the next stripped log line.
+
+        Returns:
+            Finalized jobs (see _finalize_job_data) that are now complete
+        """
+        advanced = False
+        prefix = line[:19]
+        if prefix > self._watermark:
+            match = TIMESTAMP_RE.match(prefix)
+            if match:
+                self._watermark = prefix
+                self._now = datetime(*map(int, match.groups()))
+                advanced = True
+
+        job_count = len(self.jobs)
+        apply_job_event(self.jobs, line, self._user_id_candidates)
+        if len(self.jobs) > job_count:
+            self._first_seen[next(reversed(self.jobs))] = self._now
+
+        self._collector.feed(line)
+
+        for marker in METRIC_LINE_MARKERS:
+            if marker in line:
+                timestamp = extract_timestamp(line)
+                if timestamp:
+                    self._metric_lines.append((timestamp, line))
+                break
+
+        if not advanced:
+            return []
+        if self._next_flush is None:
+            self._next_flush = self._now + self._window
+        if self._now < self._next_flush:
+            return []
+
+        # Batch the work: resolve and evict once per window of log time
+        self._next_flush = self._now + self._window
+        return self._flush(self._now - self._window)
+
+    def finish(self) -> List[Dict[str, Any]]:
+        """
+        Match everything still buffered and return all remaining jobs.
+
+        Returns:
+            Finalized jobs, in the order they were first seen
+        """
+        index = JobTimeIndex(self.jobs)
+        for timestamp, line in self._metric_lines:
+            job = index.find(timestamp)
+            if job:
+                apply_metrics(job, line)
+        _apply_citation_blocks(self._collector.pop_ready(), index)
+
+        jobs, self.jobs = self.jobs, {}
+        self._user_id_candidates = UserIdCandidates(self.jobs)
+        self._metric_lines = []
+        self._first_seen = {}
+        return _finalize_job_data(jobs) if self.finalize else list(jobs.values())
+
+    def _flush(self, cutoff: datetime) -> List[Dict[str, Any]]:
+        index = JobTimeIndex(self.jobs)
+
+        pending_lines = []
+        for timestamp, line in self._metric_lines:
+            if timestamp > cutoff:
+                pending_lines.append((timestamp, line))
+                continue
+            job = index.find(timestamp)
+            if job:
+                apply_metrics(job, line)
+        self._metric_lines = pending_lines
+
+        _apply_citation_blocks(self._collector.pop_ready(cutoff), index)
+
+        # Every metric and citation block up to cutoff has been applied, so a
+        # job whose lifetime ended before cutoff can't receive any more
+        finished = {}
+        for job_id, job in self.jobs.items():
+            completed_at = job.get("completed_at")
+            created_at = job.get("created_at")
+            if completed_at:
+                done_at = completed_at + self._linger
+            elif created_at:
+                done_at = created_at + self._pending_timeout
+            else:
+                done_at = (self._first_seen.get(job_id) or datetime.min) + self._linger
+            if done_at <= cutoff:
+                finished[job_id] = job
+
+        for job_id in finished:
+            del self.jobs[job_id]
+            self._first_seen.pop(job_id, None)
+            self._user_id_candidates.discard(job_id)
+        self._user_id_candidates.prune(cutoff - timedelta(seconds=USER_ID_ASSOCIATION_TIMEOUT_SECONDS))
+
+        return _finalize_job_data(finished) if self.finalize else list(finished.values())
+
+
+def iter_parsed_jobs(log_lines: Iterable[str], **kwargs) -> Iterator[Dict[str, Any]]:
+    """
+    Stream finalized jobs from stripped log lines with a StreamingJobParser.
+
+    Args:
+        log_lines: Iterable of stripped log lines, in chronological order
+        **kwargs: StreamingJobParser window settings
+
+    Yields:
+        Job dictionaries, each as soon as it is complete
+    """
+    parser = StreamingJobParser(**kwargs)
+    for line in log_lines:
+        yield from parser.feed(line)
+    yield from parser.finish()
+
+
+def read_log_lines(log_file_path: str, start_timestamp: Optional[datetime] = None) -> Iterator[str]:
+    """
+    Stream stripped lines from a log file.
 
     Args:
         log_file_path: Path to log file (supports .gz compression)
-        start_timestamp: Optional timestamp to start parsing from
+        start_timestamp: Optional timestamp; only timestamped lines at or
+            after it are yielded
 
-    Returns:
-        List of job dictionaries with extracted information
+    Yields:
+        Stripped log lines
     """
     # Determine if file is gzip compressed
     open_func = gzip.open if log_file_path.endswith('.gz') else open
 
     with open_func(log_file_path, 'rt', encoding='utf-8') as f:
-        log_lines = f.readlines()
-
-    # Filter by start timestamp if provided
-    if start_timestamp:
-        filtered_lines = []
-        for line in log_lines:
-            timestamp = extract_timestamp(line.strip())
-            if timestamp and timestamp >= start_timestamp:
-                filtered_lines.append(line.strip())
-        log_lines = filtered_lines
-    else:
-        log_lines = [line.strip() for line in log_lines]
+        log_lines = (line.strip() for line in f)
 
-    # Pass 1: Extract job lifecycle events
-    jobs = parse_job_events(log_lines)
+        # Filter by start timestamp if provided
+        if start_timestamp:
+            log_lines = (
+                line for line in log_lines
+                if (timestamp := extract_timestamp(line)) and timestamp >= start_timestamp
+            )
 
-    # Pass 2: Match metrics to jobs
-    jobs = parse_metrics(log_lines, jobs)
+        yield from log_lines
 
-    # Pass 3: Extract full citations from multiline patterns
-    jobs = extract_citations_from_all_lines(log_lines, jobs)
+
+def iter_logs(log_file_path: str, start_timestamp: Optional[datetime] = None, **kwargs) -> Iterator[Dict[str, Any]]:
+    """
+    Streaming counterpart of parse_logs() for multi-GB and gzip archives.
+
+    Peak memory is bounded by the jobs open at any one time instead of the
+    size of the file. Jobs are yielded as they complete, so the order differs
+    from parse_logs(); see StreamingJobParser for the matching rules.
+
+    Args:
+        log_file_path: Path to log file (supports .gz compression)
+        start_timestamp: Optional timestamp to start parsing from
+        **kwargs: StreamingJobParser window settings
+
+    Yields:
+        Job dictionaries with extracted information
+    """
+    yield from iter_parsed_jobs(read_log_lines(log_file_path, start_timestamp), **kwargs)
+
+
+def parse_logs(log_file_path: str, start_timestamp: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """
+    Main function: Parse log file and return list of validation events.
+
+    Args:
+        log_file_path: Path to log file (supports .gz compression)
+        start_timestamp: Optional timestamp to start parsing from
+
+    Returns:
+        List of job dictionaries with extracted information
+    """
+    jobs = parse_log_lines(read_log_lines(log_file_path, start_timestamp))
 
     # Convert to list format and add default values
     return _finalize_job_data(jobs)
@@ -1311,39 +1792,19 @@ class CitationLogParser:
                 # Seek to last position
                 f.seek(self.last_position)
 
-                # Read new content
-                new_content = f.read()
-
-                # Update position to end of file
-                self.last_position = f.tell()
-                self._save_position(self.last_position)
-
-                # Process new content if any
-                if not new_content:
-                    return []
-
-                # Decode bytes to string and split into lines
+                # Stream new lines instead of reading the whole segment
                 try:
-                    content_str = new_content.decode('utf-8')
+                    jobs = parse_log_lines(self._read_new_lines(f))
                 except UnicodeDecodeError as e:
                     logger.error(f"UTF-8 decode error in log file {self.log_file_path}: {e}")
-                    return []
-
-                # Split into lines and strip whitespace
-                log_lines = [line.strip() for line in content_str.splitlines() if line.strip()]
-
-                if not log_lines:
-                    return []
+                    jobs = {}
+                    # Skip the undecodable segment, as if it had been read
+                    for _ in f:
+                        pass
 
-                # Use existing parsing logic on new lines only
-                # Pass 1: Extract job lifecycle events
-                jobs = parse_job_events(log_lines)
-
-                # Pass 2: Match metrics to jobs
-                jobs = parse_metrics(log_lines, jobs)
-
-                # Pass 3: Extract full citations from multiline patterns
-                jobs = extract_citations_from_all_lines(log_lines, jobs)
+                # Update position to end of file
+                self.last_position = f.tell()
+                self._save_position(self.last_position)
 
                 # Convert to list format and add default values using shared helper
                 return _finalize_job_data(jobs)
@@ -1352,6 +1813,16 @@ class CitationLogParser:
             logger.error(f"Error reading log file {self.log_file_path}: {e}")
             return []
 
+    @staticmethod
+    def _read_new_lines(f) -> Iterator[str]:
+        """Yield the non-empty stripped lines from the binary file's current position."""
+        for raw_line in f:
+            # splitlines() also breaks on separators other than \n
+            for line in raw_line.decode('utf-8').splitlines():
+                line = line.strip()
+                if line:
+                    yield line
+
     def reset_position(self) -> None:
         """
         Reset the parser position to the beginning of the file.
@@ -274,24 +274,12 @@ def main():
 
             # Initialize database manager for citations_dashboard table
             with DatabaseManager(PRODUCTION_DB_PATH) as db:
-                # Insert citations into the database with deduplication check
-                for citation in citations_data:
-                    try:
-                        # Check if citation already exists to prevent duplicates
-                        cursor = db.conn.cursor()
-                        cursor.execute("""
-                            SELECT COUNT(*) FROM citations_dashboard
-                            WHERE job_id = ? AND citation_text = ?
-                        """, (citation.get('job_id'), citation.get('citation_text')))
-
-                        if cursor.fetchone()[0] == 0:
-                            db.insert_citation_to_dashboard(citation)
-                            logger.debug(f"Inserted citation for job {citation.get('job_id')}")
-                        else:
-                            logger.debug(f"Skipping duplicate citation for job {citation.get('job_id')}")
-
-                    except Exception as e:
-                        logger.error(f"Failed to insert citation for job {citation.get('job_id', 'unknown')}: {str(e)}")
+                # Insert all citations in one transaction, skipping duplicates
+                try:
+                    inserted = db.insert_citations_to_dashboard(citations_data)
+                    logger.info(f"Inserted {inserted} citations ({len(citations_data) - inserted} duplicates skipped)")
+                except Exception as e:
+                    logger.error(f"Failed to insert {len(citations_data)} citations: {str(e)}")
 
                 logger.info(f"Successfully processed {len(citations_data)} citations")
         else:
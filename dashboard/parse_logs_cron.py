@@ -9,6 +9,7 @@ import time
 import os
 from pathlib import Path
 
+from dashboard.analytics import refresh_upgrade_funnel
 from dashboard.cron_parser import CronLogParser
 
 # Configure logging
@@ -35,11 +36,18 @@ logger = logging.getLogger(__name__)
 DEFAULT_LOG_PATH = "/opt/citations/logs/app.log"
 DEFAULT_DB_PATH = "/opt/citations/dashboard/data/validations.db"
 DEFAULT_NGINX_LOG_PATH = "/var/log/nginx/access.log"
+DEFAULT_EVENT_LOG_PATH = "/opt/citations/logs/events.ndjson"
 
 # Allow overrides via environment variables
 PRODUCTION_LOG_PATH = os.getenv("CITATION_LOG_PATH", DEFAULT_LOG_PATH)
 PRODUCTION_DB_PATH = os.getenv("CITATION_DB_PATH", DEFAULT_DB_PATH)
 PRODUCTION_NGINX_LOG_PATH = os.getenv("NGINX_LOG_PATH", DEFAULT_NGINX_LOG_PATH)
+PRODUCTION_EVENT_LOG_PATH = os.getenv("EVENT_LOG_PATH", DEFAULT_EVENT_LOG_PATH)
+
+# Consume the backend's structured events instead of scraping the app log.
+# Explicit, so a partial events file (e.g. EVENT_LOGGING_ENABLED switched on
+# for a test) never silently stops the app log from being parsed.
+CONSUME_EVENTS = os.getenv("DASHBOARD_CONSUME_EVENTS", "").lower() == "true"
 
 def main():
     """Main cron job function"""
@@ -63,10 +71,18 @@ def main():
         # Initialize parser
         parser = CronLogParser(PRODUCTION_DB_PATH)
         
-        # Parse application logs
-        if log_path.exists():
+        if CONSUME_EVENTS:
+            if os.path.exists(PRODUCTION_EVENT_LOG_PATH):
+                logger.info(f"Consuming events: {PRODUCTION_EVENT_LOG_PATH}")
+                parser.parse_events(PRODUCTION_EVENT_LOG_PATH)
+            else:
+                logger.warning(f"Event log not found: {PRODUCTION_EVENT_LOG_PATH}")
+        elif log_path.exists():
             parser.parse_incremental(PRODUCTION_LOG_PATH)
             
+        # Fold new upgrade events into the funnel tables behind /api/funnel-data
+        logger.info(f"Ingested {refresh_upgrade_funnel()} upgrade funnel events")
+
         # Parse Nginx logs
         if os.path.exists(PRODUCTION_NGINX_LOG_PATH):
             logger.info(f"Parsing Nginx logs: {PRODUCTION_NGINX_LOG_PATH}")
@@ -0,0 +1,142 @@
+import gzip
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+# Add the dashboard directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backfill_logs import backfill, iter_app_logs, merge_job_records
+from database import DatabaseManager
+from log_parser import parse_logs
+
+
+def make_log_lines(num_jobs, spacing_seconds=20):
+    """Overlapping jobs (each runs ~45s) with metrics, citation blocks and late events."""
+    base = datetime(2025, 11, 4, 10, 0, 0)
+    log_lines = []
+    for i in range(num_jobs):
+        job_id = f"{i:04x}-abcd"
+
+        def ts(offset):
+            return (base + timedelta(seconds=i * spacing_seconds + offset)).strftime("%Y-%m-%d %H:%M:%S")
+
+        log_lines += [
+            f"{ts(0)} - INFO - Creating async job {job_id} for free user",
+            f"{ts(0)} - INFO - Async Validation request - user_type=free, paid_user_id=N/A, free_user_id=free-{i}",
+            f"{ts(1)} - INFO - Citation text preview: Citation {i}...",
+            f"{ts(1)} - INFO - UPGRADE_WORKFLOW: job_id={job_id} event=upgrade_presented",
+            f"{ts(30)} - INFO - Token usage: {i} prompt + 1 completion = {i + 1} total",
+            f"{ts(30)} - INFO - Raw response:",
+            "ORIGINAL:",
+            f"Author {i}. (2020). Title.",
+            f"{ts(45)} - INFO - Validation summary: 1 valid, 0 invalid",
+            f"{ts(45)} - INFO - Job {job_id}: Completed successfully",
+        ]
+    # Late events for the first job, well after it completed
+    late = (base + timedelta(seconds=num_jobs * spacing_seconds)).strftime("%Y-%m-%d %H:%M:%S")
+    log_lines += [
+        f"{late} - INFO - UPGRADE_WORKFLOW: job_id=0000-abcd event=clicked_upgrade",
+        f"{late} - INFO - CORRECTION_EVENT: job_id=0000-abcd action=copy",
+    ]
+    return log_lines
+
+
+def nginx_line(timestamp, path):
+    return f'1.2.3.4 - - [{timestamp:%d/%b/%Y:%H:%M:%S} +0000] "GET {path} HTTP/1.1" 200 512 "-" "Mozilla/5.0"'
+
+
+class TestBackfillLogs(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def write_rotated(self, lines, parts, name="app.log"):
+        """Split lines into rotated files, newest (app.log) last in time; odd ones gzipped."""
+        paths = []
+        size = len(lines) // parts + 1
+        for part in range(parts):
+            chunk = lines[part * size:(part + 1) * size]
+            rotation = parts - 1 - part
+            path = os.path.join(self.test_dir, name if rotation == 0 else f"{name}.{rotation}")
+            if rotation % 2:
+                path += ".gz"
+                with gzip.open(path, "wt", encoding="utf-8") as f:
+                    f.write("\n".join(chunk) + "\n")
+            else:
+                with open(path, "w") as f:
+                    f.write("\n".join(chunk) + "\n")
+            paths.append(path)
+        return paths
+
+    def test_matches_parsing_one_log(self):
+        lines = make_log_lines(60)
+        whole = os.path.join(self.test_dir, "whole.log")
+        with open(whole, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        # Rotation order, not time order, and cut through citation blocks
+        paths = sorted(self.write_rotated(lines, parts=4))
+
+        expected = {job["job_id"]: job for job in parse_logs(whole)}
+        jobs = {job["job_id"]: job for job in iter_app_logs(paths, workers=2)}
+
+        self.assertEqual(len(jobs), 60)
+        self.assertEqual(jobs, expected)
+        self.assertEqual(jobs["0000-abcd"]["upgrade_state"], "locked,clicked")
+        self.assertEqual(jobs["0000-abcd"]["corrections_copied"], 1)
+
+    def test_ranges_shorter_than_files_match_parsing_one_log(self):
+        lines = make_log_lines(120)
+        whole = os.path.join(self.test_dir, "whole.log")
+        with open(whole, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        paths = self.write_rotated(lines, parts=5)
+
+        expected = {job["job_id"]: job for job in parse_logs(whole)}
+        # Each ~8 minute file is owned from 5 minutes in, so jobs span workers
+        jobs = list(iter_app_logs(paths, workers=3, overlap_seconds=300))
+
+        self.assertEqual(len(jobs), 120)
+        self.assertEqual({job["job_id"]: job for job in jobs}, expected)
+
+    def test_merge_job_records(self):
+        merged = merge_job_records([
+            {"job_id": "a", "created_at": "t0", "upgrade_state": "locked,shown", "corrections_copied": 1},
+            {"job_id": "b", "created_at": "t1"},
+            {"job_id": "a", "upgrade_state": "clicked", "corrections_copied": 2, "status": None},
+        ])
+
+        self.assertEqual(list(merged), ["a", "b"])
+        self.assertEqual(merged["a"], {
+            "job_id": "a", "created_at": "t0", "upgrade_state": "locked,shown,clicked", "corrections_copied": 3
+        })
+
+    def test_backfill_writes_jobs_and_visits(self):
+        app_logs = self.write_rotated(make_log_lines(10), parts=2)
+        base = datetime(2025, 11, 4, 10, 0, 0)
+        nginx_logs = self.write_rotated(
+            [nginx_line(base + timedelta(minutes=minute), "/") for minute in range(6)],
+            parts=2, name="access.log"
+        )
+        db_path = os.path.join(self.test_dir, "validations.db")
+        with DatabaseManager(db_path) as db:
+            db.set_metadata("last_nginx_parsed_timestamp", "2025-12-01 00:00:00")
+
+        self.assertEqual(backfill(db_path, app_logs, nginx_logs, workers=2), (10, 6))
+
+        with DatabaseManager(db_path) as db:
+            self.assertEqual(db.get_validations_count(), 10)
+            self.assertEqual(db.get_validation("0003-abcd")["free_user_id"], "free-3")
+            self.assertEqual(db.conn.execute("SELECT COUNT(*) FROM site_visits").fetchone()[0], 6)
+            self.assertEqual(db.get_metadata("last_parsed_timestamp"), "2025-11-04 10:03:00")
+            # Backfilling older logs doesn't move the cron's position back
+            self.assertEqual(db.get_metadata("last_nginx_parsed_timestamp"), "2025-12-01 00:00:00")
+
+
+if __name__ == '__main__':
+    unittest.main()
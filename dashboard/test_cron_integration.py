@@ -3,11 +3,13 @@ import os
 import sys
 import tempfile
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
+from unittest.mock import patch
 
 # Add project root to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from dashboard import cron_parser
 from dashboard.cron_parser import CronLogParser
 from dashboard.database import DatabaseManager
 
@@ -62,5 +64,26 @@ class TestCronIntegration(unittest.TestCase):
         job1 = self.db.get_validation('abc-123')
         self.assertIsNotNone(job1)
 
+    def test_initial_load_writes_in_batches(self):
+        start = datetime.now() - timedelta(hours=1)
+        with open(self.log_path, 'w') as f:
+            for n in range(5):
+                at = start + timedelta(minutes=10 * n)
+                f.write(f"{at:%Y-%m-%d %H:%M:%S} INFO: Creating async job abc-{n} for free user\n")
+                f.write(f"{at + timedelta(seconds=5):%Y-%m-%d %H:%M:%S} INFO: Job abc-{n}: Completed\n")
+
+        parser = CronLogParser(self.db_path)
+        with patch.object(cron_parser, 'INSERT_BATCH_SIZE', 2), \
+                patch.object(parser, '_write_parsed_jobs', wraps=parser._write_parsed_jobs) as write, \
+                patch.object(cron_parser.DatabaseManager, 'refresh_rollups', autospec=True, return_value=1) as refresh:
+            parser.parse_initial_load(self.log_path)
+
+        self.assertEqual([len(call.args[1]) for call in write.call_args_list], [2, 2, 1])
+        self.assertEqual(refresh.call_count, 1)
+        for n in range(5):
+            self.assertEqual(self.db.get_validation(f'abc-{n}')['status'], 'completed')
+        last_created = start + timedelta(minutes=40)
+        self.assertEqual(self.db.get_metadata('last_parsed_timestamp'), f"{last_created:%Y-%m-%d %H:%M:%S}")
+
 if __name__ == '__main__':
     unittest.main()
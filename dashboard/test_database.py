@@ -14,7 +14,7 @@ from pathlib import Path
 import sys
 sys.path.append(str(Path(__file__).parent))
 
-from database import DatabaseManager
+from database import DatabaseManager, decode_page_cursor, encode_page_cursor
 
 
 class TestDatabaseSchema:
@@ -299,6 +299,7 @@ class TestDatabaseStats:
 
             for validation in test_validations:
                 db.insert_validation(validation)
+            db.refresh_rollups()
 
             # Get stats
             stats = db.get_stats()
@@ -369,5 +370,380 @@ class TestDatabaseRetention:
             assert remaining[0]["job_id"] == "recent-job"
 
 
+class TestValidationsSchemaCache:
+    """Test cached validations schema introspection"""
+
+    def _validation(self, job_id, **overrides):
+        data = {
+            "job_id": job_id,
+            "created_at": "2025-11-27T10:00:00Z",
+            "user_type": "free",
+            "status": "completed",
+            "citation_count": 3,
+        }
+        data.update(overrides)
+        return data
+
+    def test_table_info_not_queried_per_call(self):
+        """Test that inserts and queries reuse the cached schema"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db = DatabaseManager(os.path.join(temp_dir, "test.db"))
+            statements = []
+            db.conn.set_trace_callback(statements.append)
+
+            db.insert_validation(self._validation("job-1"))
+            db.insert_validation(self._validation("job-1", upgrade_state="locked"))
+            db.insert_validation(self._validation("job-2"))
+            db.get_validations(status="completed")
+            db.get_validations_count(status="completed")
+            db.get_stats()
+
+            assert sum("table_info" in sql for sql in statements) == 1
+            assert db.get_validation("job-1")["upgrade_state"] == "locked"
+            assert db.get_validations_count(status="completed") == 2
+
+    def test_schema_invalidated_by_migration(self):
+        """Test that re-running schema creation refreshes the cached columns"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db = DatabaseManager(os.path.join(temp_dir, "test.db"))
+            assert 'style' in db.validations_schema.columns
+
+            db.conn.execute("ALTER TABLE validations DROP COLUMN style")
+            db._create_schema()
+
+            assert 'style' in db.validations_schema.columns
+
+    def test_write_retries_after_external_migration(self):
+        """Test that a write recovers when another process dropped a cached column"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = os.path.join(temp_dir, "test.db")
+            db = DatabaseManager(db_path)
+            assert 'orphan_count' in db.validations_schema.columns
+
+            other = sqlite3.connect(db_path)
+            other.execute("ALTER TABLE validations DROP COLUMN orphan_count")
+            other.commit()
+            other.close()
+
+            db.insert_validation(self._validation("job-1", orphan_count=2))
+
+            assert 'orphan_count' not in db.validations_schema.columns
+            assert db.get_validation("job-1")["status"] == "completed"
+
+
+class TestBatchIngestion:
+    """Test executemany ingestion used by the cron jobs"""
+
+    def _validation(self, job_id, **overrides):
+        data = {
+            "job_id": job_id,
+            "created_at": "2025-11-27T10:00:00Z",
+            "user_type": "free",
+            "status": "completed",
+            "citation_count": 3,
+        }
+        data.update(overrides)
+        return data
+
+    def test_insert_validations_matches_single_inserts(self):
+        """Test that a batch produces the same rows as per-record inserts"""
+        records = [
+            self._validation("job-1", duration_seconds=1.5),
+            self._validation("job-2", status="pending", citation_count=None),
+            self._validation("job-1", duration_seconds=None, token_usage_total=300),
+            {"job_id": "job-2", "citation_count": 7, "upgrade_state": "locked"},
+        ]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            single = DatabaseManager(os.path.join(temp_dir, "single.db"))
+            batch = DatabaseManager(os.path.join(temp_dir, "batch.db"))
+
+            for record in records:
+                single.insert_validation(record)
+            assert batch.insert_validations(records) == []
+
+            for job_id in ("job-1", "job-2"):
+                assert batch.get_validation(job_id) == single.get_validation(job_id)
+            job_1 = batch.get_validation("job-1")
+            assert (job_1["duration_seconds"], job_1["token_usage_total"]) == (1.5, 300)
+            assert batch.get_validation("job-2")["citation_count"] == 7
+
+    def test_partial_update_without_record_is_reported(self):
+        """Test that partial updates for unknown jobs are returned, not inserted"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db = DatabaseManager(os.path.join(temp_dir, "test.db"))
+
+            missing = db.insert_validations([
+                self._validation("job-1"),
+                {"job_id": "job-unknown", "citation_count": 2},
+            ])
+
+            assert missing == ["job-unknown"]
+            assert db.get_validation("job-unknown") is None
+            assert db.get_validations_count() == 1
+
+    def test_individual_inserts_skip_bad_records_in_one_transaction(self):
+        """Test that a failing record is rolled back alone and the rest commit with the metadata"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db = DatabaseManager(os.path.join(temp_dir, "test.db"))
+
+            failures = db.insert_validations_individually([
+                self._validation("job-1"),
+                self._validation("job-bad", citation_count=object()),
+                self._validation("job-2"),
+            ], metadata={"position": "42"})
+
+            assert [job_id for job_id, _ in failures] == ["job-bad"]
+            assert db.get_validation("job-bad") is None
+            assert db.get_validations_count() == 2
+            assert db.get_metadata("position") == "42"
+
+    def test_insert_citations_skips_duplicates(self):
+        """Test that citations already stored or repeated in the batch are skipped"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db = DatabaseManager(os.path.join(temp_dir, "test.db"))
+            db.insert_citation_to_dashboard({"job_id": "job-1", "citation_text": "A"})
+
+            inserted = db.insert_citations_to_dashboard([
+                {"job_id": "job-1", "citation_text": "A"},
+                {"job_id": "job-1", "citation_text": "B", "citation_type": "book"},
+                {"job_id": "job-1", "citation_text": "B"},
+                {"job_id": "job-2", "citation_text": "A"},
+            ])
+
+            assert inserted == 2
+            rows = db.conn.execute(
+                "SELECT job_id, citation_text, citation_type FROM citations_dashboard ORDER BY id"
+            ).fetchall()
+            assert [tuple(row) for row in rows] == [
+                ("job-1", "A", None), ("job-1", "B", "book"), ("job-2", "A", None)
+            ]
+
+    def test_insert_site_visits(self):
+        """Test inserting a batch of site visits"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db = DatabaseManager(os.path.join(temp_dir, "test.db"))
+
+            db.insert_site_visits([
+                {"timestamp": f"2025-11-27T10:00:0{i}Z", "path": "/", "status_code": 200, "visitor_id": f"v{i}"}
+                for i in range(3)
+            ])
+
+            assert db.conn.execute("SELECT COUNT(*) FROM site_visits").fetchone()[0] == 3
+
+    def test_insert_site_visits_rolls_back_on_error(self):
+        """Test that a bad record leaves none of the batch behind"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db = DatabaseManager(os.path.join(temp_dir, "test.db"))
+
+            with pytest.raises(sqlite3.IntegrityError):
+                db.insert_site_visits([{"timestamp": "2025-11-27T10:00:00Z"}, {"timestamp": None}])
+
+            assert db.conn.execute("SELECT COUNT(*) FROM site_visits").fetchone()[0] == 0
+
+
+class TestKeysetPagination:
+    """Test cursor pagination and projection in get_validations()"""
+
+    def _db(self, temp_dir):
+        db = DatabaseManager(os.path.join(temp_dir, "test.db"))
+        # Several jobs per created_at, so pages split ties
+        db.insert_validations([
+            {
+                "job_id": f"job-{i:02d}",
+                "created_at": f"2025-11-27T10:00:{i // 4:02d}Z",
+                "user_type": "free" if i % 3 else "paid",
+                "status": "completed",
+                "error_message": "x" * 1000,
+            }
+            for i in range(30)
+        ])
+        return db
+
+    @pytest.mark.parametrize("order_dir,user_type", [("DESC", None), ("ASC", None), ("DESC", "free")])
+    def test_pages_match_offset_pages(self, order_dir, user_type):
+        """Test that following cursors returns the same pages as offsets"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db = self._db(temp_dir)
+
+            pages, after = [], None
+            while True:
+                page = db.get_validations(limit=7, order_dir=order_dir, user_type=user_type, after=after)
+                if not page:
+                    break
+                pages.append([v["job_id"] for v in page])
+                after = decode_page_cursor(encode_page_cursor(page[-1]))
+
+            expected = [
+                [v["job_id"] for v in db.get_validations(limit=7, offset=offset, order_dir=order_dir, user_type=user_type)]
+                for offset in range(0, 7 * len(pages), 7)
+            ]
+            assert pages == expected
+            assert sum(len(page) for page in pages) == db.get_validations_count(user_type=user_type)
+
+    def test_projection_skips_other_columns(self):
+        """Test that columns limits the columns read but keeps the key and status"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db = self._db(temp_dir)
+
+            validation = db.get_validations(limit=1, columns=["user_type", "not_a_column"])[0]
+
+            assert set(validation) == {"job_id", "created_at", "status", "user_type"}
+
+    def test_invalid_cursor_usage(self):
+        """Test that malformed cursors and non-created_at orderings are rejected"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db = self._db(temp_dir)
+
+            with pytest.raises(ValueError):
+                decode_page_cursor("not-a-cursor")
+            with pytest.raises(ValueError):
+                db.get_validations(order_by="job_id", after=("2025-11-27T10:00:00Z", "job-01"))
+
+    def test_filtered_pages_use_composite_index(self):
+        """Test that a filtered page is read in index order instead of sorted"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db = self._db(temp_dir)
+
+            plan = " ".join(row["detail"] for row in db.explain_query(
+                "SELECT * FROM validations WHERE user_type = ? AND (created_at, job_id) < (?, ?) "
+                "ORDER BY created_at DESC, job_id DESC LIMIT 10",
+                ("free", "2025-11-27T10:00:05Z", "job-20")
+            ))
+
+            assert "idx_validations_user_type_created" in plan
+            assert "TEMP B-TREE" not in plan
+
+
+class TestRollups:
+    """Test the materialized daily/hourly rollups behind the stats and chart endpoints"""
+
+    def _validations(self):
+        validations = []
+        for i in range(24):
+            # Mix the backend's and the log parser's created_at formats
+            created_at = f"2025-11-{1 + i % 3:02d}{'T' if i % 2 else ' '}{i:02d}:30:00{'Z' if i % 2 else ''}"
+            validations.append({
+                "job_id": f"job-{i}",
+                "created_at": created_at,
+                "user_type": "free" if i % 3 else "paid",
+                "status": ["completed", "failed", "pending"][i % 4 % 3],
+                "citation_count": None if i % 5 == 0 else i % 4 + 1,
+                "duration_seconds": 10.0 + i,
+                "free_user_id": f"free-{i % 4}",
+                "paid_user_id": None if i % 3 else "paid-1",
+                "is_test_job": i % 7 == 0,
+                "provider": "openai" if i % 2 else None,
+                "valid_citations_count": i % 3,
+            })
+        return validations
+
+    def _direct_stats(self, db, from_date, to_date):
+        """get_stats() computed straight from the validations table"""
+        query = """
+            SELECT COUNT(*), SUM(citation_count), COUNT(CASE WHEN user_type = 'free' THEN 1 END),
+                   AVG(duration_seconds)
+            FROM validations WHERE created_at >= ? AND created_at <= ?
+        """
+        row = db.conn.execute(query, (from_date, to_date)).fetchone()
+        return row[0], row[1], row[2], round(row[3], 1)
+
+    def _direct_daily(self, db, from_date, to_date):
+        """Chart points computed straight from the validations table"""
+        query = """
+            SELECT DATE(created_at), COUNT(*), COUNT(DISTINCT CASE WHEN user_type = 'free' THEN free_user_id END),
+                   COUNT(DISTINCT COALESCE(paid_user_id, free_user_id)), SUM(valid_citations_count)
+            FROM validations
+            WHERE created_at >= ? AND created_at <= ? AND (is_test_job = 0 OR is_test_job IS NULL)
+            GROUP BY DATE(created_at) ORDER BY 1
+        """
+        return [tuple(row) for row in db.conn.execute(query, (from_date, to_date))]
+
+    @pytest.mark.parametrize("from_date,to_date", [
+        ("2025-11-01", "2025-11-04"),
+        ("2025-11-01T12:00:00Z", "2025-11-03T08:00:00Z"),
+        ("2025-11-02 05:00:00", "2025-11-02T20:00:00Z"),
+    ])
+    def test_matches_direct_queries(self, from_date, to_date):
+        """Test that whole days from the rollups plus partial edge days equal a direct query"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db = DatabaseManager(os.path.join(temp_dir, "test.db"))
+            db.insert_validations(self._validations())
+            db.refresh_rollups()
+
+            stats = db.get_stats(from_date, to_date)
+            assert (
+                stats["total_validations"], stats["total_citations"], stats["free_users"], stats["avg_duration_seconds"]
+            ) == self._direct_stats(db, from_date, to_date)
+
+            daily = db.get_chart_data(from_date, to_date, exclude_tests=True)["series"]
+            assert [
+                (p["date"], p["total_validations"], p["unique_free_users"], p["total_unique_users"], p["valid_citations"])
+                for p in daily
+            ] == self._direct_daily(db, from_date, to_date)
+
+    def test_refresh_follows_writes(self):
+        """Test that inserts, updates and deletes mark their days for recomputation"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db = DatabaseManager(os.path.join(temp_dir, "test.db"))
+            db.insert_validations(self._validations())
+
+            assert db.refresh_rollups() == 3
+            assert db.refresh_rollups() == 0
+            assert db.get_stats()["total_validations"] == 24
+
+            db.insert_validation({"job_id": "job-0", "status": "failed"})
+            db.conn.execute("DELETE FROM validations WHERE created_at LIKE '2025-11-03%'")
+            db.conn.commit()
+
+            # Readers don't refresh: whole days stay as of the last refresh
+            assert db.get_stats()["total_validations"] == 24
+            assert db.refresh_rollups() == 2
+            stats = db.get_stats()
+            assert (stats["total_validations"], stats["failed"]) == (16, 5)
+            assert [p["date"] for p in db.get_chart_data()["series"]] == ["2025-11-01", "2025-11-02"]
+
+    def test_existing_rows_are_rolled_up_on_first_use(self):
+        """Test that a database with validations but no rollups gets every day built"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = os.path.join(temp_dir, "test.db")
+            db = DatabaseManager(db_path)
+            db.insert_validations(self._validations())
+            db.conn.execute("DELETE FROM validations_daily_rollup")
+            db.conn.execute("DELETE FROM validations_rollup_dirty")
+            db.conn.execute("DELETE FROM parser_metadata WHERE key = 'rollup_version'")
+            db.conn.commit()
+            db.close()
+
+            db = DatabaseManager(db_path)
+            assert db.refresh_rollups() == 3
+            assert db.get_stats()["total_validations"] == 24
+
+    def test_hourly_and_gated_stats(self):
+        """Test hourly chart points and gated engagement statistics"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db = DatabaseManager(os.path.join(temp_dir, "test.db"))
+            db.insert_validations([
+                {"job_id": "job-1", "created_at": "2025-11-01T10:05:00Z", "completed_at": "2025-11-01T10:06:00Z",
+                 "user_type": "free", "status": "completed", "results_gated": True,
+                 "results_revealed_at": "2025-11-01T10:07:30Z", "gated_outcome": "revealed", "style": "apa7"},
+                {"job_id": "job-2", "created_at": "2025-11-01 10:45:00", "user_type": "free", "status": "completed",
+                 "results_gated": True, "gated_outcome": "abandoned", "style": "mla9"},
+                {"job_id": "job-3", "created_at": "2025-11-01T11:00:00Z", "user_type": "paid", "status": "completed"},
+            ])
+            db.refresh_rollups()
+
+            hourly = db.get_chart_data(granularity='hour')["series"]
+            assert [(p["hour"], p["total_validations"]) for p in hourly] == [
+                ("2025-11-01T10:00", 2), ("2025-11-01T11:00", 1)
+            ]
+
+            gated = db.get_gated_stats()
+            assert (gated["total_gated"], gated["revealed_count"], gated["reveal_rate"]) == (2, 1, 50.0)
+            assert gated["avg_time_to_reveal_seconds"] == 90.0
+            assert gated["by_outcome"] == {"revealed": 1, "abandoned": 1}
+            assert gated["by_style"]["apa7"]["reveal_rate"] == 100.0
+            assert gated["conversion_metrics"]["gated_rate"] == 66.7
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
\ No newline at end of file
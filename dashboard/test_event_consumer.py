@@ -0,0 +1,190 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# Add the dashboard directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cron_parser import CronLogParser
+from database import DatabaseManager
+from event_consumer import fold_events, read_events
+
+
+def event(ts, event_type, job_id, **fields):
+    return {"ts": f"2025-11-04T10:{ts}Z", "type": event_type, "job_id": job_id, **fields}
+
+
+def job_events(job_id, start, user_type="free"):
+    """A full job lifecycle, interleaved-safe: every event names its job."""
+    return [
+        event(f"{start:02d}:00", "job_created", job_id, user_type=user_type, free_user_id=f"free-{job_id}",
+              style="apa7", is_test_job=False),
+        event(f"{start:02d}:01", "validation_type", job_id, validation_type="ref_only"),
+        event(f"{start:02d}:20", "token_usage", job_id, prompt=100, completion=20, total=120),
+        event(f"{start:02d}:30", "llm_call", job_id, provider="model_c", style="apa7", fallback=False,
+              duration_seconds=29.5),
+        event(f"{start:02d}:30", "validation_summary", job_id, citation_count=3, valid=2, invalid=1),
+        event(f"{start:02d}:30", "gating_decision", job_id, user_type=user_type, results_gated=False,
+              reason="Free tier under limit"),
+        event(f"{start:02d}:31", "job_completed", job_id),
+    ]
+
+
+class TestFoldEvents(unittest.TestCase):
+    def test_overlapping_jobs_are_attributed_exactly(self):
+        # Two jobs running at the same time, their events interleaved
+        a, b = job_events("job-a", 0), job_events("job-b", 0)
+        b[2] = dict(b[2], prompt=7, completion=3, total=10)
+        events = [e for pair in zip(a, b) for e in pair]
+        events.append(event("00:25", "token_usage", "job-a", prompt=1, completion=1, total=2))
+
+        jobs = fold_events(events)
+
+        self.assertEqual(jobs["job-a"]["token_usage_total"], 122)
+        self.assertEqual(jobs["job-b"]["token_usage_total"], 10)
+        self.assertEqual(jobs["job-a"], dict(jobs["job-a"], **{
+            "created_at": "2025-11-04T10:00:00Z", "completed_at": "2025-11-04T10:00:31Z",
+            "status": "completed", "user_type": "free", "free_user_id": "free-job-a", "provider": "model_c",
+            "duration_seconds": 29.5, "citation_count": 3, "valid_citations_count": 2,
+            "invalid_citations_count": 1, "results_gated": False, "validation_type": "ref_only",
+        }))
+
+    def test_partial_and_unattributed_events(self):
+        jobs = fold_events([
+            event("00:00", "upgrade", "job-a", event="upgrade_presented", experiment_variant="1"),
+            event("00:01", "upgrade", "job-a", event="clicked_upgrade", token="abcd1234"),
+            event("00:02", "correction", "job-a", action="copy"),
+            event("00:03", "token_usage", None, prompt=1, completion=1, total=2),
+            event("00:04", "no_such_type", "job-a"),
+        ])
+
+        self.assertEqual(jobs, {"job-a": {
+            "job_id": "job-a", "upgrade_state": "locked,clicked", "experiment_variant": "1",
+            "paid_user_id": "abcd1234", "corrections_copied": 1,
+        }})
+
+
+class TestEventConsumer(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.test_dir, "validations.db")
+        self.event_log = os.path.join(self.test_dir, "events.ndjson")
+        self.parser = CronLogParser(self.db_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def append(self, events, partial_line=""):
+        with open(self.event_log, "a") as f:
+            f.write("".join(json.dumps(e) + "\n" for e in events) + partial_line)
+
+    def test_read_events_stops_at_partial_line(self):
+        self.append(job_events("job-a", 0)[:2], partial_line='{"ts": "2025-11-04T10:00:02Z", "ty')
+        with open(self.event_log, "a") as f:
+            f.write("not json\n")
+
+        events, position = read_events(self.event_log)
+
+        self.assertEqual(len(events), 2)
+        self.assertEqual(read_events(self.event_log, position), ([], position))
+
+    def test_incremental_runs_update_jobs(self):
+        first, rest = job_events("job-a", 0)[:3], job_events("job-a", 0)[3:]
+        self.append(first + job_events("job-b", 1))
+        self.parser.parse_events(self.event_log)
+
+        with DatabaseManager(self.db_path) as db:
+            self.assertEqual(db.get_validation("job-a")["status"], "pending")
+            self.assertEqual(db.get_validation("job-b")["status"], "completed")
+
+        self.append(rest + [
+            event("00:40", "token_usage", "job-a", prompt=5, completion=5, total=10),
+            event("00:50", "results_locked", "job-a", partial_type="locked"),
+            event("01:00", "upgrade", "job-a", event="clicked_upgrade", experiment_variant="2"),
+            event("01:05", "correction", "job-b", action="copy"),
+        ])
+        self.parser.parse_events(self.event_log)
+        # Late events in a later run merge with the stored funnel state and counters
+        self.append([
+            event("02:00", "upgrade", "job-a", event="modal_proceed"),
+            event("02:05", "correction", "job-b", action="copy"),
+            event("02:10", "reveal", "job-b", outcome="revealed"),
+        ])
+        self.parser.parse_events(self.event_log)
+        self.parser.parse_events(self.event_log)
+
+        with DatabaseManager(self.db_path) as db:
+            job_a = db.get_validation("job-a")
+            job_b = db.get_validation("job-b")
+            self.assertEqual(db.get_validations_count(), 2)
+
+        self.assertEqual(job_a["status"], "completed")
+        self.assertEqual(job_a["completed_at"], "2025-11-04T10:00:31Z")
+        self.assertEqual(job_a["token_usage_total"], 130)
+        self.assertEqual(job_a["upgrade_state"], "locked,clicked,modal")
+        self.assertEqual(job_a["experiment_variant"], "2")
+        self.assertEqual(job_b["corrections_copied"], 2)
+        self.assertEqual(job_b["results_revealed_at"], "2025-11-04T10:02:10Z")
+        self.assertEqual(job_b["gated_outcome"], "revealed")
+        self.assertEqual(job_b["free_user_id"], "free-job-b")
+
+    def test_interrupted_run_does_not_replay_counters(self):
+        self.append(job_events("job-b", 1))
+        self.parser.parse_events(self.event_log)
+        self.append([event("01:05", "correction", "job-b", action="copy"),
+                     event("01:06", "token_usage", "job-b", prompt=5, completion=5, total=10)])
+
+        # Fails after the records are written, before the position is saved
+        with patch.object(DatabaseManager, "_write_metadata", side_effect=RuntimeError("disk full")):
+            self.parser.parse_events(self.event_log)
+        self.parser.parse_events(self.event_log)
+
+        with DatabaseManager(self.db_path) as db:
+            job_b = db.get_validation("job-b")
+        self.assertEqual(job_b["corrections_copied"], 1)
+        self.assertEqual(job_b["token_usage_total"], 130)
+
+    def test_follows_rotation(self):
+        self.append(job_events("job-a", 0)[:1])
+        self.parser.parse_events(self.event_log)
+        # Written before the rotation but after the last run
+        self.append(job_events("job-a", 0)[1:])
+        os.rename(self.event_log, self.event_log + ".1")
+        self.append(job_events("job-b", 1))
+
+        self.parser.parse_events(self.event_log)
+
+        with DatabaseManager(self.db_path) as db:
+            self.assertEqual(db.get_validation("job-a")["status"], "completed")
+            self.assertEqual(db.get_validation("job-b")["status"], "completed")
+            self.assertEqual(db.get_validation("job-a")["citation_count"], 3)
+            self.assertEqual(db.get_stats()["total_validations"], 2)
+
+    def test_job_timings_feed_latency_stats(self):
+        for i, (job_id, provider, llm) in enumerate((("job-a", "model_c", 10.0), ("job-b", "model_c", 20.0),
+                                                     ("job-c", "model_g", 2.0))):
+            events = job_events(job_id, i)
+            events[3] = dict(events[3], provider=provider)
+            events.append(event(f"{i:02d}:31", "job_timings", job_id, provider=provider, style="apa7",
+                                spans={"queue_wait": 0.01, "llm": llm, "total": llm + 1}))
+            self.append(events)
+        self.append([event("05:00", "job_created", "job-d", user_type="free", style="mla9")])
+        self.parser.parse_events(self.event_log)
+
+        with DatabaseManager(self.db_path) as db:
+            self.assertEqual(json.loads(db.get_validation("job-a")["stage_timings"])["llm"], 10.0)
+            stats = db.get_latency_stats()
+
+        self.assertEqual(stats["timed_jobs"], 3)
+        self.assertEqual(stats["stages"]["llm"], {"count": 3, "avg": 10.667, "p50": 10.0, "p95": 20.0, "p99": 20.0})
+        self.assertEqual(stats["by_provider"]["model_c"]["llm"]["p50"], 10.0)
+        self.assertEqual(stats["by_provider"]["model_g"]["total"]["count"], 1)
+        self.assertEqual(set(stats["by_style"]), {"apa7"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,5 @@
 import unittest
-from datetime import datetime
+from datetime import datetime, timedelta
 import sys
 import os
 
@@ -24,7 +24,13 @@ from log_parser import (
     parse_job_events,
     find_job_by_timestamp,
     parse_metrics,
-    parse_logs
+    parse_logs,
+    parse_log_lines,
+    extract_citations_from_all_lines,
+    iter_logs,
+    _finalize_job_data,
+    JobTimeIndex,
+    StreamingJobParser
 )
 
 
@@ -796,5 +802,173 @@ class TestLogParser(unittest.TestCase):
         self.assertEqual(job["corrections_copied"], 1)
 
 
+
+class TestSinglePassParser(unittest.TestCase):
+    """parse_log_lines and its indexes must match the three-pass parser."""
+
+    def test_extract_timestamp_invalid_date(self):
+        self.assertIsNone(extract_timestamp("2025-13-45 10:00:00 - INFO - bad date"))
+
+    def test_job_time_index_matches_linear_scan(self):
+        base = datetime(2025, 11, 4, 10, 0, 0)
+        jobs = {}
+        for i in range(40):
+            created_at = base + timedelta(seconds=17 * i)
+            job = {"created_at": created_at}
+            # Mix of short, long (> 2 * window) and still-running jobs
+            if i % 3 == 0:
+                job["completed_at"] = created_at + timedelta(seconds=30)
+            elif i % 3 == 1:
+                job["completed_at"] = created_at + timedelta(seconds=400)
+            jobs[f"job-{i}"] = job
+        # Jobs added out of creation order and without creation time
+        jobs["late-insert"] = {"created_at": base + timedelta(seconds=5)}
+        jobs["partial-only"] = {"job_id": "partial-only"}
+
+        index = JobTimeIndex(jobs)
+        for offset in range(-10, 17 * 40 + 600, 3):
+            timestamp = base + timedelta(seconds=offset)
+            expected = find_job_by_timestamp(jobs, timestamp)
+            self.assertIs(index.find(timestamp), expected, f"offset {offset}")
+
+    def test_parse_log_lines_matches_three_passes(self):
+        log_lines = [
+            "2025-11-04 10:00:00 - INFO - Creating async job aaa-111 for free user",
+            "2025-11-04 10:00:00 - INFO - Async Validation request - user_type=free, paid_user_id=N/A, free_user_id=free-1",
+            "2025-11-04 10:00:01 - INFO - Creating async job bbb-222 for paid user",
+            "2025-11-04 10:00:01 - INFO - Citation text preview: Smith, J. (2020). Title...",
+            "2025-11-04 10:00:02 - INFO - Async Validation request - user_type=paid, paid_user_id=paid-1, free_user_id=N/A",
+            "CITATION #1",
+            "ORIGINAL:",
+            "Smith, J. (2020). Title.",
+            "",
+            "2025-11-04 10:00:30 - INFO - Token usage: 100 prompt + 50 completion = 150 total",
+            "2025-11-04 10:00:30 - INFO - Gemini API call completed in 29.0s",
+            "2025-11-04 10:00:30 - INFO - Raw response:",
+            "ORIGINAL:",
+            "Doe, J. (2021). Other.",
+            "2025-11-04 10:00:31 - INFO - Validation summary: 1 valid, 1 invalid",
+            "2025-11-04 10:00:31 - INFO - Job aaa-111: Completed successfully",
+            "2025-11-04 10:00:45 - INFO - Job bbb-222: Completed successfully",
+            "ORIGINAL:",
+            "Never timestamped.",
+        ]
+
+        expected = parse_job_events(log_lines)
+        expected = parse_metrics(log_lines, expected)
+        expected = extract_citations_from_all_lines(log_lines, expected)
+
+        jobs = parse_log_lines(iter(log_lines))
+
+        self.assertEqual(jobs, expected)
+        self.assertEqual(jobs["aaa-111"]["free_user_id"], "free-1")
+        self.assertEqual(jobs["bbb-222"]["paid_user_id"], "paid-1")
+        self.assertEqual(jobs["aaa-111"]["citations_full"], "Doe, J. (2021). Other.")
+        self.assertEqual(jobs["aaa-111"]["token_usage_total"], 150)
+
+    def test_user_ids_go_to_first_inserted_candidate(self):
+        """Association follows job insertion order, not creation time."""
+        log_lines = [
+            "2025-11-04 10:00:00 - INFO - VALIDATION_TYPE: job_id=bbb-222 type=ref_only",
+            "2025-11-04 10:00:30 - INFO - Creating async job aaa-111 for free user",
+            "2025-11-04 10:00:31 - INFO - Creating async job bbb-222 for free user",
+            "2025-11-04 10:00:32 - INFO - Validation request - user_type=free, paid_user_id=N/A, free_user_id=free-1",
+        ]
+
+        jobs = parse_log_lines(log_lines)
+
+        self.assertEqual(jobs["bbb-222"]["free_user_id"], "free-1")
+        self.assertIsNone(jobs["aaa-111"]["free_user_id"])
+
+
+class TestStreamingParser(unittest.TestCase):
+    """StreamingJobParser emits jobs early with the same content as parse_log_lines."""
+
+    @staticmethod
+    def job_id(i):
+        return f"{i:04x}-abcd"
+
+    def make_log_lines(self, num_jobs, spacing_seconds=60):
+        base = datetime(2025, 11, 4, 10, 0, 0)
+        log_lines = []
+        for i in range(num_jobs):
+            def ts(offset):
+                return (base + timedelta(seconds=i * spacing_seconds + offset)).strftime("%Y-%m-%d %H:%M:%S")
+            log_lines += [
+                f"{ts(0)} - INFO - Creating async job {self.job_id(i)} for free user",
+                f"{ts(0)} - INFO - Async Validation request - user_type=free, paid_user_id=N/A, free_user_id=free-{i}",
+                f"{ts(1)} - INFO - Citation text preview: Citation {i}...",
+                f"{ts(20)} - INFO - Token usage: {i} prompt + 1 completion = {i + 1} total",
+                f"{ts(20)} - INFO - Raw response:",
+                "ORIGINAL:",
+                f"Author {i}. (2020). Title.",
+                f"{ts(21)} - INFO - Validation summary: 1 valid, 0 invalid",
+                f"{ts(21)} - INFO - Job {self.job_id(i)}: Completed successfully",
+            ]
+        return log_lines
+
+    def test_matches_parse_log_lines(self):
+        log_lines = self.make_log_lines(50)
+        # Job that never completes and a late upgrade click for the first job
+        log_lines.insert(3, "2025-11-04 10:00:01 - INFO - Creating async job dead-0001 for paid user")
+        log_lines.append("2025-11-04 10:50:00 - INFO - UPGRADE_WORKFLOW: job_id=0000-abcd event=clicked_upgrade")
+
+        expected = {job["job_id"]: job for job in _finalize_job_data(parse_log_lines(log_lines))}
+        parser = StreamingJobParser()
+        emitted_early = []
+        for line in log_lines:
+            emitted_early += parser.feed(line)
+        streamed = emitted_early + parser.finish()
+
+        self.assertGreater(len(emitted_early), 30)
+        self.assertEqual(len(streamed), 52)
+        streamed_by_id = {}
+        for job in streamed:
+            streamed_by_id.setdefault(job["job_id"], []).append(job)
+        for job_id in expected:
+            if job_id == self.job_id(0):
+                continue
+            self.assertEqual(streamed_by_id[job_id], [expected[job_id]], job_id)
+        self.assertEqual(streamed_by_id["dead-0001"][0]["status"], "pending")
+
+        # The click came long after the first job was emitted: it becomes a partial record
+        full, partial = streamed_by_id[self.job_id(0)]
+        self.assertEqual(full["citations_full"], "Author 0. (2020). Title.")
+        self.assertIsNone(full["upgrade_state"])
+        self.assertEqual(partial["upgrade_state"], "clicked")
+        self.assertNotIn("created_at", partial)
+
+    def test_open_jobs_stay_bounded(self):
+        parser = StreamingJobParser()
+        emitted = 0
+        max_open = 0
+        for line in self.make_log_lines(500):
+            emitted += len(parser.feed(line))
+            max_open = max(max_open, len(parser.jobs))
+        emitted += len(parser.finish())
+
+        self.assertEqual(emitted, 500)
+        # Linger (300s) + match window (120s) + flush interval (120s) of one-a-minute jobs
+        self.assertLessEqual(max_open, 10)
+
+    def test_iter_logs_reads_gzip(self):
+        import gzip
+        import tempfile
+
+        log_lines = self.make_log_lines(20)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "app.log.gz")
+            with gzip.open(path, "wt", encoding="utf-8") as f:
+                f.write("\n".join(log_lines) + "\n")
+
+            expected = {job["job_id"]: job for job in parse_logs(path)}
+            streamed = {job["job_id"]: job for job in iter_logs(path)}
+
+        self.assertEqual(len(streamed), 20)
+        self.assertEqual(streamed, expected)
+        self.assertEqual(streamed[self.job_id(7)]["free_user_id"], "free-7")
+        self.assertEqual(streamed[self.job_id(7)]["token_usage_total"], 8)
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Log parser throughput benchmark
+
+Generates the generate_test_log.py fixtures (if missing) and reports MB/s for
+the single-pass dashboard parser:
+- parse_logs() on the app log fixture
+- CitationLogParser.parse_new_entries() on both fixtures
+- iter_logs() (streaming) on the app log fixture and a gzip copy of it
+
+followed by the peak traced memory of parse_logs() vs iter_logs().
+"""
+
+import gzip
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+script_dir = Path(__file__).parent
+sys.path.insert(0, str(script_dir))
+sys.path.insert(0, str(script_dir.parent / 'dashboard'))
+
+from generate_test_log import create_large_app_log, create_large_citation_log
+from log_parser import CitationLogParser, iter_logs, parse_logs
+
+
+def measure(label, log_path, parse, runs=3):
+    """Run parse(log_path) `runs` times and print the best throughput"""
+    size_mb = os.path.getsize(log_path) / (1024 * 1024)
+    best = None
+    jobs = 0
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        jobs = len(parse(log_path))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    print(f'{label:<45} {size_mb:7.1f} MB {best:7.2f}s {size_mb / best:8.1f} MB/s  ({jobs} jobs)')
+    return size_mb / best
+
+
+def peak_memory(label, log_path, parse):
+    """Run parse(log_path) once under tracemalloc and print the peak allocation"""
+    tracemalloc.start()
+    jobs = len(parse(log_path))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f'{label:<45} {peak / (1024 * 1024):7.1f} MB peak  ({jobs} jobs)')
+    return peak
+
+
+def stream_jobs(log_path):
+    """Consume iter_logs() without keeping the jobs"""
+    return range(sum(1 for _ in iter_logs(log_path)))
+
+
+def parse_with_citation_log_parser(log_path):
+    """Parse the whole file as new entries, without touching the real position file"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        parser = CitationLogParser(log_path, position_file_path=os.path.join(tmp_dir, 'position'))
+        return parser.parse_new_entries()
+
+
+def main():
+    num_jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 4000
+    citations_per_job = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    log_dir = script_dir.parent / 'logs'
+    app_log = log_dir / 'app_test.log'
+    citations_log = log_dir / 'citations_test.log'
+
+    if not app_log.exists():
+        create_large_app_log(num_jobs, citations_per_job)
+    if not citations_log.exists():
+        create_large_citation_log(num_jobs, citations_per_job)
+
+    print('\n=== LOG PARSER THROUGHPUT ===')
+    measure('parse_logs (app log)', str(app_log), parse_logs)
+    measure('CitationLogParser (app log)', str(app_log), parse_with_citation_log_parser)
+    measure('CitationLogParser (citations log)', str(citations_log), parse_with_citation_log_parser)
+    measure('iter_logs (app log)', str(app_log), stream_jobs)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        gz_log = os.path.join(tmp_dir, 'app_test.log.gz')
+        with open(app_log, 'rb') as src, gzip.open(gz_log, 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        measure('iter_logs (app log, gzip)', gz_log, stream_jobs)
+
+    print('\n=== LOG PARSER PEAK MEMORY ===')
+    peak_memory('parse_logs (app log)', str(app_log), parse_logs)
+    peak_memory('iter_logs (app log)', str(app_log), stream_jobs)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+LLM response parser benchmark
+
+Parses the recorded 121-citation responses in competitive_benchmark/ with the
+shared CITATION #N parser of backend/providers/base.py and reports the best
+time per response and the throughput:
+- parse_response() on the whole response
+- CitationBlockParser.feed() with ~20 character deltas, as a streamed
+  completion arrives
+
+Usage: benchmark_response_parser.py [runs]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+script_dir = Path(__file__).parent
+sys.path.insert(0, str(script_dir.parent / 'backend'))
+
+from providers.base import CitationBlockParser, parse_response
+
+RECORDED_RESPONSES = [
+    script_dir.parent / 'competitive_benchmark' / 'gpt51_batch_response.txt',
+    script_dir.parent / 'competitive_benchmark' / 'gpt51_batch_response_low.txt',
+]
+DELTA_SIZE = 20
+
+
+def parse_streamed(text):
+    """Feed text to a CitationBlockParser in DELTA_SIZE pieces"""
+    parser = CitationBlockParser()
+    results = []
+    for start in range(0, len(text), DELTA_SIZE):
+        results.extend(parser.feed(text[start:start + DELTA_SIZE]))
+    results.extend(parser.close())
+    return results
+
+
+def measure(label, text, parse, runs):
+    """Run parse(text) `runs` times and print the best time and throughput"""
+    size_kb = len(text.encode('utf-8')) / 1024
+    best = None
+    citations = 0
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        citations = len(parse(text))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    print(f'{label:<50} {size_kb:7.1f} KB {best * 1000:7.2f} ms {size_kb / 1024 / best:7.1f} MB/s  ({citations} citations)')
+    return best
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+    print('\n=== RESPONSE PARSER ===')
+    for path in RECORDED_RESPONSES:
+        if not path.exists():
+            print(f'{path.name}: not found, skipped')
+            continue
+        text = path.read_text()
+        measure(f'parse_response ({path.name})', text, parse_response, runs)
+        measure(f'streamed ({path.name})', text, parse_streamed, runs)
+
+
+if __name__ == '__main__':
+    main()
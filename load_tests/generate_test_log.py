@@ -1,13 +1,87 @@
 #!/usr/bin/env python3
 """
-Generate large test citation log file for parser performance testing
+Generate large test log files (citations log and app log) for parser performance testing
 """
 
 import os
 import sys
 import time
+from datetime import datetime, timedelta
 from pathlib import Path
 
+# Sample citation templates for variety
+CITATION_TEMPLATES = [
+    '{author}. {title}. {publisher}, {year}.',
+    '{author}. "{title}" {journal}, {volume}({issue}): {pages}, {year}.',
+    '{author}. {title}. PhD thesis, {university}, {year}.',
+    '{author}. {title}. In {conference}, pp. {pages}, {year}.',
+    '{author} and {coauthor}. {title}. {publisher}, {year}.'
+]
+
+AUTHORS = [
+    'Smith J', 'Johnson A', 'Williams B', 'Brown C', 'Davis D',
+    'Miller E', 'Wilson F', 'Moore G', 'Taylor H', 'Anderson K',
+    'Thomas L', 'Jackson M', 'White N', 'Harris P', 'Martin S'
+]
+
+TITLES = [
+    'A Study on Advanced Methods', 'Machine Learning Applications',
+    'Data Analysis Techniques', 'Computational Intelligence',
+    'Algorithm Design Patterns', 'Software Engineering Best Practices',
+    'Database Optimization Strategies', 'Network Security Fundamentals'
+]
+
+PUBLISHERS = [
+    'ACM Press', 'IEEE Computer Society', 'Springer', 'Oxford University Press',
+    'Cambridge University Press', 'MIT Press', 'Wiley', 'Elsevier'
+]
+
+
+def make_citation(job_id, citation_num):
+    """Build a varied, production-sized citation for the given job/citation number"""
+    # Create varied citations
+    template = CITATION_TEMPLATES[citation_num % len(CITATION_TEMPLATES)]
+    author = AUTHORS[(job_id + citation_num) % len(AUTHORS)]
+    title = TITLES[(job_id + citation_num * 2) % len(TITLES)]
+    publisher = PUBLISHERS[(job_id + citation_num * 3) % len(PUBLISHERS)]
+    year = 2020 + (job_id % 4)
+
+    if 'journal' in template:
+        journal = f'Journal of {TITLES[job_id % len(TITLES)]}'
+        volume = 10 + (job_id % 20)
+        issue = 1 + (job_id % 6)
+        pages = f'{100 + job_id % 900}-{105 + job_id % 900}'
+
+        citation = template.format(
+            author=author,
+            title=title,
+            journal=journal,
+            volume=volume,
+            issue=issue,
+            pages=pages,
+            year=year
+        )
+    elif 'university' in template:
+        universities = ['Stanford University', 'MIT', 'CMU', 'UC Berkeley', 'University of Washington']
+        university = universities[job_id % len(universities)]
+        citation = template.format(author=author, title=title, university=university, year=year)
+    elif 'conference' in template:
+        conferences = ['ICML', 'NeurIPS', 'ICLR', 'AAAI', 'IJCAI']
+        conference = conferences[job_id % len(conferences)]
+        pages = f'{100 + job_id % 2000}-{105 + job_id % 2000}'
+        citation = template.format(author=author, title=title, conference=conference, pages=pages, year=year)
+    elif 'coauthor' in template:
+        coauthor = AUTHORS[(job_id + citation_num + 1) % len(AUTHORS)]
+        citation = template.format(author=author, coauthor=coauthor, title=title, publisher=publisher, year=year)
+    else:
+        citation = template.format(author=author, title=title, publisher=publisher, year=year)
+
+    # Add some realistic text to simulate production data
+    citation += f" This citation represents a realistic academic reference with sufficient detail to simulate production data volume and variety of source types."
+
+    return citation
+
+
 def create_large_citation_log(num_jobs=4000, citations_per_job=8):
     """Generate large test log file"""
     script_dir = Path(__file__).parent
@@ -22,33 +96,6 @@ def create_large_citation_log(num_jobs=4000, citations_per_job=8):
     print(f'Generating {num_jobs} jobs with {citations_per_job} citations each...')
     print(f'Output file: {log_path}')
 
-    # Sample citation templates for variety
-    citation_templates = [
-        '{author}. {title}. {publisher}, {year}.',
-        '{author}. "{title}" {journal}, {volume}({issue}): {pages}, {year}.',
-        '{author}. {title}. PhD thesis, {university}, {year}.',
-        '{author}. {title}. In {conference}, pp. {pages}, {year}.',
-        '{author} and {coauthor}. {title}. {publisher}, {year}.'
-    ]
-
-    authors = [
-        'Smith J', 'Johnson A', 'Williams B', 'Brown C', 'Davis D',
-        'Miller E', 'Wilson F', 'Moore G', 'Taylor H', 'Anderson K',
-        'Thomas L', 'Jackson M', 'White N', 'Harris P', 'Martin S'
-    ]
-
-    titles = [
-        'A Study on Advanced Methods', 'Machine Learning Applications',
-        'Data Analysis Techniques', 'Computational Intelligence',
-        'Algorithm Design Patterns', 'Software Engineering Best Practices',
-        'Database Optimization Strategies', 'Network Security Fundamentals'
-    ]
-
-    publishers = [
-        'ACM Press', 'IEEE Computer Society', 'Springer', 'Oxford University Press',
-        'Cambridge University Press', 'MIT Press', 'Wiley', 'Elsevier'
-    ]
-
     start_time = time.time()
 
     with open(log_path, 'w') as f:
@@ -56,46 +103,7 @@ def create_large_citation_log(num_jobs=4000, citations_per_job=8):
             f.write(f'<<JOB_ID:test-load-job-{job_id:04d}>>\n')
 
             for citation_num in range(citations_per_job):
-                # Create varied citations
-                template = citation_templates[citation_num % len(citation_templates)]
-                author = authors[(job_id + citation_num) % len(authors)]
-                title = titles[(job_id + citation_num * 2) % len(titles)]
-                publisher = publishers[(job_id + citation_num * 3) % len(publishers)]
-                year = 2020 + (job_id % 4)
-
-                if 'journal' in template:
-                    journal = f'Journal of {titles[job_id % len(titles)]}'
-                    volume = 10 + (job_id % 20)
-                    issue = 1 + (job_id % 6)
-                    pages = f'{100 + job_id % 900}-{105 + job_id % 900}'
-
-                    citation = template.format(
-                        author=author,
-                        title=title,
-                        journal=journal,
-                        volume=volume,
-                        issue=issue,
-                        pages=pages,
-                        year=year
-                    )
-                elif 'university' in template:
-                    universities = ['Stanford University', 'MIT', 'CMU', 'UC Berkeley', 'University of Washington']
-                    university = universities[job_id % len(universities)]
-                    citation = template.format(author=author, title=title, university=university, year=year)
-                elif 'conference' in template:
-                    conferences = ['ICML', 'NeurIPS', 'ICLR', 'AAAI', 'IJCAI']
-                    conference = conferences[job_id % len(conferences)]
-                    pages = f'{100 + job_id % 2000}-{105 + job_id % 2000}'
-                    citation = template.format(author=author, title=title, conference=conference, pages=pages, year=year)
-                elif 'coauthor' in template:
-                    coauthor = authors[(job_id + citation_num + 1) % len(authors)]
-                    citation = template.format(author=author, coauthor=coauthor, title=title, publisher=publisher, year=year)
-                else:
-                    citation = template.format(author=author, title=title, publisher=publisher, year=year)
-
-                # Add some realistic text to simulate production data
-                citation += f" This citation represents a realistic academic reference with sufficient detail to simulate production data volume and variety of source types."
-
+                citation = make_citation(job_id, citation_num)
                 f.write(f'{citation}\n')
 
             f.write('<<<END_JOB>>>\n')
@@ -118,6 +126,92 @@ def create_large_citation_log(num_jobs=4000, citations_per_job=8):
 
     return log_path
 
+def create_large_app_log(num_jobs=4000, citations_per_job=8):
+    """Generate large test app log (the format dashboard/log_parser.py parses)"""
+    script_dir = Path(__file__).parent
+    project_dir = script_dir.parent
+    log_dir = project_dir / 'logs'
+
+    # Create logs directory if it doesn't exist
+    os.makedirs(log_dir, exist_ok=True)
+
+    log_path = os.path.join(log_dir, 'app_test.log')
+
+    print(f'Generating {num_jobs} app log jobs with {citations_per_job} citations each...')
+    print(f'Output file: {log_path}')
+
+    start_time = time.time()
+    base_time = datetime(2025, 11, 4, 0, 0, 0)
+
+    # (timestamp, sequence, text) - jobs overlap, so entries are sorted before writing
+    entries = []
+
+    def log(when, logger, source, message):
+        stamp = when.strftime('%Y-%m-%d %H:%M:%S')
+        entries.append((when, len(entries), f'{stamp} - {logger} - INFO - {source} - {message}\n'))
+
+    for job_num in range(num_jobs):
+        job_id = f'{job_num:08x}-0000-4000-8000-{job_num:012x}'
+        user_type = 'paid' if job_num % 5 == 0 else 'free'
+        paid_user_id = f'paid-{job_num % 300}' if user_type == 'paid' else 'N/A'
+        free_user_id = f'free-{job_num % 1500}' if user_type == 'free' else 'N/A'
+        created = base_time + timedelta(seconds=3 * job_num)
+        duration = 5 + (job_num * 7) % 35
+        completed = created + timedelta(seconds=duration)
+        citations = [make_citation(job_num, n) for n in range(citations_per_job)]
+        valid = (job_num * 3) % (citations_per_job + 1)
+
+        log(created, 'citation_validator', 'app.py:1701', f'Creating async job {job_id} for {user_type} user')
+        log(created, 'citation_validator', 'app.py:1720',
+            f'Async Validation request - user_type={user_type}, paid_user_id={paid_user_id}, free_user_id={free_user_id}')
+        log(created, 'citation_validator', 'app.py:1755', f'Citation text preview: {citations[0][:200]}...')
+        log(created + timedelta(seconds=1), 'citation_validator', 'app.py:1790',
+            f'PROVIDER_SELECTION: job_id={job_id} style=apa7 model=model_c status=success fallback=False')
+        log(created + timedelta(seconds=1), 'gemini_provider', 'gemini_provider.py:98',
+            f'Starting validation for {sum(len(c) for c in citations)} characters of citation text (style=apa7)')
+        log(completed - timedelta(seconds=1), 'gemini_provider', 'gemini_provider.py:139',
+            f'Token usage: {900 + job_num % 400} prompt + {700 + job_num % 300} completion = '
+            f'{1600 + job_num % 400 + job_num % 300} total')
+        log(completed - timedelta(seconds=1), 'gemini_provider', 'gemini_provider.py:146',
+            f'Gemini API call completed in {duration - 1.5:.1f}s')
+
+        # Raw response dump: ORIGINAL: blocks are multiline and untimestamped
+        response_lines = ''.join(
+            f'CITATION #{n + 1}\nORIGINAL:\n{citation}\nSOURCE TYPE: book\n\n'
+            for n, citation in enumerate(citations)
+        )
+        stamp = (completed - timedelta(seconds=1)).strftime('%Y-%m-%d %H:%M:%S')
+        entries.append((
+            completed - timedelta(seconds=1), len(entries),
+            f'{stamp} - gemini_provider - DEBUG - gemini_provider.py:150 - Raw response:\n{response_lines}'
+        ))
+
+        log(completed, 'citation_validator', 'app.py:1830', f'Job {job_id}: LLM API completed in {duration - 1.0:.1f}s')
+        log(completed, 'citation_validator', 'app.py:1835', f'Job {job_id}: Found {citations_per_job} citation result(s)')
+        log(completed, 'citation_validator', 'app.py:1840',
+            f'Validation summary: {valid} valid, {citations_per_job - valid} invalid')
+        log(completed, 'citation_validator', 'app.py:1850', f'Job {job_id}: Completed successfully')
+
+    entries.sort()
+
+    with open(log_path, 'w') as f:
+        for _, _, text in entries:
+            f.write(text)
+
+    end_time = time.time()
+    generation_time = end_time - start_time
+
+    file_size = os.path.getsize(log_path)
+
+    print(f'\n=== GENERATION COMPLETE ===')
+    print(f'Generated {num_jobs} app log jobs with {citations_per_job} citations each')
+    print(f'Total log entries: {len(entries)}')
+    print(f'Generation time: {generation_time:.2f} seconds')
+    print(f'Log file size: {file_size / (1024*1024):.1f} MB')
+    print(f'File location: {log_path}')
+
+    return log_path
+
 if __name__ == '__main__':
     # Allow customization from command line
     num_jobs = 4000
@@ -129,4 +223,5 @@ if __name__ == '__main__':
         citations_per_job = int(sys.argv[2])
 
     log_path = create_large_citation_log(num_jobs, citations_per_job)
-    print(f'\nReady for parser performance testing with: {log_path}')
\ No newline at end of file
+    app_log_path = create_large_app_log(num_jobs, citations_per_job)
+    print(f'\nReady for parser performance testing with: {log_path} and {app_log_path}')
\ No newline at end of file